@@ -4,13 +4,24 @@ from flask_wtf.csrf import CSRFProtect
 from flask_migrate import Migrate
 from datetime import datetime
 from app.config import Config
-from app.models import db, User
-from app.auth import auth_bp, login_required
+from app.models import db
+from app.auth import auth_bp, login_required, load_principal, register_principal_listeners
 from app.account import account_bp
 from app.categories import category_bp
 from app.transactions import transaction_bp
 from app.home import home as home_bp
 from app.profile import profile_bp
+from app.admin import admin_bp
+from app.rollups import register_rollup_listeners, rollups_cli
+from app.statistics import register_statistics_listeners
+from app.reference import register_reference_listeners
+from app.descriptions import register_description_listeners
+from app.search import register_search_ddl, search_cli
+from app.changes import register_change_listeners
+from app.ledger import ledger_cli
+from app.idempotency import idempotency_cli, register_idempotency_listeners
+from app.jobs import jobs_bp, jobs_cli
+from app.purge import purge_cli
 
 # Create the blueprint first
 dashboard = Blueprint('dashboard', __name__)
@@ -25,6 +36,29 @@ def create_app(config_class=Config):
     migrate = Migrate(app, db)
     csrf = CSRFProtect(app)
     
+    # Keep daily rollups in step with every transaction write
+    register_rollup_listeners()
+    # Drop cached statistics of users whose ledger changed once it commits
+    register_statistics_listeners()
+    # Drop cached accounts and categories of users once their writes commit
+    register_reference_listeners()
+    # Drop cached session users once their row changes
+    register_principal_listeners()
+    # Apply committed description changes to the autocomplete indexes
+    register_description_listeners()
+    # Leave tombstones of deleted rows for delta backups
+    register_change_listeners()
+    # Stamp Idempotency-Key claims in the transactions their views commit
+    register_idempotency_listeners()
+    # Create the description search index together with the transactions table
+    register_search_ddl()
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(purge_cli)
+    
     # Register Jinja2 global functions
     @app.template_global()
     def now():
@@ -46,15 +80,22 @@ def create_app(config_class=Config):
     app.register_blueprint(category_bp)
     app.register_blueprint(transaction_bp)
     app.register_blueprint(profile_bp, url_prefix='/profile')
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(jobs_bp)
     
     @app.before_request
     def load_logged_in_user():
-        """Load the logged-in user from the session before each request."""
+        """Load the logged-in user's principal from the session before each request."""
+        # Static files never need the user
+        if request.endpoint == 'static' or (request.endpoint or '').endswith('.static'):
+            g.user = None
+            return
+        
         user_id = session.get('user_id')
         if user_id is None:
             g.user = None
         else:
-            g.user = db.session.get(User, user_id)
+            g.user = load_principal(user_id)
     
     return app
 
@@ -6,6 +6,8 @@ Provides account CRUD operations, balance tracking, and transfer functionality.
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, g
 from app.models import db, Account, Transaction, Category, Transfer
 from app.auth import login_required
+from app.idempotency import idempotent
+from app.balances import apply_balance_deltas, transfer_funds, InsufficientFundsError
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import func
 from sqlalchemy.orm import joinedload
@@ -48,7 +50,8 @@ def _create_initial_deposit_if_needed(account, balance):
     if balance <= 0:
         return
     
-    # Create or find the "Initial Deposit" category
+    # Create or find the "Initial Deposit" category; not from the reference cache,
+    # which may still hold a category another process deleted
     initial_deposit_category = Category.query.filter_by(
         name='Initial Deposit',
         type='income',
@@ -103,6 +106,8 @@ def create():
             account = Account(
                 name=name,
                 balance=balance,
+                # Positive balances get an initial deposit; others never reach the ledger
+                opening_balance=min(balance, 0.0),
                 color=color,
                 user_id=g.user.id
             )
@@ -220,8 +225,10 @@ def edit(account_id):
                 _create_balance_adjustment_transaction(account, original_balance, new_balance)
                 flash('Balance adjustment transaction created.', 'info')
             
-            # Update the account balance
-            account.balance = new_balance
+            # Apply the difference in place so concurrent writes are kept
+            apply_balance_deltas(db.session.connection(), g.user.id, {
+                account.id: new_balance - original_balance
+            })
             
             db.session.commit()
             flash(f'Account "{name}" updated successfully!', 'success')
@@ -337,6 +344,7 @@ def _validate_transfer_data(from_account_id, to_account_id, amount):
 
 @account_bp.route('/transfer', methods=['POST'])
 @login_required
+@idempotent
 def transfer():
     """Transfer money between accounts with comprehensive validation."""
     from_account_id = request.form.get('from_account')
@@ -359,11 +367,10 @@ def transfer():
     if not from_account or not to_account:
         return _handle_request_response(is_ajax, 'Invalid accounts selected.', 'error')
     
-    # Check sufficient balance
-    if from_account.balance < amount_float:
-        return _handle_request_response(is_ajax, 'Insufficient balance in source account.', 'error')
-    
     try:
+        # Check and debit in one conditional update, then credit the destination
+        transfer_funds(db.session.connection(), g.user.id, from_account.id, to_account.id, amount_float)
+        
         # Create the Transfer record
         transfer_record = Transfer(
             amount=amount_float,
@@ -375,16 +382,14 @@ def transfer():
         )
         
         db.session.add(transfer_record)
-        
-        # Update account balances directly
-        from_account.balance -= amount_float
-        to_account.balance += amount_float
-        
         db.session.commit()
         
         success_message = f'Successfully transferred {format_currency(amount_float)} from {from_account.name} to {to_account.name}!'
         return _handle_request_response(is_ajax, success_message, 'success')
         
+    except InsufficientFundsError as e:
+        db.session.rollback()
+        return _handle_request_response(is_ajax, str(e), 'error')
     except Exception as e:
         db.session.rollback()
         return _handle_request_response(is_ajax, 'Error processing transfer. Please try again.', 'error')
@@ -595,9 +600,11 @@ def delete_transfer(transfer_id):
         if from_account.user_id != g.user.id or to_account.user_id != g.user.id:
             return jsonify({'status': 'error', 'message': 'Unauthorized access to accounts'}), 403
         
-        # Reverse the transfer by updating account balances
-        from_account.balance += amount  # Restore to source
-        to_account.balance -= amount    # Remove from destination
+        # Reverse the transfer by restoring the source and debiting the destination
+        apply_balance_deltas(db.session.connection(), g.user.id, {
+            from_account.id: amount,
+            to_account.id: -amount
+        })
         
         # Delete associated transactions if they exist
         for transaction_id in [transfer.from_transaction_id, transfer.to_transaction_id]:
@@ -0,0 +1,50 @@
+"""
+Admin blueprint for maintenance endpoints.
+Only users listed in the ADMIN_USER_IDS setting can call these endpoints.
+"""
+
+from flask import Blueprint, request, jsonify
+from app.auth import api_admin_required
+from app.ledger import reconcile_ledger, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, MAX_WORKERS
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+@admin_bp.route('/api/ledger/reconcile', methods=['POST'])
+@api_admin_required
+def api_reconcile_ledger():
+    """
+    API endpoint to check account balances against the ledger.
+    
+    Request JSON (all optional):
+        user_id (int): Only reconcile this user
+        fix (bool): Correct drifted balances, a JSON boolean
+        batch_size (int): Users per batch
+        workers (int): Batches run in parallel, at most MAX_WORKERS
+        
+    Returns:
+        JSON: Reconciliation report with the drifted accounts
+        400: Invalid options
+    """
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        user_id = data.get('user_id')
+        user_ids = [int(user_id)] if user_id is not None else None
+        batch_size = int(data.get('batch_size', DEFAULT_BATCH_SIZE))
+        workers = int(data.get('workers', DEFAULT_WORKERS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid reconcile options'}), 400
+    
+    if batch_size < 1 or workers < 1:
+        return jsonify({'error': 'batch_size and workers must be positive'}), 400
+    if workers > MAX_WORKERS:
+        return jsonify({'error': f'workers must be at most {MAX_WORKERS}'}), 400
+    
+    # Only a JSON boolean; bool("false") would be True
+    fix = data.get('fix', False)
+    if not isinstance(fix, bool):
+        return jsonify({'error': 'fix must be true or false'}), 400
+    
+    report = reconcile_ledger(user_ids, fix=fix, batch_size=batch_size, workers=workers)
+    return jsonify(report)
@@ -1,12 +1,18 @@
 import functools
 import re
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, session, url_for, jsonify
+    Blueprint, current_app, flash, g, redirect, render_template, request, session, url_for, jsonify
 )
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.caching import ALL_USERS, CommitTracker, LRUCache, bulk_write_model
 from app.models import db, User
 
 auth_bp = Blueprint('auth', __name__)
 
+# connection.info key holding the users whose row changed in the current transaction
+PRINCIPAL_CHANGES_KEY = 'principal_changed_user_ids'
+
 # Password complexity patterns
 PASSWORD_PATTERNS = {
     'letter': re.compile(r'[a-zA-Z]'),
@@ -20,6 +26,102 @@ EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 # Username validation pattern
 USERNAME_PATTERN = re.compile(r'^[a-zA-Z0-9]+$')
 
+class Principal:
+    """
+    The logged in user as seen by views and templates.
+
+    Holds the ID, username, email and name read from the principal cache;
+    the full User row is only loaded when a view accesses `model`.
+    """
+
+    __slots__ = ('id', 'username', 'email', 'name', '_model')
+
+    def __init__(self, id, username, email, name):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.name = name
+        self._model = None
+
+    @property
+    def model(self):
+        """The User row of the principal, loaded on first access."""
+        if self._model is None:
+            self._model = db.session.get(User, self.id)
+        return self._model
+
+
+def _principal_cache():
+    """Return the application's principal cache, creating it on first use."""
+    cache = current_app.extensions.get('principal_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('principal_cache', LRUCache(
+            current_app.config.get('SESSION_USER_CACHE_MAX_USERS', 4096)
+        ))
+    return cache
+
+
+def load_principal(user_id):
+    """
+    Get the principal of a session's user, from the cache when possible.
+
+    Args:
+        user_id (int): User ID stored in the session
+
+    Returns:
+        Principal: The user, or None if it no longer exists
+    """
+    cache = _principal_cache()
+    fields = cache.get(user_id)
+    if fields is None:
+        version = cache.version
+        row = db.session.execute(
+            select(User.id, User.username, User.email, User.name).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        fields = tuple(row)
+        ttl = current_app.config.get('SESSION_USER_CACHE_TTL_SECONDS', 60)
+        if ttl > 0:
+            cache.set(user_id, fields, ttl, version)
+    return Principal(*fields)
+
+
+def _track_user_writes(session, flush_context):
+    """Session after_flush hook marking users whose row changed."""
+    user_ids = {
+        obj.id for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User)
+    }
+    _principal_changes.mark(session.connection(), user_ids)
+
+
+def _track_bulk_user_writes(orm_execute_state):
+    """Session hook marking every principal stale when a bulk statement changes users."""
+    if bulk_write_model(orm_execute_state) is User:
+        _principal_changes.mark(orm_execute_state.session.connection(), {ALL_USERS})
+
+
+def _invalidate_principals(user_ids):
+    """Drop the principals of users changed by a committed transaction."""
+    _principal_cache().invalidate(user_ids)
+
+
+_principal_changes = CommitTracker(PRINCIPAL_CHANGES_KEY, _invalidate_principals)
+
+
+def register_principal_listeners():
+    """Register the hooks that keep the principal cache current."""
+    listeners = (
+        (Session, 'after_flush', _track_user_writes),
+        (Session, 'do_orm_execute', _track_bulk_user_writes),
+    )
+    for target, name, listener in listeners:
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+    _principal_changes.register()
+
+
 def login_required(view):
     """
     View decorator that redirects anonymous users to the login page.
@@ -46,6 +148,32 @@ def api_login_required(view):
         return view(**kwargs)
     return wrapped_view
 
+def is_admin(user):
+    """
+    Return True if the user's ID is listed in the ADMIN_USER_IDS setting.
+    """
+    admin_user_ids = current_app.config.get('ADMIN_USER_IDS', ())
+    return user is not None and user.id in admin_user_ids
+
+def api_admin_required(view):
+    """
+    API view decorator that only lets administrators through.
+    """
+    @functools.wraps(view)
+    def wrapped_view(**kwargs):
+        if g.user is None:
+            return jsonify({
+                'success': False,
+                'error': 'Authentication required'
+            }), 401
+        if not is_admin(g.user):
+            return jsonify({
+                'success': False,
+                'error': 'Administrator access required'
+            }), 403
+        return view(**kwargs)
+    return wrapped_view
+
 def validate_password_complexity(password):
     """
     Validates password complexity requirements.
@@ -0,0 +1,1046 @@
+"""
+JSON backups for DumpMyCash.
+
+A backup holds a user's profile, accounts, categories, transactions and
+transfers. Accounts and transactions refer to each other by name, so a
+backup can be restored into any user.
+
+The exporter streams: accounts and categories are read once into ID maps,
+transactions and transfers are read through a server-side cursor in
+chunks of BACKUP_CHUNK_SIZE rows and written out as they arrive, so memory
+use does not grow with the history and nothing is written to disk. Two
+layouts are supported:
+
+- 'json': one document with the sections export_info, user_profile,
+  accounts, categories, transactions, transfers and statistics
+- 'ndjson': one JSON object per line, the section record type in its
+  'record' key ('export_info', 'user_profile', 'account', 'category',
+  'transaction', 'transfer', 'statistics')
+
+Either can be gzip compressed on the fly. Transactions linked to a
+transfer are written inside their transfer record ('from_transaction' and
+'to_transaction'), not in the transactions section, so a restore can link
+them again and the ledger counts them once.
+
+Every backup carries a watermark. Given the watermark of an earlier
+backup, the exporter writes a delta backup instead: only the records
+updated since then (see app.changes) and a 'deleted' section with the
+tombstones of records deleted since then, each naming a record type and
+the exported 'id'. Watermarks trail the export by WATERMARK_OVERLAP, so
+writes still in flight during an export are picked up by the next delta.
+
+Restores parse uploads of either layout incrementally and insert in chunks
+of RESTORE_CHUNK_SIZE rows with executemany, then recompute the balances
+of the accounts they created or wrote rows into from the ledger once. A restore can apply a chain:
+a full backup followed by the deltas taken after it, in order. The
+sections are expected in the order the exporter writes them: deletions
+first, then accounts and categories before the transactions and transfers
+that refer to them.
+"""
+
+import gzip
+import io
+import json
+import re
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, case, exists, or_, select
+from sqlalchemy.orm import aliased
+
+from app.models import db, User, Account, Category, Transaction, Transfer, Tombstone, transaction_kind_for
+from app.rollups import apply_transaction_deltas
+from app.ledger import reconcile_users
+from app.descriptions import mark_descriptions_stale
+from app.changes import ALL_RECORDS, TRACKED_MODELS, record_deletions
+from app.purge import delete_user_rows
+
+BACKUP_VERSION = '1.2'  # 1.1 added transfers and category_type, 1.2 record IDs and deltas
+BACKUP_FORMATS = {
+    'json': ('application/json', '.json'),
+    'ndjson': ('application/x-ndjson', '.ndjson'),
+}
+BACKUP_CHUNK_SIZE = 1000  # Rows fetched per round trip
+RESTORE_CHUNK_SIZE = 1000  # Rows inserted per executemany
+RESTORE_READ_SIZE = 64 * 1024  # Characters read from an upload at a time
+# Sections a JSON document backup must contain
+REQUIRED_SECTIONS = ('export_info', 'accounts', 'categories', 'transactions')
+BACKUP_BUFFER_BYTES = 64 * 1024  # Output gathered before a chunk is sent
+GZIP_WBITS = 16 + zlib.MAX_WBITS  # zlib window with a gzip header and trailer
+# Transaction columns written to a backup, in transaction_record() order
+LEG_COLUMNS = ('id', 'amount', 'description', 'account_id', 'category_id', 'date')
+# NDJSON record type of each list section
+RECORD_TYPES = {
+    'deleted': 'deleted',
+    'accounts': 'account',
+    'categories': 'category',
+    'transactions': 'transaction',
+    'transfers': 'transfer',
+}
+# How far a watermark trails its export: writes flushed before the export
+# read their table but committed after it are still in the next delta
+WATERMARK_OVERLAP = timedelta(minutes=1)
+# Model of each restored record type
+RESTORED_MODELS = {record_type: model for model, record_type in TRACKED_MODELS.items()}
+# Order tombstones are applied in, so rows go before the rows they refer to
+DELETION_ORDER = (ALL_RECORDS, 'transfer', 'transaction', 'account', 'category')
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _stream(connection, statement, to_record):
+    """Yield the records of a statement's rows, fetched in chunks."""
+    result = connection.execution_options(
+        stream_results=True, yield_per=BACKUP_CHUNK_SIZE
+    ).execute(statement)
+    for rows in result.partitions():
+        for row in rows:
+            yield to_record(row)
+
+
+def _backup_sections(connection, user_id, counts, since=None):
+    """
+    Build the sections of a user's backup in file order.
+
+    Args:
+        connection: SQLAlchemy connection to read from
+        user_id (int): User ID
+        counts (Counter): Filled with the number of records per list section
+            while they are written, for the statistics section
+        since (datetime, optional): Watermark of an earlier backup; only
+            records changed after it are written, with the deletions
+
+    Returns:
+        list: (name, value) pairs; a value is a dict, an iterable of record
+              dicts, or a callable returning a dict once the lists are written
+    """
+    watermark = datetime.now() - WATERMARK_OVERLAP
+    user = connection.execute(
+        select(User.username, User.email, User.name, User.created_at).where(User.id == user_id)
+    ).one()
+    # Deltas still need every name, records refer to accounts and categories by name
+    accounts = connection.execute(
+        select(Account.id, Account.name, Account.balance, Account.opening_balance, Account.color,
+               Account.created_at, Account.updated_at)
+        .where(Account.user_id == user_id).order_by(Account.id)
+    ).all()
+    categories = connection.execute(
+        select(Category.id, Category.name, Category.type, Category.unicode_emoji, Category.updated_at)
+        .where(Category.user_id == user_id).order_by(Category.id)
+    ).all()
+    account_names = {account.id: account.name for account in accounts}
+    categories_by_id = {category.id: category for category in categories}
+
+    def changed(row):
+        return since is None or (row.updated_at is not None and row.updated_at >= since)
+
+    def transaction_record(id, amount, description, account_id, category_id, date):
+        category = categories_by_id.get(category_id)
+        return {
+            'id': id,
+            'amount': float(amount),
+            'description': description,
+            'account_name': account_names.get(account_id),
+            'category_name': category.name if category else None,
+            'category_type': category.type if category else None,
+            'date': _isoformat(date)
+        }
+
+    def transfer_record(row):
+        record = {
+            'id': row.id,
+            'amount': float(row.amount),
+            'description': row.description,
+            'from_account_name': account_names.get(row.from_account_id),
+            'to_account_name': account_names.get(row.to_account_id),
+            'date': _isoformat(row.date)
+        }
+        for side in ('from', 'to'):
+            leg = [row._mapping[f'{side}_leg_{name}'] for name in LEG_COLUMNS]
+            if leg[0] is not None:
+                record[f'{side}_transaction'] = transaction_record(*leg)
+        return record
+
+    linked_to_transfer = exists().where(
+        Transfer.user_id == Transaction.user_id,
+        or_(Transfer.from_transaction_id == Transaction.id, Transfer.to_transaction_id == Transaction.id)
+    )
+    transactions = select(
+        *(getattr(Transaction, name) for name in LEG_COLUMNS)
+    ).where(
+        Transaction.user_id == user_id,
+        ~linked_to_transfer
+    ).order_by(Transaction.date, Transaction.id)
+
+    from_leg, to_leg = aliased(Transaction), aliased(Transaction)
+    transfers = select(
+        Transfer.id, Transfer.amount, Transfer.description, Transfer.from_account_id, Transfer.to_account_id,
+        Transfer.date,
+        *(getattr(leg, name).label(f'{side}_leg_{name}')
+          for side, leg in (('from', from_leg), ('to', to_leg)) for name in LEG_COLUMNS)
+    ).outerjoin(
+        from_leg, from_leg.id == Transfer.from_transaction_id
+    ).outerjoin(
+        to_leg, to_leg.id == Transfer.to_transaction_id
+    ).where(Transfer.user_id == user_id).order_by(Transfer.date, Transfer.id)
+
+    export_info = {
+        'username': user.username,
+        'email': user.email,
+        'export_date': datetime.now().isoformat(),
+        'version': BACKUP_VERSION,
+        'backup_type': 'full' if since is None else 'delta',
+        'watermark': watermark.isoformat()
+    }
+    sections = [
+        ('export_info', export_info),
+        ('user_profile', {
+            'name': user.name,
+            'created_at': _isoformat(user.created_at)
+        }),
+    ]
+    if since is not None:
+        export_info['since'] = since.isoformat()
+        transactions = transactions.where(Transaction.updated_at >= since)
+        transfers = transfers.where(or_(
+            Transfer.updated_at >= since, from_leg.updated_at >= since, to_leg.updated_at >= since
+        ))
+        deletions = select(Tombstone.record_type, Tombstone.record_id).where(
+            Tombstone.user_id == user_id,
+            Tombstone.deleted_at >= since
+        ).order_by(
+            case({record_type: rank for rank, record_type in enumerate(DELETION_ORDER)},
+                 value=Tombstone.record_type, else_=len(DELETION_ORDER)),
+            Tombstone.id
+        )
+        sections.append(('deleted', _stream(
+            connection, deletions, lambda row: {'type': row.record_type, 'id': row.record_id}
+        )))
+
+    def statistics():
+        totals = {
+            'total_accounts': counts['accounts'],
+            'total_categories': counts['categories'],
+            'total_transactions': counts['transactions'],
+            'total_transfers': counts['transfers']
+        }
+        if since is not None:
+            totals['total_deleted'] = counts['deleted']
+        return totals
+
+    return sections + [
+        ('accounts', [{
+            'id': account.id,
+            'name': account.name,
+            'balance': float(account.balance or 0.0),
+            'opening_balance': float(account.opening_balance or 0.0),
+            'color': account.color,
+            'created_at': _isoformat(account.created_at)
+        } for account in accounts if changed(account)]),
+        ('categories', [{
+            'id': category.id,
+            'name': category.name,
+            'type': category.type,
+            'unicode_emoji': category.unicode_emoji
+        } for category in categories if changed(category)]),
+        ('transactions', _stream(connection, transactions, lambda row: transaction_record(*row))),
+        ('transfers', _stream(connection, transfers, transfer_record)),
+        ('statistics', statistics),
+    ]
+
+
+def _json_pieces(sections, counts):
+    """Write sections as one JSON document, one record per line."""
+    yield '{'
+    for position, (name, value) in enumerate(sections):
+        yield ('\n' if position == 0 else ',\n') + f'  {json.dumps(name)}: '
+        if callable(value):
+            value = value()
+        if isinstance(value, dict):
+            yield json.dumps(value, default=str)
+            continue
+
+        yield '['
+        for record in value:
+            yield (',\n    ' if counts[name] else '\n    ') + json.dumps(record, default=str)
+            counts[name] += 1
+        yield '\n  ]' if counts[name] else ']'
+    yield '\n}\n'
+
+
+def _ndjson_pieces(sections, counts):
+    """Write sections as NDJSON, one record per line."""
+    for name, value in sections:
+        if callable(value):
+            value = value()
+        if isinstance(value, dict):
+            yield json.dumps({'record': name, **value}, default=str) + '\n'
+            continue
+
+        for record in value:
+            yield json.dumps({'record': RECORD_TYPES[name], **record}, default=str) + '\n'
+            counts[name] += 1
+
+
+def generate_backup(user_id, backup_format='json', compress=False, since=None):
+    """
+    Stream the backup of a user.
+
+    Args:
+        user_id (int): User ID
+        backup_format (str): 'json' or 'ndjson'
+        compress (bool): Gzip the output on the fly
+        since (datetime, optional): Watermark of an earlier backup, to write
+            a delta backup of the changes after it
+
+    Yields:
+        bytes: Encoded (and optionally compressed) chunks of the backup
+    """
+    pieces = _json_pieces if backup_format == 'json' else _ndjson_pieces
+    compressor = zlib.compressobj(wbits=GZIP_WBITS) if compress else None
+    buffer = []
+    size = 0
+
+    def flush():
+        data = ''.join(buffer).encode('utf-8')
+        buffer.clear()
+        return compressor.compress(data) if compressor else data
+
+    with db.engine.connect() as connection:
+        counts = Counter()
+        for piece in pieces(_backup_sections(connection, user_id, counts, since), counts):
+            buffer.append(piece)
+            size += len(piece)
+            if size >= BACKUP_BUFFER_BYTES:
+                size = 0
+                chunk = flush()
+                if chunk:
+                    yield chunk
+
+    chunk = flush()
+    if chunk:
+        yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+def get_user_backup_data(user_id):
+    """
+    Get all user data for backup as a dict.
+
+    Builds the whole backup in memory; generate_backup() streams it.
+
+    Args:
+        user_id (int): User ID
+
+    Returns:
+        dict: Backup document, see the 'json' layout
+    """
+    return json.loads(b''.join(generate_backup(user_id)))
+
+
+def backup_filename(username, backup_format='json', compress=False, delta=False):
+    """Generate the download name of a backup with a timestamp."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    suffix = '_delta' if delta else ''
+    filename = f'dumpmycash_backup_{username}_{timestamp}{suffix}{BACKUP_FORMATS[backup_format][1]}'
+    return filename + '.gz' if compress else filename
+
+
+def backup_mimetype(backup_format='json', compress=False):
+    """Return the content type of a backup download."""
+    return 'application/gzip' if compress else BACKUP_FORMATS[backup_format][0]
+
+
+class BackupFormatError(ValueError):
+    """Raised when an uploaded backup cannot be read."""
+
+
+def parse_watermark(value):
+    """
+    Parse the watermark of an earlier backup given for a delta backup.
+
+    Args:
+        value (str): ISO 8601 watermark from the backup's export_info
+
+    Returns:
+        datetime: The watermark
+
+    Raises:
+        BackupFormatError: The value is not a watermark
+    """
+    watermark = _parse_date(value)
+    if watermark is None:
+        raise BackupFormatError('Invalid backup watermark')
+    return watermark.replace(tzinfo=None)
+
+
+def backup_upload_format(filename):
+    """
+    Detect the layout of an uploaded backup from its file name.
+
+    Args:
+        filename (str): Uploaded file name
+
+    Returns:
+        tuple: (backup format, compressed), or None if not a backup file
+    """
+    compressed = filename.endswith('.gz')
+    name = filename[:-3] if compressed else filename
+    for backup_format, (_, extension) in BACKUP_FORMATS.items():
+        if name.endswith(extension):
+            return backup_format, compressed
+    return None
+
+
+class _JSONStreamReader:
+    """Decode the values of a JSON document one at a time from a text stream."""
+
+    _decoder = json.JSONDecoder()
+    _non_space = re.compile(r'\S')
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = ''
+        self.pos = 0
+
+    def _fill(self):
+        data = self.stream.read(RESTORE_READ_SIZE)
+        if not data:
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-blank character without consuming it, '' at the end."""
+        while True:
+            match = self._non_space.search(self.buffer, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buffer[self.pos]
+            self.pos = len(self.buffer)
+            if not self._fill():
+                return ''
+
+    def take(self, expected):
+        """Consume the next non-blank character, which must be one of expected."""
+        char = self.peek()
+        if not char or char not in expected:
+            raise json.JSONDecodeError(f'Expected one of {expected!r}', self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next read
+            if end < len(self.buffer) or not self._fill():
+                self.pos = end
+                return value
+
+
+def _json_document_records(stream):
+    """Yield (record type, record) pairs of a JSON document backup."""
+    reader = _JSONStreamReader(stream)
+    seen = set()
+    reader.take('{')
+    if reader.peek() == '}':
+        reader.take('}')
+    else:
+        while True:
+            section = reader.value()
+            if not isinstance(section, str):
+                raise BackupFormatError('Invalid backup file structure')
+            reader.take(':')
+            seen.add(section)
+            if reader.peek() == '[':
+                reader.take('[')
+                if reader.peek() == ']':
+                    reader.take(']')
+                else:
+                    while True:
+                        yield RECORD_TYPES.get(section, section), reader.value()
+                        if reader.take(',]') == ']':
+                            break
+            else:
+                yield section, reader.value()
+            if reader.take(',}') == '}':
+                break
+    if reader.peek():
+        raise json.JSONDecodeError('Extra data', reader.buffer, reader.pos)
+    if not all(section in seen for section in REQUIRED_SECTIONS):
+        raise BackupFormatError('Invalid backup file structure')
+
+
+def _ndjson_records(stream):
+    """Yield (record type, record) pairs of an NDJSON backup."""
+    first = True
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict) or (first and record.get('record') != 'export_info'):
+            raise BackupFormatError('Invalid backup file structure')
+        first = False
+        yield record.pop('record', None), record
+    if first:
+        raise BackupFormatError('Invalid backup file structure')
+
+
+def read_backup(fileobj, backup_format='json', compressed=False):
+    """
+    Parse an uploaded backup incrementally.
+
+    Args:
+        fileobj: Binary file object of the upload
+        backup_format (str): 'json' or 'ndjson'
+        compressed (bool): The upload is gzip compressed
+
+    Yields:
+        tuple: (record type, record dict), e.g. ('account', {...}); single
+               sections like 'export_info' use the section name
+
+    Raises:
+        BackupFormatError: The upload is not valid JSON or lacks required sections
+    """
+    if compressed:
+        fileobj = gzip.GzipFile(fileobj=fileobj)
+    stream = io.TextIOWrapper(fileobj, encoding='utf-8')
+    records = _json_document_records if backup_format == 'json' else _ndjson_records
+    try:
+        yield from records(stream)
+    except (json.JSONDecodeError, UnicodeDecodeError, EOFError, OSError):
+        raise BackupFormatError('Invalid JSON file format')
+    finally:
+        stream.detach()
+
+
+def backup_records(backup_data):
+    """
+    Yield the (record type, record) pairs of a backup loaded as a dict.
+
+    Args:
+        backup_data (dict): Backup document, see the 'json' layout
+    """
+    for section, value in backup_data.items():
+        if isinstance(value, list):
+            for record in value:
+                yield RECORD_TYPES.get(section, section), record
+        else:
+            yield section, value
+
+
+def _parse_date(value):
+    """Parse an exported date, None when missing or invalid."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _parse_watermark_value(value):
+    """Parse a watermark of a restored backup, None when missing or invalid."""
+    watermark = _parse_date(value)
+    return watermark.replace(tzinfo=None) if watermark else None
+
+
+def _as_id(value):
+    return getattr(value, 'id', value)
+
+
+def _drop_key(mapping, key, value):
+    """Remove a name map entry if it still refers to the given row."""
+    entry = mapping.get(key)
+    if entry is not None and (entry[0] if isinstance(entry, tuple) else entry) == value:
+        del mapping[key]
+
+
+class BackupRestore:
+    """
+    Restore the records of a backup, or of a chain of backups, into a user's data.
+
+    A chain is a full backup followed by the delta backups taken after it,
+    in order. Records are added in file order. Accounts and categories that
+    do not exist yet (by name, and by name and type) are created with one
+    flush; new transactions and transfers are inserted in chunks of
+    RESTORE_CHUNK_SIZE with Core executemany, their rollups applied once
+    per backup, and finish() recomputes the balances of the accounts the
+    restore created or wrote rows into from the ledger. Other accounts of
+    the user keep their balance. Nothing is committed; the caller commits
+    or rolls back.
+
+    The row each exported ID was restored to is remembered, so the deltas
+    of a chain can update and delete it. Those changes are few and go
+    through the session, whose hooks keep kinds, rollups and tombstones
+    current.
+
+    Attributes:
+        counts (Counter): Created accounts, categories, transactions and
+            transfers, and updated and deleted records
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.connection = db.session.connection()
+        self.counts = Counter(accounts=0, categories=0, transactions=0, transfers=0, updated=0, deleted=0)
+        self._load_names()
+        # Record type -> exported ID -> restored row ID, or the new object before its flush
+        self.restored = {record_type: {} for record_type in RESTORED_MODELS}
+        self.new_objects = []
+        # Created account (the object before its flush, then its ID) -> its latest backup record
+        self.created_accounts = {}
+        # Accounts restored transactions and transfers were written into
+        self.touched_accounts = set()
+        self.transactions = []
+        self.transfers = []
+        self.rollup_deltas = defaultdict(lambda: [0.0, 0, None])
+        self.started = False
+        self.watermark = None
+
+    def _load_names(self):
+        """Read the user's account and category names into the name maps."""
+        self.accounts = dict(self.connection.execute(
+            select(Account.name, Account.id).where(Account.user_id == self.user_id).order_by(Account.id)
+        ).all())
+        self.categories = {}
+        self.category_names = {}
+        for category in self.connection.execute(
+            select(Category.id, Category.name, Category.type)
+            .where(Category.user_id == self.user_id).order_by(Category.id)
+        ):
+            self._map_category(category.name, category.type, category.id)
+
+    def _map_category(self, name, category_type, category):
+        entry = (category, transaction_kind_for(category_type, name))
+        self.categories[(name, category_type)] = entry
+        # Backups before 1.1 name the category of a transaction without its type
+        self.category_names[name] = entry
+
+    def add(self, record_type, record):
+        """
+        Add one backup record.
+
+        Args:
+            record_type (str): 'export_info', 'deleted', 'account',
+                'category', 'transaction' or 'transfer'; other records are
+                ignored
+            record (dict): Record as written by the exporter
+
+        Raises:
+            BackupFormatError: A backup does not continue the chain
+        """
+        handler = {
+            'export_info': self._start_backup,
+            'deleted': self._delete,
+            'account': self._add_account,
+            'category': self._add_category,
+            'transaction': self._add_transaction,
+            'transfer': self._add_transfer,
+        }.get(record_type)
+        if handler is not None:
+            handler(record)
+
+    def _start_backup(self, record):
+        """Check that a backup continues the chain and write out the one before it."""
+        if record.get('backup_type') == 'delta':
+            since = _parse_watermark_value(record.get('since'))
+            if self.watermark is None or since is None:
+                raise BackupFormatError('A delta backup must follow the backup it continues')
+            if since > self.watermark:
+                raise BackupFormatError('Backups are missing between the delta backups')
+        elif self.started:
+            raise BackupFormatError('Only the first backup of a chain can be a full backup')
+
+        # Deltas refer to the rows of the backups before them by exported ID
+        self._flush_pending()
+        self.started = True
+        self.watermark = _parse_watermark_value(record.get('watermark'))
+
+    def _remember(self, record_type, exported_id, row):
+        if exported_id is not None:
+            self.restored[record_type][exported_id] = row
+
+    def _restored_row(self, record_type, exported_id):
+        """Return the ORM object an exported ID was restored to, None if it was not."""
+        row = self.restored[record_type].get(exported_id)
+        if row is None:
+            return None
+        model = RESTORED_MODELS[record_type]
+        return row if isinstance(row, model) else db.session.get(model, row)
+
+    def _add_account(self, record):
+        name = record['name']
+        account = self._restored_row('account', record.get('id'))
+        if account is not None:
+            restored = self.restored['account'][record['id']]
+            if restored in self.created_accounts:
+                self.created_accounts[restored] = record
+            _drop_key(self.accounts, account.name, restored)
+            self.accounts[name] = restored
+            account.name = name
+            if record.get('color'):
+                account.color = record['color']
+            self.counts['updated'] += 1
+            return
+
+        if name not in self.accounts:
+            account = Account(name=name, balance=record.get('balance', 0.0), user_id=self.user_id)
+            if record.get('color'):
+                account.color = record['color']
+            self.new_objects.append(account)
+            self.accounts[name] = account
+            self.created_accounts[account] = record
+            self.counts['accounts'] += 1
+        self._remember('account', record.get('id'), self.accounts[name])
+
+    def _add_category(self, record):
+        name, category_type = record['name'], record['type']
+        category = self._restored_row('category', record.get('id'))
+        if category is not None:
+            restored = self.restored['category'][record['id']]
+            _drop_key(self.categories, (category.name, category.type), restored)
+            _drop_key(self.category_names, category.name, restored)
+            category.name, category.type = name, category_type
+            if record.get('unicode_emoji'):
+                category.unicode_emoji = record['unicode_emoji']
+            self._map_category(name, category_type, restored)
+            self.counts['updated'] += 1
+            return
+
+        if (name, category_type) not in self.categories:
+            category = Category(name=name, type=category_type, user_id=self.user_id)
+            if record.get('unicode_emoji'):
+                category.unicode_emoji = record['unicode_emoji']
+            self.new_objects.append(category)
+            self._map_category(name, category_type, category)
+            self.counts['categories'] += 1
+        self._remember('category', record.get('id'), self.categories[(name, category_type)][0])
+
+    def _flush_new_objects(self):
+        """Create pending accounts and categories in one flush and map their IDs."""
+        if not self.new_objects:
+            return
+        db.session.add_all(self.new_objects)
+        db.session.flush()
+        self.new_objects = []
+        self.accounts = {name: _as_id(account) for name, account in self.accounts.items()}
+        self.created_accounts = {_as_id(account): record for account, record in self.created_accounts.items()}
+        for mapping in (self.categories, self.category_names):
+            for key, (category, kind) in mapping.items():
+                mapping[key] = (_as_id(category), kind)
+        for record_type in ('account', 'category'):
+            restored = self.restored[record_type]
+            for exported_id, row in restored.items():
+                restored[exported_id] = _as_id(row)
+
+    def _references(self, record):
+        """Resolve the account ID and (category ID, kind) a transaction record names."""
+        account_id = self.accounts.get(record.get('account_name'))
+        if record.get('category_type'):
+            category = self.categories.get((record.get('category_name'), record['category_type']))
+        else:
+            category = self.category_names.get(record.get('category_name'))
+        return account_id, category
+
+    def _transaction_row(self, record):
+        """Build the insert row of a transaction record, None if its account or category is unknown."""
+        account_id, category = self._references(record)
+        if account_id is None or category is None:
+            return None
+
+        category_id, kind = category
+        row = {
+            'amount': float(record['amount']),
+            'description': record.get('description'),
+            'account_id': account_id,
+            'category_id': category_id,
+            'user_id': self.user_id,
+            'kind': kind,
+            'date': _parse_date(record.get('date')) or datetime.now()
+        }
+        self.touched_accounts.add(account_id)
+        delta = self.rollup_deltas[(self.user_id, row['date'].date(), category_id, account_id)]
+        delta[0] += row['amount']
+        delta[1] += 1
+        delta[2] = kind
+        return row
+
+    def _update_transaction(self, transaction, record):
+        """Apply a delta's transaction record to the row it was restored to."""
+        account_id, category = self._references(record)
+        if account_id is None or category is None:
+            return
+        self.touched_accounts.update((transaction.account_id, account_id))
+        transaction.amount = float(record['amount'])
+        transaction.description = record.get('description')
+        transaction.account_id = account_id
+        transaction.category_id = category[0]
+        transaction.date = _parse_date(record.get('date')) or transaction.date
+
+    def _add_transaction(self, record):
+        self._flush_new_objects()
+        transaction = self._restored_row('transaction', record.get('id'))
+        if transaction is not None:
+            self._update_transaction(transaction, record)
+            self.counts['updated'] += 1
+            return
+
+        row = self._transaction_row(record)
+        if row is None:
+            return
+        self.transactions.append((record.get('id'), row))
+        if len(self.transactions) >= RESTORE_CHUNK_SIZE:
+            self._insert_transactions()
+
+    def _transfer_values(self, record):
+        """Resolve the columns of a transfer record, None if an account is unknown."""
+        from_account_id = self.accounts.get(record.get('from_account_name'))
+        to_account_id = self.accounts.get(record.get('to_account_name'))
+        if from_account_id is None or to_account_id is None:
+            return None
+        return {
+            'amount': float(record['amount']),
+            'description': record.get('description'),
+            'from_account_id': from_account_id,
+            'to_account_id': to_account_id,
+            'date': _parse_date(record.get('date'))
+        }
+
+    def _add_transfer(self, record):
+        self._flush_new_objects()
+        values = self._transfer_values(record)
+        if values is None:
+            return
+        transfer = self._restored_row('transfer', record.get('id'))
+        if transfer is not None:
+            self._update_transfer(transfer, values, record)
+            return
+
+        self.touched_accounts.update((values['from_account_id'], values['to_account_id']))
+        row = {
+            **values,
+            'user_id': self.user_id,
+            'date': values['date'] or datetime.now(),
+            'from_transaction_id': None,
+            'to_transaction_id': None
+        }
+        legs = {}
+        for side in ('from', 'to'):
+            leg_record = record.get(f'{side}_transaction')
+            if leg_record:
+                leg = self._transaction_row(leg_record)
+                if leg is not None:
+                    legs[side] = (leg_record.get('id'), leg)
+        self.transfers.append((record.get('id'), row, legs))
+        if len(self.transfers) >= RESTORE_CHUNK_SIZE:
+            self._insert_transfers()
+
+    def _update_transfer(self, transfer, values, record):
+        """Apply a delta's transfer record, and its legs, to the rows they were restored to."""
+        self.touched_accounts.update((transfer.from_account_id, transfer.to_account_id,
+                                      values['from_account_id'], values['to_account_id']))
+        for column, value in values.items():
+            if value is not None:
+                setattr(transfer, column, value)
+        for side in ('from', 'to'):
+            leg_record = record.get(f'{side}_transaction')
+            if not leg_record:
+                continue
+            leg = self._restored_row('transaction', leg_record.get('id'))
+            if leg is not None:
+                self._update_transaction(leg, leg_record)
+                continue
+            row = self._transaction_row(leg_record)
+            if row is not None:
+                leg_id = self._insert_rows(Transaction, [row])[0]
+                self._remember('transaction', leg_record.get('id'), leg_id)
+                setattr(transfer, f'{side}_transaction_id', leg_id)
+        self.counts['updated'] += 1
+
+    def _insert_rows(self, model, rows, returning=True):
+        """Insert rows with one executemany and return their IDs in order, if asked to."""
+        table = model.__table__
+        if not returning:
+            # Without RETURNING the driver's executemany is used, the fastest path
+            self.connection.execute(table.insert(), rows)
+            return [None] * len(rows)
+        return self.connection.execute(
+            table.insert().returning(table.c.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+
+    def _insert_transactions(self):
+        if not self.transactions:
+            return
+        # Only records with an exported ID can be changed by a later delta
+        returning = any(exported_id is not None for exported_id, _ in self.transactions)
+        ids = self._insert_rows(Transaction, [row for _, row in self.transactions], returning)
+        for (exported_id, _), row_id in zip(self.transactions, ids):
+            self._remember('transaction', exported_id, row_id)
+        self.counts['transactions'] += len(self.transactions)
+        self.transactions = []
+
+    def _insert_transfers(self):
+        if not self.transfers:
+            return
+        legs = [(row, side, leg) for _, row, row_legs in self.transfers for side, leg in row_legs.items()]
+        if legs:
+            leg_ids = self._insert_rows(Transaction, [leg for _, _, (_, leg) in legs])
+            for (row, side, (exported_id, _)), leg_id in zip(legs, leg_ids):
+                row[f'{side}_transaction_id'] = leg_id
+                self._remember('transaction', exported_id, leg_id)
+        ids = self._insert_rows(Transfer, [row for _, row, _ in self.transfers])
+        for (exported_id, _, _), row_id in zip(self.transfers, ids):
+            self._remember('transfer', exported_id, row_id)
+        self.counts['transfers'] += len(self.transfers)
+        self.transfers = []
+
+    def _flush_pending(self):
+        """Write out every buffered row and change, with the rollups of the inserted rows."""
+        self._flush_new_objects()
+        self._insert_transactions()
+        self._insert_transfers()
+        db.session.flush()
+
+        # Core inserts bypass the flush hook, so roll up the new rows explicitly
+        apply_transaction_deltas(self.connection, {
+            key: delta for key, delta in self.rollup_deltas.items() if delta[1]
+        })
+        self.rollup_deltas.clear()
+
+    def _unused_ids(self, model, ids):
+        """Return the accounts or categories among ids that no transaction or transfer refers to."""
+        db.session.flush()
+        if model is Account:
+            used = select(Transaction.account_id).where(Transaction.account_id.in_(ids)).union(
+                select(Transfer.from_account_id).where(Transfer.from_account_id.in_(ids)),
+                select(Transfer.to_account_id).where(Transfer.to_account_id.in_(ids))
+            )
+        else:
+            used = select(Transaction.category_id).where(Transaction.category_id.in_(ids))
+        used_ids = set(self.connection.execute(used).scalars())
+        return [row_id for row_id in ids if row_id not in used_ids]
+
+    def _delete(self, record):
+        """Apply a delta's tombstone to the row the deleted record was restored to."""
+        record_type = record.get('type')
+        if record_type == ALL_RECORDS:
+            self._delete_all()
+            return
+        if record_type not in RESTORED_MODELS:
+            return
+        row = self._restored_row(record_type, record.get('id'))
+        if row is None:
+            return
+
+        restored = self.restored[record_type].pop(record['id'])
+        model = RESTORED_MODELS[record_type]
+        # Rows restored into existing accounts and categories keep them alive
+        if model in (Account, Category) and not self._unused_ids(model, [row.id]):
+            return
+        if model is Account:
+            _drop_key(self.accounts, row.name, restored)
+            self.created_accounts.pop(restored, None)
+        elif model is Category:
+            _drop_key(self.categories, (row.name, row.type), restored)
+            _drop_key(self.category_names, row.name, restored)
+        db.session.delete(row)
+        self.counts['deleted'] += 1
+
+    def _delete_all(self):
+        """Apply a purge of all data: delete every row the chain restored so far."""
+        self._flush_pending()
+        for record_type in ('transfer', 'transaction', 'account', 'category'):
+            model = RESTORED_MODELS[record_type]
+            ids = [_as_id(row) for row in self.restored[record_type].values()]
+            if model in (Account, Category) and ids:
+                ids = self._unused_ids(model, ids)
+            if model is Account:
+                for account_id in ids:
+                    self.created_accounts.pop(account_id, None)
+            for start in range(0, len(ids), RESTORE_CHUNK_SIZE):
+                chunk = ids[start:start + RESTORE_CHUNK_SIZE]
+                delete_user_rows(self.connection, self.user_id, model, chunk)
+                record_deletions(self.connection, self.user_id, record_type, chunk)
+            self.counts['deleted'] += len(ids)
+            self.restored[record_type].clear()
+
+        # The session may hold rows deleted behind its back
+        db.session.expire_all()
+        self._load_names()
+
+    def _open_created_accounts(self):
+        """
+        Set the opening balance of the accounts this restore created.
+
+        An account without restored ledger rows opens with its backup
+        balance. Others open with the opening balance the backup names, 0 in
+        backups before it was exported, and take the rest from the ledger.
+        """
+        openings = []
+        for account_id, record in self.created_accounts.items():
+            if account_id in self.touched_accounts:
+                opening = record.get('opening_balance') or 0.0
+            else:
+                opening = record.get('balance') or 0.0
+            if opening:
+                openings.append({'account': account_id, 'opening': float(opening)})
+        if openings:
+            accounts = Account.__table__
+            self.connection.execute(
+                accounts.update().where(accounts.c.id == bindparam('account'))
+                .values(opening_balance=bindparam('opening')),
+                openings
+            )
+
+    def finish(self):
+        """
+        Insert the remaining rows, apply the rollups and recompute balances.
+
+        Returns:
+            Counter: Created accounts, categories, transactions and
+                transfers, and updated and deleted records
+        """
+        self._flush_pending()
+        mark_descriptions_stale(self.connection, [self.user_id])
+        self._open_created_accounts()
+        # Balances of the accounts the restore created or wrote into come from
+        # their opening balance and ledger, the same way reconciliation does
+        account_ids = set(self.created_accounts) | self.touched_accounts
+        if account_ids:
+            reconcile_users(self.connection, [self.user_id], fix=True, account_ids=account_ids)
+        return self.counts
+
+
+def restore_backup(user_id, records):
+    """
+    Restore backup records into a user's data in the current transaction.
+
+    Args:
+        user_id (int): User ID
+        records (iterable): (record type, record) pairs from read_backup()
+            or backup_records(); chain several backups to apply deltas
+
+    Returns:
+        Counter: Created accounts, categories, transactions and transfers,
+            and updated and deleted records
+
+    Raises:
+        BackupFormatError: The records are not a valid backup chain
+    """
+    restore = BackupRestore(user_id)
+    for record_type, record in records:
+        restore.add(record_type, record)
+    return restore.finish()
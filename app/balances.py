@@ -0,0 +1,117 @@
+"""
+Atomic account balance updates for DumpMyCash.
+
+Balances are never read, changed in Python and written back: two requests
+doing that at once both start from the same balance and one change is lost.
+Every change is issued as a relative UPDATE (balance = balance + delta) so
+the database applies concurrent changes one after the other.
+
+Statements touching several accounts always visit them in ascending ID
+order, so two requests locking the same pair of rows cannot deadlock.
+"""
+
+from sqlalchemy import bindparam, select
+
+from app.models import Account
+
+
+class InsufficientFundsError(Exception):
+    """Raised when an account cannot cover a debit."""
+
+
+def balance_effect(category_type, amount):
+    """
+    Return the balance effect of an amount in a category of the given type.
+
+    Args:
+        category_type (str): 'income' or 'expense'
+        amount (float): Transaction amount
+
+    Returns:
+        float: Amount to add to the account balance
+    """
+    return amount if category_type == 'income' else -amount
+
+
+def lock_accounts(connection, user_id, account_ids):
+    """
+    Lock account rows for the rest of the transaction in ascending ID order.
+
+    SQLite has no row locks and serializes writers on the database lock, so
+    this only issues SELECT ... FOR UPDATE on databases that support it.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): Owner of the accounts
+        account_ids (iterable): IDs of the accounts to lock
+    """
+    if connection.dialect.name == 'sqlite':
+        return
+
+    accounts = Account.__table__
+    connection.execute(
+        select(accounts.c.id).where(
+            accounts.c.id.in_(sorted(set(account_ids))),
+            accounts.c.user_id == user_id
+        ).order_by(accounts.c.id).with_for_update()
+    ).all()
+
+
+def apply_balance_deltas(connection, user_id, balance_deltas):
+    """
+    Adjust account balances with one relative UPDATE per account.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): Owner of the accounts
+        balance_deltas (dict): Account ID -> amount to add to the balance
+    """
+    params = [
+        {'account': account_id, 'delta': delta}
+        for account_id, delta in sorted(balance_deltas.items())
+        if delta
+    ]
+    if not params:
+        return
+
+    accounts = Account.__table__
+    connection.execute(
+        accounts.update().where(
+            accounts.c.id == bindparam('account'),
+            accounts.c.user_id == user_id
+        ).values(balance=accounts.c.balance + bindparam('delta')),
+        params
+    )
+
+
+def transfer_funds(connection, user_id, from_account_id, to_account_id, amount):
+    """
+    Move money between two accounts if the source can cover it.
+
+    The funds check and the debit are a single conditional UPDATE, so no
+    other request can spend the same money between checking and debiting.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): Owner of the accounts
+        from_account_id (int): Account to debit
+        to_account_id (int): Account to credit
+        amount (float): Positive amount to move
+
+    Raises:
+        InsufficientFundsError: If the source balance is below the amount
+    """
+    lock_accounts(connection, user_id, [from_account_id, to_account_id])
+
+    accounts = Account.__table__
+    debited = connection.execute(
+        accounts.update().where(
+            accounts.c.id == from_account_id,
+            accounts.c.user_id == user_id,
+            accounts.c.balance >= amount
+        ).values(balance=accounts.c.balance - amount)
+    )
+    if debited.rowcount != 1:
+        raise InsufficientFundsError('Insufficient balance in source account.')
+
+    apply_balance_deltas(connection, user_id, {to_account_id: amount})
@@ -0,0 +1,143 @@
+"""
+In-process cache building blocks for DumpMyCash.
+
+The per-user caches (session principals, reference data, statistics and
+description indexes) share one design, implemented here once:
+
+- LRUCache keeps values with an expiry time, evicts the least recently used
+  entries beyond its size and drops the entries of given users on demand
+- every invalidation bumps the cache version, and a value read from the
+  database is only stored if no invalidation happened since the read
+  started, so a load racing a commit never caches data older than it
+- CommitTracker collects the changes of the current transaction on its
+  database connection and hands them to the cache once the transaction
+  commits; a rollback discards them
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Marks every user as changed, e.g. after a bulk statement
+ALL_USERS = '*'
+
+
+class LRUCache:
+    """
+    Thread safe LRU cache of expiring entries keyed by user ID.
+
+    Attributes:
+        max_entries (int): Entries kept before the least recently used go
+        version (int): Bumped by every invalidation, see set()
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, version):
+        """Store a value unless an invalidation happened since `version` was read."""
+        now = time.monotonic()
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (now + ttl, value)
+            self._entries.move_to_end(key)
+            # Expired entries at the cold end go first, then the least recently used
+            while self._entries and next(iter(self._entries.values()))[0] < now:
+                self._entries.popitem(last=False)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        """Drop the entries of users, or every entry if ALL_USERS is among them."""
+        with self._lock:
+            self._invalidate(user_ids)
+
+    def _invalidate(self, user_ids):
+        # Values being loaded right now may predate this invalidation
+        self.version += 1
+        if ALL_USERS in user_ids:
+            self._entries.clear()
+        else:
+            self._drop_users(user_ids)
+
+    def _drop_users(self, user_ids):
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+
+class CommitTracker:
+    """
+    Changes recorded on a database connection until its transaction ends.
+
+    Args:
+        key (str): connection.info key holding the changes
+        on_commit (callable): Called with the changes once the transaction
+            has committed, when an application context is active
+        factory (callable): Creates the changes of a new transaction, a set
+            of user IDs by default
+    """
+
+    def __init__(self, key, on_commit, factory=set):
+        self.key = key
+        self.on_commit = on_commit
+        self.factory = factory
+
+    def changes(self, connection):
+        """Return the changes of the connection's transaction, creating them if needed."""
+        changes = connection.info.get(self.key)
+        if changes is None:
+            changes = connection.info[self.key] = self.factory()
+        return changes
+
+    def pending(self, connection):
+        """Return the changes recorded so far in the connection's transaction, or None."""
+        return connection.info.get(self.key)
+
+    def mark(self, connection, user_ids):
+        """Record users changed by the connection's transaction, or ALL_USERS."""
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if user_ids:
+            self.changes(connection).update(user_ids)
+
+    def _commit(self, connection):
+        """Engine commit hook handing the transaction's changes to the cache."""
+        changes = connection.info.pop(self.key, None)
+        if changes and has_app_context():
+            self.on_commit(changes)
+
+    def _rollback(self, connection):
+        """Engine rollback hook; rolled back changes leave the cache valid."""
+        connection.info.pop(self.key, None)
+
+    def register(self):
+        """Register the engine hooks of this tracker."""
+        for name, listener in (('commit', self._commit), ('rollback', self._rollback)):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+
+
+def bulk_write_model(orm_execute_state):
+    """Return the model a bulk ORM UPDATE or DELETE statement changes, or None."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    return mapper.class_ if mapper is not None else None
@@ -14,8 +14,8 @@ from flask import Blueprint, render_template, request, jsonify, g
 from app.auth import login_required, api_login_required
 from app import db
 from app.models import Category, Transaction
-from sqlalchemy import func, or_, and_
-from datetime import datetime, timedelta
+from app.statistics import category_totals, totals_by_kind
+from app.periods import get_date_range, STANDARD_PERIODS
 
 # Initialize category blueprint
 category_bp = Blueprint('categories', __name__, url_prefix='/categories')
@@ -27,135 +27,48 @@ DEFAULT_EMOJI_INCOME = '💰'
 DEFAULT_EMOJI_EXPENSE = '💸'
 
 
-def get_date_range(filter_type, start_date_str=None, end_date_str=None):
+def _period_category_totals(time_filter, start_date_str=None, end_date_str=None):
     """
-    Get date range based on filter type.
+    Get every category of the user with its totals for a filter period.
+    
+    The page, the stats endpoint and the top expenses chart all read the
+    same cached result of one grouped query (see app.statistics). Transfer
+    transactions are excluded from the totals.
     
     Args:
-        filter_type (str): Type of filter ('today', 'week', 'month', 'quarter', 'year', 'custom', 'all')
+        time_filter (str): Filter type, see get_date_range()
         start_date_str (str, optional): Start date for custom range in YYYY-MM-DD format
         end_date_str (str, optional): End date for custom range in YYYY-MM-DD format
         
     Returns:
-        tuple: (start_date, end_date) or (None, None) for 'all' filter
+        dict: Result of category_totals()
     """
-    now = datetime.now()
-    
-    # Handle custom date range
-    if filter_type == 'custom' and start_date_str and end_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').replace(hour=23, minute=59, second=59, microsecond=999999)
-            return start_date, end_date
-        except ValueError:
-            # Invalid date format, fall back to default month filter
-            filter_type = 'month'
-    
-    if filter_type == 'today':
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-    elif filter_type == 'week':
-        # Monday of this week
-        start_date = now - timedelta(days=now.weekday())
-        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=6, hours=23, minutes=59, seconds=59, microseconds=999999)
-    elif filter_type == 'month':
-        # First day of current month
-        start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        # Last day of current month
-        if now.month == 12:
-            end_date = now.replace(year=now.year + 1, month=1, day=1) - timedelta(microseconds=1)
-        else:
-            end_date = now.replace(month=now.month + 1, day=1) - timedelta(microseconds=1)
-    elif filter_type == 'quarter':
-        # Calculate current quarter
-        quarter = (now.month - 1) // 3 + 1
-        start_month = (quarter - 1) * 3 + 1
-        start_date = now.replace(month=start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Last day of the quarter
-        end_month = start_month + 2
-        if end_month > 12:
-            # Next year's January 1st minus 1 microsecond = December 31st 23:59:59.999999
-            end_date = now.replace(year=now.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-        else:
-            # First day of next month minus 1 microsecond = Last day of quarter at 23:59:59.999999
-            end_date = now.replace(month=end_month + 1, day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-    elif filter_type == 'year':
-        # First day of current year
-        start_date = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        # Last day of current year
-        end_date = now.replace(year=now.year + 1, month=1, day=1) - timedelta(microseconds=1)
-    elif filter_type == 'all':
-        return None, None
-    else:  # Invalid filter, default to 'month'
-        # First day of current month
-        start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        # Last day of current month
-        if now.month == 12:
-            end_date = now.replace(year=now.year + 1, month=1, day=1) - timedelta(microseconds=1)
-        else:
-            end_date = now.replace(month=now.month + 1, day=1) - timedelta(microseconds=1)
-    
-    return start_date, end_date
+    start_date, end_date = get_date_range(time_filter, start_date_str, end_date_str)
+    # Custom ranges are not cached
+    cache_key = ('categories', time_filter) if time_filter in STANDARD_PERIODS else None
+    return category_totals(g.user.id, start_date, end_date, cache_key=cache_key)
 
 
-def _build_category_query_with_totals(category_type, start_date=None, end_date=None):
+def _format_category_data(totals, category_type):
     """
-    Build a query to get categories with their transaction totals.
+    Format the categories of one type for template rendering.
     
     Args:
+        totals (dict): Result of category_totals()
         category_type (str): 'income' or 'expense'
-        start_date (datetime, optional): Start date for filtering transactions
-        end_date (datetime, optional): End date for filtering transactions
-        
-    Returns:
-        SQLAlchemy query: Query object ready for execution
-    """
-    query = db.session.query(
-        Category,
-        func.coalesce(func.sum(Transaction.amount), 0).label('total')
-    ).outerjoin(Transaction, Category.id == Transaction.category_id)
-    
-    # Apply date filter if provided
-    if start_date and end_date:
-        query = query.filter(
-            or_(
-                Transaction.date == None,
-                and_(Transaction.date >= start_date, Transaction.date <= end_date)
-            )
-        )
-    
-    # Apply category filters
-    query = query.filter(
-        Category.user_id == g.user.id,
-        Category.type == category_type
-    ).group_by(Category.id)
-    
-    return query
-
-
-def _format_category_data(categories_query_result):
-    """
-    Format category data for template rendering.
-    
-    Args:
-        categories_query_result: Result from category query with totals
         
     Returns:
         list: Formatted category dictionaries
     """
-    categories = []
-    for category, total in categories_query_result:
-        category_dict = {
-            'id': category.id,
-            'name': category.name,
-            'type': category.type,
-            'unicode_emoji': category.unicode_emoji,
-            'total': float(total)
-        }
-        categories.append(category_dict)
-    return categories
+    field = 'income' if category_type == 'income' else 'expenses'
+    return [{
+        'id': category['id'],
+        'name': category['name'],
+        'type': category['type'],
+        'unicode_emoji': category['emoji'],
+        'total': category[field],
+        'transaction_count': category['transaction_count']
+    } for category in totals['categories'] if category['type'] == category_type]
 
 
 def _get_filter_display_names():
@@ -190,22 +103,18 @@ def list_categories():
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
     
-    # Get date range based on filter type
-    start_date, end_date = get_date_range(time_filter, start_date_str, end_date_str)
-    
-    # Get categories with totals using helper functions
-    income_categories_result = _build_category_query_with_totals('income', start_date, end_date).all()
-    expense_categories_result = _build_category_query_with_totals('expense', start_date, end_date).all()
+    # Both category types with their totals come from one aggregate query
+    totals = _period_category_totals(time_filter, start_date_str, end_date_str)
     
     # Format data for template
-    income_categories = _format_category_data(income_categories_result)
-    expense_categories = _format_category_data(expense_categories_result)
+    income_categories = _format_category_data(totals, 'income')
+    expense_categories = _format_category_data(totals, 'expense')
     
     # Calculate statistics
-    total_income_categories = len(income_categories)
-    total_expense_categories = len(expense_categories)
-    total_income = sum(cat['total'] for cat in income_categories)
-    total_expenses = sum(cat['total'] for cat in expense_categories)
+    total_income_categories = totals['category_counts']['income']
+    total_expense_categories = totals['category_counts']['expense']
+    total_income = totals['total_income']
+    total_expenses = totals['total_expenses']
     
     # Get filter display names
     filter_names = _get_filter_display_names()
@@ -500,57 +409,19 @@ def api_category_stats():
         start_date_str = request.args.get('start_date')
         end_date_str = request.args.get('end_date')
         
-        # Get date range based on filter type and custom dates
-        start_date, end_date = get_date_range(time_filter, start_date_str, end_date_str)
-        
-        # Count categories by type
-        income_categories = Category.query.filter_by(
-            user_id=g.user.id,
-            type='income'
-        ).count()
-        
-        expense_categories = Category.query.filter_by(
-            user_id=g.user.id,
-            type='expense'
-        ).count()
-        
-        # Calculate real totals from transactions with date filter
-        income_query = db.session.query(
-            func.coalesce(func.sum(Transaction.amount), 0)
-        ).join(Category).filter(
-            Category.user_id == g.user.id,
-            Category.type == 'income'
-        )
-        
-        expense_query = db.session.query(
-            func.coalesce(func.sum(Transaction.amount), 0)
-        ).join(Category).filter(
-            Category.user_id == g.user.id,
-            Category.type == 'expense'
-        )
-        
-        # Apply date filter if not 'all'
-        if start_date and end_date:
-            income_query = income_query.filter(
-                Transaction.date >= start_date,
-                Transaction.date <= end_date
-            )
-            expense_query = expense_query.filter(
-                Transaction.date >= start_date,
-                Transaction.date <= end_date
-            )
-        
-        total_income = income_query.scalar() or 0.0
-        total_expenses = expense_query.scalar() or 0.0
+        # Same cached result as the categories page
+        totals = _period_category_totals(time_filter, start_date_str, end_date_str)
+        total_income = totals['total_income']
+        total_expenses = totals['total_expenses']
 
         return jsonify({
             'success': True,
             'stats': {
-                'income_categories': income_categories,
-                'expense_categories': expense_categories,
-                'total_income': float(total_income),
-                'total_expenses': float(total_expenses),
-                'net_income': float(total_income - total_expenses),
+                'income_categories': totals['category_counts']['income'],
+                'expense_categories': totals['category_counts']['expense'],
+                'total_income': total_income,
+                'total_expenses': total_expenses,
+                'net_income': total_income - total_expenses,
                 'filter': time_filter
             }
         })
@@ -573,41 +444,17 @@ def api_top_expense_categories():
         end_date_str = request.args.get('end_date')
         show_all = request.args.get('show_all', 'false').lower() == 'true'
         
-        # Get date range based on filter type
-        start_date, end_date = get_date_range(time_filter, start_date_str, end_date_str)
-        
-        # Base query for expense categories
-        query = db.session.query(
-            Category.name,
-            Category.unicode_emoji,
-            func.sum(Transaction.amount).label('total')
-        ).join(Transaction).filter(
-            Category.user_id == g.user.id,
-            Category.type == 'expense'
-        )
-        
-        # Apply date filter if provided
-        if start_date and end_date:
-            query = query.filter(
-                Transaction.date >= start_date,
-                Transaction.date <= end_date
-            )
-        
-        # Get expenses - apply limit only if show_all is False
-        query = query.group_by(Category.id).order_by(
-            func.sum(Transaction.amount).desc()
-        )
-        
+        # Same cached result as the categories page, largest expenses first
+        totals = _period_category_totals(time_filter, start_date_str, end_date_str)
+        expenses = totals_by_kind(totals, 'expense')
         if not show_all:
-            query = query.limit(TOP_CATEGORIES_LIMIT)
-            
-        expenses = query.all()
+            expenses = expenses[:TOP_CATEGORIES_LIMIT]
         
         # Format data for chart
         chart_data = {
-            'labels': [expense.name for expense in expenses],
-            'data': [float(expense.total) for expense in expenses],
-            'emojis': [expense.unicode_emoji or DEFAULT_EMOJI_EXPENSE for expense in expenses]
+            'labels': [category['name'] for category, _ in expenses],
+            'data': [amount for _, amount in expenses],
+            'emojis': [category['emoji'] or DEFAULT_EMOJI_EXPENSE for category, _ in expenses]
         }
         
         return jsonify({
@@ -0,0 +1,107 @@
+"""
+Change tracking for delta backups in DumpMyCash.
+
+Accounts, categories, transactions and transfers carry an updated_at
+timestamp, set on insert and on every update, Core UPDATE statements
+included (it is the column's onupdate). Deleted rows leave a tombstone
+naming their record type and ID; deleting all of a user's data leaves a
+single 'all' tombstone instead of one per row. A delta backup holds the
+rows updated and the tombstones written since a watermark.
+
+ORM deletes are recorded by a session hook. Paths that delete these rows
+with Core statements call record_deletions() or record_purge() instead.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+
+from app.models import db, Account, Category, Transaction, Transfer, Tombstone
+
+# Record type of each tracked model, as used in tombstones and backups
+TRACKED_MODELS = {
+    Account: 'account',
+    Category: 'category',
+    Transaction: 'transaction',
+    Transfer: 'transfer',
+}
+ALL_RECORDS = 'all'  # Tombstone record type of a purge of all data
+DEFAULT_BATCH_SIZE = 1000
+
+
+def record_deletions(connection, user_id, record_type, record_ids):
+    """
+    Write tombstones for rows deleted with Core statements.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): Owner of the rows
+        record_type (str): 'account', 'category', 'transaction' or 'transfer'
+        record_ids (iterable): IDs of the deleted rows
+    """
+    now = datetime.now()
+    rows = [
+        {'user_id': user_id, 'record_type': record_type, 'record_id': record_id, 'deleted_at': now}
+        for record_id in record_ids
+    ]
+    if rows:
+        connection.execute(Tombstone.__table__.insert(), rows)
+
+
+def record_purge(connection, user_id):
+    """
+    Write the tombstone of a purge of all of a user's data.
+
+    Earlier tombstones of the user are superseded by it and removed.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): User whose data was deleted
+    """
+    connection.execute(Tombstone.__table__.delete().where(Tombstone.__table__.c.user_id == user_id))
+    record_deletions(connection, user_id, ALL_RECORDS, [None])
+
+
+def _track_deletions(session, flush_context):
+    """Session after_flush hook writing tombstones for deleted tracked rows."""
+    now = datetime.now()
+    rows = [
+        {'user_id': obj.user_id, 'record_type': TRACKED_MODELS[type(obj)], 'record_id': obj.id, 'deleted_at': now}
+        for obj in session.deleted
+        if type(obj) in TRACKED_MODELS
+    ]
+    if rows:
+        session.connection().execute(Tombstone.__table__.insert(), rows)
+
+
+def purge_tombstones(older_than, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Delete tombstones in batches once no delta backup needs them.
+
+    Args:
+        older_than (datetime): Only tombstones written before this are deleted
+        batch_size (int): Tombstones deleted per batch
+
+    Returns:
+        int: Number of tombstones deleted
+    """
+    purged = 0
+    while True:
+        ids = db.session.execute(
+            select(Tombstone.id).where(Tombstone.deleted_at < older_than).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return purged
+
+        db.session.execute(delete(Tombstone).where(Tombstone.id.in_(ids)))
+        db.session.commit()
+        purged += len(ids)
+        if len(ids) < batch_size:
+            return purged
+
+
+def register_change_listeners():
+    """Register the session hook that writes tombstones for ORM deletes."""
+    if not event.contains(Session, 'after_flush', _track_deletions):
+        event.listen(Session, 'after_flush', _track_deletions)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -13,6 +14,46 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None  # No time limit for CSRF tokens
+    # Per-user statistics: results kept (least recently used are evicted) and
+    # seconds they are cached; writes drop them immediately
+    STATS_CACHE_MAX_ENTRIES = 4096
+    STATS_CACHE_TTL_SECONDS = 30
+    # Per-user account and category cache: users kept (least recently used
+    # are evicted) and seconds an entry lives; writes drop entries immediately
+    REFERENCE_CACHE_MAX_USERS = 1024
+    REFERENCE_CACHE_TTL_SECONDS = 300
+    # Logged in users (ID, username, email, name) cached between requests;
+    # changes to a user drop its entry immediately
+    SESSION_USER_CACHE_MAX_USERS = 4096
+    SESSION_USER_CACHE_TTL_SECONDS = 60
+    # Description autocomplete indexes: users kept (least recently used are
+    # evicted) and seconds an index lives; writes update indexes immediately
+    DESCRIPTION_INDEX_MAX_USERS = 512
+    DESCRIPTION_INDEX_TTL_SECONDS = 300
+    # Hours a stored Idempotency-Key response can be replayed, and seconds a
+    # claimed key whose request never committed blocks retries before it can
+    # be claimed again
+    IDEMPOTENCY_KEY_TTL_HOURS = 24
+    IDEMPOTENCY_KEY_LEASE_SECONDS = 60
+    # Background jobs: pool size shared by all users, active jobs per user,
+    # where result files are written and how long they are kept
+    JOBS_MAX_WORKERS = int(os.environ.get('JOBS_MAX_WORKERS', 2))
+    JOBS_MAX_PER_USER = 2
+    JOBS_RESULT_DIR = os.environ.get('JOBS_RESULT_DIR') or os.path.join(basedir, 'job_results')
+    JOBS_RESULT_TTL_HOURS = 24
+    JOBS_EAGER = False  # Run jobs inside the request, for tests
+    # Days tombstones of deleted rows are kept; delta backups can only
+    # continue backups taken within this window
+    BACKUP_TOMBSTONE_TTL_DAYS = 90
+    # Data purges (delete all data, delete account): rows deleted per
+    # statement and seconds paused between batches so other writers get in
+    PURGE_BATCH_SIZE = 1000
+    PURGE_PAUSE_SECONDS = 0.01
+    # Comma separated IDs of users allowed to run maintenance endpoints. IDs,
+    # not emails: users can change their email to any address not in use
+    ADMIN_USER_IDS = tuple(
+        int(user_id) for user_id in os.environ.get('ADMIN_USER_IDS', '').split(',') if user_id.strip()
+    )
 
 
 class TestConfig(Config):
@@ -21,4 +62,7 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     SECRET_KEY = 'test-secret-key'
     WTF_CSRF_ENABLED = False  # Disable CSRF for testing
+    JOBS_EAGER = True
+    PURGE_PAUSE_SECONDS = 0
+    JOBS_RESULT_DIR = os.path.join(tempfile.gettempdir(), 'dumpmycash_test_jobs')
 
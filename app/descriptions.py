@@ -0,0 +1,328 @@
+"""
+Description autocomplete index for DumpMyCash.
+
+The description field suggests the user's earlier descriptions on every
+keystroke. Instead of grouping the user's whole history per request, each
+user gets an in-process index of their distinct descriptions and how often
+they were used (transfers excluded):
+
+- the index is built lazily with one grouped query on the first lookup
+- descriptions are kept sorted by their case folded form, so the ones
+  starting with the typed text are one slice found by binary search, and
+  the most used of them are picked from that slice
+- when fewer prefix matches than requested exist, descriptions containing
+  the text elsewhere fill the remaining places
+- ORM writes to transactions record per-description count changes on the
+  database connection, which are applied to the cached index when the
+  transaction commits; category renames or type changes, bulk ORM
+  statements and writers calling mark_descriptions_stale() drop the
+  index instead, and it is rebuilt on the next lookup
+- the least recently used users are evicted beyond
+  DESCRIPTION_INDEX_MAX_USERS and an index expires after
+  DESCRIPTION_INDEX_TTL_SECONDS, which bounds staleness for writes made by
+  other processes
+"""
+
+import heapq
+import itertools
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.caching import ALL_USERS, CommitTracker, LRUCache, bulk_write_model
+from app.models import db, Transaction, Category, User
+from app.rollups import previous_value, track_previous_value
+
+# connection.info key holding the pending count changes and the users whose
+# index must be rebuilt
+DESCRIPTION_CHANGES_KEY = 'description_index_changes'
+DEFAULT_MAX_USERS = 512
+DEFAULT_TTL_SECONDS = 300
+# Sorts after every character a description can continue with
+_PREFIX_END = '\U0010ffff'
+
+
+class DescriptionIndex:
+    """
+    Frequency ranked prefix index over the descriptions of one user.
+
+    Attributes:
+        counts (dict): Description -> number of non-transfer transactions using it
+    """
+
+    def __init__(self, counts):
+        self.counts = dict(counts)
+        self._entries = sorted((description.casefold(), description) for description in self.counts)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _rank(self, entry):
+        return -self.counts[entry[1]], entry[1]
+
+    def search(self, query='', limit=10):
+        """
+        Find the most used descriptions matching a query, case insensitively.
+
+        Args:
+            query (str): Typed text; empty matches every description
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: Descriptions starting with the query, most used first,
+                  followed by descriptions containing it elsewhere
+        """
+        if limit <= 0:
+            return []
+
+        needle = query.casefold()
+        with self._lock:
+            start = bisect_left(self._entries, (needle,))
+            end = bisect_left(self._entries, (needle + _PREFIX_END,))
+            matches = heapq.nsmallest(limit, itertools.islice(self._entries, start, end), key=self._rank)
+
+            if needle and len(matches) < limit:
+                others = (
+                    entry for entry in itertools.chain(
+                        itertools.islice(self._entries, start), itertools.islice(self._entries, end, None)
+                    )
+                    if needle in entry[0]
+                )
+                matches += heapq.nsmallest(limit - len(matches), others, key=self._rank)
+
+        return [description for _, description in matches]
+
+    def apply(self, deltas):
+        """
+        Apply committed changes to the description counts.
+
+        Args:
+            deltas (dict): Description -> change in the number of uses
+        """
+        with self._lock:
+            for description, delta in deltas.items():
+                if not delta:
+                    continue
+                entry = (description.casefold(), description)
+                count = self.counts.get(description, 0) + delta
+                if count > 0:
+                    if description not in self.counts:
+                        insort(self._entries, entry)
+                    self.counts[description] = count
+                elif description in self.counts:
+                    del self.counts[description]
+                    del self._entries[bisect_left(self._entries, entry)]
+
+
+class DescriptionIndexCache(LRUCache):
+    """Thread safe LRU cache of DescriptionIndex keyed by user ID."""
+
+    def apply(self, deltas, resets):
+        """
+        Apply committed count changes and drop the indexes to rebuild.
+
+        Args:
+            deltas (dict): User ID -> {description: change in uses}
+            resets (set): User IDs, or ALL_USERS, whose index is dropped
+        """
+        with self._lock:
+            # Indexes being built right now may predate this commit
+            self._invalidate(resets)
+            indexes = [
+                (self._entries[user_id][1], user_deltas)
+                for user_id, user_deltas in deltas.items() if user_id in self._entries
+            ]
+        for index, user_deltas in indexes:
+            index.apply(user_deltas)
+
+
+class DescriptionChanges:
+    """
+    Description changes of one database transaction.
+
+    Attributes:
+        deltas (dict): User ID -> Counter of description -> change in uses
+        resets (set): User IDs, or ALL_USERS, whose index must be rebuilt
+    """
+
+    def __init__(self):
+        self.deltas = defaultdict(Counter)
+        self.resets = set()
+
+    def __bool__(self):
+        return bool(self.deltas or self.resets)
+
+
+def _cache():
+    """Return the application's description index cache, creating it on first use."""
+    cache = current_app.extensions.get('description_index_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('description_index_cache', DescriptionIndexCache(
+            current_app.config.get('DESCRIPTION_INDEX_MAX_USERS', DEFAULT_MAX_USERS)
+        ))
+    return cache
+
+
+def load_description_index(user_id):
+    """
+    Build the description index of a user from the database.
+
+    Args:
+        user_id (int): User ID
+
+    Returns:
+        DescriptionIndex: Distinct non-empty descriptions of the user's
+                          income and expense transactions with their counts
+    """
+    rows = db.session.execute(
+        select(Transaction.description, func.count().label('frequency')).where(
+            Transaction.user_id == user_id,
+            Transaction.description.isnot(None),
+            Transaction.description != '',
+            Transaction.kind != 'transfer'
+        ).group_by(Transaction.description)
+    ).all()
+    return DescriptionIndex((row.description, row.frequency) for row in rows)
+
+
+def get_description_index(user_id):
+    """
+    Get the description index of a user, building it when needed.
+
+    Args:
+        user_id (int): User ID
+
+    Returns:
+        DescriptionIndex: Index of the user's committed descriptions
+    """
+    cache = _cache()
+    index = cache.get(user_id)
+    if index is None:
+        version = cache.version
+        index = load_description_index(user_id)
+        ttl = current_app.config.get('DESCRIPTION_INDEX_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+        if ttl > 0:
+            cache.set(user_id, index, ttl, version)
+    return index
+
+
+def suggest_descriptions(user_id, query='', limit=10):
+    """
+    Suggest descriptions of a user for autocomplete.
+
+    Args:
+        user_id (int): User ID
+        query (str): Typed text, matched case insensitively
+        limit (int): Maximum number of suggestions
+
+    Returns:
+        list: Description strings, see DescriptionIndex.search()
+    """
+    return get_description_index(user_id).search(query, limit)
+
+
+def mark_descriptions_stale(connection, user_ids):
+    """
+    Drop the description indexes of users when the current transaction commits.
+
+    Core statements bypass the session hooks, so writers changing
+    transaction descriptions or kinds through them call this.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_ids (iterable): IDs of the affected users, or ALL_USERS
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        _changes.changes(connection).resets.update(user_ids)
+
+
+def _description_use(user_id, description, kind):
+    """Return the (user_id, description) a transaction counts for, or None."""
+    if not description or kind == 'transfer':
+        return None
+    return user_id, description
+
+
+def _track_description_writes(session, flush_context):
+    """Session after_flush hook recording description count changes and stale indexes."""
+    deltas = Counter()
+    resets = set()
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            deltas[_description_use(obj.user_id, obj.description, obj.kind)] += 1
+        elif isinstance(obj, User):
+            # New users may reuse the ID of a deleted one
+            resets.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and session.is_modified(obj):
+            state = inspect(obj)
+            deltas[_description_use(*(
+                previous_value(state, key) for key in ('user_id', 'description', 'kind')
+            ))] -= 1
+            deltas[_description_use(obj.user_id, obj.description, obj.kind)] += 1
+        elif isinstance(obj, Category):
+            # Renaming to or from Transfer moves all its transactions in or out
+            state = inspect(obj)
+            if state.attrs.name.history.has_changes() or state.attrs.type.history.has_changes():
+                resets.add(obj.user_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            state = inspect(obj)
+            deltas[_description_use(*(
+                previous_value(state, key) for key in ('user_id', 'description', 'kind')
+            ))] -= 1
+        elif isinstance(obj, User):
+            resets.add(obj.id)
+
+    deltas.pop(None, None)
+    changes = [(key, delta) for key, delta in deltas.items() if delta]
+    if not changes and not resets:
+        return
+
+    connection = session.connection()
+    if changes:
+        pending = _changes.changes(connection).deltas
+        for (user_id, description), delta in changes:
+            pending[user_id][description] += delta
+    mark_descriptions_stale(connection, resets)
+
+
+def _track_bulk_description_writes(orm_execute_state):
+    """Session hook dropping every index when a bulk statement changes transactions."""
+    if bulk_write_model(orm_execute_state) is Transaction:
+        mark_descriptions_stale(orm_execute_state.session.connection(), {ALL_USERS})
+
+
+def _apply(changes):
+    """Apply the description changes of a committed transaction to the cache."""
+    _cache().apply(changes.deltas, changes.resets)
+
+
+_changes = CommitTracker(DESCRIPTION_CHANGES_KEY, _apply, factory=DescriptionChanges)
+
+
+def register_description_listeners():
+    """Register the hooks that keep the description indexes current."""
+    # Without active history, assigning to an expired description discards
+    # the value it replaces, and its count could not be decremented
+    if not event.contains(Transaction.description, 'set', track_previous_value):
+        event.listen(Transaction.description, 'set', track_previous_value,
+                     active_history=True, retval=True)
+
+    listeners = (
+        (Session, 'after_flush', _track_description_writes),
+        (Session, 'do_orm_execute', _track_bulk_description_writes),
+    )
+    for target, name, listener in listeners:
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+    _changes.register()
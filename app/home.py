@@ -7,17 +7,22 @@ import calendar
 from datetime import datetime, timedelta
 
 from flask import Blueprint, render_template, jsonify, request, current_app, g
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case
 
-from app.models import Transaction, Category, db
+from app.models import Transaction, DailyRollup, db
 from app.auth import login_required
+from app.rollups import ledger_rows, get_user_summary
+from app.statistics import category_totals, totals_by_kind
+from app.periods import period_totals
 
 home = Blueprint('home', __name__, url_prefix='/home')
 
 # Constants for better maintainability
-TRANSFER_CATEGORY_NAME = 'Transfer'
 DEFAULT_STATS_DAYS = 30
 MAX_TRANSACTION_LIMIT = 50
+BUCKET_GRANULARITIES = ('day', 'week', 'month')
+MONTH_ABBREVIATIONS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                       'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
 
 def format_currency(amount):
     """Format a currency amount with proper formatting."""
@@ -31,71 +36,153 @@ def _get_transaction_filter(user_id, transaction_type, start_date=None, exclude_
     
     Args:
         user_id (int): User ID
-        transaction_type (str): 'income' or 'expense'
+        transaction_type (str, optional): 'income' or 'expense'
         start_date (datetime, optional): Filter by date from this start date
         exclude_transfers (bool): Whether to exclude transfer transactions
         
     Returns:
         SQLAlchemy filter conditions
     """
-    conditions = [
-        Transaction.user_id == user_id,
-        Transaction.category.has(Category.type == transaction_type)
-    ]
+    conditions = [Transaction.user_id == user_id]
     
-    if exclude_transfers:
-        conditions.append(Transaction.category.has(Category.name != TRANSFER_CATEGORY_NAME))
+    if transaction_type:
+        # Transfers carry their own kind, so a type match already excludes them
+        conditions.append(Transaction.kind == transaction_type)
+    elif exclude_transfers:
+        conditions.append(Transaction.kind != 'transfer')
     
     if start_date:
         conditions.append(Transaction.date >= start_date)
     
     return and_(*conditions)
 
-def _calculate_totals(user_id, start_date=None):
+def _add_months(value, months):
     """
-    Calculate total income, expenses, and balance for a user.
+    Shift a first-of-month datetime by a number of months.
+    
+    Args:
+        value (datetime): Datetime on the first day of a month
+        months (int): Number of months to add (may be negative)
+        
+    Returns:
+        datetime: First day of the resulting month
+    """
+    month_index = value.month - 1 + months
+    return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1)
+
+def _truncate_to_bucket(value, granularity):
+    """
+    Truncate a datetime to the start of its day, ISO week or month bucket.
+    
+    Args:
+        value (datetime): Datetime to truncate
+        granularity (str): 'day', 'week' or 'month'
+        
+    Returns:
+        datetime: Start of the bucket containing the value
+    """
+    day_start = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return day_start - timedelta(days=day_start.weekday())
+    if granularity == 'month':
+        return day_start.replace(day=1)
+    return day_start
+
+def _next_bucket(bucket_start, granularity):
+    """Return the start of the bucket following bucket_start."""
+    if granularity == 'week':
+        return bucket_start + timedelta(weeks=1)
+    if granularity == 'month':
+        return _add_months(bucket_start, 1)
+    return bucket_start + timedelta(days=1)
+
+def _bucket_key_expression(granularity, column):
+    """
+    Build a SQL expression that labels each row with its bucket start.
+    
+    The label is always an ISO date string (YYYY-MM-DD) of the first day of the
+    bucket, so results from SQLite and PostgreSQL can be merged the same way.
+    
+    Args:
+        granularity (str): 'day', 'week' or 'month'
+        column: Date or datetime column to bucket
+        
+    Returns:
+        SQLAlchemy column expression
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(func.date_trunc(granularity, column), 'YYYY-MM-DD')
+    
+    if granularity == 'week':
+        # Advance to the Sunday closing the ISO week, then step back to its Monday
+        return func.date(column, 'weekday 0', '-6 days')
+    if granularity == 'month':
+        return func.strftime('%Y-%m-01', column)
+    return func.date(column)
+
+def _bucket_totals(user_id, granularity, start_date, end_date):
+    """
+    Aggregate income and expenses into contiguous time buckets with one query.
+    
+    Every bucket between start_date and end_date is returned, including those
+    without transactions, which are zero-filled. Buckets are whole days, so
+    the totals are read from the daily rollups.
     
     Args:
         user_id (int): User ID
-        start_date (datetime, optional): Filter by date from this start date
+        granularity (str): 'day', 'week' (ISO, starting Monday) or 'month'
+        start_date (datetime): Start of the range (inclusive, truncated to midnight)
+        end_date (datetime): End of the range (exclusive, truncated to midnight)
         
     Returns:
-        tuple: (total_income, total_expenses, total_balance)
+        list: Dicts with 'start', 'income', 'expenses' and 'net' per bucket
     """
-    # Calculate total income
-    total_income = db.session.query(
-        func.coalesce(func.sum(Transaction.amount), 0)
-    ).filter(
-        _get_transaction_filter(user_id, 'income', start_date)
-    ).scalar()
+    if granularity not in BUCKET_GRANULARITIES:
+        raise ValueError(f"Unsupported bucket granularity: {granularity}")
     
-    # Calculate total expenses
-    total_expenses = db.session.query(
-        func.coalesce(func.sum(Transaction.amount), 0)
+    bucket_key = _bucket_key_expression(granularity, DailyRollup.day).label('bucket')
+    
+    rows = db.session.query(
+        bucket_key,
+        func.coalesce(func.sum(case((DailyRollup.kind == 'income', DailyRollup.total), else_=0)), 0).label('income'),
+        func.coalesce(func.sum(case((DailyRollup.kind == 'expense', DailyRollup.total), else_=0)), 0).label('expenses')
     ).filter(
-        _get_transaction_filter(user_id, 'expense', start_date)
-    ).scalar()
+        DailyRollup.user_id == user_id,
+        DailyRollup.day >= start_date.date(),
+        DailyRollup.day < end_date.date()
+    ).group_by(bucket_key).all()
+    
+    totals_by_bucket = {row.bucket: (float(row.income), float(row.expenses)) for row in rows}
+    
+    buckets = []
+    bucket_start = _truncate_to_bucket(start_date, granularity)
+    while bucket_start < end_date:
+        income, expenses = totals_by_bucket.get(bucket_start.strftime('%Y-%m-%d'), (0.0, 0.0))
+        buckets.append({
+            'start': bucket_start,
+            'income': income,
+            'expenses': expenses,
+            'net': income - expenses
+        })
+        bucket_start = _next_bucket(bucket_start, granularity)
     
-    return float(total_income), float(total_expenses), float(total_income - total_expenses)
+    return buckets
 
-def _get_month_boundaries(year, month):
+
+def _lifetime_totals(user_id):
     """
-    Get start and end datetime for a given month.
+    Read all-time totals from the stored user summary.
     
     Args:
-        year (int): Year
-        month (int): Month (1-12)
+        user_id (int): User ID
         
     Returns:
-        tuple: (month_start, month_end)
+        tuple: (income, expenses, net) as floats
     """
-    month_start = datetime(year, month, 1)
-    if month == 12:
-        month_end = datetime(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        month_end = datetime(year, month + 1, 1) - timedelta(days=1)
-    
-    return month_start, month_end
+    summary = get_user_summary(user_id)
+    income = float(summary.total_income)
+    expenses = float(summary.total_expenses)
+    return income, expenses, income - expenses
 
 
 @home.route('/')
@@ -103,23 +190,59 @@ def _get_month_boundaries(year, month):
 def dashboard():
     """Main dashboard view with overview statistics."""
     now = datetime.now()
-    current_month_start = datetime(now.year, now.month, 1)
     
-    # Calculate total balance (all time)
-    total_income, total_expenses, total_balance = _calculate_totals(g.user.id)
+    # Embed the polling payload so the first paint needs no extra requests;
+    # it carries the current month's totals too
+    bundle = _build_dashboard_bundle(g.user.id)
+    month = bundle['periods']['month']
     
-    # Calculate current month statistics
-    month_income, month_expenses, month_net = _calculate_totals(g.user.id, current_month_start)
+    # Calculate total balance (all time), from the bundle's snapshot
+    total_income, total_expenses, total_balance = _lifetime_totals(g.user.id)
     
     return render_template('dashboard/home.html', 
                          title='Dashboard',
                          total_balance=total_balance,
                          total_income=total_income,
                          total_expenses=total_expenses,
-                         month_income=month_income,
-                         month_expenses=month_expenses,
-                         month_net=month_net,
-                         current_month=calendar.month_name[now.month])
+                         month_income=month['income'],
+                         month_expenses=month['expenses'],
+                         month_net=month['net'],
+                         current_month=calendar.month_name[now.month],
+                         bundle=bundle)
+
+
+def _build_stats_data(user_id, days=DEFAULT_STATS_DAYS):
+    """
+    Build the overview statistics payload served by /api/stats.
+    
+    Args:
+        user_id (int): User ID
+        days (int): Length of the period in days (0 or less for all time)
+        
+    Returns:
+        dict: Total balance plus income, expenses, net and count for the period
+    """
+    start_date = datetime.now() - timedelta(days=days) if days > 0 else None
+    
+    # Calculate total statistics (all time)
+    total_income, total_expenses, total_balance = _lifetime_totals(user_id)
+    
+    # Period totals and transaction count in one query
+    ledger = ledger_rows(user_id, start_date)
+    period_income, period_expenses, transaction_count = db.session.query(
+        func.coalesce(func.sum(case((ledger.c.kind == 'income', ledger.c.total), else_=0)), 0),
+        func.coalesce(func.sum(case((ledger.c.kind == 'expense', ledger.c.total), else_=0)), 0),
+        func.coalesce(func.sum(ledger.c.txn_count), 0)
+    ).select_from(ledger).one()
+    
+    return {
+        'total_balance': total_balance,
+        'period_income': float(period_income),
+        'period_expenses': float(period_expenses),
+        'period_net': float(period_income - period_expenses),
+        'transaction_count': transaction_count,
+        'period_days': days
+    }
 
 
 @home.route('/api/stats')
@@ -129,32 +252,10 @@ def api_stats():
     try:
         # Get date range from query parameters
         days = request.args.get('days', DEFAULT_STATS_DAYS, type=int)
-        start_date = datetime.now() - timedelta(days=days) if days > 0 else None
-        
-        # Calculate total statistics (all time)
-        total_income, total_expenses, total_balance = _calculate_totals(g.user.id)
-        
-        # Calculate period statistics
-        period_income, period_expenses, period_net = _calculate_totals(g.user.id, start_date)
-        
-        # Get transaction count for the period
-        count_query = db.session.query(func.count(Transaction.id)).filter(
-            Transaction.user_id == g.user.id
-        )
-        if start_date:
-            count_query = count_query.filter(Transaction.date >= start_date)
-        transaction_count = count_query.scalar()
         
         return jsonify({
             'status': 'success',
-            'data': {
-                'total_balance': total_balance,
-                'period_income': period_income,
-                'period_expenses': period_expenses,
-                'period_net': period_net,
-                'transaction_count': transaction_count,
-                'period_days': days
-            }
+            'data': _build_stats_data(g.user.id, days)
         })
         
     except Exception as e:
@@ -215,30 +316,23 @@ def api_category_breakdown():
         if transaction_type not in ['income', 'expense']:
             transaction_type = 'expense'
         
-        # Build query for category breakdown
-        query = db.session.query(
-            Category.name,
-            func.sum(Transaction.amount).label('total')
-        ).join(Transaction).filter(
-            _get_transaction_filter(g.user.id, transaction_type, start_date)
-        ).group_by(Category.id, Category.name).order_by(
-            func.sum(Transaction.amount).desc()
-        )
-        
-        categories = query.all()
+        # Only the dashboard's default period is cached, other lengths are one-off
+        cache_key = ('home', days) if days == DEFAULT_STATS_DAYS else None
+        totals = category_totals(g.user.id, start_date, cache_key=cache_key)
+        categories = totals_by_kind(totals, transaction_type)
         
         # Calculate total for percentage calculation
-        total_amount = sum(float(cat.total) for cat in categories)
+        total_amount = sum(amount for _, amount in categories)
         
         return jsonify({
             'status': 'success',
             'data': {
                 'categories': [{
-                    'name': cat.name,
-                    'amount': float(cat.total),
-                    'percentage': round((float(cat.total) / total_amount * 100), 2) if total_amount > 0 else 0,
-                    'formatted_amount': format_currency(cat.total)
-                } for cat in categories],
+                    'name': category['name'],
+                    'amount': amount,
+                    'percentage': round((amount / total_amount * 100), 2) if total_amount > 0 else 0,
+                    'formatted_amount': format_currency(amount)
+                } for category, amount in categories],
                 'total_amount': total_amount,
                 'period_days': days,
                 'transaction_type': transaction_type
@@ -258,49 +352,23 @@ def api_category_breakdown():
 def api_monthly_trend():
     """API endpoint for monthly income/expense trend data."""
     try:
-        months = []
-        current_date = datetime.now()
-        
-        for i in range(12):
-            # Calculate month and year
-            if current_date.month - i <= 0:
-                month = current_date.month - i + 12
-                year = current_date.year - 1
-            else:
-                month = current_date.month - i
-                year = current_date.year
-            
-            # Get month boundaries
-            month_start, month_end = _get_month_boundaries(year, month)
-            
-            # Calculate monthly statistics with proper date filtering
-            month_income = db.session.query(
-                func.coalesce(func.sum(Transaction.amount), 0)
-            ).filter(
-                _get_transaction_filter(g.user.id, 'income'),
-                Transaction.date >= month_start,
-                Transaction.date <= month_end
-            ).scalar()
-            
-            month_expenses = db.session.query(
-                func.coalesce(func.sum(Transaction.amount), 0)
-            ).filter(
-                _get_transaction_filter(g.user.id, 'expense'),
-                Transaction.date >= month_start,
-                Transaction.date <= month_end
-            ).scalar()
-            
-            months.append({
-                'month': calendar.month_name[month],
-                'year': year,
-                'income': float(month_income),
-                'expenses': float(month_expenses),
-                'net': float(month_income - month_expenses),
-                'month_num': month
-            })
-        
-        # Reverse to get chronological order
-        months.reverse()
+        current_month_start = _truncate_to_bucket(datetime.now(), 'month')
+        
+        # Last 12 months, including the current one, in chronological order
+        buckets = _bucket_totals(
+            g.user.id, 'month',
+            _add_months(current_month_start, -11),
+            _add_months(current_month_start, 1)
+        )
+        
+        months = [{
+            'month': calendar.month_name[bucket['start'].month],
+            'year': bucket['start'].year,
+            'income': bucket['income'],
+            'expenses': bucket['expenses'],
+            'net': bucket['net'],
+            'month_num': bucket['start'].month
+        } for bucket in buckets]
         
         return jsonify({
             'status': 'success',
@@ -320,46 +388,20 @@ def api_monthly_trend():
 def api_daily_activity():
     """API endpoint for daily activity chart data for the current month."""
     try:
-        now = datetime.now()
-        current_month_start = datetime(now.year, now.month, 1)
-        
-        # Calculate last day of current month
-        month_start, current_month_end = _get_month_boundaries(now.year, now.month)
-        
-        days_data = []
-        current_date = current_month_start
-        
-        while current_date <= current_month_end:
-            day_start = current_date
-            day_end = current_date.replace(hour=23, minute=59, second=59)
-            
-            # Calculate daily income
-            daily_income = db.session.query(
-                func.coalesce(func.sum(Transaction.amount), 0)
-            ).filter(
-                _get_transaction_filter(g.user.id, 'income'),
-                Transaction.date >= day_start,
-                Transaction.date <= day_end
-            ).scalar()
-            
-            # Calculate daily expenses
-            daily_expenses = db.session.query(
-                func.coalesce(func.sum(Transaction.amount), 0)
-            ).filter(
-                _get_transaction_filter(g.user.id, 'expense'),
-                Transaction.date >= day_start,
-                Transaction.date <= day_end
-            ).scalar()
-            
-            days_data.append({
-                'day': current_date.day,
-                'date': current_date.strftime('%Y-%m-%d'),
-                'income': float(daily_income),
-                'expenses': float(daily_expenses),
-                'net': float(daily_income - daily_expenses)
-            })
-            
-            current_date += timedelta(days=1)
+        current_month_start = _truncate_to_bucket(datetime.now(), 'month')
+        buckets = _bucket_totals(
+            g.user.id, 'day',
+            current_month_start,
+            _add_months(current_month_start, 1)
+        )
+        
+        days_data = [{
+            'day': bucket['start'].day,
+            'date': bucket['start'].strftime('%Y-%m-%d'),
+            'income': bucket['income'],
+            'expenses': bucket['expenses'],
+            'net': bucket['net']
+        } for bucket in buckets]
         
         return jsonify({
             'status': 'success',
@@ -378,32 +420,20 @@ def api_daily_activity():
 def api_weekly_expenses():
     """API endpoint for weekly expenses breakdown."""
     try:
-        now = datetime.now()
         # Get the start of the week (Monday)
-        start_of_week = now - timedelta(days=now.weekday())
-        start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
+        start_of_week = _truncate_to_bucket(datetime.now(), 'week')
+        buckets = _bucket_totals(
+            g.user.id, 'day',
+            start_of_week,
+            start_of_week + timedelta(weeks=1)
+        )
         
-        weekly_data = []
         day_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        
-        for i in range(7):  # Monday to Sunday
-            day_date = start_of_week + timedelta(days=i)
-            day_end = day_date.replace(hour=23, minute=59, second=59)
-            
-            # Get expenses for this day
-            daily_expenses = db.session.query(
-                func.coalesce(func.sum(Transaction.amount), 0)
-            ).filter(
-                _get_transaction_filter(g.user.id, 'expense'),
-                Transaction.date >= day_date,
-                Transaction.date <= day_end
-            ).scalar()
-            
-            weekly_data.append({
-                'day': day_date.strftime('%Y-%m-%d'),
-                'day_name': day_names[i],
-                'expenses': float(daily_expenses)
-            })
+        weekly_data = [{
+            'day': bucket['start'].strftime('%Y-%m-%d'),
+            'day_name': day_names[i],
+            'expenses': bucket['expenses']
+        } for i, bucket in enumerate(buckets)]
         
         return jsonify({
             'status': 'success',
@@ -417,45 +447,38 @@ def api_weekly_expenses():
             'message': 'Failed to fetch weekly expenses data'
         }), 500
 
+def _build_daily_expenses_data(user_id):
+    """
+    Build the per-day expenses series for the current month.
+    
+    Args:
+        user_id (int): User ID
+        
+    Returns:
+        list: One dict per day of the current month
+    """
+    current_month_start = _truncate_to_bucket(datetime.now(), 'month')
+    buckets = _bucket_totals(
+        user_id, 'day',
+        current_month_start,
+        _add_months(current_month_start, 1)
+    )
+    
+    return [{
+        'day': bucket['start'].day,
+        'day_name': f"Day {bucket['start'].day}",
+        'date': bucket['start'].strftime('%Y-%m-%d'),
+        'expenses': bucket['expenses']
+    } for bucket in buckets]
+
 @home.route('/api/daily-expenses')
 @login_required
 def api_daily_expenses():
     """API endpoint for daily expenses breakdown of current month."""
     try:
-        now = datetime.now()
-        current_month_start = datetime(now.year, now.month, 1)
-        
-        # Calculate last day of current month
-        month_start, current_month_end = _get_month_boundaries(now.year, now.month)
-        
-        daily_data = []
-        current_date = current_month_start
-        
-        while current_date <= current_month_end:
-            day_start = current_date
-            day_end = current_date.replace(hour=23, minute=59, second=59)
-            
-            # Calculate daily expenses
-            daily_expenses = db.session.query(
-                func.coalesce(func.sum(Transaction.amount), 0)
-            ).filter(
-                _get_transaction_filter(g.user.id, 'expense'),
-                Transaction.date >= day_start,
-                Transaction.date <= day_end
-            ).scalar()
-            
-            daily_data.append({
-                'day': current_date.day,
-                'day_name': f"Day {current_date.day}",
-                'date': current_date.strftime('%Y-%m-%d'),
-                'expenses': float(daily_expenses)
-            })
-            
-            current_date += timedelta(days=1)
-        
         return jsonify({
             'status': 'success',
-            'data': daily_data
+            'data': _build_daily_expenses_data(g.user.id)
         })
         
     except Exception as e:
@@ -466,40 +489,38 @@ def api_daily_expenses():
         }), 500
 
 
+def _build_monthly_expenses_data(user_id):
+    """
+    Build the per-month expenses series for the current year.
+    
+    Args:
+        user_id (int): User ID
+        
+    Returns:
+        list: One dict per month of the current year
+    """
+    now = datetime.now()
+    buckets = _bucket_totals(
+        user_id, 'month',
+        datetime(now.year, 1, 1),
+        datetime(now.year + 1, 1, 1)
+    )
+    
+    return [{
+        'month': f"{MONTH_ABBREVIATIONS[bucket['start'].month - 1]} {now.year}",
+        'month_name': MONTH_ABBREVIATIONS[bucket['start'].month - 1],
+        'year': now.year,
+        'expenses': bucket['expenses']
+    } for bucket in buckets]
+
 @home.route('/api/monthly-expenses')
 @login_required
 def api_monthly_expenses():
     """API endpoint for monthly expenses breakdown of current year."""
     try:
-        now = datetime.now()
-        monthly_data = []
-        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        
-        # Get all months of current year
-        for month_num in range(1, 13):
-            # Get month boundaries
-            month_start, month_end = _get_month_boundaries(now.year, month_num)
-            
-            # Get expenses for this month
-            monthly_expenses = db.session.query(
-                func.coalesce(func.sum(Transaction.amount), 0)
-            ).filter(
-                _get_transaction_filter(g.user.id, 'expense'),
-                Transaction.date >= month_start,
-                Transaction.date <= month_end
-            ).scalar()
-            
-            monthly_data.append({
-                'month': f"{month_names[month_num-1]} {now.year}",
-                'month_name': month_names[month_num-1],
-                'year': now.year,
-                'expenses': float(monthly_expenses)
-            })
-        
         return jsonify({
             'status': 'success',
-            'data': monthly_data
+            'data': _build_monthly_expenses_data(g.user.id)
         })
         
     except Exception as e:
@@ -510,30 +531,18 @@ def api_monthly_expenses():
         }), 500
 
 
-def get_date_range_for_filter(filter_type):
+def _build_period_stats_data(user_id, filter_type):
     """
-    Get date range using the same logic as transactions and categories modules.
+    Build income, expenses and net for a single standard period.
     
     Args:
-        filter_type (str): 'today' or 'week'
+        user_id (int): User ID
+        filter_type (str): Standard period name, e.g. 'today' or 'week'
         
     Returns:
-        tuple: (start_date, end_date)
+        dict: Period totals with ISO formatted boundaries
     """
-    now = datetime.now()
-    
-    if filter_type == 'today':
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-    elif filter_type == 'week':
-        # Monday of this week
-        start_date = now - timedelta(days=now.weekday())
-        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=6, hours=23, minutes=59, seconds=59, microseconds=999999)
-    else:
-        raise ValueError(f"Unsupported filter type: {filter_type}")
-    
-    return start_date, end_date
+    return period_totals(user_id, (filter_type,))[filter_type]
 
 
 @home.route('/api/today-stats')
@@ -541,37 +550,9 @@ def get_date_range_for_filter(filter_type):
 def api_today_stats():
     """API endpoint for today's statistics using same logic as transactions/categories."""
     try:
-        start_date, end_date = get_date_range_for_filter('today')
-        
-        # Calculate today's income
-        today_income = db.session.query(
-            func.coalesce(func.sum(Transaction.amount), 0)
-        ).filter(
-            _get_transaction_filter(g.user.id, 'income'),
-            Transaction.date >= start_date,
-            Transaction.date <= end_date
-        ).scalar()
-        
-        # Calculate today's expenses
-        today_expenses = db.session.query(
-            func.coalesce(func.sum(Transaction.amount), 0)
-        ).filter(
-            _get_transaction_filter(g.user.id, 'expense'),
-            Transaction.date >= start_date,
-            Transaction.date <= end_date
-        ).scalar()
-        
-        today_net = float(today_income) - float(today_expenses)
-        
         return jsonify({
             'status': 'success',
-            'data': {
-                'income': float(today_income),
-                'expenses': float(today_expenses),
-                'net': today_net,
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat()
-            }
+            'data': _build_period_stats_data(g.user.id, 'today')
         })
         
     except Exception as e:
@@ -587,37 +568,9 @@ def api_today_stats():
 def api_week_stats():
     """API endpoint for this week's statistics using same logic as transactions/categories."""
     try:
-        start_date, end_date = get_date_range_for_filter('week')
-        
-        # Calculate this week's income
-        week_income = db.session.query(
-            func.coalesce(func.sum(Transaction.amount), 0)
-        ).filter(
-            _get_transaction_filter(g.user.id, 'income'),
-            Transaction.date >= start_date,
-            Transaction.date <= end_date
-        ).scalar()
-        
-        # Calculate this week's expenses
-        week_expenses = db.session.query(
-            func.coalesce(func.sum(Transaction.amount), 0)
-        ).filter(
-            _get_transaction_filter(g.user.id, 'expense'),
-            Transaction.date >= start_date,
-            Transaction.date <= end_date
-        ).scalar()
-        
-        week_net = float(week_income) - float(week_expenses)
-        
         return jsonify({
             'status': 'success',
-            'data': {
-                'income': float(week_income),
-                'expenses': float(week_expenses),
-                'net': week_net,
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat()
-            }
+            'data': _build_period_stats_data(g.user.id, 'week')
         })
         
     except Exception as e:
@@ -628,3 +581,81 @@ def api_week_stats():
         }), 500
 
 
+@home.route('/api/periods')
+@login_required
+def api_periods():
+    """API endpoint for income, expenses and net of every standard period."""
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': period_totals(g.user.id)
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Error fetching period stats: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to fetch period statistics'
+        }), 500
+
+
+def _begin_snapshot():
+    """
+    Start a new transaction on the request's session that reads one snapshot.
+    
+    On Postgres the transaction runs at REPEATABLE READ. pysqlite only
+    begins transactions before writes, so on SQLite it is begun explicitly;
+    a read transaction there already sees a single snapshot.
+    """
+    db.session.commit()
+    if db.engine.dialect.name == 'postgresql':
+        db.session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+    elif db.engine.dialect.name == 'sqlite':
+        connection = db.session.connection()
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN')
+
+
+def _build_dashboard_bundle(user_id):
+    """
+    Build every figure the dashboard page needs in one pass.
+    
+    All queries run in one snapshot transaction (see _begin_snapshot), so
+    the figures agree with each other even while the user's data changes.
+    
+    Args:
+        user_id (int): User ID
+        
+    Returns:
+        dict: Payloads of /api/stats, /api/periods, /api/week-stats,
+              /api/today-stats, /api/daily-expenses and /api/monthly-expenses
+              keyed by name
+    """
+    _begin_snapshot()
+    periods = period_totals(user_id)
+    return {
+        'stats': _build_stats_data(user_id),
+        'periods': periods,
+        'week': periods['week'],
+        'today': periods['today'],
+        'daily_expenses': _build_daily_expenses_data(user_id),
+        'monthly_expenses': _build_monthly_expenses_data(user_id)
+    }
+
+
+@home.route('/api/bundle')
+@login_required
+def api_bundle():
+    """API endpoint returning all dashboard statistics and chart data at once."""
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': _build_dashboard_bundle(g.user.id)
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Error fetching dashboard bundle: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to fetch dashboard data'
+        }), 500
@@ -0,0 +1,247 @@
+"""
+Idempotency keys for DumpMyCash write endpoints.
+
+Clients that retry a write after a timeout send the same Idempotency-Key
+header with every attempt. The first request claims the key and runs; its
+response is stored with the key. Retries are answered from the stored
+response without running the view again, so the ledger and the account
+balances are changed exactly once.
+
+Keys are scoped to the user, remember a hash of the request they were first
+used with and expire after IDEMPOTENCY_KEY_TTL_HOURS.
+
+The response is only known once the view has returned, after its commit, so
+it is stored in a transaction of its own. Every commit made while a claim is
+held also stamps the claim's committed_at in that same transaction. A claim
+that was never stamped wrote nothing, so once IDEMPOTENCY_KEY_LEASE_SECONDS
+have passed a retry may claim it again and run. A stamped claim is never
+run again, even when its response was lost. A view whose claim was taken
+over by such a retry cannot commit anymore, so a slow first attempt and its
+retry never both write.
+"""
+
+import functools
+import hashlib
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, g, has_app_context, jsonify, make_response, request, Response
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import db, IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+DEFAULT_LEASE_SECONDS = 60
+PURGE_BATCH_SIZE = 1000
+
+idempotency_cli = AppGroup('idempotency', help='Manage stored idempotency keys.')
+
+
+class ClaimLostError(Exception):
+    """Raised on commit when the request's Idempotency-Key was claimed again by a retry."""
+
+
+def _request_hash():
+    """Return a SHA-256 fingerprint of the current request."""
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _replay(record):
+    """Build the response stored with a completed key."""
+    response = Response(record.body or '', status=record.status_code, content_type=record.content_type)
+    if record.location:
+        response.headers['Location'] = record.location
+    response.headers[REPLAY_HEADER] = 'true'
+    return response
+
+
+def _find_key(user_id, key):
+    return db.session.execute(
+        select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    ).scalar_one_or_none()
+
+
+def _answer_existing(record, request_hash):
+    """Answer a request whose key is already claimed."""
+    if record.request_hash != request_hash:
+        return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+    if record.status_code is None and record.committed_at is not None:
+        return jsonify({'error': 'A request with this Idempotency-Key was already applied, '
+                                 'but its response was lost'}), 409
+    if record.status_code is None:
+        return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+    return _replay(record)
+
+
+def _claim_key(user_id, key, request_hash):
+    """
+    Claim a key for the current request.
+
+    Returns:
+        tuple: (claimed key ID, None) or (None, response to send instead)
+    """
+    now = datetime.now()
+    record = _find_key(user_id, key)
+    if record is not None:
+        lease = timedelta(seconds=current_app.config.get('IDEMPOTENCY_KEY_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+        # Only a claim that never committed anything is safe to run again
+        abandoned = (record.status_code is None and record.committed_at is None
+                     and record.created_at is not None and record.created_at <= now - lease)
+        if record.expires_at > now and not abandoned:
+            return None, _answer_existing(record, request_hash)
+        # Delete before inserting, the unit of work would order the insert first
+        stale = delete(IdempotencyKey).where(IdempotencyKey.id == record.id)
+        if abandoned:
+            # The first attempt may commit meanwhile; then its claim stands
+            stale = stale.where(IdempotencyKey.committed_at.is_(None))
+        if db.session.execute(stale).rowcount != 1:
+            db.session.rollback()
+            db.session.expire_all()
+            record = _find_key(user_id, key)
+            if record is None:
+                return None, (jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409)
+            return None, _answer_existing(record, request_hash)
+
+    ttl = timedelta(hours=current_app.config.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    record = IdempotencyKey(user_id=user_id, key=key, request_hash=request_hash,
+                            created_at=now, expires_at=now + ttl)
+    db.session.add(record)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request claimed the key first
+        db.session.rollback()
+        record = _find_key(user_id, key)
+        if record is None:
+            return None, (jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409)
+        return None, _answer_existing(record, request_hash)
+    return record.id, None
+
+
+def _release_key(key_id):
+    """Forget a claim so the request can be retried."""
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == key_id))
+    db.session.commit()
+
+
+def _store_response(key_id, response):
+    """Store the response of a claimed key for later replays."""
+    db.session.rollback()
+    db.session.execute(update(IdempotencyKey).where(IdempotencyKey.id == key_id).values(
+        status_code=response.status_code,
+        content_type=response.content_type,
+        location=response.headers.get('Location'),
+        body=response.get_data(as_text=True)
+    ))
+    db.session.commit()
+
+
+def idempotent(view):
+    """
+    View decorator that honours the Idempotency-Key header.
+
+    Requests without the header run as usual. Server errors release the key
+    so a retry runs the view again; any other response is stored.
+    Must be applied inside the login decorator, as keys belong to g.user.
+    """
+    @functools.wraps(view)
+    def wrapped_view(**kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(**kwargs)
+
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': 'Invalid Idempotency-Key header'}), 400
+
+        key_id, answer = _claim_key(g.user.id, key, _request_hash())
+        if answer is not None:
+            return answer
+
+        g.idempotency_key_id = key_id
+        try:
+            response = make_response(view(**kwargs))
+        except Exception:
+            g.idempotency_key_id = None
+            _release_key(key_id)
+            raise
+        g.idempotency_key_id = None
+
+        if response.status_code >= 500:
+            _release_key(key_id)
+        else:
+            _store_response(key_id, response)
+        return response
+    return wrapped_view
+
+
+def _stamp_claim(session):
+    """
+    Session before_commit hook stamping the current request's claim.
+
+    The stamp is written in the transaction being committed, so a claim is
+    marked committed exactly when the view's writes are. Raises
+    ClaimLostError, rolling the commit back, when a retry took the claim over.
+    """
+    key_id = g.get('idempotency_key_id') if has_app_context() else None
+    if key_id is None:
+        return
+    stamped = session.connection().execute(
+        update(IdempotencyKey).where(IdempotencyKey.id == key_id).values(committed_at=datetime.now())
+    )
+    if stamped.rowcount != 1:
+        raise ClaimLostError('The Idempotency-Key of this request was claimed again by a retry')
+
+
+def register_idempotency_listeners():
+    """Register the session hook that stamps claims on commit."""
+    if not event.contains(Session, 'before_commit', _stamp_claim):
+        event.listen(Session, 'before_commit', _stamp_claim)
+
+
+def purge_expired_keys(batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete expired idempotency keys in batches.
+
+    Each batch is its own short transaction, so purging a large backlog never
+    holds a long lock on the table.
+
+    Args:
+        batch_size (int): Keys deleted per batch
+
+    Returns:
+        int: Number of keys deleted
+    """
+    now = datetime.now()
+    purged = 0
+    while True:
+        key_ids = db.session.execute(
+            select(IdempotencyKey.id).where(IdempotencyKey.expires_at <= now).limit(batch_size)
+        ).scalars().all()
+        if not key_ids:
+            return purged
+
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(key_ids)))
+        db.session.commit()
+        purged += len(key_ids)
+        if len(key_ids) < batch_size:
+            return purged
+
+
+@idempotency_cli.command('purge')
+@click.option('--batch-size', type=int, default=PURGE_BATCH_SIZE, show_default=True, help='Keys deleted per batch.')
+def purge_command(batch_size):
+    """Delete expired idempotency keys."""
+    if batch_size < 1:
+        raise click.ClickException('Batch size must be positive')
+
+    purged = purge_expired_keys(batch_size)
+    click.echo(f'Purged {purged} expired idempotency keys.')
@@ -0,0 +1,437 @@
+"""
+Background jobs for DumpMyCash.
+
+Work that grows with a user's history (exports, restores, purges) runs on a
+thread pool instead of the request thread. Every job is a row in the jobs
+table, so its progress and result survive the request that started it:
+
+- a view enqueues the job and answers 202 with the job ID straight away
+- a pool thread claims the job, runs the registered handler and stores the
+  outcome, optionally with a result file offered for download
+- clients poll /jobs/<id> until the job has finished
+
+JOBS_MAX_WORKERS bounds how many jobs run at once across all users and
+JOBS_MAX_PER_USER bounds how many jobs one user can have queued or running;
+the limit is checked by the statement that inserts the job, so concurrent
+requests cannot both slip under it.
+
+A job deleting its own user's account outlives the user: its row is detached
+(user_id set to NULL) instead of deleted, and the session that started it can
+still poll it after the account is gone.
+"""
+
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import Blueprint, current_app, g, jsonify, request, send_file, session, url_for
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, insert, literal, or_, select, update
+
+from app.auth import api_login_required
+from app.models import db, Job, User
+
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+FINISHED_JOB_STATUSES = ('succeeded', 'failed')
+PURGE_BATCH_SIZE = 500
+# Session key of the job deleting the session's user, see start_job()
+DETACHED_JOB_SESSION_KEY = 'detached_job_id'
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+jobs_cli = AppGroup('jobs', help='Manage background jobs.')
+
+_handlers = {}
+
+
+class JobLimitError(Exception):
+    """Raised when a user already has the maximum number of active jobs."""
+
+
+def job_handler(kind):
+    """
+    Register a function as the handler of a job kind.
+
+    The handler receives a JobContext and may return a short message shown
+    to the user once the job has succeeded. Raising marks the job failed.
+
+    Args:
+        kind (str): Job kind passed to enqueue_job()
+    """
+    def decorator(handler):
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+class JobContext:
+    """
+    Arguments and helpers handed to a job handler.
+
+    Attributes:
+        job_id (int): ID of the running job
+        user_id (int): Owner of the job
+        params (dict): Arguments given to enqueue_job()
+    """
+
+    def __init__(self, job):
+        self.job_id = job.id
+        self.user_id = job.user_id
+        self.params = json.loads(job.params) if job.params else {}
+        self.result = None
+
+    def result_path(self, download_name, mimetype):
+        """
+        Reserve the file the job writes its downloadable result to.
+
+        Args:
+            download_name (str): File name offered to the user
+            mimetype (str): Content type of the download
+
+        Returns:
+            str: Path to write the result to
+        """
+        path = os.path.join(_result_dir(), f'job_{self.job_id}_{uuid.uuid4().hex}')
+        self.result = (path, download_name, mimetype)
+        return path
+
+    def progress(self, percent, message=None):
+        """Record how far the job has got, visible to clients polling it."""
+        values = {'progress': max(0, min(100, int(percent)))}
+        if message is not None:
+            values['message'] = message[:255]
+        db.session.execute(update(Job).where(Job.id == self.job_id).values(**values))
+        db.session.commit()
+
+
+def _result_dir():
+    path = current_app.config['JOBS_RESULT_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def save_job_input(file_storage):
+    """
+    Store an uploaded file for a job to read later.
+
+    Args:
+        file_storage (FileStorage): Uploaded file
+
+    Returns:
+        str: Path of the stored copy, pass it to the job in its params
+    """
+    path = os.path.join(_result_dir(), f'input_{uuid.uuid4().hex}')
+    file_storage.save(path)
+    return path
+
+
+def _remove_file(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _executor(app):
+    """Return the application's job pool, creating it on first use."""
+    executor = app.extensions.get('jobs')
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=app.config.get('JOBS_MAX_WORKERS', 2),
+            thread_name_prefix='dumpmycash-job'
+        )
+        app.extensions['jobs'] = executor
+    return executor
+
+
+def enqueue_job(kind, user_id, params=None):
+    """
+    Persist a job and hand it to the pool.
+
+    Args:
+        kind (str): Registered job kind
+        user_id (int): Owner of the job
+        params (dict, optional): JSON serialisable handler arguments
+
+    Returns:
+        int: ID of the new job
+
+    Raises:
+        JobLimitError: If the user already has JOBS_MAX_PER_USER active jobs
+    """
+    if kind not in _handlers:
+        raise ValueError(f'Unknown job kind: {kind}')
+
+    connection = db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        # Enqueues of the same user wait for each other, so each one counts the other's job
+        connection.execute(select(User.id).where(User.id == user_id).with_for_update()).all()
+
+    active = select(func.count(Job.id)).where(
+        Job.user_id == user_id, Job.status.in_(ACTIVE_JOB_STATUSES)
+    ).scalar_subquery()
+    # Count and insert in one statement; SQLite has no row locks but runs it atomically
+    job_id = connection.execute(
+        insert(Job).from_select(
+            ['user_id', 'kind', 'status', 'progress', 'params', 'created_at'],
+            select(
+                literal(user_id), literal(kind), literal('queued'), literal(0),
+                literal(json.dumps(params or {})), literal(datetime.now())
+            ).where(active < current_app.config.get('JOBS_MAX_PER_USER', 2))
+        ).returning(Job.id)
+    ).scalar()
+    if job_id is None:
+        db.session.rollback()
+        raise JobLimitError('Too many jobs in progress, please wait for one to finish')
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    if app.config.get('JOBS_EAGER'):
+        run_job(job_id)
+    else:
+        _executor(app).submit(_run_job_in_context, app, job_id)
+    return job_id
+
+
+def _run_job_in_context(app, job_id):
+    """Run a job on a pool thread with its own app context and session."""
+    with app.app_context():
+        run_job(job_id)
+
+
+def run_job(job_id):
+    """
+    Claim a queued job, run its handler and record the outcome.
+
+    Args:
+        job_id (int): ID of the job to run
+    """
+    claimed = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == 'queued')
+        .values(status='running', started_at=datetime.now())
+    )
+    db.session.commit()
+    if claimed.rowcount != 1:
+        return
+
+    job = db.session.get(Job, job_id)
+    context = JobContext(job)
+    try:
+        message = _handlers[job.kind](context)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Job %s (%s) failed', job_id, job.kind)
+        if context.result:
+            _remove_file(context.result[0])
+        db.session.execute(update(Job).where(Job.id == job_id).values(
+            status='failed', error=str(e), finished_at=datetime.now()
+        ))
+        db.session.commit()
+        return
+
+    values = {'status': 'succeeded', 'progress': 100, 'finished_at': datetime.now()}
+    if message:
+        values['message'] = message[:255]
+    if context.result:
+        values['result_path'], values['result_name'], values['result_mimetype'] = context.result
+    db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+    db.session.commit()
+
+
+def wants_async():
+    """Return True if the client asked for the work to run as a job (RFC 7240)."""
+    return 'respond-async' in request.headers.get('Prefer', '').lower()
+
+
+def start_job(kind, params=None, outlives_user=False):
+    """
+    Enqueue a job for the logged in user and build the 202 response.
+
+    Args:
+        kind (str): Registered job kind
+        params (dict, optional): Handler arguments
+        outlives_user (bool): The job deletes its user; remember it in the
+            session so it can still be polled once the user is gone
+
+    Returns:
+        Response tuple: 202 with the job ID and status URL, or 429
+    """
+    try:
+        job_id = enqueue_job(kind, g.user.id, params)
+    except JobLimitError as e:
+        return jsonify({'error': str(e)}), 429
+
+    if outlives_user:
+        session[DETACHED_JOB_SESSION_KEY] = job_id
+    job = db.session.get(Job, job_id)
+    status_url = url_for('jobs.job_status', job_id=job_id)
+    return jsonify({
+        'job_id': job_id,
+        'status': job.status,
+        'status_url': status_url
+    }), 202, {'Location': status_url}
+
+
+def serialize_job(job):
+    """Format a job for API responses."""
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'download_url': None
+    }
+    if job.status == 'succeeded' and job.result_path:
+        data['download_url'] = url_for('jobs.download_job_result', job_id=job.id)
+    return data
+
+
+def _user_job_or_404(job_id):
+    return Job.query.filter_by(id=job_id, user_id=g.user.id).first_or_404()
+
+
+@jobs_bp.route('/<int:job_id>')
+def job_status(job_id):
+    """
+    API endpoint to poll a background job.
+
+    A job that deleted its user is served to the session that started it,
+    even though nobody is logged in anymore.
+
+    Args:
+        job_id (int): ID of the job
+
+    Returns:
+        JSON: Job status, progress and download link once finished
+        401: Not logged in
+        404: Job not found or doesn't belong to user
+    """
+    if session.get(DETACHED_JOB_SESSION_KEY) == job_id:
+        user_id = session.get('user_id')
+        job = Job.query.filter(
+            Job.id == job_id, or_(Job.user_id.is_(None), Job.user_id == user_id)
+        ).first_or_404()
+        return jsonify(serialize_job(job))
+    return _owned_job_status(job_id=job_id)
+
+
+@api_login_required
+def _owned_job_status(job_id):
+    return jsonify(serialize_job(_user_job_or_404(job_id)))
+
+
+@jobs_bp.route('/<int:job_id>/download')
+@api_login_required
+def download_job_result(job_id):
+    """
+    Download the result file of a finished job.
+
+    Args:
+        job_id (int): ID of the job
+
+    Returns:
+        File download
+        404: Job not found, not finished or its result has expired
+    """
+    job = _user_job_or_404(job_id)
+    if job.status != 'succeeded' or not job.result_path or not os.path.exists(job.result_path):
+        return jsonify({'error': 'Result not available'}), 404
+
+    return send_file(
+        job.result_path,
+        as_attachment=True,
+        download_name=job.result_name,
+        mimetype=job.result_mimetype
+    )
+
+
+def delete_user_jobs(user_id, keep_job_id=None):
+    """
+    Delete every job of a user together with its files.
+
+    Args:
+        user_id (int): Owner of the jobs
+        keep_job_id (int, optional): Job to detach from the user instead of
+            deleting, so the outcome of a job deleting its own user can
+            still be polled
+    """
+    jobs = Job.user_id == user_id
+    if keep_job_id is not None:
+        db.session.execute(update(Job).where(jobs, Job.id == keep_job_id).values(user_id=None))
+    paths = db.session.execute(
+        select(Job.result_path).where(jobs, Job.result_path.isnot(None))
+    ).scalars().all()
+    db.session.execute(delete(Job).where(jobs))
+    for path in paths:
+        _remove_file(path)
+
+
+def purge_finished_jobs(older_than, batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete finished jobs and their result files in batches.
+
+    Args:
+        older_than (datetime): Only jobs finished before this are deleted
+        batch_size (int): Jobs deleted per batch
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    purged = 0
+    while True:
+        rows = db.session.execute(
+            select(Job.id, Job.result_path).where(
+                Job.status.in_(FINISHED_JOB_STATUSES),
+                Job.finished_at < older_than
+            ).limit(batch_size)
+        ).all()
+        if not rows:
+            return purged
+
+        db.session.execute(delete(Job).where(Job.id.in_([row.id for row in rows])))
+        db.session.commit()
+        for row in rows:
+            _remove_file(row.result_path)
+        purged += len(rows)
+        if len(rows) < batch_size:
+            return purged
+
+
+def fail_interrupted_jobs():
+    """
+    Mark jobs left queued or running by a stopped process as failed.
+
+    Returns:
+        int: Number of jobs marked failed
+    """
+    result = db.session.execute(
+        update(Job).where(Job.status.in_(ACTIVE_JOB_STATUSES)).values(
+            status='failed', error='Interrupted before it finished', finished_at=datetime.now()
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+@jobs_cli.command('purge')
+@click.option('--older-than-hours', type=int, default=None,
+              help='Age of finished jobs to delete, JOBS_RESULT_TTL_HOURS by default.')
+def purge_command(older_than_hours):
+    """Delete finished jobs and their result files."""
+    if older_than_hours is None:
+        older_than_hours = current_app.config.get('JOBS_RESULT_TTL_HOURS', 24)
+
+    purged = purge_finished_jobs(datetime.now() - timedelta(hours=older_than_hours))
+    click.echo(f'Purged {purged} finished jobs.')
+
+
+@jobs_cli.command('recover')
+def recover_command():
+    """Fail jobs interrupted by a restart so users can start them again."""
+    count = fail_interrupted_jobs()
+    click.echo(f'Marked {count} interrupted jobs as failed.')
@@ -0,0 +1,225 @@
+"""
+Ledger to balance reconciliation for DumpMyCash.
+
+Account.balance is a cached value. The ledger behind it is:
+
+- every transaction, added for income categories and subtracted for expense
+  categories, except transactions linked to a transfer record
+- every transfer, subtracted from its source and added to its destination
+
+on top of the account's opening balance: the part of the balance that never
+had a ledger entry, such as a credit card or loan opened below zero.
+
+Reconciliation recomputes the balance of every account from the ledger with
+one grouped query per batch of users, reports accounts whose cached balance
+drifted and optionally corrects them. Corrections are applied as relative
+updates of the drift measured in the same database transaction, so writes
+committed meanwhile are kept.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import case, exists, func, or_, select, union_all
+
+from app.balances import apply_balance_deltas
+from app.models import db, Account, Category, Transaction, Transfer, User
+
+# Cached balances closer than this to the ledger are not reported
+DRIFT_TOLERANCE = 0.005
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_WORKERS = 4
+MAX_WORKERS = 16
+
+ledger_cli = AppGroup('ledger', help='Check account balances against the ledger.')
+
+
+def _ledger_totals(user_ids):
+    """Subquery of the ledger total (account_id, total) of every account of the given users with entries."""
+    linked_to_transfer = exists().where(
+        Transfer.user_id == Transaction.user_id,
+        or_(Transfer.from_transaction_id == Transaction.id, Transfer.to_transaction_id == Transaction.id)
+    )
+    entries = union_all(
+        select(
+            Transaction.account_id.label('account_id'),
+            case((Category.type == 'income', Transaction.amount), else_=-Transaction.amount).label('amount')
+        ).join(
+            Category, Category.id == Transaction.category_id
+        ).where(
+            Transaction.user_id.in_(user_ids),
+            ~linked_to_transfer
+        ),
+        select(Transfer.from_account_id, -Transfer.amount).where(Transfer.user_id.in_(user_ids)),
+        select(Transfer.to_account_id, Transfer.amount).where(Transfer.user_id.in_(user_ids))
+    ).subquery('entries')
+    return select(
+        entries.c.account_id, func.sum(entries.c.amount).label('total')
+    ).group_by(entries.c.account_id).subquery('ledger')
+
+
+def ledger_balances(connection, user_ids):
+    """
+    Compute the ledger balance of every account of the given users.
+
+    Args:
+        connection: SQLAlchemy connection to read with
+        user_ids (list): IDs of the users to compute
+
+    Returns:
+        dict: Account ID -> ledger balance, for accounts with ledger entries
+    """
+    ledger = _ledger_totals(user_ids)
+    return {
+        account_id: total or 0.0
+        for account_id, total in connection.execute(select(ledger.c.account_id, ledger.c.total))
+    }
+
+
+def reconcile_users(connection, user_ids, fix=False, account_ids=None):
+    """
+    Compare cached balances of the given users with their ledger.
+
+    An account's expected balance is its opening balance plus its ledger
+    balance. Balances and ledger totals are read by one statement, so they
+    come from the same snapshot even under READ COMMITTED.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_ids (list): IDs of the users to check
+        fix (bool): Correct drifted balances
+        account_ids (iterable, optional): Only check these accounts of the users
+
+    Returns:
+        tuple: (number of accounts checked, list of drift dicts)
+    """
+    ledger = _ledger_totals(user_ids)
+    query = select(
+        Account.id, Account.user_id, Account.name, Account.balance, Account.opening_balance,
+        func.coalesce(ledger.c.total, 0.0).label('ledger_total')
+    ).outerjoin(
+        ledger, ledger.c.account_id == Account.id
+    ).where(
+        Account.user_id.in_(user_ids)
+    ).order_by(Account.user_id, Account.id)
+    if account_ids is not None:
+        query = query.where(Account.id.in_(sorted(account_ids)))
+    accounts = connection.execute(query).all()
+
+    drifts = []
+    corrections = {}
+    for account in accounts:
+        balance = account.balance or 0.0
+        expected = (account.opening_balance or 0.0) + account.ledger_total
+        drift = expected - balance
+        if abs(drift) < DRIFT_TOLERANCE:
+            continue
+        drifts.append({
+            'account_id': account.id,
+            'user_id': account.user_id,
+            'name': account.name,
+            'balance': round(balance, 2),
+            'ledger_balance': round(expected, 2),
+            'drift': round(drift, 2)
+        })
+        corrections.setdefault(account.user_id, {})[account.id] = drift
+
+    if fix:
+        for user_id, balance_deltas in corrections.items():
+            apply_balance_deltas(connection, user_id, balance_deltas)
+    return len(accounts), drifts
+
+
+def _reconcile_batch(user_ids, fix):
+    """Reconcile one batch of users and commit its corrections."""
+    try:
+        result = reconcile_users(db.session.connection(), user_ids, fix=fix)
+        db.session.commit()
+        return result
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _reconcile_batch_in_thread(app, user_ids, fix):
+    """Reconcile one batch in a worker thread with its own session."""
+    with app.app_context():
+        return _reconcile_batch(user_ids, fix)
+
+
+def _runs_in_one_connection():
+    """Return True if the database cannot be shared between threads."""
+    url = db.engine.url
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def reconcile_ledger(user_ids=None, fix=False, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS):
+    """
+    Reconcile account balances with the ledger in batches of users.
+
+    Batches run in parallel on separate connections. Each batch commits on
+    its own, so a failing batch does not undo the others.
+
+    Args:
+        user_ids (list, optional): Only reconcile these users
+        fix (bool): Correct drifted balances
+        batch_size (int): Users per batch
+        workers (int): Batches processed at the same time, at most MAX_WORKERS
+
+    Returns:
+        dict: Report with users, accounts_checked, drifted, fixed and drifts
+    """
+    if user_ids is None:
+        user_ids = db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+    user_ids = list(user_ids)
+    batch_size = max(1, batch_size)
+    workers = min(workers, MAX_WORKERS)
+    batches = [user_ids[start:start + batch_size] for start in range(0, len(user_ids), batch_size)]
+
+    # An in-memory SQLite database lives on one connection, which threads cannot share
+    if _runs_in_one_connection():
+        workers = 1
+
+    if workers > 1 and len(batches) > 1:
+        app = current_app._get_current_object()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda batch: _reconcile_batch_in_thread(app, batch, fix), batches))
+    else:
+        results = [_reconcile_batch(batch, fix) for batch in batches]
+
+    drifts = [drift for _, batch_drifts in results for drift in batch_drifts]
+    return {
+        'users': len(user_ids),
+        'accounts_checked': sum(checked for checked, _ in results),
+        'drifted': len(drifts),
+        'fixed': len(drifts) if fix else 0,
+        'drifts': drifts
+    }
+
+
+@ledger_cli.command('reconcile')
+@click.option('--user-id', type=int, default=None, help='Only reconcile this user.')
+@click.option('--fix', is_flag=True, help='Correct drifted balances.')
+@click.option('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, show_default=True, help='Users per batch.')
+@click.option('--workers', type=int, default=DEFAULT_WORKERS, show_default=True, help='Batches run in parallel.')
+def reconcile_command(user_id, fix, batch_size, workers):
+    """Recompute account balances from the ledger and report drift."""
+    user_ids = None
+    if user_id is not None:
+        if db.session.get(User, user_id) is None:
+            raise click.ClickException(f'User {user_id} not found')
+        user_ids = [user_id]
+
+    report = reconcile_ledger(user_ids, fix=fix, batch_size=batch_size, workers=workers)
+    for drift in report['drifts']:
+        click.echo(
+            f"Account {drift['account_id']} ({drift['name']}) of user {drift['user_id']}: "
+            f"balance {drift['balance']:.2f}, ledger {drift['ledger_balance']:.2f}, drift {drift['drift']:+.2f}"
+        )
+
+    summary = f"Checked {report['accounts_checked']} accounts of {report['users']} users, {report['drifted']} drifted"
+    if fix:
+        summary += f", {report['fixed']} fixed"
+    click.echo(summary + '.')
@@ -4,6 +4,16 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+# Transactions in this category are internal moves, not income or expenses
+TRANSFER_CATEGORY_NAME = 'Transfer'
+
+
+def transaction_kind_for(category_type, category_name):
+    """Return the kind ('income', 'expense' or 'transfer') of a category's transactions."""
+    if category_name == TRANSFER_CATEGORY_NAME:
+        return 'transfer'
+    return category_type
+
 class User(db.Model):
     __tablename__ = 'users'
 
@@ -23,29 +33,57 @@ class User(db.Model):
 
 class Account(db.Model):
     __tablename__ = 'accounts'
+    __table_args__ = (
+        db.Index('ix_accounts_user_name', 'user_id', 'name'),
+        db.Index('ix_accounts_user_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     balance = db.Column(db.Float, default=0.0)
+    opening_balance = db.Column(db.Float, nullable=False, default=0.0)  # Part of the balance with no ledger entry
     color = db.Column(db.String(7), default='#FF6384')  # Hex color for account identification
     created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)  # Last change, for delta backups
 
     user = db.relationship('User', backref=db.backref('accounts', lazy=True))
 
 class Category(db.Model):
     __tablename__ = 'categories'
+    __table_args__ = (
+        db.Index('ix_categories_user_type', 'user_id', 'type'),
+        db.Index('ix_categories_user_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     type = db.Column(db.String(20), nullable=False)  # 'income' or 'expense'
     unicode_emoji = db.Column(db.String(10), nullable=True)  # Optional emoji for the category
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)  # Last change, for delta backups
 
     user = db.relationship('User', backref=db.backref('categories', lazy=True))
 
+    @property
+    def transaction_kind(self):
+        """Kind stamped on the transactions of this category."""
+        return transaction_kind_for(self.type, self.name)
+
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Date range reads; Postgres also serves the ledger edge reads from the index alone
+        db.Index('ix_transactions_user_date', 'user_id', 'date',
+                 postgresql_include=['amount', 'kind', 'category_id', 'account_id']),
+        db.Index('ix_transactions_user_kind_date', 'user_id', 'kind', 'date'),
+        db.Index('ix_transactions_user_category_date', 'user_id', 'category_id', 'date'),
+        db.Index('ix_transactions_account_id', 'account_id'),
+        # Description autocomplete only ever looks at non-empty descriptions
+        db.Index('ix_transactions_user_description', 'user_id', 'description',
+                 postgresql_where=db.text("description IS NOT NULL AND description <> ''")),
+        db.Index('ix_transactions_user_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
@@ -54,6 +92,8 @@ class Transaction(db.Model):
     account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'income', 'expense' or 'transfer', copied from the category
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)  # Last change, for delta backups
 
     account = db.relationship('Account', backref=db.backref('transactions', lazy=True))
     category = db.relationship('Category', backref=db.backref('transactions', lazy=True))
@@ -61,6 +101,12 @@ class Transaction(db.Model):
 
 class Transfer(db.Model):
     __tablename__ = 'transfers'
+    __table_args__ = (
+        db.Index('ix_transfers_user_date_id', 'user_id', 'date', 'id'),
+        db.Index('ix_transfers_from_account_id', 'from_account_id'),
+        db.Index('ix_transfers_to_account_id', 'to_account_id'),
+        db.Index('ix_transfers_user_updated_at', 'user_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
@@ -71,9 +117,93 @@ class Transfer(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     from_transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=True)
     to_transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)  # Last change, for delta backups
 
     from_account = db.relationship('Account', foreign_keys=[from_account_id], backref=db.backref('transfers_from', lazy=True))
     to_account = db.relationship('Account', foreign_keys=[to_account_id], backref=db.backref('transfers_to', lazy=True))
     user = db.relationship('User', backref=db.backref('transfers', lazy=True))
     from_transaction = db.relationship('Transaction', foreign_keys=[from_transaction_id], backref=db.backref('transfer_from', uselist=False))
-    to_transaction = db.relationship('Transaction', foreign_keys=[to_transaction_id], backref=db.backref('transfer_to', uselist=False))
\ No newline at end of file
+    to_transaction = db.relationship('Transaction', foreign_keys=[to_transaction_id], backref=db.backref('transfer_to', uselist=False))
+
+class DailyRollup(db.Model):
+    __tablename__ = 'daily_rollups'
+    __table_args__ = (
+        db.Index('ix_daily_rollups_user_category', 'user_id', 'category_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # Kind of the category, see Transaction.kind
+    total = db.Column(db.Float, nullable=False, default=0.0)  # Sum of transaction amounts for the day
+    txn_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class UserSummary(db.Model):
+    __tablename__ = 'user_summaries'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_income = db.Column(db.Float, nullable=False, default=0.0)  # Lifetime income, transfers excluded
+    total_expenses = db.Column(db.Float, nullable=False, default=0.0)  # Lifetime expenses, transfers excluded
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+    category_count = db.Column(db.Integer, nullable=False, default=0)
+    account_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Tombstone(db.Model):
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        db.Index('ix_tombstones_user_deleted_at', 'user_id', 'deleted_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    record_type = db.Column(db.String(20), nullable=False)  # 'account', 'category', 'transaction', 'transfer' or 'all'
+    record_id = db.Column(db.Integer, nullable=True)  # ID of the deleted row, None when all data was deleted
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+        db.Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)  # Client supplied Idempotency-Key header
+    request_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of method, path and body
+    status_code = db.Column(db.Integer, nullable=True)  # None while the first request is running
+    content_type = db.Column(db.String(100), nullable=True)
+    location = db.Column(db.String(255), nullable=True)  # Redirect target of the stored response
+    body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    committed_at = db.Column(db.DateTime, nullable=True)  # Set by the first commit of the claiming request
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_user_status', 'user_id', 'status'),
+        db.Index('ix_jobs_status_finished_at', 'status', 'finished_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # NULL once the job has deleted its own user, see delete_user_jobs()
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    kind = db.Column(db.String(30), nullable=False)  # Name of the registered job handler
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'succeeded' or 'failed'
+    progress = db.Column(db.Integer, nullable=False, default=0)  # Percent complete
+    message = db.Column(db.String(255), nullable=True)
+    params = db.Column(db.Text, nullable=True)  # JSON encoded handler arguments
+    result_path = db.Column(db.String(500), nullable=True)  # File offered for download once succeeded
+    result_name = db.Column(db.String(255), nullable=True)
+    result_mimetype = db.Column(db.String(100), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
@@ -0,0 +1,176 @@
+"""
+Keyset (cursor) pagination for DumpMyCash listings.
+
+Listings are ordered newest first on (date, id), where id breaks ties between
+rows sharing a timestamp. A page is fetched by seeking past the boundary row
+of the previous page instead of using OFFSET, so every page costs the same
+index range read no matter how deep it is, and no COUNT(*) is needed.
+
+Cursors are opaque URL-safe strings encoding the boundary row and the
+direction to move in. They are not signed: the owning user filter is always
+applied by the caller, so a forged cursor can only skip around the user's
+own rows.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import or_, and_
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+CURSOR_DIRECTIONS = ('next', 'prev')
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class CursorPage:
+    """
+    One page of keyset pagination results.
+
+    Attributes:
+        items (list): Rows of the page, newest first
+        per_page (int): Requested page size
+        next_cursor (str): Cursor of the following (older) page, or None
+        prev_cursor (str): Cursor of the preceding (newer) page, or None
+    """
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def clamp_per_page(per_page):
+    """
+    Bound a client supplied page size to the supported range.
+
+    Args:
+        per_page (int): Requested page size, may be None
+
+    Returns:
+        int: Page size between 1 and MAX_PER_PAGE
+    """
+    if not per_page or per_page < 1:
+        return DEFAULT_PER_PAGE
+    return min(per_page, MAX_PER_PAGE)
+
+
+def encode_cursor(date, row_id, direction):
+    """
+    Encode a boundary row into an opaque cursor.
+
+    Args:
+        date (datetime): Date of the boundary row
+        row_id (int): ID of the boundary row
+        direction (str): 'next' for older rows, 'prev' for newer rows
+
+    Returns:
+        str: URL-safe cursor
+    """
+    payload = json.dumps({'d': date.isoformat(), 'i': row_id, 'v': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Args:
+        cursor (str): Cursor from a previous page
+
+    Returns:
+        tuple: (date, row_id, direction)
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        date = datetime.fromisoformat(payload['d'])
+        row_id = int(payload['i'])
+        direction = payload['v']
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError) as e:
+        raise InvalidCursorError('Invalid pagination cursor') from e
+
+    if direction not in CURSOR_DIRECTIONS:
+        raise InvalidCursorError('Invalid pagination cursor')
+    return date, row_id, direction
+
+
+def keyset_paginate(query, date_column, id_column, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Fetch one page of a query ordered by (date, id) descending.
+
+    The query must not be ordered yet; one extra row is read to learn whether
+    another page exists in the direction of travel.
+
+    Args:
+        query: SQLAlchemy query with all filters applied
+        date_column: Column holding the row date
+        id_column: Column holding the unique row ID
+        cursor (str, optional): Cursor from a previous page
+        per_page (int): Page size
+
+    Returns:
+        CursorPage: Page of results with cursors to its neighbours
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    direction = 'next'
+    if cursor:
+        boundary_date, boundary_id, direction = decode_cursor(cursor)
+        if direction == 'next':
+            query = query.filter(or_(
+                date_column < boundary_date,
+                and_(date_column == boundary_date, id_column < boundary_id)
+            ))
+        else:
+            query = query.filter(or_(
+                date_column > boundary_date,
+                and_(date_column == boundary_date, id_column > boundary_id)
+            ))
+
+    if direction == 'next':
+        query = query.order_by(date_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(date_column.asc(), id_column.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    if not rows:
+        return CursorPage([], per_page)
+
+    def boundary(row, towards):
+        return encode_cursor(getattr(row, date_column.key), getattr(row, id_column.key), towards)
+
+    if direction == 'next':
+        # Moving to older rows: there is a newer page whenever we came from one
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        has_next, has_prev = True, has_more
+
+    return CursorPage(
+        rows,
+        per_page,
+        next_cursor=boundary(rows[-1], 'next') if has_next else None,
+        prev_cursor=boundary(rows[0], 'prev') if has_prev else None
+    )
@@ -0,0 +1,128 @@
+"""
+Reporting periods for DumpMyCash.
+
+The transaction, category and dashboard views filter by the same named
+periods ('today', 'week', 'month', 'quarter', 'year', 'all' and 'custom').
+This module resolves them to date ranges in one place and computes the
+totals of every standard period with a single scan of the daily rollups.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func, select
+
+from app.models import db, DailyRollup
+
+STANDARD_PERIODS = ('today', 'week', 'month', 'quarter', 'year', 'all')
+DEFAULT_PERIOD = 'month'
+
+
+def _next_month_start(value, months=1):
+    """Return midnight on the first day of the month `months` after value's month."""
+    month_index = value.month - 1 + months
+    return datetime(value.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_date_range(filter_type, start_date_str=None, end_date_str=None, now=None):
+    """
+    Get date range based on filter type.
+
+    Args:
+        filter_type (str): Type of filter ('today', 'week', 'month', 'quarter', 'year', 'custom', 'all')
+        start_date_str (str, optional): Start date for custom range in YYYY-MM-DD format
+        end_date_str (str, optional): End date for custom range in YYYY-MM-DD format
+        now (datetime, optional): Reference time, defaults to the current time
+
+    Returns:
+        tuple: (start_date, end_date) or (None, None) for 'all' filter.
+               Unknown filters and invalid custom dates fall back to 'month'.
+    """
+    now = now or datetime.now()
+
+    # Handle custom date range
+    if filter_type == 'custom' and start_date_str and end_date_str:
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1, microseconds=-1)
+            return start_date, end_date
+        except ValueError:
+            # Invalid date format, fall back to default month filter
+            filter_type = DEFAULT_PERIOD
+
+    if filter_type == 'all':
+        return None, None
+
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if filter_type == 'today':
+        start_date, end_date = today, today + timedelta(days=1)
+    elif filter_type == 'week':
+        # Monday of this week
+        start_date = today - timedelta(days=today.weekday())
+        end_date = start_date + timedelta(days=7)
+    elif filter_type == 'quarter':
+        start_date = datetime(now.year, (now.month - 1) // 3 * 3 + 1, 1)
+        end_date = _next_month_start(start_date, 3)
+    elif filter_type == 'year':
+        start_date = datetime(now.year, 1, 1)
+        end_date = datetime(now.year + 1, 1, 1)
+    else:  # 'month' and invalid filters
+        start_date = datetime(now.year, now.month, 1)
+        end_date = _next_month_start(start_date)
+
+    # Ranges are inclusive: end one microsecond before the next period starts
+    return start_date, end_date - timedelta(microseconds=1)
+
+
+def period_totals(user_id, periods=STANDARD_PERIODS, now=None):
+    """
+    Compute income, expenses and net of several periods in one query.
+
+    Standard periods cover whole days, so every figure comes from one scan of
+    the user's daily rollups with a conditional sum per period and kind.
+
+    Args:
+        user_id (int): User ID
+        periods (iterable): Standard period names
+        now (datetime, optional): Reference time, defaults to the current time
+
+    Returns:
+        dict: Period name -> dict with income, expenses, net and the ISO
+              formatted start_date and end_date (None for 'all')
+    """
+    ranges = {period: get_date_range(period, now=now) for period in periods}
+
+    columns = []
+    for period, (start_date, end_date) in ranges.items():
+        in_period = [] if start_date is None else [
+            DailyRollup.day >= start_date.date(),
+            DailyRollup.day <= end_date.date()
+        ]
+        for kind in ('income', 'expense'):
+            columns.append(func.coalesce(func.sum(case(
+                (and_(DailyRollup.kind == kind, *in_period), DailyRollup.total), else_=0
+            )), 0).label(f'{period}_{kind}'))
+
+    query = select(*columns).where(
+        DailyRollup.user_id == user_id,
+        DailyRollup.kind.in_(('income', 'expense'))
+    )
+    # Only the widest period's days need to be read
+    if all(start_date is not None for start_date, _ in ranges.values()):
+        query = query.where(
+            DailyRollup.day >= min(start_date for start_date, _ in ranges.values()).date(),
+            DailyRollup.day <= max(end_date for _, end_date in ranges.values()).date()
+        )
+    row = db.session.execute(query).one()
+
+    totals = {}
+    for period, (start_date, end_date) in ranges.items():
+        income = float(getattr(row, f'{period}_income'))
+        expenses = float(getattr(row, f'{period}_expense'))
+        totals[period] = {
+            'income': income,
+            'expenses': expenses,
+            'net': income - expenses,
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None
+        }
+    return totals
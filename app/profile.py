@@ -1,14 +1,23 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, g, send_file
-from sqlalchemy import func
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, g, Response, stream_with_context, current_app
+from contextlib import ExitStack
 from datetime import datetime, timedelta
-import json
-import tempfile
+from itertools import chain
 import os
-from app.models import db, User, Account, Category, Transaction
+from app.models import db, User
 from app.auth import login_required, api_login_required
+from app.rollups import get_user_summary
+from app.backup import (
+    generate_backup, get_user_backup_data, backup_filename, backup_mimetype, BACKUP_FORMATS,
+    read_backup, backup_records, backup_upload_format, restore_backup, parse_watermark, BackupFormatError
+)
+from app.jobs import job_handler, start_job, wants_async, save_job_input
+from app.purge import purge_user_data
 
 profile_bp = Blueprint('profile', __name__)
 
+DELETE_ALL_DATA_MESSAGE = 'All your data has been permanently deleted. Your account remains active.'
+DELETE_ACCOUNT_MESSAGE = 'Your account has been permanently deleted. You will be logged out.'
+
 @profile_bp.route('/')
 @login_required
 def index():
@@ -20,14 +29,8 @@ def index():
 
 def get_user_statistics(user_id):
     """Calculate and return user statistics."""
-    # Total transactions
-    total_transactions = Transaction.query.filter_by(user_id=user_id).count()
-    
-    # Categories created
-    categories_created = Category.query.filter_by(user_id=user_id).count()
-    
-    # Accounts managed
-    accounts_managed = Account.query.filter_by(user_id=user_id).count()
+    # Record counts are maintained incrementally in the user summary
+    summary = get_user_summary(user_id)
     
     # Days active (days since registration)
     user = User.query.get(user_id)
@@ -37,9 +40,9 @@ def get_user_statistics(user_id):
         days_active = 0
     
     return {
-        'total_transactions': total_transactions,
-        'categories_created': categories_created,
-        'accounts_managed': accounts_managed,
+        'total_transactions': summary.transaction_count,
+        'categories_created': summary.category_count,
+        'accounts_managed': summary.account_count,
         'days_active': days_active
     }
 
@@ -59,7 +62,7 @@ def update_profile():
         if not data:
             return jsonify({'success': False, 'message': 'No data provided'}), 400
         
-        user = User.query.get(g.user.id)
+        user = g.user.model
         if not user:
             return jsonify({'success': False, 'message': 'User not found'}), 404
         
@@ -123,7 +126,7 @@ def change_password():
         if len(new_password) < 8:
             return jsonify({'success': False, 'message': 'Password must be at least 8 characters long'}), 400
         
-        user = User.query.get(g.user.id)
+        user = g.user.model
         if not user:
             return jsonify({'success': False, 'message': 'User not found'}), 404
         
@@ -142,66 +145,151 @@ def change_password():
         db.session.rollback()
         return jsonify({'success': False, 'message': 'Error changing password'}), 500
 
+@job_handler('export_backup')
+def _export_backup_job(job):
+    """Write a user's backup to the job result file."""
+    params = job.params
+    backup_format = params.get('format', 'json')
+    compress = params.get('compress', False)
+    since = parse_watermark(params['since']) if params.get('since') else None
+    user = db.session.get(User, job.user_id)
+    
+    path = job.result_path(
+        backup_filename(user.username, backup_format, compress, delta=since is not None),
+        backup_mimetype(backup_format, compress)
+    )
+    with open(path, 'wb') as result_file:
+        for chunk in generate_backup(job.user_id, backup_format, compress, since):
+            result_file.write(chunk)
+    return 'Backup ready for download'
+
 @profile_bp.route('/export-data')
 @login_required
 def export_data():
-    """Export user data in JSON format."""
+    """
+    Export user data as a JSON backup, as a background job if the client prefers.
+    
+    The backup is streamed in chunks, so memory use does not grow with the
+    number of transactions and no temporary file is written.
+    
+    Query Parameters:
+        format (str): 'json' (default) or 'ndjson', one record per line
+        gzip (str): 'true' to download a gzip compressed file
+        since (str): Watermark of an earlier backup, to download a delta
+            backup of the changes after it
+    
+    Returns:
+        Backup file download, or 202 with the job ID
+    """
+    backup_format = request.args.get('format', 'json').lower()
+    compress = request.args.get('gzip', 'false').lower() == 'true'
+    if backup_format not in BACKUP_FORMATS:
+        flash('Unsupported backup format', 'error')
+        return redirect(url_for('profile.index'))
+    
+    since = None
+    if request.args.get('since'):
+        try:
+            since = parse_watermark(request.args['since'])
+        except BackupFormatError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('profile.index'))
+        # Tombstones older than this are purged, so the delta could miss deletions
+        if since < datetime.now() - timedelta(days=current_app.config.get('BACKUP_TOMBSTONE_TTL_DAYS', 90)):
+            flash('That backup is too old to continue, please export a full backup', 'error')
+            return redirect(url_for('profile.index'))
+    
+    if wants_async():
+        return start_job('export_backup', {
+            'format': backup_format,
+            'compress': compress,
+            'since': since.isoformat() if since else None
+        })
+    
     try:
-        user_data = get_user_backup_data(g.user.id)
-        
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json')
-        json.dump(user_data, temp_file, indent=2, default=str)
-        temp_file.close()
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'dumpmycash_backup_{g.user.username}_{timestamp}.json'
-        
-        return send_file(
-            temp_file.name,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/json'
+        filename = backup_filename(g.user.username, backup_format, compress, delta=since is not None)
+        return Response(
+            stream_with_context(generate_backup(g.user.id, backup_format, compress, since)),
+            mimetype=backup_mimetype(backup_format, compress),
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
         
     except Exception as e:
         flash(f'Error creating backup: {str(e)}', 'error')
         return redirect(url_for('profile.index'))
 
+@job_handler('restore_backup')
+def _restore_backup_job(job):
+    """Restore an uploaded backup stored for the job."""
+    inputs = job.params['inputs']
+    try:
+        with ExitStack() as stack:
+            records = chain.from_iterable(
+                read_backup(stack.enter_context(open(upload['path'], 'rb')), upload['format'], upload['compressed'])
+                for upload in inputs
+            )
+            result = restore_user_data(job.user_id, records)
+    finally:
+        for upload in inputs:
+            if os.path.exists(upload['path']):
+                os.remove(upload['path'])
+    
+    if not result['success']:
+        raise ValueError(f"Error restoring data: {result['message']}")
+    return f"Data restored successfully! {result['message']}"
+
+def _restore_error(message):
+    """Report a rejected restore upload the way the client expects."""
+    if wants_async():
+        return jsonify({'error': message}), 400
+    flash(message, 'error')
+    return redirect(url_for('profile.index'))
+
 @profile_bp.route('/restore-data', methods=['POST'])
 @login_required 
 def restore_data():
-    """Restore user data from JSON file."""
+    """
+    Restore user data from backup files, as a background job if the client prefers.
+    
+    Accepts the layouts written by export_data: .json or .ndjson, optionally
+    gzip compressed (.json.gz, .ndjson.gz). Several files are restored as a
+    chain: a full backup followed by the delta backups taken after it.
+    """
     try:
-        if 'backup_file' not in request.files:
-            flash('No file selected', 'error')
-            return redirect(url_for('profile.index'))
-        
-        file = request.files['backup_file']
-        if file.filename == '':
-            flash('No file selected', 'error')
-            return redirect(url_for('profile.index'))
-        
-        if not file.filename.endswith('.json'):
-            flash('Please upload a JSON file', 'error')
-            return redirect(url_for('profile.index'))
-        
-        # Read and parse JSON
+        files = [file for file in request.files.getlist('backup_file') if file.filename]
+        if not files:
+            return _restore_error('No file selected')
+        # Backup names carry their export time, so name order is chain order
+        files.sort(key=lambda file: file.filename)
+        
+        upload_formats = [backup_upload_format(file.filename) for file in files]
+        if None in upload_formats:
+            return _restore_error('Please upload JSON or NDJSON backup files')
+        
+        # Parsing and restoring grow with the backup size, so run them as a job
+        if wants_async():
+            inputs = [
+                {'path': save_job_input(file), 'format': backup_format, 'compressed': compressed}
+                for file, (backup_format, compressed) in zip(files, upload_formats)
+            ]
+            response = start_job('restore_backup', {'inputs': inputs})
+            if response[1] != 202:
+                for upload in inputs:
+                    if os.path.exists(upload['path']):
+                        os.remove(upload['path'])
+            return response
+        
+        # Parse the uploads while restoring them
         try:
-            backup_data = json.load(file)
-        except json.JSONDecodeError:
-            flash('Invalid JSON file format', 'error')
+            records = chain.from_iterable(
+                read_backup(file.stream, backup_format, compressed)
+                for file, (backup_format, compressed) in zip(files, upload_formats)
+            )
+            result = restore_user_data(g.user.id, records)
+        except BackupFormatError as e:
+            flash(str(e), 'error')
             return redirect(url_for('profile.index'))
         
-        # Validate backup data structure
-        if not validate_backup_data(backup_data):
-            flash('Invalid backup file structure', 'error')
-            return redirect(url_for('profile.index'))
-        
-        # Restore data
-        result = restore_user_data(g.user.id, backup_data)
-        
         if result['success']:
             flash(f"Data restored successfully! {result['message']}", 'success')
         else:
@@ -213,191 +301,82 @@ def restore_data():
         flash(f'Error restoring data: {str(e)}', 'error')
         return redirect(url_for('profile.index'))
 
-def get_user_backup_data(user_id):
-    """Get all user data for backup."""
-    user = User.query.get(user_id)
-    
-    # Get user accounts
-    accounts = Account.query.filter_by(user_id=user_id).all()
-    accounts_data = []
-    for account in accounts:
-        accounts_data.append({
-            'name': account.name,
-            'balance': float(account.balance),
-            'color': account.color if hasattr(account, 'color') else None,
-            'created_at': account.created_at.isoformat() if account.created_at else None
-        })
-    
-    # Get user categories
-    categories = Category.query.filter_by(user_id=user_id).all()
-    categories_data = []
-    for category in categories:
-        categories_data.append({
-            'name': category.name,
-            'type': category.type,
-            'unicode_emoji': category.unicode_emoji if hasattr(category, 'unicode_emoji') else None
-        })
-    
-    # Get user transactions
-    transactions = Transaction.query.filter_by(user_id=user_id).all()
-    transactions_data = []
-    for transaction in transactions:
-        # Get account and category names for reference
-        account = Account.query.get(transaction.account_id)
-        category = Category.query.get(transaction.category_id)
-        
-        transactions_data.append({
-            'amount': float(transaction.amount),
-            'description': transaction.description,
-            'account_name': account.name if account else None,
-            'category_name': category.name if category else None,
-            'date': transaction.date.isoformat() if transaction.date else None
-        })
-    
-    backup_data = {
-        'export_info': {
-            'username': user.username,
-            'email': user.email,
-            'export_date': datetime.now().isoformat(),
-            'version': '1.0'
-        },
-        'user_profile': {
-            'name': user.name,
-            'created_at': user.created_at.isoformat() if user.created_at else None
-        },
-        'accounts': accounts_data,
-        'categories': categories_data,
-        'transactions': transactions_data,
-        'statistics': {
-            'total_accounts': len(accounts_data),
-            'total_categories': len(categories_data),
-            'total_transactions': len(transactions_data)
-        }
-    }
-    
-    return backup_data
-
 def validate_backup_data(data):
     """Validate backup data structure."""
     required_keys = ['export_info', 'accounts', 'categories', 'transactions']
     return all(key in data for key in required_keys)
 
 def restore_user_data(user_id, backup_data):
-    """Restore user data from backup."""
+    """
+    Restore user data from backup.
+    
+    Args:
+        user_id (int): User ID
+        backup_data: Backup document as a dict, or (record type, record)
+            pairs from read_backup(), possibly of a chain of backups
+    
+    Returns:
+        dict: 'success' and a 'message' with the restored counts
+    
+    Raises:
+        BackupFormatError: The backup cannot be parsed; nothing is restored
+    """
     try:
-        restored_counts = {
-            'accounts': 0,
-            'categories': 0,
-            'transactions': 0
-        }
-        
-        # Create mapping for old to new IDs
-        account_mapping = {}
-        category_mapping = {}
-        
-        # Restore accounts
-        for account_data in backup_data.get('accounts', []):
-            # Check if account already exists
-            existing_account = Account.query.filter_by(
-                user_id=user_id, 
-                name=account_data['name']
-            ).first()
-            
-            if not existing_account:
-                new_account = Account(
-                    name=account_data['name'],
-                    balance=account_data.get('balance', 0.0),
-                    user_id=user_id
-                )
-                if 'color' in account_data and hasattr(new_account, 'color'):
-                    new_account.color = account_data['color']
-                
-                db.session.add(new_account)
-                db.session.flush()  # Get the ID
-                account_mapping[account_data['name']] = new_account.id
-                restored_counts['accounts'] += 1
-            else:
-                account_mapping[account_data['name']] = existing_account.id
-        
-        # Restore categories
-        for category_data in backup_data.get('categories', []):
-            # Check if category already exists
-            existing_category = Category.query.filter_by(
-                user_id=user_id,
-                name=category_data['name'],
-                type=category_data['type']
-            ).first()
-            
-            if not existing_category:
-                new_category = Category(
-                    name=category_data['name'],
-                    type=category_data['type'],
-                    user_id=user_id
-                )
-                if 'unicode_emoji' in category_data and category_data['unicode_emoji']:
-                    new_category.unicode_emoji = category_data['unicode_emoji']
-                
-                db.session.add(new_category)
-                db.session.flush()  # Get the ID
-                category_mapping[category_data['name']] = new_category.id
-                restored_counts['categories'] += 1
-            else:
-                category_mapping[category_data['name']] = existing_category.id
-        
-        # Restore transactions
-        for transaction_data in backup_data.get('transactions', []):
-            account_id = account_mapping.get(transaction_data.get('account_name'))
-            category_id = category_mapping.get(transaction_data.get('category_name'))
-            
-            if account_id and category_id:
-                new_transaction = Transaction(
-                    amount=transaction_data['amount'],
-                    description=transaction_data['description'],
-                    account_id=account_id,
-                    category_id=category_id,
-                    user_id=user_id
-                )
-                
-                # Parse date if provided
-                if transaction_data.get('date'):
-                    try:
-                        new_transaction.date = datetime.fromisoformat(transaction_data['date'].replace('Z', '+00:00'))
-                    except:
-                        pass  # Use default date
-                
-                db.session.add(new_transaction)
-                restored_counts['transactions'] += 1
-        
-        # Update account balances based on transactions
-        for account_name, account_id in account_mapping.items():
-            account = Account.query.get(account_id)
-            if account:
-                # Calculate balance from transactions
-                total_income = db.session.query(func.sum(Transaction.amount)).filter(
-                    Transaction.account_id == account_id,
-                    Transaction.amount > 0
-                ).scalar() or 0
-                
-                total_expense = db.session.query(func.sum(Transaction.amount)).filter(
-                    Transaction.account_id == account_id,
-                    Transaction.amount < 0
-                ).scalar() or 0
-                
-                account.balance = float(total_income + total_expense)
-        
+        records = backup_records(backup_data) if isinstance(backup_data, dict) else backup_data
+        restored_counts = restore_backup(user_id, records)
         db.session.commit()
         
-        message = f"Restored {restored_counts['accounts']} accounts, {restored_counts['categories']} categories, {restored_counts['transactions']} transactions"
+        message = (
+            f"Restored {restored_counts['accounts']} accounts, {restored_counts['categories']} categories, "
+            f"{restored_counts['transactions']} transactions, {restored_counts['transfers']} transfers"
+        )
+        if restored_counts['updated'] or restored_counts['deleted']:
+            message += f", updated {restored_counts['updated']} and deleted {restored_counts['deleted']} records"
         return {'success': True, 'message': message}
         
+    except BackupFormatError:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return {'success': False, 'message': str(e)}
 
+def delete_user_data(user_id, progress=None):
+    """
+    Delete all data of a user except the user account.
+    
+    Rows are deleted in batches, each committed on its own, see app.purge.
+    
+    Args:
+        user_id (int): User ID
+        progress (callable, optional): Called with (rows deleted, rows to delete)
+    """
+    purge_user_data(user_id, progress=progress)
+
+def _purge_progress(job):
+    """Report purge progress on a job."""
+    def progress(done, total):
+        job.progress(100 * done / total, f'Deleted {done} of {total} records')
+    return progress
+
+@job_handler('delete_all_data')
+def _delete_all_data_job(job):
+    """Delete a user's data in the background."""
+    delete_user_data(job.user_id, progress=_purge_progress(job))
+    return DELETE_ALL_DATA_MESSAGE
+
+@job_handler('delete_account')
+def _delete_account_job(job):
+    """Delete a user's data and then the user, in the background."""
+    purge_user_data(
+        job.user_id, delete_user=True, progress=_purge_progress(job), job_id=job.job_id
+    )
+    return DELETE_ACCOUNT_MESSAGE
+
 @profile_bp.route('/delete-all-data', methods=['POST'])
 @api_login_required
 def delete_all_data():
-    """Delete all user data except user account."""
+    """Delete all user data except user account, as a background job if the client prefers."""
     try:
         data = request.get_json(force=True, silent=True)
         confirmation1 = data.get('confirmation1') if data else None
@@ -409,31 +388,14 @@ def delete_all_data():
         if confirmation2 != 'CONFIRM DELETE':
             return jsonify({'success': False, 'message': 'Invalid second confirmation'}), 400
         
-        user_id = g.user.id
-        
-        # Delete all user data in the correct order (to respect foreign keys)
-        # 1. Delete transactions first
-        Transaction.query.filter_by(user_id=user_id).delete()
+        if wants_async():
+            return start_job('delete_all_data')
         
-        # 2. Delete accounts (this will also delete any remaining account references)
-        Account.query.filter_by(user_id=user_id).delete()
-        
-        # 3. Delete categories
-        Category.query.filter_by(user_id=user_id).delete()
-        
-        # 4. Delete transfers if they exist
-        try:
-            from app.models import Transfer
-            Transfer.query.filter_by(user_id=user_id).delete()
-        except ImportError:
-            pass  # Transfer model might not exist in all configurations
-        
-        # Commit the transaction
-        db.session.commit()
+        delete_user_data(g.user.id)
         
         return jsonify({
             'success': True, 
-            'message': 'All your data has been permanently deleted. Your account remains active.'
+            'message': DELETE_ALL_DATA_MESSAGE
         })
         
     except Exception as e:
@@ -455,34 +417,15 @@ def delete_account():
         if confirmation2 != 'PERMANENTLY DELETE':
             return jsonify({'success': False, 'message': 'Invalid second confirmation'}), 400
         
-        user_id = g.user.id
-        
-        # Delete all user data in the correct order (to respect foreign keys)
-        # 1. Delete transactions first
-        Transaction.query.filter_by(user_id=user_id).delete()
-        
-        # 2. Delete accounts
-        Account.query.filter_by(user_id=user_id).delete()
-        
-        # 3. Delete categories
-        Category.query.filter_by(user_id=user_id).delete()
+        # Deleting a large history takes a while, so run it as a job if asked
+        if wants_async():
+            return start_job('delete_account', outlives_user=True)
         
-        # 4. Delete transfers if they exist
-        try:
-            from app.models import Transfer
-            Transfer.query.filter_by(user_id=user_id).delete()
-        except ImportError:
-            pass  # Transfer model might not exist in all configurations
-        
-        # 5. Finally, delete the user account
-        User.query.filter_by(id=user_id).delete()
-        
-        # Commit the transaction
-        db.session.commit()
+        purge_user_data(g.user.id, delete_user=True)
         
         return jsonify({
             'success': True, 
-            'message': 'Your account has been permanently deleted. You will be logged out.',
+            'message': DELETE_ACCOUNT_MESSAGE,
             'logout': True
         })
         
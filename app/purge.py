@@ -0,0 +1,218 @@
+"""
+Chunked purges of user data for DumpMyCash.
+
+Deleting everything a user owns with one DELETE per table holds a write
+lock for as long as the largest table takes, and on SQLite that blocks
+every other writer. A purge instead walks the user's tables in foreign key
+order:
+
+- transfers, which refer to accounts and to their transactions
+- transactions, with the daily rollups derived from them
+- accounts, then categories
+- when deleting the user: idempotency keys, jobs, tombstones, the summary
+  and the user
+
+and deletes at most PURGE_BATCH_SIZE rows per statement, each batch in its
+own short database transaction. Rollups and summaries are updated with
+every batch, so the figures stay consistent while a purge runs, and a purge
+that was interrupted can simply be started again: it continues with the
+rows that are left. A purge that keeps the user leaves one 'all' tombstone
+for delta backups instead of one per deleted row. It is written with the
+first batch, so no row is ever gone without a tombstone covering it, even
+when the purge is interrupted.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select
+
+from app.models import db, User, Account, Category, Transaction, Transfer, DailyRollup, IdempotencyKey, Tombstone
+from app.rollups import apply_transaction_deltas, apply_summary_deltas, mark_ledger_changed, reset_user_summary
+from app.reference import mark_reference_stale
+from app.descriptions import mark_descriptions_stale
+from app.jobs import delete_user_jobs
+from app.changes import record_purge, purge_tombstones
+
+DEFAULT_BATCH_SIZE = 1000
+# Tables purged in foreign key order: (name, model)
+PURGE_STEPS = (
+    ('transfers', Transfer),
+    ('transactions', Transaction),
+    ('accounts', Account),
+    ('categories', Category),
+)
+# Summary columns counting the rows of a table
+SUMMARY_COUNT_COLUMNS = {Account: 'account_count', Category: 'category_count'}
+
+purge_cli = AppGroup('purge', help='Delete user data in batches.')
+
+
+def count_user_rows(user_id):
+    """
+    Count the rows a purge of a user has to delete.
+
+    Args:
+        user_id (int): User ID
+
+    Returns:
+        dict: Table name -> number of rows, in PURGE_STEPS order
+    """
+    return {
+        name: db.session.execute(select(func.count(model.id)).where(model.user_id == user_id)).scalar()
+        for name, model in PURGE_STEPS
+    }
+
+
+def _transaction_deltas(connection, user_id, ids):
+    """Rollup deltas removing the given transactions."""
+    deltas = {}
+    rows = connection.execute(
+        select(Transaction.date, Transaction.category_id, Transaction.account_id, Transaction.amount, Transaction.kind)
+        .where(Transaction.id.in_(ids))
+    )
+    for row in rows:
+        key = (user_id, row.date.date(), row.category_id, row.account_id)
+        delta = deltas.setdefault(key, [0.0, 0, row.kind])
+        delta[0] -= row.amount
+        delta[1] -= 1
+    return deltas
+
+
+def delete_user_rows(connection, user_id, model, ids):
+    """
+    Delete rows of a user by ID with a Core statement, keeping derived data current.
+
+    Transactions are taken out of the rollups and summary, deleted accounts
+    and categories out of the summary counts, and the user's cached
+    reference data and description index are dropped on commit.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): Owner of the rows
+        model: Account, Category, Transaction or Transfer
+        ids (list): IDs of the rows, at most a batch
+    """
+    if model is Transaction:
+        # Core deletes bypass the session hooks, so take the rows out of the rollups here
+        apply_transaction_deltas(connection, _transaction_deltas(connection, user_id, ids))
+        mark_descriptions_stale(connection, [user_id])
+    connection.execute(model.__table__.delete().where(model.__table__.c.id.in_(ids)))
+    column = SUMMARY_COUNT_COLUMNS.get(model)
+    if column:
+        apply_summary_deltas(connection, {user_id: {column: -len(ids)}})
+        mark_ledger_changed(connection, [user_id])
+        mark_reference_stale(connection, [user_id])
+
+
+def _delete_batch(user_id, model, batch_size, tombstone=False):
+    """
+    Delete one batch of a user's rows from a table and commit.
+
+    Args:
+        user_id (int): Owner of the rows
+        model: Account, Category, Transaction or Transfer
+        batch_size (int): Maximum number of rows deleted
+        tombstone (bool): Write the 'all' tombstone in the batch's transaction
+
+    Returns:
+        int: Number of rows deleted, 0 once the table holds none of the user's
+    """
+    connection = db.session.connection()
+    ids = connection.execute(
+        select(model.id).where(model.user_id == user_id).order_by(model.id).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    delete_user_rows(connection, user_id, model, ids)
+    if tombstone:
+        record_purge(connection, user_id)
+    db.session.commit()
+    return len(ids)
+
+
+def purge_user_data(user_id, delete_user=False, batch_size=None, progress=None, job_id=None):
+    """
+    Delete a user's data in bounded batches, committing after each batch.
+
+    Safe to run again after an interruption; rows deleted by earlier runs
+    are simply not found again.
+
+    Args:
+        user_id (int): User ID
+        delete_user (bool): Also delete the user, its summary, idempotency
+            keys and jobs
+        batch_size (int, optional): Rows deleted per statement,
+            PURGE_BATCH_SIZE by default
+        progress (callable, optional): Called with (rows deleted, rows to
+            delete) after every batch
+        job_id (int, optional): Job running this purge; with delete_user it
+            is detached from the user instead of deleted
+
+    Returns:
+        dict: Table name -> number of rows deleted
+    """
+    if batch_size is None:
+        batch_size = current_app.config.get('PURGE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    pause = current_app.config.get('PURGE_PAUSE_SECONDS', 0)
+
+    total = sum(count_user_rows(user_id).values())
+    deleted = {name: 0 for name, _ in PURGE_STEPS}
+    done = 0
+    # A deleted user needs no tombstone, its tombstones go with it
+    tombstone = not delete_user
+    for name, model in PURGE_STEPS:
+        while True:
+            count = _delete_batch(user_id, model, batch_size, tombstone)
+            if not count:
+                break
+            tombstone = False
+            deleted[name] += count
+            done += count
+            if progress is not None:
+                progress(done, max(total, done))
+            if pause:
+                # Let writers queued behind the lock in before the next batch
+                time.sleep(pause)
+
+    # Rollups went with their transactions; drop any stale leftovers
+    db.session.execute(delete(DailyRollup).where(DailyRollup.user_id == user_id))
+    if delete_user:
+        reset_user_summary(user_id, delete=True)
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id))
+        db.session.execute(delete(Tombstone).where(Tombstone.user_id == user_id))
+        delete_user_jobs(user_id, keep_job_id=job_id)
+        db.session.execute(delete(User).where(User.id == user_id))
+    else:
+        reset_user_summary(user_id)
+    db.session.commit()
+    return deleted
+
+
+@purge_cli.command('user')
+@click.argument('user_id', type=int)
+@click.option('--delete-user', is_flag=True, help='Delete the user too, not only its data.')
+@click.option('--batch-size', type=int, default=None, help='Rows deleted per statement.')
+def purge_user_command(user_id, delete_user, batch_size):
+    """Delete a user's data in batches, or finish an interrupted purge."""
+    if db.session.get(User, user_id) is None:
+        raise click.ClickException(f'User {user_id} not found')
+
+    deleted = purge_user_data(user_id, delete_user=delete_user, batch_size=batch_size)
+    click.echo('Deleted ' + ', '.join(f'{count} {name}' for name, count in deleted.items()) + '.')
+
+
+@purge_cli.command('tombstones')
+@click.option('--older-than-days', type=int, default=None,
+              help='Age of tombstones to delete, BACKUP_TOMBSTONE_TTL_DAYS by default.')
+def purge_tombstones_command(older_than_days):
+    """Delete tombstones too old for any delta backup to need."""
+    if older_than_days is None:
+        older_than_days = current_app.config.get('BACKUP_TOMBSTONE_TTL_DAYS', 90)
+
+    purged = purge_tombstones(datetime.now() - timedelta(days=older_than_days))
+    click.echo(f'Purged {purged} tombstones.')
@@ -0,0 +1,236 @@
+"""
+Per-user reference data cache for DumpMyCash.
+
+Accounts and categories are small, rarely change and are read on nearly
+every request: filter dropdowns, ownership checks of transaction writes and
+the system categories used by deposits and balance adjustments. This module
+keeps an in-process copy per user:
+
+- entries hold the id, name, color, type and emoji of every account and
+  category of a user, never balances
+- the least recently used users are evicted beyond REFERENCE_CACHE_MAX_USERS
+- ORM writes to accounts, categories or users mark the user on the database
+  connection and the entry is dropped when that transaction commits; bulk
+  ORM statements on those tables drop every entry
+- entries expire after REFERENCE_CACHE_TTL_SECONDS, which bounds staleness
+  for writes made by other processes; an account or category a caller asks
+  for that is missing from the entry, e.g. one just created by another
+  process, reloads the entry once before it counts as not found
+
+Entries serve rendering and early validation only. Writes whose effect
+depends on a category, such as balance updates and transaction kinds, read
+it again inside their transaction with read_categories().
+"""
+
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.caching import ALL_USERS, CommitTracker, LRUCache, bulk_write_model
+from app.models import db, Account, Category, User, transaction_kind_for
+
+# connection.info key holding the users whose accounts or categories changed
+REFERENCE_CHANGES_KEY = 'reference_changed_user_ids'
+DEFAULT_MAX_USERS = 1024
+DEFAULT_TTL_SECONDS = 300
+
+AccountRef = namedtuple('AccountRef', 'id name color')
+CategoryRef = namedtuple('CategoryRef', 'id name type unicode_emoji transaction_kind')
+
+
+class ReferenceData:
+    """
+    Accounts and categories of one user.
+
+    Attributes:
+        accounts (dict): Account ID -> AccountRef, ordered by ID
+        categories (dict): Category ID -> CategoryRef, ordered by ID
+    """
+
+    def __init__(self, accounts, categories):
+        self.accounts = {account.id: account for account in accounts}
+        self.categories = {category.id: category for category in categories}
+
+    def account(self, account_id):
+        """Return the user's account with this ID, or None."""
+        return self.accounts.get(_as_id(account_id))
+
+    def category(self, category_id):
+        """Return the user's category with this ID, or None."""
+        return self.categories.get(_as_id(category_id))
+
+    def has(self, account_ids=(), category_ids=()):
+        """Return True if every valid ID given is an account or category of the user."""
+        return (
+            all(account_id in self.accounts for account_id in map(_as_id, account_ids) if account_id is not None)
+            and all(category_id in self.categories
+                    for category_id in map(_as_id, category_ids) if category_id is not None)
+        )
+
+    def category_named(self, name, category_type):
+        """Return the user's category with this name and type, or None."""
+        for category in self.categories.values():
+            if category.name == name and category.type == category_type:
+                return category
+        return None
+
+
+def _as_id(value):
+    """Convert a request supplied ID to int, None if it is not one."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cache():
+    """Return the application's reference cache, creating it on first use."""
+    cache = current_app.extensions.get('reference_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('reference_cache', LRUCache(
+            current_app.config.get('REFERENCE_CACHE_MAX_USERS', DEFAULT_MAX_USERS)
+        ))
+    return cache
+
+
+def load_reference_data(user_id):
+    """
+    Read the accounts and categories of a user from the database.
+
+    Args:
+        user_id (int): User ID
+
+    Returns:
+        ReferenceData: Accounts and categories of the user
+    """
+    accounts = db.session.execute(
+        select(Account.id, Account.name, Account.color).where(Account.user_id == user_id).order_by(Account.id)
+    ).all()
+    categories = db.session.execute(
+        select(Category.id, Category.name, Category.type, Category.unicode_emoji)
+        .where(Category.user_id == user_id).order_by(Category.id)
+    ).all()
+    return ReferenceData(
+        [AccountRef(*row) for row in accounts],
+        [CategoryRef(*row, transaction_kind_for(row.type, row.name)) for row in categories]
+    )
+
+
+def get_reference_data(user_id, account_ids=(), category_ids=()):
+    """
+    Get the accounts and categories of a user, from the cache when possible.
+
+    Inside a transaction that already changed the user's accounts or
+    categories, the data is read fresh and not cached, so uncommitted rows
+    never reach other requests.
+
+    Args:
+        user_id (int): User ID
+        account_ids (iterable, optional): Accounts the caller looks up
+        category_ids (iterable, optional): Categories the caller looks up;
+            a cached entry missing one of them is reloaded, as it may
+            predate rows created by another process
+
+    Returns:
+        ReferenceData: Accounts and categories of the user; treat as read only
+    """
+    pending = _changes.pending(db.session.connection()) or ()
+    if user_id in pending or ALL_USERS in pending:
+        return load_reference_data(user_id)
+
+    cache = _cache()
+    data = cache.get(user_id)
+    if data is None or not data.has(account_ids, category_ids):
+        version = cache.version
+        data = load_reference_data(user_id)
+        ttl = current_app.config.get('REFERENCE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+        if ttl > 0:
+            cache.set(user_id, data, ttl, version)
+    return data
+
+
+def read_categories(connection, user_id, category_ids):
+    """
+    Read categories of a user from the database inside a write, bypassing the cache.
+
+    A cached type can be behind a change made by another process, and applying
+    a balance with it would turn income into an expense for good. The rows are
+    share locked where the database supports it, so their type cannot change
+    and they cannot be deleted before the write commits.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): Owner of the categories
+        category_ids (iterable): IDs of the categories
+
+    Returns:
+        dict: Category ID -> CategoryRef, for the IDs that are categories of the user
+    """
+    ids = sorted({category_id for category_id in map(_as_id, category_ids) if category_id is not None})
+    if not ids:
+        return {}
+
+    query = select(Category.id, Category.name, Category.type, Category.unicode_emoji).where(
+        Category.id.in_(ids), Category.user_id == user_id
+    ).order_by(Category.id)
+    if connection.dialect.name != 'sqlite':
+        query = query.with_for_update(read=True)
+    return {
+        row.id: CategoryRef(*row, transaction_kind_for(row.type, row.name))
+        for row in connection.execute(query)
+    }
+
+
+def mark_reference_stale(connection, user_ids):
+    """
+    Drop the reference data of users when the current transaction commits.
+
+    Core statements bypass the session hooks, so writers changing accounts
+    or categories through them call this.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_ids (iterable): IDs of the affected users, or ALL_USERS
+    """
+    _changes.mark(connection, user_ids)
+
+
+def _track_reference_writes(session, flush_context):
+    """Session after_flush hook marking users whose accounts or categories changed."""
+    user_ids = {
+        obj.id if isinstance(obj, User) else obj.user_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, (Account, Category, User))
+    }
+    if user_ids:
+        mark_reference_stale(session.connection(), user_ids)
+
+
+def _track_bulk_reference_writes(orm_execute_state):
+    """Session hook marking every user when a bulk statement changes accounts or categories."""
+    if bulk_write_model(orm_execute_state) in (Account, Category):
+        mark_reference_stale(orm_execute_state.session.connection(), {ALL_USERS})
+
+
+def _invalidate(user_ids):
+    """Drop the reference data of users changed by a committed transaction."""
+    _cache().invalidate(user_ids)
+
+
+_changes = CommitTracker(REFERENCE_CHANGES_KEY, _invalidate)
+
+
+def register_reference_listeners():
+    """Register the hooks that keep the reference cache current."""
+    listeners = (
+        (Session, 'after_flush', _track_reference_writes),
+        (Session, 'do_orm_execute', _track_bulk_reference_writes),
+    )
+    for target, name, listener in listeners:
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+    _changes.register()
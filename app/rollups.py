@@ -0,0 +1,702 @@
+"""
+Rollup maintenance for DumpMyCash.
+
+This module keeps derived data in step with the raw tables:
+- transactions.kind: 'income', 'expense' or 'transfer', copied from the
+  category so filters need no per-row category subquery
+- daily_rollups: sum and count of transaction amounts per
+  (user, day, category, account)
+- user_summaries: lifetime income, expenses and record counts per user
+
+All of them are updated inside the same database transaction by session
+flush hooks, so every ORM write path (API create, update, delete, bulk delete,
+initial deposits, balance adjustments and restores) updates them
+automatically.
+
+Aggregate queries read from the rollups through ledger_rows(), which only
+falls back to raw transactions for partial days at the edges of a range.
+All-time figures are read from the per-user summary via get_user_summary().
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, select, literal, union_all, func, cast, case, or_, type_coerce
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import db, DailyRollup, UserSummary, Transaction, Account, Category, User, transaction_kind_for
+
+SUMMARY_COUNTERS = ('transaction_count', 'category_count', 'account_count')
+ROLLUP_TRACKED_ATTRIBUTES = (
+    Transaction.user_id, Transaction.date, Transaction.category_id,
+    Transaction.account_id, Transaction.amount, Transaction.kind,
+    Category.type, Category.name
+)
+SUMMARY_COLUMNS_BY_KIND = {'income': 'total_income', 'expense': 'total_expenses'}
+# connection.info key holding the users whose ledger changed in the current transaction
+LEDGER_CHANGES_KEY = 'ledger_changed_user_ids'
+
+rollups_cli = AppGroup('rollups', help='Manage the daily transaction rollups.')
+
+
+def mark_ledger_changed(connection, user_ids):
+    """
+    Record users whose ledger figures change in the current transaction.
+
+    Derived per-user caches (see app.statistics) are dropped for these users
+    when the transaction commits.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_ids (iterable): IDs of the affected users
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        connection.info.setdefault(LEDGER_CHANGES_KEY, set()).update(user_ids)
+
+
+def _as_day(value):
+    """Return the calendar day of a datetime (or date) value."""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def previous_value(state, key):
+    """Return the value an attribute had before the pending changes."""
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return state.attrs[key].value
+
+
+def _current_contribution(transaction):
+    """
+    Get the rollup key, amount and kind a transaction contributes after the flush.
+
+    Args:
+        transaction (Transaction): Transaction being inserted or updated
+
+    Returns:
+        tuple: ((user_id, day, category_id, account_id), amount, kind)
+    """
+    key = (
+        transaction.user_id,
+        _as_day(transaction.date),
+        transaction.category_id,
+        transaction.account_id
+    )
+    return key, transaction.amount, transaction.kind
+
+
+def _previous_contribution(transaction):
+    """
+    Get the rollup key, amount and kind a transaction contributed before the flush.
+
+    Args:
+        transaction (Transaction): Transaction being updated or deleted
+
+    Returns:
+        tuple: ((user_id, day, category_id, account_id), amount, kind)
+    """
+    state = inspect(transaction)
+    key = (
+        previous_value(state, 'user_id'),
+        _as_day(previous_value(state, 'date')),
+        previous_value(state, 'category_id'),
+        previous_value(state, 'account_id')
+    )
+    return key, previous_value(state, 'amount'), previous_value(state, 'kind')
+
+
+def _assign_transaction_kinds(session, flush_context, instances):
+    """Session before_flush hook stamping new or recategorized transactions with their kind."""
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty):
+            if not isinstance(obj, Transaction):
+                continue
+
+            state = inspect(obj)
+            if obj.kind is not None and not (
+                state.attrs.category_id.history.has_changes()
+                or state.attrs.category.history.has_changes()
+            ):
+                continue
+
+            added = state.attrs.category.history.added
+            category = added[0] if added and added[0] is not None else None
+            if category is None and obj.category_id is not None:
+                category = session.get(Category, obj.category_id)
+            if category is not None:
+                obj.kind = category.transaction_kind
+
+
+def collect_category_kind_changes(session):
+    """
+    Find categories whose type or name change moves them to another kind.
+
+    Args:
+        session (Session): Session in its after_flush state
+
+    Returns:
+        dict: Category ID -> (user_id, new kind)
+    """
+    changes = {}
+    for obj in session.dirty:
+        if not isinstance(obj, Category) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        previous_kind = transaction_kind_for(previous_value(state, 'type'), previous_value(state, 'name'))
+        if previous_kind != obj.transaction_kind:
+            changes[obj.id] = (obj.user_id, obj.transaction_kind)
+    return changes
+
+
+def apply_category_kind_changes(session, changes):
+    """
+    Restamp the transactions and rollups of reclassified categories.
+
+    Args:
+        session (Session): Session in its after_flush state
+        changes (dict): Output of collect_category_kind_changes()
+    """
+    connection = session.connection()
+    for category_id, (user_id, kind) in changes.items():
+        for table in (Transaction.__table__, DailyRollup.__table__):
+            connection.execute(
+                table.update().where(
+                    table.c.user_id == user_id,
+                    table.c.category_id == category_id,
+                    table.c.kind != kind
+                ).values(kind=kind)
+            )
+
+    # Keep loaded transactions consistent with the rows just updated
+    for obj in session.identity_map.values():
+        if isinstance(obj, Transaction) and obj.category_id in changes:
+            set_committed_value(obj, 'kind', changes[obj.category_id][1])
+
+
+def collect_rollup_deltas(session):
+    """
+    Compute the rollup changes implied by the pending Transaction writes.
+
+    Args:
+        session (Session): Session in its after_flush state
+
+    Returns:
+        dict: Rollup key -> [amount delta, count delta, kind]
+    """
+    deltas = defaultdict(lambda: [0.0, 0, None])
+
+    def add(key, amount, count, kind):
+        deltas[key][0] += amount
+        deltas[key][1] += count
+        deltas[key][2] = kind
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            key, amount, kind = _current_contribution(obj)
+            add(key, amount, 1, kind)
+
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and session.is_modified(obj):
+            old_key, old_amount, old_kind = _previous_contribution(obj)
+            new_key, new_amount, new_kind = _current_contribution(obj)
+            if old_key != new_key or old_amount != new_amount:
+                add(old_key, -old_amount, -1, old_kind)
+                add(new_key, new_amount, 1, new_kind)
+
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            key, amount, kind = _previous_contribution(obj)
+            add(key, -amount, -1, kind)
+
+    return {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+
+
+def apply_rollup_deltas(connection, deltas):
+    """
+    Upsert rollup deltas and drop rows that no longer hold any transaction.
+
+    Callers that change transactions with bulk SQL statements, which bypass
+    the session flush hook, must call this with their own deltas.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        deltas (dict): Rollup key -> [amount delta, count delta, kind]
+    """
+    if not deltas:
+        return
+
+    insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+    table = DailyRollup.__table__
+
+    rows = [{
+        'user_id': user_id,
+        'day': day,
+        'category_id': category_id,
+        'account_id': account_id,
+        'kind': kind,
+        'total': amount,
+        'txn_count': count
+    } for (user_id, day, category_id, account_id), (amount, count, kind) in deltas.items()]
+
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day, table.c.category_id, table.c.account_id],
+        set_={
+            'total': table.c.total + statement.excluded.total,
+            'txn_count': table.c.txn_count + statement.excluded.txn_count
+        }
+    )
+    connection.execute(statement, rows)
+
+    user_ids = {key[0] for key in deltas}
+    mark_ledger_changed(connection, user_ids)
+    connection.execute(
+        table.delete().where(table.c.user_id.in_(user_ids), table.c.txn_count <= 0)
+    )
+
+
+def summary_deltas_from_rollups(rollup_deltas, deltas=None):
+    """
+    Translate rollup deltas into per-user summary deltas.
+
+    Args:
+        rollup_deltas (dict): Rollup key -> [amount delta, count delta, kind]
+        deltas (dict, optional): Summary deltas to add to
+
+    Returns:
+        dict: User ID -> dict of column -> delta
+    """
+    if deltas is None:
+        deltas = defaultdict(lambda: defaultdict(float))
+    for (user_id, day, category_id, account_id), (amount, count, kind) in rollup_deltas.items():
+        deltas[user_id]['transaction_count'] += count
+        column = SUMMARY_COLUMNS_BY_KIND.get(kind)
+        if column:
+            deltas[user_id][column] += amount
+    return deltas
+
+
+def collect_summary_deltas(session, rollup_deltas, kind_changes):
+    """
+    Compute per-user summary changes implied by the pending writes.
+
+    Transaction totals are derived from the rollup deltas of the same flush.
+    Users whose categories changed kind cannot be updated by deltas, because
+    the reclassification affects their whole history; they are returned
+    separately so their totals can be recomputed.
+
+    Args:
+        session (Session): Session in its after_flush state
+        rollup_deltas (dict): Output of collect_rollup_deltas()
+        kind_changes (dict): Output of collect_category_kind_changes()
+
+    Returns:
+        tuple: (deltas, refresh_user_ids, new_user_ids) where deltas maps a
+               user ID to a dict of column -> delta
+    """
+    deltas = defaultdict(lambda: defaultdict(float))
+    refresh_user_ids = {user_id for user_id, kind in kind_changes.values()}
+    new_user_ids = set()
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            new_user_ids.add(obj.id)
+            deltas[obj.id]['transaction_count'] += 0
+        elif isinstance(obj, Account):
+            deltas[obj.user_id]['account_count'] += 1
+        elif isinstance(obj, Category):
+            deltas[obj.user_id]['category_count'] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Account):
+            deltas[obj.user_id]['account_count'] -= 1
+        elif isinstance(obj, Category):
+            deltas[obj.user_id]['category_count'] -= 1
+
+    summary_deltas_from_rollups(rollup_deltas, deltas)
+    return deltas, refresh_user_ids, new_user_ids
+
+
+def _summary_upsert(connection, rows, accumulate):
+    """
+    Insert summary rows, adding to or replacing existing values on conflict.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        rows (list): Dicts with user_id and any summary columns
+        accumulate (bool): Add the values to existing rows instead of replacing them
+    """
+    insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+    table = UserSummary.__table__
+    columns = ('total_income', 'total_expenses') + SUMMARY_COUNTERS
+
+    full_rows = [{'user_id': row['user_id'], **{c: row.get(c, 0) for c in columns}} for row in rows]
+
+    statement = insert(table)
+    if accumulate:
+        set_ = {c: table.c[c] + statement.excluded[c] for c in columns}
+    else:
+        set_ = {c: statement.excluded[c] for c in columns}
+    connection.execute(
+        statement.on_conflict_do_update(index_elements=[table.c.user_id], set_=set_),
+        full_rows
+    )
+
+
+def compute_user_summary(connection, user_id):
+    """
+    Compute a user's summary values from the rollups and record tables.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): User ID
+
+    Returns:
+        dict: user_id plus every summary column
+    """
+    total_income, total_expenses, transaction_count = connection.execute(
+        select(
+            func.coalesce(func.sum(case((DailyRollup.kind == 'income', DailyRollup.total), else_=0)), 0),
+            func.coalesce(func.sum(case((DailyRollup.kind == 'expense', DailyRollup.total), else_=0)), 0),
+            func.coalesce(func.sum(DailyRollup.txn_count), 0)
+        ).where(DailyRollup.user_id == user_id)
+    ).one()
+
+    category_count = connection.execute(
+        select(func.count(Category.id)).where(Category.user_id == user_id)
+    ).scalar()
+    account_count = connection.execute(
+        select(func.count(Account.id)).where(Account.user_id == user_id)
+    ).scalar()
+
+    return {
+        'user_id': user_id,
+        'total_income': float(total_income),
+        'total_expenses': float(total_expenses),
+        'transaction_count': transaction_count,
+        'category_count': category_count,
+        'account_count': account_count
+    }
+
+
+def apply_summary_deltas(connection, deltas, refresh_user_ids=(), new_user_ids=()):
+    """
+    Apply per-user summary deltas, recomputing rows that cannot take a delta.
+
+    Users without a summary row yet (data that predates the summaries) and
+    users in refresh_user_ids are recomputed in full instead.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        deltas (dict): User ID -> dict of column -> delta
+        refresh_user_ids (iterable): Users whose totals must be recomputed
+        new_user_ids (iterable): Users created in this transaction
+    """
+    user_ids = set(deltas) | set(refresh_user_ids)
+    if not user_ids:
+        return
+
+    existing = set(connection.execute(
+        select(UserSummary.user_id).where(UserSummary.user_id.in_(user_ids))
+    ).scalars())
+    recompute = (set(refresh_user_ids) | (user_ids - existing)) - set(new_user_ids)
+
+    delta_rows = [
+        {'user_id': user_id, **values}
+        for user_id, values in deltas.items()
+        if user_id not in recompute
+    ]
+    if delta_rows:
+        _summary_upsert(connection, delta_rows, accumulate=True)
+
+    if recompute:
+        _summary_upsert(
+            connection,
+            [compute_user_summary(connection, user_id) for user_id in recompute],
+            accumulate=False
+        )
+
+
+def apply_transaction_deltas(connection, rollup_deltas):
+    """
+    Apply the rollup and summary changes of a bulk SQL transaction write.
+
+    Bulk statements bypass the session flush hook; paths that insert, update
+    or delete transactions with Core statements pass the rollup deltas of
+    the affected rows here instead.
+
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        rollup_deltas (dict): Rollup key -> [amount delta, count delta, kind]
+    """
+    apply_rollup_deltas(connection, rollup_deltas)
+    apply_summary_deltas(connection, summary_deltas_from_rollups(rollup_deltas))
+
+
+def _maintain_rollups(session, flush_context):
+    """Session after_flush hook keeping kinds, rollups and summaries current."""
+    connection = session.connection()
+    kind_changes = collect_category_kind_changes(session)
+    apply_category_kind_changes(session, kind_changes)
+
+    rollup_deltas = collect_rollup_deltas(session)
+    apply_rollup_deltas(connection, rollup_deltas)
+    # Category names, types and counts are part of the statistics; new users
+    # may reuse the ID of a deleted one
+    mark_ledger_changed(connection, [
+        obj.user_id if isinstance(obj, Category) else obj.id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, (Category, User))
+    ])
+    apply_summary_deltas(connection, *collect_summary_deltas(session, rollup_deltas, kind_changes))
+
+
+def get_user_summary(user_id):
+    """
+    Get the lifetime summary of a user in constant time.
+
+    Users whose data predates the summaries get their row computed on first
+    access; run 'flask rollups rebuild' to backfill all users at once.
+
+    Args:
+        user_id (int): User ID
+
+    Returns:
+        UserSummary: Summary row of the user
+    """
+    summary = db.session.get(UserSummary, user_id)
+    if summary is None:
+        summary = UserSummary(**compute_user_summary(db.session.connection(), user_id))
+    return summary
+
+
+def reset_user_summary(user_id, delete=False):
+    """
+    Reset or remove a user's summary after a bulk purge of their data.
+
+    Bulk query deletes bypass the flush hook, so purge paths call this.
+
+    Args:
+        user_id (int): User ID
+        delete (bool): Remove the row entirely (used when deleting the user)
+    """
+    if delete:
+        UserSummary.query.filter_by(user_id=user_id).delete()
+    else:
+        _summary_upsert(db.session.connection(), [{'user_id': user_id}], accumulate=False)
+    mark_ledger_changed(db.session.connection(), [user_id])
+
+
+def track_previous_value(target, value, oldvalue, initiator):
+    """Attribute set hook; registering it loads the old value of expired attributes."""
+    return value
+
+
+def register_rollup_listeners():
+    """Register the session hooks that maintain kinds, rollups and summaries."""
+    # Without active history, assigning to an expired attribute discards the
+    # value it replaces, and the flush hook could not subtract it again
+    for attribute in ROLLUP_TRACKED_ATTRIBUTES:
+        if not event.contains(attribute, 'set', track_previous_value):
+            event.listen(attribute, 'set', track_previous_value, active_history=True, retval=True)
+
+    if not event.contains(Session, 'before_flush', _assign_transaction_kinds):
+        event.listen(Session, 'before_flush', _assign_transaction_kinds)
+    if not event.contains(Session, 'after_flush', _maintain_rollups):
+        event.listen(Session, 'after_flush', _maintain_rollups)
+
+
+def day_expression(column):
+    """
+    Build a SQL expression for the calendar day of a datetime column.
+
+    Args:
+        column: Datetime column
+
+    Returns:
+        SQLAlchemy expression of type Date
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return cast(column, db.Date)
+    return type_coerce(func.date(column), db.Date)
+
+
+def sync_transaction_kinds(user_id=None):
+    """
+    Restamp every transaction with the kind of its category.
+
+    Used to backfill the kind column and to repair drift; the flush hooks
+    keep it current for regular writes.
+
+    Args:
+        user_id (int, optional): Restrict the update to a single user
+    """
+    categories = select(Category.id, Category.type, Category.name)
+    if user_id is not None:
+        categories = categories.where(Category.user_id == user_id)
+
+    for category_id, category_type, category_name in db.session.execute(categories).all():
+        kind = transaction_kind_for(category_type, category_name)
+        db.session.execute(
+            Transaction.__table__.update().where(
+                Transaction.category_id == category_id,
+                or_(Transaction.kind.is_(None), Transaction.kind != kind)
+            ).values(kind=kind)
+        )
+
+
+def rebuild_rollups(user_id=None):
+    """
+    Recompute transaction kinds, daily rollups and user summaries from the raw tables.
+
+    Args:
+        user_id (int, optional): Restrict the rebuild to a single user
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    day = day_expression(Transaction.date)
+
+    delete = DailyRollup.__table__.delete()
+    source = select(
+        Transaction.user_id,
+        day.label('day'),
+        Transaction.category_id,
+        Transaction.account_id,
+        func.min(Transaction.kind),
+        func.sum(Transaction.amount),
+        func.count(Transaction.id)
+    ).group_by(Transaction.user_id, day, Transaction.category_id, Transaction.account_id)
+
+    if user_id is not None:
+        delete = delete.where(DailyRollup.user_id == user_id)
+        source = source.where(Transaction.user_id == user_id)
+
+    sync_transaction_kinds(user_id)
+    db.session.execute(delete)
+    result = db.session.execute(
+        DailyRollup.__table__.insert().from_select(
+            ['user_id', 'day', 'category_id', 'account_id', 'kind', 'total', 'txn_count'],
+            source
+        )
+    )
+
+    user_ids = [user_id] if user_id is not None else db.session.execute(select(User.id)).scalars().all()
+    if user_ids:
+        connection = db.session.connection()
+        _summary_upsert(
+            connection,
+            [compute_user_summary(connection, uid) for uid in user_ids],
+            accumulate=False
+        )
+
+    db.session.commit()
+    return result.rowcount
+
+
+def _full_day_span(start_date, end_date):
+    """
+    Split an inclusive datetime range into whole days and partial edges.
+
+    Args:
+        start_date (datetime, optional): Range start (inclusive)
+        end_date (datetime, optional): Range end (inclusive)
+
+    Returns:
+        tuple: (first_day, last_day, edges) where first_day/last_day bound the
+               whole days (either may be None for an open end) and edges is a
+               list of (start, end) inclusive datetime ranges to read raw
+    """
+    first_day = last_day = None
+    edges = []
+
+    if start_date is not None:
+        first_day = start_date.date()
+        if start_date.time() != time.min:
+            first_day += timedelta(days=1)
+
+    if end_date is not None:
+        last_day = end_date.date()
+        if (end_date + timedelta(microseconds=1)).time() != time.min:
+            last_day -= timedelta(days=1)
+
+    if first_day is not None and last_day is not None and first_day > last_day:
+        # The whole range sits inside partial days
+        return None, None, [(start_date, end_date)]
+
+    if start_date is not None and datetime.combine(first_day, time.min) > start_date:
+        edges.append((start_date, datetime.combine(first_day, time.min) - timedelta(microseconds=1)))
+    if end_date is not None and datetime.combine(last_day, time.max) < end_date:
+        edges.append((datetime.combine(last_day + timedelta(days=1), time.min), end_date))
+
+    return first_day, last_day, edges
+
+
+def ledger_rows(user_id, start_date=None, end_date=None):
+    """
+    Build a subquery of per-category, per-account amounts for a date range.
+
+    Whole days are read from daily_rollups; only the partial days at either
+    edge of the range are read from the raw transactions table.
+
+    Args:
+        user_id (int): User ID
+        start_date (datetime, optional): Range start (inclusive)
+        end_date (datetime, optional): Range end (inclusive)
+
+    Returns:
+        Subquery with category_id, account_id, kind, total and txn_count columns
+    """
+    first_day, last_day, edges = _full_day_span(start_date, end_date)
+
+    selects = []
+    if first_day is not None or last_day is not None or not edges:
+        rollup_select = select(
+            DailyRollup.category_id,
+            DailyRollup.account_id,
+            DailyRollup.kind,
+            DailyRollup.total.label('total'),
+            DailyRollup.txn_count.label('txn_count')
+        ).where(DailyRollup.user_id == user_id)
+        if first_day is not None:
+            rollup_select = rollup_select.where(DailyRollup.day >= first_day)
+        if last_day is not None:
+            rollup_select = rollup_select.where(DailyRollup.day <= last_day)
+        selects.append(rollup_select)
+
+    for edge_start, edge_end in edges:
+        selects.append(select(
+            Transaction.category_id,
+            Transaction.account_id,
+            Transaction.kind,
+            Transaction.amount.label('total'),
+            literal(1).label('txn_count')
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.date >= edge_start,
+            Transaction.date <= edge_end
+        ))
+
+    if len(selects) == 1:
+        return selects[0].subquery('ledger')
+    return union_all(*selects).subquery('ledger')
+
+
+@rollups_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only rebuild rollups for this user.')
+def rebuild_command(user_id):
+    """Rebuild daily rollups and user summaries from the raw tables."""
+    if user_id is not None and db.session.get(User, user_id) is None:
+        raise click.ClickException(f'User {user_id} not found')
+
+    count = rebuild_rollups(user_id)
+    click.echo(f'Rebuilt {count} daily rollup rows and the user summaries.')
@@ -0,0 +1,340 @@
+"""
+Transaction search for DumpMyCash.
+
+The search box matches a term against the transaction description and the
+names of its category and account. This module serves both parts without
+scanning the user's history:
+
+- category and account names are matched in memory against the user's
+  cached reference data (see app.reference); matching rows are then found
+  by category_id/account_id on the existing indexes
+- descriptions are matched through a trigram index: on SQLite a
+  contentless FTS5 table (transactions_fts, trigram tokenizer) kept current
+  by triggers on transactions, on Postgres a pg_trgm GIN index serving
+  ILIKE and the similarity operator. Terms shorter than a trigram, and
+  databases without the index, fall back to ILIKE.
+- every FTS5 row also holds an owner token ('<user_id>'), and every MATCH
+  requires the user's token, so the index only yields the user's rows
+  instead of matches from all users filtered afterwards
+
+The triggers fire for every write path, ORM or Core. Recreating the
+transactions table (e.g. an Alembic batch migration on SQLite) drops them;
+'flask search rebuild' restores the index.
+
+search_transactions() additionally ranks by fuzzy similarity, so typos
+and partial words still find descriptions, prefix matches first.
+"""
+
+import re
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import column, event, func, or_, select, table, text
+from sqlalchemy.exc import OperationalError
+
+from app.models import db, Transaction
+from app.reference import get_reference_data
+
+SEARCH_TABLE = 'transactions_fts'
+TRIGRAM_INDEX = 'ix_transactions_description_trgm'
+# Shortest term the trigram indexes can serve
+MIN_INDEXED_TERM_LENGTH = 3
+# Share of the term's trigrams a description must contain to match fuzzily
+MIN_SIMILARITY = 0.5
+# Candidates read from the index per requested result before scoring
+CANDIDATES_PER_RESULT = 5
+
+_OWNER_TOKEN_SQL = "'<' || {}.user_id || '>'"
+SQLITE_SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "description, owner, content='', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON transactions BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, description, owner) "
+    f"VALUES (new.id, new.description, {_OWNER_TOKEN_SQL.format('new')}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON transactions BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, description, owner) "
+    f"VALUES ('delete', old.id, old.description, {_OWNER_TOKEN_SQL.format('old')}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF description, user_id ON transactions BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, description, owner) "
+    f"VALUES ('delete', old.id, old.description, {_OWNER_TOKEN_SQL.format('old')}); "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, description, owner) "
+    f"VALUES (new.id, new.description, {_OWNER_TOKEN_SQL.format('new')}); END",
+)
+# A contentless table cannot 'rebuild' itself, it is refilled from transactions
+SQLITE_SEARCH_FILL = (
+    f"INSERT INTO {SEARCH_TABLE}(rowid, description, owner) "
+    f"SELECT id, description, {_OWNER_TOKEN_SQL.format('transactions')} FROM transactions"
+)
+POSTGRES_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON transactions USING gin (description gin_trgm_ops)",
+)
+
+search_table = table(SEARCH_TABLE, column('rowid'), column(SEARCH_TABLE), column('rank'))
+search_cli = AppGroup('search', help='Manage the transaction search index.')
+
+
+def create_search_index(connection):
+    """
+    Create the description index of the connection's database.
+
+    Args:
+        connection: SQLAlchemy connection
+
+    Returns:
+        bool: Whether the dialect supports the index and it now exists
+    """
+    dialect = connection.dialect.name
+    statements = {'sqlite': SQLITE_SEARCH_DDL, 'postgresql': POSTGRES_SEARCH_DDL}.get(dialect)
+    if statements is None:
+        return False
+    try:
+        for statement in statements:
+            connection.exec_driver_sql(statement)
+    except OperationalError:
+        # SQLite builds without FTS5 or its trigram tokenizer (before 3.34)
+        current_app.logger.warning('Transaction search index unavailable, falling back to ILIKE')
+        return False
+    return True
+
+
+def _create_on_table_create(target, connection, **kw):
+    """Table after_create hook adding the search index next to transactions."""
+    create_search_index(connection)
+
+
+def _drop_on_table_drop(target, connection, **kw):
+    """Table before_drop hook; the FTS table is not part of the metadata."""
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def register_search_ddl():
+    """Create and drop the search index together with the transactions table."""
+    if not event.contains(Transaction.__table__, 'after_create', _create_on_table_create):
+        event.listen(Transaction.__table__, 'after_create', _create_on_table_create)
+    if not event.contains(Transaction.__table__, 'before_drop', _drop_on_table_drop):
+        event.listen(Transaction.__table__, 'before_drop', _drop_on_table_drop)
+
+
+def _search_backend():
+    """Return 'fts5', 'trigram' or None for the application's database, detected once."""
+    backend = current_app.extensions.get('transaction_search_backend', False)
+    if backend is False:
+        dialect = db.engine.dialect.name
+        backend = None
+        if dialect == 'sqlite':
+            found = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': SEARCH_TABLE}
+            ).first()
+            backend = 'fts5' if found else None
+        elif dialect == 'postgresql':
+            backend = 'trigram'
+        current_app.extensions['transaction_search_backend'] = backend
+    return backend
+
+
+def _fts_phrase(term):
+    """Quote a term as an FTS5 phrase; with trigram tokens it matches as a substring."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _user_match(user_id, query):
+    """
+    Build the MATCH condition of an FTS5 query on one user's descriptions.
+
+    Args:
+        user_id (int): Owner of the transactions
+        query (str): FTS5 query on the description column
+
+    Returns:
+        ColumnElement: Condition on search_table
+    """
+    owner = _fts_phrase(f'<{int(user_id)}>')
+    return search_table.c[SEARCH_TABLE].match(f'owner : {owner} AND description : ({query})')
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def description_condition(user_id, term):
+    """
+    Build the condition matching descriptions of a user that contain a term.
+
+    Args:
+        user_id (int): User ID; the caller still filters Transaction.user_id
+        term (str): Search term, matched case insensitively
+
+    Returns:
+        ColumnElement: Condition on Transaction
+    """
+    if len(term) >= MIN_INDEXED_TERM_LENGTH and _search_backend() == 'fts5':
+        return Transaction.id.in_(
+            select(search_table.c.rowid).where(_user_match(user_id, _fts_phrase(term)))
+        )
+    # Served by the trigram GIN index on Postgres
+    return Transaction.description.ilike(f'%{_escape_like(term)}%', escape='\\')
+
+
+def _matching_names(refs, term):
+    folded = term.casefold()
+    return [ref.id for ref in refs if folded in ref.name.casefold()]
+
+
+def search_condition(user_id, term):
+    """
+    Build the condition matching transactions of a user whose description,
+    category name or account name contains a term.
+
+    Args:
+        user_id (int): User ID
+        term (str): Search term, matched case insensitively
+
+    Returns:
+        ColumnElement: Condition on Transaction
+    """
+    reference = get_reference_data(user_id)
+    conditions = [description_condition(user_id, term)]
+    category_ids = _matching_names(reference.categories.values(), term)
+    if category_ids:
+        conditions.append(Transaction.category_id.in_(category_ids))
+    account_ids = _matching_names(reference.accounts.values(), term)
+    if account_ids:
+        conditions.append(Transaction.account_id.in_(account_ids))
+    return or_(*conditions)
+
+
+def _words(value):
+    return re.findall(r'\w+', value.casefold())
+
+
+def _trigrams(value, query=False):
+    """
+    Split text into padded word trigrams, like pg_trgm.
+
+    Query trigrams are only padded in front, so a query that is a prefix of
+    a word has all of its trigrams in that word.
+    """
+    grams = set()
+    for word in _words(value):
+        padded = '  ' + word + ('' if query else ' ')
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(term, value):
+    """
+    Share of the term's trigrams found in a value.
+
+    Args:
+        term (str): Search term
+        value (str): Text to score
+
+    Returns:
+        float: 1.0 when every word of term starts a word of value, lower
+               for substrings inside words and for typos
+    """
+    term_grams = _trigrams(term, query=True)
+    if not term_grams or not value:
+        return 0.0
+    return len(term_grams & _trigrams(value)) / len(term_grams)
+
+
+def _description_candidates(user_id, term, limit):
+    """Select income and expense transactions whose description may match term."""
+    statement = select(
+        Transaction.id, Transaction.date, Transaction.description, Transaction.amount,
+        Transaction.category_id, Transaction.account_id
+    ).where(
+        Transaction.user_id == user_id,
+        Transaction.kind != 'transfer'
+    )
+
+    backend = _search_backend()
+    inner_grams = {gram for gram in _trigrams(term, query=True) if ' ' not in gram}
+    if backend == 'fts5' and inner_grams:
+        # Any shared trigram makes a candidate; bm25 puts the closest first
+        statement = statement.join(search_table, search_table.c.rowid == Transaction.id).where(
+            _user_match(user_id, ' OR '.join(_fts_phrase(gram) for gram in sorted(inner_grams)))
+        ).order_by(search_table.c.rank)
+    elif backend == 'trigram' and inner_grams:
+        statement = statement.where(
+            or_(Transaction.description.op('%')(term), Transaction.description.ilike(f'%{_escape_like(term)}%', escape='\\'))
+        ).order_by(func.similarity(Transaction.description, term).desc())
+    else:
+        statement = statement.where(
+            Transaction.description.ilike(f'%{_escape_like(term)}%', escape='\\')
+        ).order_by(Transaction.date.desc())
+
+    return db.session.execute(statement.limit(limit * CANDIDATES_PER_RESULT)).all()
+
+
+def search_transactions(user_id, term, limit=20):
+    """
+    Rank a user's transactions, categories and accounts against a search term.
+
+    Descriptions are matched fuzzily through the trigram index; names of
+    categories and accounts are scored in memory. Results scoring below
+    MIN_SIMILARITY are dropped. Transfers are excluded.
+
+    Args:
+        user_id (int): User ID
+        term (str): Search term
+        limit (int): Maximum number of transactions
+
+    Returns:
+        dict: 'transactions' (rows with their score, best first, newest first
+              among equal scores), 'categories' and 'accounts' (matching
+              names with their score, best first)
+    """
+    reference = get_reference_data(user_id)
+
+    transactions = []
+    for row in _description_candidates(user_id, term, limit):
+        score = similarity(term, row.description)
+        if score >= MIN_SIMILARITY:
+            transactions.append((score, row))
+    transactions.sort(key=lambda item: (-item[0], -item[1].date.timestamp(), -item[1].id))
+
+    def ranked(refs):
+        scored = [(similarity(term, ref.name), ref) for ref in refs]
+        return sorted(
+            [(score, ref) for score, ref in scored if score >= MIN_SIMILARITY],
+            key=lambda item: (-item[0], item[1].name)
+        )
+
+    return {
+        'transactions': [
+            (score, row, reference.category(row.category_id), reference.account(row.account_id))
+            for score, row in transactions[:limit]
+        ],
+        'categories': ranked(reference.categories.values()),
+        'accounts': ranked(reference.accounts.values())
+    }
+
+
+def rebuild_search_index():
+    """
+    Recreate the search index and, on SQLite, refill it from transactions.
+
+    Returns:
+        bool: Whether the database supports the index
+    """
+    connection = db.session.connection()
+    created = create_search_index(connection)
+    if created and connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')")
+        connection.exec_driver_sql(SQLITE_SEARCH_FILL)
+    db.session.commit()
+    current_app.extensions.pop('transaction_search_backend', None)
+    return created
+
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Recreate the transaction search index and its triggers."""
+    if not rebuild_search_index():
+        raise click.ClickException('This database does not support the search index; search uses ILIKE.')
+    click.echo('Rebuilt the transaction search index.')
@@ -51,3 +51,33 @@ function formatCurrency(amount) {
         currency: 'USD'
     }).format(amount);
 }
+
+// How often a running background job is polled, in milliseconds
+const JOB_POLL_INTERVAL_MS = 1000;
+
+/**
+ * Start a heavy operation as a background job and wait for it to finish
+ * @param {string} url - Endpoint that accepts the "Prefer: respond-async" header
+ * @param {Object} options - fetch options (method, headers, body)
+ * @returns {Promise<Object>} The finished job, with download_url when it produced a file
+ */
+async function runBackgroundJob(url, options = {}) {
+    const headers = Object.assign({}, options.headers, { 'Prefer': 'respond-async' });
+    const response = await fetch(url, Object.assign({}, options, { headers }));
+    const started = await response.json();
+    if (response.status !== 202) {
+        throw new Error(started.error || started.message || 'Could not start the job');
+    }
+
+    while (true) {
+        const job = await (await fetch(started.status_url)).json();
+        if (job.status === 'succeeded') {
+            return job;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'The job failed');
+        }
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
+
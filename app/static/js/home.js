@@ -12,6 +12,7 @@ const DASHBOARD_CONFIG = {
     ],
     maxCategoryDisplay: 5,
     apiEndpoints: {
+        bundle: '/home/api/bundle',
         stats: '/home/api/stats',
         categoryBreakdown: '/home/api/category-breakdown',
         weeklyExpenses: '/home/api/weekly-expenses',
@@ -50,14 +51,36 @@ function initializeDashboard() {
         return;
     }
     
+    const bundle = readEmbeddedBundle();
+    
     initializeQuickActions();
-    initializeCharts();
-    loadPeriodStatistics();
+    if (bundle) {
+        // Server already rendered the statistics; only the charts need drawing
+        initializeCharts(bundle);
+    } else {
+        refreshAllStats();
+    }
     setupAutoRefresh();
     
     dashboardState.isInitialized = true;
 }
 
+/**
+ * Read the dashboard bundle embedded in the page by the server
+ * @returns {Object|null} Bundle data or null if missing or invalid
+ */
+function readEmbeddedBundle() {
+    const element = document.getElementById('dashboard-bundle');
+    if (!element) return null;
+    
+    try {
+        return JSON.parse(element.textContent);
+    } catch (error) {
+        console.error('Error parsing embedded dashboard data:', error);
+        return null;
+    }
+}
+
 /**
  * Initialize quick action buttons
  */
@@ -94,8 +117,9 @@ function navigateToPage(url) {
 /**
  * Update statistics display with new data
  * @param {Object} stats - Statistics data from API
+ * @param {Object} month - Current month totals from the periods payload
  */
-function updateStatisticsDisplay(stats) {
+function updateStatisticsDisplay(stats, month) {
     const updates = [
         { 
             selector: '[data-stat="total-balance"]', 
@@ -104,7 +128,7 @@ function updateStatisticsDisplay(stats) {
         },
         { 
             selector: '[data-stat="monthly-net"]', 
-            value: stats.period_net,
+            value: month.net,
             formatter: formatCurrency
         }
     ];
@@ -119,30 +143,27 @@ function updateStatisticsDisplay(stats) {
 }
 
 /**
- * Refresh statistics from server
- * @param {number} days - Number of days for period statistics
+ * Fetch all dashboard statistics and chart data in a single request
+ * @returns {Promise<Object|null>} Bundle data or null on failure
  */
-async function refreshStatistics(days = 30) {
+async function fetchDashboardBundle() {
     try {
-        const response = await fetch(`${DASHBOARD_CONFIG.apiEndpoints.stats}?days=${days}`);
+        const response = await fetch(DASHBOARD_CONFIG.apiEndpoints.bundle);
+        
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
         const data = await response.json();
         
         if (data.status === 'success') {
-            updateStatisticsDisplay(data.data);
-        } else {
-            console.error('Failed to refresh statistics:', data.message);
+            return data.data;
         }
+        console.error('Failed to refresh dashboard:', data.message);
     } catch (error) {
-        console.error('Error refreshing statistics:', error);
+        console.error('Error refreshing dashboard:', error);
     }
-}
-
-/**
- * Load period statistics (weekly and daily)
- */
-function loadPeriodStatistics() {
-    loadWeeklyStats();
-    loadDailyStats();
+    return null;
 }
 
 /**
@@ -158,81 +179,99 @@ function setupAutoRefresh() {
 
 /**
  * Initialize charts if Chart.js is available
+ * @param {Object} bundle - Dashboard bundle data
  */
-function initializeCharts() {
+function initializeCharts(bundle) {
     if (typeof Chart === 'undefined') {
         console.warn('Chart.js not loaded, skipping chart initialization');
         return;
     }
     
-    initializeDailyExpensesChart();
-    initializeMonthlyExpensesChart();
+    initializeDailyExpensesChart(bundle.daily_expenses);
+    initializeMonthlyExpensesChart(bundle.monthly_expenses);
+}
+
+/**
+ * Update chart datasets in place without recreating the charts
+ * @param {Object} bundle - Dashboard bundle data
+ */
+function updateCharts(bundle) {
+    const { dailyExpenses, monthlyExpenses } = dashboardState.charts;
+    
+    if (!dailyExpenses || !monthlyExpenses) {
+        initializeCharts(bundle);
+        return;
+    }
+    
+    dailyExpenses.data.labels = bundle.daily_expenses.map(day => day.day);
+    dailyExpenses.data.datasets[0].data = bundle.daily_expenses.map(day => day.expenses);
+    dailyExpenses.update('none');
+    
+    monthlyExpenses.data.labels = bundle.monthly_expenses.map(month => month.month_name);
+    monthlyExpenses.data.datasets[0].data = bundle.monthly_expenses.map(month => month.expenses);
+    monthlyExpenses.update('none');
 }
 
 /**
  * Initialize daily expenses chart
+ * @param {Array} days - Daily expenses data for the current month
  */
-async function initializeDailyExpensesChart() {
+function initializeDailyExpensesChart(days) {
     const chartContainer = document.getElementById('daily-expenses-chart');
     if (!chartContainer) return;
     
     try {
-        const response = await fetch(DASHBOARD_CONFIG.apiEndpoints.dailyExpenses);
-        const data = await response.json();
+        const ctx = chartContainer.getContext('2d');
         
-        if (data.status === 'success') {
-            const ctx = chartContainer.getContext('2d');
-            
-            // Destroy existing chart if it exists
-            if (dashboardState.charts.dailyExpenses) {
-                dashboardState.charts.dailyExpenses.destroy();
-            }
-            
-            dashboardState.charts.dailyExpenses = new Chart(ctx, {
-                type: 'bar',
-                data: {
-                    labels: data.data.map(day => day.day),
-                    datasets: [{
-                        label: 'Expenses',
-                        data: data.data.map(day => day.expenses),
-                        backgroundColor: 'rgba(220, 53, 69, 0.8)',
-                        borderColor: '#dc3545',
-                        borderWidth: 1,
-                        borderRadius: 4
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            ticks: {
-                                callback: function(value) {
-                                    return formatCurrency(value);
-                                }
-                            }
-                        },
-                        x: {
-                            title: {
-                                display: true,
-                                text: 'Day of Month'
+        // Destroy existing chart if it exists
+        if (dashboardState.charts.dailyExpenses) {
+            dashboardState.charts.dailyExpenses.destroy();
+        }
+        
+        dashboardState.charts.dailyExpenses = new Chart(ctx, {
+            type: 'bar',
+            data: {
+                labels: days.map(day => day.day),
+                datasets: [{
+                    label: 'Expenses',
+                    data: days.map(day => day.expenses),
+                    backgroundColor: 'rgba(220, 53, 69, 0.8)',
+                    borderColor: '#dc3545',
+                    borderWidth: 1,
+                    borderRadius: 4
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                scales: {
+                    y: {
+                        beginAtZero: true,
+                        ticks: {
+                            callback: function(value) {
+                                return formatCurrency(value);
                             }
                         }
                     },
-                    plugins: {
-                        legend: { display: false },
-                        tooltip: {
-                            callbacks: {
-                                label: function(context) {
-                                    return `Day ${context.label}: ${formatCurrency(context.parsed.y)}`;
-                                }
+                    x: {
+                        title: {
+                            display: true,
+                            text: 'Day of Month'
+                        }
+                    }
+                },
+                plugins: {
+                    legend: { display: false },
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                return `Day ${context.label}: ${formatCurrency(context.parsed.y)}`;
                             }
                         }
                     }
                 }
-            });
-        }
+            }
+        });
     } catch (error) {
         console.error('Error initializing daily expenses chart:', error);
     }
@@ -240,68 +279,64 @@ async function initializeDailyExpensesChart() {
 
 /**
  * Initialize monthly expenses chart
+ * @param {Array} months - Monthly expenses data for the current year
  */
-async function initializeMonthlyExpensesChart() {
+function initializeMonthlyExpensesChart(months) {
     const chartContainer = document.getElementById('monthly-expenses-chart');
     if (!chartContainer) return;
     
     try {
-        const response = await fetch(DASHBOARD_CONFIG.apiEndpoints.monthlyExpenses);
-        const data = await response.json();
+        const ctx = chartContainer.getContext('2d');
         
-        if (data.status === 'success') {
-            const ctx = chartContainer.getContext('2d');
-            
-            // Destroy existing chart if it exists
-            if (dashboardState.charts.monthlyExpenses) {
-                dashboardState.charts.monthlyExpenses.destroy();
-            }
-            
-            dashboardState.charts.monthlyExpenses = new Chart(ctx, {
-                type: 'bar',
-                data: {
-                    labels: data.data.map(month => month.month_name),
-                    datasets: [{
-                        label: 'Expenses',
-                        data: data.data.map(month => month.expenses),
-                        backgroundColor: 'rgba(220, 53, 69, 0.8)',
-                        borderColor: '#dc3545',
-                        borderWidth: 1,
-                        borderRadius: 4
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            ticks: {
-                                callback: function(value) {
-                                    return formatCurrency(value);
-                                }
-                            }
-                        },
-                        x: {
-                            title: {
-                                display: true,
-                                text: 'Month (Current Year)'
+        // Destroy existing chart if it exists
+        if (dashboardState.charts.monthlyExpenses) {
+            dashboardState.charts.monthlyExpenses.destroy();
+        }
+        
+        dashboardState.charts.monthlyExpenses = new Chart(ctx, {
+            type: 'bar',
+            data: {
+                labels: months.map(month => month.month_name),
+                datasets: [{
+                    label: 'Expenses',
+                    data: months.map(month => month.expenses),
+                    backgroundColor: 'rgba(220, 53, 69, 0.8)',
+                    borderColor: '#dc3545',
+                    borderWidth: 1,
+                    borderRadius: 4
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                scales: {
+                    y: {
+                        beginAtZero: true,
+                        ticks: {
+                            callback: function(value) {
+                                return formatCurrency(value);
                             }
                         }
                     },
-                    plugins: {
-                        legend: { display: false },
-                        tooltip: {
-                            callbacks: {
-                                label: function(context) {
-                                    return `${context.label}: ${formatCurrency(context.parsed.y)}`;
-                                }
+                    x: {
+                        title: {
+                            display: true,
+                            text: 'Month (Current Year)'
+                        }
+                    }
+                },
+                plugins: {
+                    legend: { display: false },
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                return `${context.label}: ${formatCurrency(context.parsed.y)}`;
                             }
                         }
                     }
                 }
-            });
-        }
+            }
+        });
     } catch (error) {
         console.error('Error initializing monthly expenses chart:', error);
     }
@@ -338,106 +373,40 @@ async function loadPeriodStats(days, elementId, breakdownId) {
 }
 
 /**
- * Load weekly statistics using same calculation as transactions/categories
+ * Update a period statistics card (weekly or daily)
+ * @param {string} prefix - Element ID prefix ('weekly' or 'daily')
+ * @param {Object} stats - Period statistics with income, expenses and net
  */
-async function loadWeeklyStats() {
-    try {
-        const response = await fetch('/home/api/week-stats');
-        
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
-        
-        if (data.status === 'success') {
-            const stats = data.data;
-            const formattedNet = formatCurrency(stats.net);
-            const formattedIncome = formatCurrency(stats.income);
-            const formattedExpenses = formatCurrency(stats.expenses);
-            
-            // Update balance text
-            updateElementText('weekly-balance', formattedNet);
-            
-            // Update color class based on positive/negative value
-            const weeklyContainer = document.getElementById('weekly-net-container');
-            if (weeklyContainer) {
-                weeklyContainer.className = stats.net >= 0 ? 'text-success' : 'text-danger';
-            }
-            
-            updateElementHTML('weekly-breakdown', 
-                `<span class="text-success">+${formattedIncome}</span> | 
-                 <span class="text-danger">-${formattedExpenses}</span>`);
-        }
-    } catch (error) {
-        console.error('Error loading weekly stats:', error);
-        updateElementText('weekly-balance', 'Error');
-        updateElementHTML('weekly-breakdown', 
-            '<span class="text-muted">Unable to load</span>');
-        
-        // Reset color class on error
-        const weeklyContainer = document.getElementById('weekly-net-container');
-        if (weeklyContainer) {
-            weeklyContainer.className = 'text-muted';
-        }
-    }
-}
-
-/**
- * Load daily statistics using same calculation as transactions/categories
- */
-async function loadDailyStats() {
-    try {
-        const response = await fetch('/home/api/today-stats');
-        
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
-        
-        if (data.status === 'success') {
-            const stats = data.data;
-            const formattedNet = formatCurrency(stats.net);
-            const formattedIncome = formatCurrency(stats.income);
-            const formattedExpenses = formatCurrency(stats.expenses);
-            
-            // Update balance text
-            updateElementText('daily-balance', formattedNet);
-            
-            // Update color class based on positive/negative value
-            const dailyContainer = document.getElementById('daily-net-container');
-            if (dailyContainer) {
-                dailyContainer.className = stats.net >= 0 ? 'text-success' : 'text-danger';
-            }
-            
-            updateElementHTML('daily-breakdown', 
-                `<span class="text-success">+${formattedIncome}</span> | 
-                 <span class="text-danger">-${formattedExpenses}</span>`);
-        }
-    } catch (error) {
-        console.error('Error loading daily stats:', error);
-        updateElementText('daily-balance', 'Error');
-        updateElementHTML('daily-breakdown', 
-            '<span class="text-muted">Unable to load</span>');
-        
-        // Reset color class on error
-        const dailyContainer = document.getElementById('daily-net-container');
-        if (dailyContainer) {
-            dailyContainer.className = 'text-muted';
-        }
-    }
+function updatePeriodStats(prefix, stats) {
+    const formattedNet = formatCurrency(stats.net);
+    const formattedIncome = formatCurrency(stats.income);
+    const formattedExpenses = formatCurrency(stats.expenses);
+    
+    // Update balance text
+    updateElementText(`${prefix}-balance`, formattedNet);
+    
+    // Update color class based on positive/negative value
+    updateElementClass(`${prefix}-net-container`, stats.net >= 0 ? 'text-success' : 'text-danger');
+    
+    updateElementHTML(`${prefix}-breakdown`, 
+        `<span class="text-success">+${formattedIncome}</span> | 
+         <span class="text-danger">-${formattedExpenses}</span>`);
 }
 
 /**
- * Refresh all statistics
+ * Refresh all statistics and charts with one bundle request
  */
 async function refreshAllStats() {
-    await Promise.all([
-        refreshStatistics(),
-        loadWeeklyStats(),
-        loadDailyStats()
-    ]);
+    const bundle = await fetchDashboardBundle();
+    if (!bundle) return;
+    
+    updateStatisticsDisplay(bundle.stats, bundle.periods.month);
+    updatePeriodStats('weekly', bundle.week);
+    updatePeriodStats('daily', bundle.today);
+    
+    if (typeof Chart !== 'undefined') {
+        updateCharts(bundle);
+    }
 }
 
 /**
@@ -9,6 +9,7 @@ function initializeProfilePage() {
     setupDeleteDataModal();
     setupDeleteAccountModal();
     setupRestoreDataModal();
+    setupExportData();
     loadUserStatistics();
     showFlashMessages();
 }
@@ -220,8 +221,9 @@ function setupDeleteAccountModal() {
 
         confirmButton.addEventListener('click', function() {
             if (deleteInput2.value === 'PERMANENTLY DELETE') {
-                // Send deletion request to the server
-                fetch('/profile/delete-account', {
+                // Deleting a long history runs as a background job on the server
+                showFlashMessage('Deleting your account...', 'info');
+                runBackgroundJob('/profile/delete-account', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
@@ -232,24 +234,17 @@ function setupDeleteAccountModal() {
                         confirmation2: deleteInput2.value
                     })
                 })
-                .then(response => response.json())
-                .then(data => {
-                    if (data.success) {
-                        showFlashMessage(data.message, 'success');
-                        
-                        // If logout is required, redirect after a delay
-                        if (data.logout) {
-                            setTimeout(() => {
-                                window.location.href = '/auth/login';
-                            }, 2000);
-                        }
-                    } else {
-                        showFlashMessage(data.message || 'Error deleting account', 'error');
-                    }
+                .then(job => {
+                    showFlashMessage(job.message, 'success');
+                    
+                    // The account is gone, so log out after a delay
+                    setTimeout(() => {
+                        window.location.href = '/auth/login';
+                    }, 2000);
                 })
                 .catch(error => {
                     console.error('Error:', error);
-                    showFlashMessage('Error deleting account', 'error');
+                    showFlashMessage(error.message || 'Error deleting account', 'error');
                 });
                 
                 // Close modal
@@ -333,8 +328,9 @@ function setupDeleteDataModal() {
 
         confirmButton.addEventListener('click', function() {
             if (deleteInput2.value === 'CONFIRM DELETE') {
-                // Send deletion request to the server
-                fetch('/profile/delete-all-data', {
+                // Deleting a long history runs as a background job on the server
+                showFlashMessage('Deleting your data...', 'info');
+                runBackgroundJob('/profile/delete-all-data', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
@@ -345,22 +341,15 @@ function setupDeleteDataModal() {
                         confirmation2: deleteInput2.value
                     })
                 })
-                .then(response => response.json())
-                .then(data => {
-                    if (data.success) {
-                        showFlashMessage(data.message, 'success');
-                        
-                        // Reload statistics to show zeros
-                        setTimeout(() => {
-                            loadUserStatistics();
-                        }, 1000);
-                    } else {
-                        showFlashMessage(data.message || 'Error deleting data', 'error');
-                    }
+                .then(job => {
+                    showFlashMessage(job.message, 'success');
+                    
+                    // Reload statistics to show zeros
+                    loadUserStatistics();
                 })
                 .catch(error => {
                     console.error('Error:', error);
-                    showFlashMessage('Error deleting data', 'error');
+                    showFlashMessage(error.message || 'Error deleting data', 'error');
                 });
                 
                 // Close modal
@@ -426,11 +415,12 @@ function setupRestoreDataModal() {
             backupFileInput.addEventListener('change', function() {
                 updateRestoreButton();
                 
-                // Validate file type
+                // Validate file types
                 if (this.files.length > 0) {
-                    const file = this.files[0];
-                    if (!file.name.toLowerCase().endsWith('.json')) {
-                        showFlashMessage('Please select a JSON file', 'error');
+                    const backupPattern = /\.(json|ndjson)(\.gz)?$/;
+                    const files = Array.from(this.files);
+                    if (!files.every(file => backupPattern.test(file.name.toLowerCase()))) {
+                        showFlashMessage('Please select JSON or NDJSON backup files', 'error');
                         this.value = '';
                         updateRestoreButton();
                     }
@@ -438,6 +428,28 @@ function setupRestoreDataModal() {
             });
         }
 
+        // Restore in a background job and report the outcome when it finishes
+        const restoreForm = document.getElementById('restoreDataForm');
+        if (restoreForm) {
+            restoreForm.addEventListener('submit', function(event) {
+                event.preventDefault();
+                const formData = new FormData(restoreForm);
+                
+                bootstrap.Modal.getInstance(document.getElementById('restoreDataModal')).hide();
+                showFlashMessage('Restoring your data...', 'info');
+                
+                runBackgroundJob(restoreForm.action, { method: 'POST', body: formData })
+                .then(job => {
+                    showFlashMessage(job.message, 'success');
+                    loadUserStatistics();
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    showFlashMessage(error.message || 'Error restoring data', 'error');
+                });
+            });
+        }
+
         // Reset when modal is closed
         document.getElementById('restoreDataModal').addEventListener('hidden.bs.modal', function() {
             confirmCheckbox.checked = false;
@@ -447,6 +459,26 @@ function setupRestoreDataModal() {
     }
 }
 
+function setupExportData() {
+    const exportBtn = document.getElementById('exportDataBtn');
+    if (!exportBtn) return;
+
+    // Build the backup in a background job, then download the finished file
+    exportBtn.addEventListener('click', function(event) {
+        event.preventDefault();
+        showFlashMessage('Preparing your backup...', 'info');
+        
+        runBackgroundJob(exportBtn.href)
+        .then(job => {
+            window.location.href = job.download_url;
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showFlashMessage(error.message || 'Error creating backup', 'error');
+        });
+    });
+}
+
 function showFlashMessage(message, type) {
     const flashContainer = document.getElementById('flash-container');
     if (!flashContainer) return;
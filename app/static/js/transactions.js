@@ -56,6 +56,32 @@ class TransactionManager {
         this.setupClearFiltersButton();
         this.setupTimeFilter();
         this.setupTransactionRowClicks();
+        this.setupExportButton();
+    }
+
+    /**
+     * Export CSV through a background job, then download the finished file
+     */
+    setupExportButton() {
+        const exportBtn = document.getElementById('exportCsvBtn');
+        if (!exportBtn) return;
+
+        exportBtn.addEventListener('click', (event) => {
+            event.preventDefault();
+            exportBtn.classList.add('disabled');
+
+            runBackgroundJob(exportBtn.href)
+                .then(job => {
+                    window.location.href = job.download_url;
+                })
+                .catch(error => {
+                    console.error('Error exporting transactions:', error);
+                    alert(`Error exporting transactions: ${error.message}`);
+                })
+                .finally(() => {
+                    exportBtn.classList.remove('disabled');
+                });
+        });
     }
 
     /**
@@ -131,7 +157,7 @@ class TransactionManager {
      * @param {URL} url - The URL object to modify
      */
     clearFilterParams(url) {
-        const paramsToRemove = ['category_id', 'account_id', 'search', 'filter', 'start_date', 'end_date', 'page'];
+        const paramsToRemove = ['category_id', 'account_id', 'search', 'filter', 'start_date', 'end_date', 'cursor'];
         paramsToRemove.forEach(param => url.searchParams.delete(param));
     }
 
@@ -217,7 +243,7 @@ class TransactionManager {
             url.searchParams.set('filter', 'custom');
             url.searchParams.set('start_date', startDate);
             url.searchParams.set('end_date', endDate);
-            url.searchParams.delete('page');
+            url.searchParams.delete('cursor');
             
             window.location.href = url.toString();
         }
@@ -967,7 +993,7 @@ class TransactionManager {
         url.searchParams.set('filter', filter);
         url.searchParams.delete('start_date');
         url.searchParams.delete('end_date');
-        url.searchParams.delete('page');
+        url.searchParams.delete('cursor');
         
         window.location.href = url.toString();
     }
@@ -0,0 +1,171 @@
+"""
+Category statistics for DumpMyCash.
+
+Every income/expense figure shown by the statistics endpoints comes from one
+scan of the user's categories left joined to the ledger, grouped by category
+with conditional sums. The same result set gives:
+- total income, total expenses and the transaction count (transfers excluded)
+- income and expense totals per category
+- the number of income and expense categories
+
+Results are cached per user and named period for STATS_CACHE_TTL_SECONDS;
+custom date ranges are never cached. Writes that change a user's ledger or
+categories mark the user on the database connection (see
+rollups.mark_ledger_changed) and the user's cached results are dropped when
+that transaction commits. The TTL bounds staleness for changes made by other
+processes, and the least recently used results are evicted beyond
+STATS_CACHE_MAX_ENTRIES.
+"""
+
+from flask import current_app, has_app_context
+from sqlalchemy import case, func, select
+
+from app.caching import CommitTracker, LRUCache
+from app.models import db, Category
+from app.rollups import ledger_rows, LEDGER_CHANGES_KEY
+
+DEFAULT_CACHE_TTL_SECONDS = 30
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class StatisticsCache(LRUCache):
+    """Thread safe LRU cache of category statistics keyed by user ID and period."""
+
+    def get(self, user_id, key):
+        return super().get((user_id, key))
+
+    def set(self, user_id, key, value, ttl, version):
+        """Store a result unless an invalidation happened since `version` was read."""
+        super().set((user_id, key), value, ttl, version)
+
+    def _drop_users(self, user_ids):
+        user_ids = set(user_ids)
+        for entry_key in [entry_key for entry_key in self._entries if entry_key[0] in user_ids]:
+            del self._entries[entry_key]
+
+
+def _cache():
+    """Return the application's statistics cache, creating it on first use."""
+    cache = current_app.extensions.get('statistics_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('statistics_cache', StatisticsCache(
+            current_app.config.get('STATS_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        ))
+    return cache
+
+
+def compute_category_totals(user_id, start_date=None, end_date=None):
+    """
+    Compute per-category totals of a user for a date range in one query.
+
+    Args:
+        user_id (int): User ID
+        start_date (datetime, optional): Range start (inclusive)
+        end_date (datetime, optional): Range end (inclusive)
+
+    Returns:
+        dict: 'categories' (list of dicts with id, name, emoji, type, income,
+              expenses and transaction_count, one per category of the user),
+              'total_income', 'total_expenses', 'transaction_count' and
+              'category_counts' ({'income': n, 'expense': n})
+    """
+    ledger = ledger_rows(user_id, start_date, end_date)
+    rows = db.session.execute(
+        select(
+            Category.id,
+            Category.name,
+            Category.unicode_emoji,
+            Category.type,
+            func.coalesce(func.sum(case((ledger.c.kind == 'income', ledger.c.total), else_=0)), 0).label('income'),
+            func.coalesce(func.sum(case((ledger.c.kind == 'expense', ledger.c.total), else_=0)), 0).label('expenses'),
+            func.coalesce(func.sum(case((ledger.c.kind != 'transfer', ledger.c.txn_count), else_=0)), 0).label('txn_count')
+        ).select_from(Category).outerjoin(
+            ledger, ledger.c.category_id == Category.id
+        ).where(
+            Category.user_id == user_id
+        ).group_by(
+            Category.id, Category.name, Category.unicode_emoji, Category.type
+        ).order_by(Category.id)
+    ).all()
+
+    categories = [{
+        'id': row.id,
+        'name': row.name,
+        'emoji': row.unicode_emoji,
+        'type': row.type,
+        'income': float(row.income),
+        'expenses': float(row.expenses),
+        'transaction_count': int(row.txn_count)
+    } for row in rows]
+
+    return {
+        'categories': categories,
+        'total_income': sum(category['income'] for category in categories),
+        'total_expenses': sum(category['expenses'] for category in categories),
+        'transaction_count': sum(category['transaction_count'] for category in categories),
+        'category_counts': {
+            category_type: sum(1 for category in categories if category['type'] == category_type)
+            for category_type in ('income', 'expense')
+        }
+    }
+
+
+def category_totals(user_id, start_date=None, end_date=None, cache_key=None):
+    """
+    Get per-category totals of a user, from the cache when possible.
+
+    Args:
+        user_id (int): User ID
+        start_date (datetime, optional): Range start (inclusive)
+        end_date (datetime, optional): Range end (inclusive)
+        cache_key (hashable, optional): Name of the period, e.g.
+            ('transactions', 'last_30_days'). Relative periods move with the
+            clock, so the key names the period rather than its dates.
+            Without a key the totals are always computed; pass none for
+            custom ranges, which would fill the cache with one-off entries.
+
+    Returns:
+        dict: See compute_category_totals(). Treat it as read only, it is shared.
+    """
+    if cache_key is None:
+        return compute_category_totals(user_id, start_date, end_date)
+
+    cache = _cache()
+    totals = cache.get(user_id, cache_key)
+    if totals is None:
+        version = cache.version
+        totals = compute_category_totals(user_id, start_date, end_date)
+        ttl = current_app.config.get('STATS_CACHE_TTL_SECONDS', DEFAULT_CACHE_TTL_SECONDS)
+        if ttl > 0:
+            cache.set(user_id, cache_key, totals, ttl, version)
+    return totals
+
+
+def totals_by_kind(totals, kind):
+    """
+    List the categories of one kind that have an amount, largest first.
+
+    Args:
+        totals (dict): Result of category_totals()
+        kind (str): 'income' or 'expense'
+
+    Returns:
+        list: (category dict, amount) tuples
+    """
+    field = 'income' if kind == 'income' else 'expenses'
+    rows = [(category, category[field]) for category in totals['categories'] if category[field]]
+    return sorted(rows, key=lambda row: row[1], reverse=True)
+
+
+def invalidate_user_statistics(user_ids):
+    """Drop the cached statistics of the given users."""
+    if has_app_context():
+        _cache().invalidate(user_ids)
+
+
+_ledger_changes = CommitTracker(LEDGER_CHANGES_KEY, invalidate_user_statistics)
+
+
+def register_statistics_listeners():
+    """Register the engine hooks that keep the statistics cache current."""
+    _ledger_changes.register()
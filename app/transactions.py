@@ -12,17 +12,51 @@ All transactions are properly tracked with account balance updates
 and exclude internal transfers from most operations.
 """
 
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, g, Response
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, g, Response, stream_with_context
 from app.auth import login_required, api_login_required
-from app.models import db, Transaction, Account, Category
+from app.idempotency import idempotent
+from app.jobs import job_handler, start_job, wants_async
+from app.statistics import category_totals, totals_by_kind
+from app.periods import get_date_range
+from app.reference import get_reference_data, read_categories
+from app.descriptions import suggest_descriptions, mark_descriptions_stale
+from app.changes import record_deletions
+from app.search import search_condition, search_transactions
+from app.models import db, Transaction, Account, Category, transaction_kind_for
+from app.rollups import ledger_rows, apply_transaction_deltas, day_expression
+from app.balances import apply_balance_deltas, balance_effect
+from app.pagination import keyset_paginate, clamp_per_page, InvalidCursorError, DEFAULT_PER_PAGE
 from datetime import datetime, timedelta
-from sqlalchemy import or_, and_, desc, func
+from sqlalchemy import and_, desc, func, select, bindparam
+from collections import defaultdict
 import csv
 import io
+import json
+import math
+import zlib
 
 # Initialize transaction blueprint
 transaction_bp = Blueprint('transactions', __name__, url_prefix='/transactions')
 
+# CSV export settings
+CSV_EXPORT_HEADERS = ['id', 'date', 'description', 'category', 'account', 'amount']
+EXPORT_CHUNK_SIZE = 1000
+GZIP_WBITS = 16 + zlib.MAX_WBITS  # zlib window with a gzip header and trailer
+
+# Bulk create settings
+BULK_INSERT_CHUNK_SIZE = 500
+BULK_CREATE_MAX_ROWS = 50000
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+# Bulk operation settings
+BULK_OPERATION_MAX_IDS = 10000
+BULK_OPERATION_VERBS = {
+    'delete': 'deleted',
+    'recategorize': 'recategorized',
+    'move': 'moved',
+    'shift_date': 'shifted'
+}
+
 def parse_datetime_local(date_string):
     """
     Parse datetime string from frontend, treating it as local time.
@@ -57,69 +91,34 @@ def parse_datetime_local(date_string):
         return datetime.now()
 
 
-def get_date_range(filter_type, start_date_str=None, end_date_str=None):
+def _estimate_transaction_total(user_id, start_date=None, end_date=None, account_id=None, category_id=None):
     """
-    Get date range based on filter type.
+    Estimate how many transactions a listing matches without counting rows.
+    
+    The count is read from the daily rollups. Search terms are not applied,
+    so for a searched listing it is an upper bound.
     
     Args:
-        filter_type (str): Type of filter ('today', 'week', 'month', 'quarter', 'year', 'custom', 'all')
-        start_date_str (str, optional): Start date for custom range in YYYY-MM-DD format
-        end_date_str (str, optional): End date for custom range in YYYY-MM-DD format
+        user_id (int): User ID
+        start_date (datetime, optional): Range start (inclusive)
+        end_date (datetime, optional): Range end (inclusive)
+        account_id (int, optional): Account filter
+        category_id (int, optional): Category filter
         
     Returns:
-        tuple: (start_date, end_date) or (None, None) for 'all' filter
+        int: Approximate number of matching transactions
     """
-    now = datetime.now()
+    ledger = ledger_rows(user_id, start_date, end_date)
+    query = db.session.query(
+        func.coalesce(func.sum(ledger.c.txn_count), 0)
+    ).select_from(ledger).filter(ledger.c.kind != 'transfer')
     
-    # Handle custom date range
-    if filter_type == 'custom' and start_date_str and end_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').replace(hour=23, minute=59, second=59, microsecond=999999)
-            return start_date, end_date
-        except ValueError:
-            # If custom dates are invalid, fallback to month
-            filter_type = 'month'
-    
-    if filter_type == 'today':
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-    elif filter_type == 'week':
-        # Monday of this week
-        start_date = now - timedelta(days=now.weekday())
-        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=6, hours=23, minutes=59, seconds=59, microseconds=999999)
-    elif filter_type == 'month' or not filter_type or filter_type not in ['today', 'week', 'quarter', 'year', 'all']:
-        # First day of current month (default for invalid filters)
-        start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        # Last day of current month
-        if now.month == 12:
-            end_date = now.replace(year=now.year + 1, month=1, day=1) - timedelta(microseconds=1)
-        else:
-            end_date = now.replace(month=now.month + 1, day=1) - timedelta(microseconds=1)
-    elif filter_type == 'quarter':
-        # Calculate current quarter
-        quarter = (now.month - 1) // 3 + 1
-        start_month = (quarter - 1) * 3 + 1
-        start_date = now.replace(month=start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        end_month = start_month + 2
-        if end_month > 12:
-            end_date = now.replace(year=now.year + 1, month=end_month - 12, day=1) - timedelta(microseconds=1)
-        else:
-            if end_month == 12:
-                end_date = now.replace(year=now.year + 1, month=1, day=1) - timedelta(microseconds=1)
-            else:
-                end_date = now.replace(month=end_month + 1, day=1) - timedelta(microseconds=1)
-    elif filter_type == 'year':
-        # First day of current year
-        start_date = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        # Last day of current year
-        end_date = now.replace(year=now.year + 1, month=1, day=1) - timedelta(microseconds=1)
-    else:  # 'all'
-        return None, None
+    if account_id:
+        query = query.filter(ledger.c.account_id == account_id)
+    if category_id:
+        query = query.filter(ledger.c.category_id == category_id)
     
-    return start_date, end_date
+    return int(query.scalar())
 
 @transaction_bp.route('/')
 @login_required
@@ -132,7 +131,7 @@ def list_transactions():
     - Category ID  
     - Date range (today, week, month, quarter, year, custom, all)
     - Search term
-    - Pagination
+    - Cursor pagination
     
     Excludes transfer transactions from the main view.
     """
@@ -144,13 +143,12 @@ def list_transactions():
     start_date_str = request.args.get('start_date')  # For custom date range
     end_date_str = request.args.get('end_date')      # For custom date range
     search = request.args.get('search', '')
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
+    cursor = request.args.get('cursor')
     
     # Build base query - exclude Transfer categories
     query = Transaction.query.filter(
         Transaction.user_id == g.user.id,
-        ~Transaction.category.has(Category.name == 'Transfer')  # Exclude transfers
+        Transaction.kind != 'transfer'  # Exclude transfers
     )
     
     # Apply filters
@@ -175,30 +173,23 @@ def list_transactions():
     
     # Apply search filter
     if search:
-        query = query.filter(
-            or_(
-                Transaction.description.ilike(f'%{search}%'),
-                Transaction.category.has(Category.name.ilike(f'%{search}%')),
-                Transaction.account.has(Account.name.ilike(f'%{search}%'))
-            )
-        )
-    
-    # Order by date descending
-    query = query.order_by(desc(Transaction.date))
+        query = query.filter(search_condition(g.user.id, search))
     
-    # Paginate results
-    transactions = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Seek newest first on (date, id); a stale or malformed cursor restarts at the first page
+    try:
+        transactions = keyset_paginate(query, Transaction.date, Transaction.id, cursor, DEFAULT_PER_PAGE)
+    except InvalidCursorError:
+        transactions = keyset_paginate(query, Transaction.date, Transaction.id, None, DEFAULT_PER_PAGE)
     
-    # Get accounts and categories for filters
-    accounts = Account.query.filter_by(user_id=g.user.id).all()
-    categories = Category.query.filter_by(user_id=g.user.id).all()
+    # Get accounts and categories for filters from the per-user cache
+    reference = get_reference_data(g.user.id)
+    accounts = list(reference.accounts.values())
+    categories = list(reference.categories.values())
     
     # Calculate statistics based on applied filter - exclude transfers
     stats_query = Transaction.query.filter(
         Transaction.user_id == g.user.id,
-        ~Transaction.category.has(Category.name == 'Transfer')  # Exclude transfers
+        Transaction.kind != 'transfer'  # Exclude transfers
     )
     if time_filter:
         if time_filter != 'all':
@@ -213,11 +204,11 @@ def list_transactions():
     
     # Calculate statistics
     total_income = stats_query.filter(
-        Transaction.category.has(Category.type == 'income')
+        Transaction.kind == 'income'
     ).with_entities(func.sum(Transaction.amount)).scalar() or 0
     
     total_expenses = stats_query.filter(
-        Transaction.category.has(Category.type == 'expense')
+        Transaction.kind == 'expense'
     ).with_entities(func.sum(Transaction.amount)).scalar() or 0
     
     # Get display names for filters
@@ -276,7 +267,8 @@ def api_list_transactions():
     - Category ID
     - Date range
     - Search term
-    - Pagination
+    - Cursor pagination ('cursor', 'per_page' capped at MAX_PER_PAGE)
+    - Optional approximate total ('include_total=true')
     
     Excludes transfer transactions.
     """
@@ -285,13 +277,15 @@ def api_list_transactions():
     category_id = request.args.get('category_id', type=int)
     date_range = request.args.get('date_range', 'last_30_days')
     search = request.args.get('search', '')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')
+    per_page = clamp_per_page(request.args.get('per_page', DEFAULT_PER_PAGE, type=int))
+    include_total = request.args.get('include_total', 'false').lower() == 'true'
+    start_date = None
     
     # Build base query - exclude Transfer categories
     query = Transaction.query.filter(
         Transaction.user_id == g.user.id,
-        ~Transaction.category.has(Category.name == 'Transfer')  # Exclude transfers
+        Transaction.kind != 'transfer'  # Exclude transfers
     )
     
     # Apply filters (same logic as list_transactions)
@@ -317,21 +311,25 @@ def api_list_transactions():
     
     # Apply search filter
     if search:
-        query = query.filter(
-            or_(
-                Transaction.description.ilike(f'%{search}%'),
-                Transaction.category.has(Category.name.ilike(f'%{search}%')),
-                Transaction.account.has(Account.name.ilike(f'%{search}%'))
-            )
-        )
+        query = query.filter(search_condition(g.user.id, search))
     
-    # Order by date descending
-    query = query.order_by(desc(Transaction.date))
-    
-    # Paginate results
-    transactions = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Seek newest first on (date, id) instead of OFFSET paging
+    try:
+        transactions = keyset_paginate(query, Transaction.date, Transaction.id, cursor, per_page)
+    except InvalidCursorError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    pagination = {
+        'per_page': transactions.per_page,
+        'has_next': transactions.has_next,
+        'has_prev': transactions.has_prev,
+        'next_cursor': transactions.next_cursor,
+        'prev_cursor': transactions.prev_cursor
+    }
+    if include_total:
+        pagination['total_estimate'] = _estimate_transaction_total(
+            g.user.id, start_date, account_id=account_id, category_id=category_id
+        )
     
     return jsonify({
         'transactions': [{
@@ -350,18 +348,16 @@ def api_list_transactions():
                 'unicode_emoji': t.category.unicode_emoji
             }
         } for t in transactions.items],
-        'pagination': {
-            'page': transactions.page,
-            'pages': transactions.pages,
-            'per_page': transactions.per_page,
-            'total': transactions.total,
-            'has_next': transactions.has_next,
-            'has_prev': transactions.has_prev
-        }
+        'pagination': pagination
     })
 
+def _account_balance(account_id):
+    """Read the committed balance of an account for API responses."""
+    return db.session.execute(select(Account.balance).where(Account.id == account_id)).scalar()
+
 @transaction_bp.route('/api/transactions', methods=['POST'])
 @api_login_required
+@idempotent
 def api_create_transaction():
     """
     API endpoint to create a new transaction.
@@ -391,13 +387,17 @@ def api_create_transaction():
             if field not in data or data[field] is None:
                 return jsonify({'error': f'Required field: {field}'}), 400
         
-        # Validate that account belongs to user
-        account = Account.query.filter_by(id=data['account_id'], user_id=g.user.id).first()
+        # Validate that account and category belong to user
+        reference = get_reference_data(g.user.id, [data['account_id']], [data['category_id']])
+        account = reference.account(data['account_id'])
         if not account:
             return jsonify({'error': 'Account not found'}), 404
         
-        # Validate that category belongs to user
-        category = Category.query.filter_by(id=data['category_id'], user_id=g.user.id).first()
+        category = reference.category(data['category_id'])
+        if not category:
+            return jsonify({'error': 'Category not found'}), 404
+        # The balance follows the category as it is now; the cache may be behind other processes
+        category = read_categories(db.session.connection(), g.user.id, [category.id]).get(category.id)
         if not category:
             return jsonify({'error': 'Category not found'}), 404
         
@@ -405,19 +405,18 @@ def api_create_transaction():
         transaction = Transaction(
             amount=float(data['amount']),
             description=data.get('description', ''),
-            account_id=data['account_id'],
-            category_id=data['category_id'],
+            account_id=account.id,
+            category_id=category.id,
             user_id=g.user.id,
             date=parse_datetime_local(data.get('date'))
         )
         
         db.session.add(transaction)
         
-        # Update account balance
-        if category.type == 'income':
-            account.balance += transaction.amount
-        else:  # expense
-            account.balance -= transaction.amount
+        # Update account balance in place so concurrent writes are not lost
+        apply_balance_deltas(db.session.connection(), g.user.id, {
+            account.id: balance_effect(category.type, transaction.amount)
+        })
         
         db.session.commit()
         
@@ -429,7 +428,7 @@ def api_create_transaction():
             'account': {
                 'id': account.id,
                 'name': account.name,
-                'balance': account.balance
+                'balance': _account_balance(account.id)
             },
             'category': {
                 'id': category.id,
@@ -445,6 +444,216 @@ def api_create_transaction():
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
 
+def _iter_bulk_payload():
+    """
+    Yield (index, item) pairs from a JSON array or a streamed NDJSON body.
+    
+    NDJSON bodies are read line by line from the request stream, so large
+    uploads are never held in memory as a whole. Lines that are not valid
+    JSON are yielded as None and reported as row errors.
+    
+    Raises:
+        ValueError: If a JSON body is not an array of transactions
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        index = 0
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = None
+            yield index, item
+            index += 1
+        return
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('transactions')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of transactions')
+    yield from enumerate(data)
+
+
+def _parse_bulk_row(item, account_ids, categories):
+    """
+    Validate one bulk row against the user's accounts and categories.
+    
+    Args:
+        item: Decoded JSON value of the row
+        account_ids (set): IDs of the user's accounts
+        categories (dict): Category ID -> (type, kind) for the user's categories
+        
+    Returns:
+        tuple: (row dict ready for insertion, None) or (None, error message)
+    """
+    if not isinstance(item, dict):
+        return None, 'Row must be a JSON object'
+    
+    for field in ('amount', 'account_id', 'category_id'):
+        if item.get(field) is None:
+            return None, f'Required field: {field}'
+    
+    try:
+        amount = float(item['amount'])
+        account_id = int(item['account_id'])
+        category_id = int(item['category_id'])
+    except (TypeError, ValueError):
+        return None, 'Invalid data'
+    if not math.isfinite(amount):
+        return None, 'Invalid amount'
+    
+    if account_id not in account_ids:
+        return None, 'Account not found'
+    if category_id not in categories:
+        return None, 'Category not found'
+    
+    date = datetime.now()
+    if item.get('date'):
+        try:
+            date = datetime.fromisoformat(str(item['date']).rstrip('Z'))
+        except ValueError:
+            return None, 'Invalid date'
+    
+    description = item.get('description') or ''
+    if not isinstance(description, str):
+        return None, 'Invalid description'
+    
+    return {
+        'amount': amount,
+        'description': description,
+        'account_id': account_id,
+        'category_id': category_id,
+        'kind': categories[category_id][1],
+        'date': date
+    }, None
+
+
+def _insert_bulk_chunk(connection, user_id, rows, indexes, categories, balance_deltas, rollup_deltas):
+    """
+    Insert a chunk of validated rows with one executemany.
+    
+    Balance and rollup changes are accumulated, not applied, so each account
+    gets a single update per request.
+    
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): User ID
+        rows (list): Validated row dicts from _parse_bulk_row()
+        indexes (list): Input position of each row
+        categories (dict): Category ID -> (type, kind)
+        balance_deltas (defaultdict): Account ID -> balance delta, updated in place
+        rollup_deltas (defaultdict): Rollup key -> [amount, count, kind], updated in place
+        
+    Returns:
+        list: Dicts with the input index and new ID of each inserted row
+    """
+    for row in rows:
+        row['user_id'] = user_id
+    
+    table = Transaction.__table__
+    new_ids = connection.execute(
+        table.insert().returning(table.c.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    
+    for row in rows:
+        sign = 1 if categories[row['category_id']][0] == 'income' else -1
+        balance_deltas[row['account_id']] += sign * row['amount']
+        
+        delta = rollup_deltas[(user_id, row['date'].date(), row['category_id'], row['account_id'])]
+        delta[0] += row['amount']
+        delta[1] += 1
+        delta[2] = row['kind']
+    
+    return [{'index': index, 'id': new_id} for index, new_id in zip(indexes, new_ids)]
+
+
+@transaction_bp.route('/api/transactions/batch', methods=['POST'])
+@api_login_required
+def api_create_transactions_batch():
+    """
+    API endpoint to create many transactions in one request.
+    
+    Accepts a JSON array (or an object with a 'transactions' array) or an
+    NDJSON body ('application/x-ndjson'), one transaction per line, with the
+    same fields as api_create_transaction. Accounts and categories are
+    loaded once, rows are inserted in chunks of BULK_INSERT_CHUNK_SIZE and
+    each account balance is updated once with the aggregated delta.
+    
+    Invalid rows are reported by their position in the input and skipped;
+    valid rows are still created.
+    
+    Returns:
+        JSON: created (index and id per row) and errors (index and message per row)
+        201: At least one transaction created
+        400: Malformed body, too many rows, or no valid rows
+        500: Server error
+    """
+    try:
+        user_id = g.user.id
+        account_ids = set(db.session.execute(
+            select(Account.id).where(Account.user_id == user_id)
+        ).scalars())
+        categories = {
+            category_id: (category_type, transaction_kind_for(category_type, name))
+            for category_id, category_type, name in db.session.execute(
+                select(Category.id, Category.type, Category.name).where(Category.user_id == user_id)
+            )
+        }
+        
+        connection = db.session.connection()
+        created, errors = [], []
+        balance_deltas = defaultdict(float)
+        rollup_deltas = defaultdict(lambda: [0.0, 0, None])
+        chunk, chunk_indexes = [], []
+        
+        for index, item in _iter_bulk_payload():
+            if index >= BULK_CREATE_MAX_ROWS:
+                db.session.rollback()
+                return jsonify({'error': f'At most {BULK_CREATE_MAX_ROWS} transactions per request'}), 400
+            
+            row, error = _parse_bulk_row(item, account_ids, categories)
+            if error:
+                errors.append({'index': index, 'error': error})
+                continue
+            
+            chunk.append(row)
+            chunk_indexes.append(index)
+            if len(chunk) >= BULK_INSERT_CHUNK_SIZE:
+                created.extend(_insert_bulk_chunk(
+                    connection, user_id, chunk, chunk_indexes, categories, balance_deltas, rollup_deltas
+                ))
+                chunk, chunk_indexes = [], []
+        
+        if chunk:
+            created.extend(_insert_bulk_chunk(
+                connection, user_id, chunk, chunk_indexes, categories, balance_deltas, rollup_deltas
+            ))
+        
+        apply_balance_deltas(connection, user_id, balance_deltas)
+        
+        # Core inserts bypass the flush hook, so roll up the new rows explicitly
+        apply_transaction_deltas(connection, rollup_deltas)
+        mark_descriptions_stale(connection, [user_id])
+        db.session.commit()
+        
+        return jsonify({
+            'created_count': len(created),
+            'error_count': len(errors),
+            'created': created,
+            'errors': errors
+        }), 201 if created else 400
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
 @transaction_bp.route('/api/transactions/<int:transaction_id>')
 @api_login_required
 def api_get_transaction(transaction_id):
@@ -507,13 +716,19 @@ def api_update_transaction(transaction_id):
         data = request.get_json()
         
         # Save previous values to revert balance
+        reference = get_reference_data(
+            g.user.id,
+            [transaction.account_id, data.get('account_id')],
+            [transaction.category_id, data.get('category_id')]
+        )
         old_amount = transaction.amount
-        old_category = transaction.category
-        old_account = transaction.account
+        # The ORM rows cover a cache entry not yet refreshed after another process wrote
+        old_category = reference.category(transaction.category_id) or transaction.category
+        old_account = reference.account(transaction.account_id) or transaction.account
         
         # Validate new account if changed
         if 'account_id' in data and data['account_id'] != transaction.account_id:
-            new_account = Account.query.filter_by(id=data['account_id'], user_id=g.user.id).first()
+            new_account = reference.account(data['account_id'])
             if not new_account:
                 return jsonify({'error': 'Account not found'}), 404
         else:
@@ -521,17 +736,22 @@ def api_update_transaction(transaction_id):
         
         # Validate new category if changed
         if 'category_id' in data and data['category_id'] != transaction.category_id:
-            new_category = Category.query.filter_by(id=data['category_id'], user_id=g.user.id).first()
+            new_category = reference.category(data['category_id'])
             if not new_category:
                 return jsonify({'error': 'Category not found'}), 404
         else:
             new_category = old_category
         
+        # Balances follow the categories as they are now; the cache may be behind other processes
+        current = read_categories(db.session.connection(), g.user.id, {old_category.id, new_category.id})
+        if new_category.id not in current:
+            return jsonify({'error': 'Category not found'}), 404
+        old_category = current.get(old_category.id, old_category)
+        new_category = current[new_category.id]
+        
         # Revert previous balance
-        if old_category.type == 'income':
-            old_account.balance -= old_amount
-        else:  # expense
-            old_account.balance += old_amount
+        balance_deltas = defaultdict(float)
+        balance_deltas[old_account.id] -= balance_effect(old_category.type, old_amount)
         
         # Update transaction fields
         if 'amount' in data:
@@ -539,17 +759,15 @@ def api_update_transaction(transaction_id):
         if 'description' in data:
             transaction.description = data['description']
         if 'account_id' in data:
-            transaction.account_id = data['account_id']
+            transaction.account_id = new_account.id
         if 'category_id' in data:
-            transaction.category_id = data['category_id']
+            transaction.category_id = new_category.id
         if 'date' in data:
             transaction.date = parse_datetime_local(data['date'])
         
         # Apply new balance
-        if new_category.type == 'income':
-            new_account.balance += transaction.amount
-        else:  # expense
-            new_account.balance -= transaction.amount
+        balance_deltas[new_account.id] += balance_effect(new_category.type, transaction.amount)
+        apply_balance_deltas(db.session.connection(), g.user.id, balance_deltas)
         
         db.session.commit()
         
@@ -561,7 +779,7 @@ def api_update_transaction(transaction_id):
             'account': {
                 'id': new_account.id,
                 'name': new_account.name,
-                'balance': new_account.balance
+                'balance': _account_balance(new_account.id)
             },
             'category': {
                 'id': new_category.id,
@@ -604,10 +822,9 @@ def api_delete_transaction(transaction_id):
         account = transaction.account
         category = transaction.category
         
-        if category.type == 'income':
-            account.balance -= transaction.amount
-        else:  # expense
-            account.balance += transaction.amount
+        apply_balance_deltas(db.session.connection(), g.user.id, {
+            account.id: -balance_effect(category.type, transaction.amount)
+        })
         
         db.session.delete(transaction)
         db.session.commit()
@@ -639,6 +856,8 @@ def api_transaction_statistics():
     """
     # Get date range
     date_range = request.args.get('date_range', 'last_30_days')
+    # Unknown ranges share the cached default rather than adding entries
+    cache_period = date_range
     
     # Calculate start date
     if date_range == 'last_30_days':
@@ -651,136 +870,386 @@ def api_transaction_statistics():
         start_date = datetime(datetime.now().year, 1, 1)
     else:
         start_date = datetime.now() - timedelta(days=30)
+        cache_period = 'last_30_days'
     
-    # General statistics
-    total_income = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == g.user.id,
-        Transaction.date >= start_date,
-        Transaction.category.has(Category.type == 'income'),
-        Transaction.category.has(Category.name != 'Transfer')  # Exclude transfers
-    ).scalar() or 0
-    
-    total_expenses = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == g.user.id,
-        Transaction.date >= start_date,
-        Transaction.category.has(Category.type == 'expense'),
-        Transaction.category.has(Category.name != 'Transfer')  # Exclude transfers
-    ).scalar() or 0
-    
-    transaction_count = Transaction.query.filter(
-        Transaction.user_id == g.user.id,
-        Transaction.date >= start_date,
-        ~Transaction.category.has(Category.name == 'Transfer')  # Exclude transfers
-    ).count()
-    
-    # Expenses by category
-    expenses_by_category = db.session.query(
-        Category.name,
-        Category.unicode_emoji,
-        func.sum(Transaction.amount).label('total')
-    ).join(Transaction).filter(
-        Transaction.user_id == g.user.id,
-        Transaction.date >= start_date,
-        Category.type == 'expense',
-        Category.name != 'Transfer'  # Exclude transfer categories
-    ).group_by(Category.id, Category.name, Category.unicode_emoji).all()
-    
-    # Income by category
-    income_by_category = db.session.query(
-        Category.name,
-        Category.unicode_emoji,
-        func.sum(Transaction.amount).label('total')
-    ).join(Transaction).filter(
-        Transaction.user_id == g.user.id,
-        Transaction.date >= start_date,
-        Category.type == 'income',
-        Category.name != 'Transfer'  # Exclude transfer categories
-    ).group_by(Category.id, Category.name, Category.unicode_emoji).all()
+    # One grouped scan gives every figure; it is cached per period
+    totals = category_totals(g.user.id, start_date, cache_key=('transactions', cache_period))
     
     return jsonify({
         'period': date_range,
         'start_date': start_date.isoformat(),
         'summary': {
-            'total_income': float(total_income),
-            'total_expenses': float(total_expenses),
-            'net_income': float(total_income - total_expenses),
-            'transaction_count': transaction_count
+            'total_income': totals['total_income'],
+            'total_expenses': totals['total_expenses'],
+            'net_income': totals['total_income'] - totals['total_expenses'],
+            'transaction_count': totals['transaction_count']
         },
         'expenses_by_category': [
             {
-                'category': row.name,
-                'emoji': row.unicode_emoji,
-                'amount': float(row.total)
-            } for row in expenses_by_category
+                'category': category['name'],
+                'emoji': category['emoji'],
+                'amount': amount
+            } for category, amount in totals_by_kind(totals, 'expense')
         ],
         'income_by_category': [
             {
-                'category': row.name,
-                'emoji': row.unicode_emoji,
-                'amount': float(row.total)
-            } for row in income_by_category
+                'category': category['name'],
+                'emoji': category['emoji'],
+                'amount': amount
+            } for category, amount in totals_by_kind(totals, 'income')
         ]
     })
 
+def _bulk_groups(connection, user_id, transaction_ids):
+    """
+    Aggregate the selected transactions by account, category and day.
+    
+    This one grouped query provides everything the bulk operations need:
+    the ownership check, balance corrections and rollup deltas.
+    
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): User ID
+        transaction_ids (list): IDs of the selected transactions
+        
+    Returns:
+        list: Rows with account_id, category_id, day, kind, type, total and count
+    """
+    day = day_expression(Transaction.date)
+    return connection.execute(
+        select(
+            Transaction.account_id,
+            Transaction.category_id,
+            day.label('day'),
+            Transaction.kind,
+            Category.type,
+            func.sum(Transaction.amount).label('total'),
+            func.count(Transaction.id).label('count')
+        ).join(
+            Category, Transaction.category_id == Category.id
+        ).where(
+            Transaction.id.in_(transaction_ids),
+            Transaction.user_id == user_id
+        ).group_by(
+            Transaction.account_id, Transaction.category_id, day, Transaction.kind, Category.type
+        )
+    ).all()
+
+
+def _parse_bulk_operation(data, user_id):
+    """
+    Validate the target of a bulk operation.
+    
+    Args:
+        data (dict): Request JSON
+        user_id (int): User ID
+        
+    Returns:
+        tuple: (target, None) or (None, (error message, status code)); the
+               target is a CategoryRef, AccountRef or day count depending on the operation
+    """
+    operation = data.get('operation')
+    
+    if operation == 'delete':
+        return None, None
+    
+    if operation == 'recategorize':
+        category = get_reference_data(user_id, category_ids=[data.get('category_id')]).category(data.get('category_id'))
+        if not category:
+            return None, ('Category not found', 404)
+        return category, None
+    
+    if operation == 'move':
+        account = get_reference_data(user_id, account_ids=[data.get('account_id')]).account(data.get('account_id'))
+        if not account:
+            return None, ('Account not found', 404)
+        return account, None
+    
+    if operation == 'shift_date':
+        days = data.get('days')
+        if isinstance(days, bool) or not isinstance(days, int) or days == 0:
+            return None, ('A non-zero whole number of days is required', 400)
+        return days, None
+    
+    return None, ('Operation not supported', 400)
+
+
+def _shift_transaction_dates(connection, user_id, transaction_ids, days):
+    """
+    Move the selected transactions by a whole number of days.
+    
+    Postgres shifts the dates with one UPDATE. SQLite's date functions would
+    rewrite the stored timestamp format, so there the new dates are computed
+    from one SELECT and written back with a single executemany.
+    
+    Args:
+        connection: SQLAlchemy connection of the current transaction
+        user_id (int): User ID
+        transaction_ids (list): IDs of the selected transactions
+        days (int): Number of days to add (may be negative)
+    """
+    table = Transaction.__table__
+    selected = and_(table.c.id.in_(transaction_ids), table.c.user_id == user_id)
+    
+    if connection.dialect.name == 'postgresql':
+        connection.execute(
+            table.update().where(selected).values(date=table.c.date + func.make_interval(0, 0, 0, days))
+        )
+        return
+    
+    shift = timedelta(days=days)
+    params = [
+        {'row_id': row_id, 'new_date': date + shift}
+        for row_id, date in connection.execute(select(table.c.id, table.c.date).where(selected))
+    ]
+    connection.execute(
+        table.update().where(table.c.id == bindparam('row_id')).values(date=bindparam('new_date')),
+        params
+    )
+
+
 @transaction_bp.route('/api/transactions/bulk', methods=['POST'])
 @api_login_required
 def api_bulk_operations():
     """
-    API endpoint for bulk operations on transactions.
+    API endpoint for set-based bulk operations on transactions.
     
-    Currently supports bulk deletion of transactions with proper
-    balance adjustment for each affected account.
+    Every operation runs as a handful of statements regardless of how many
+    transactions are selected: one grouped query over the selection, one
+    UPDATE or DELETE, one balance update per affected account and the
+    rollup maintenance.
     
     Request JSON:
-        operation (str): Type of operation ('delete')
+        operation (str): 'delete', 'recategorize', 'move' or 'shift_date'
         transaction_ids (list): List of transaction IDs to operate on
+        category_id (int): Target category for 'recategorize'
+        account_id (int): Target account for 'move'
+        days (int): Days to add (negative to go back) for 'shift_date'
     
     Returns:
-        JSON: Success message with operation count
+        JSON: Success message, affected count and per-account counts and balance changes
         400: Invalid request data
-        404: Some transactions not found
+        404: Some transactions, or the target account/category, not found
         500: Server error
     """
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         operation = data.get('operation')
         transaction_ids = data.get('transaction_ids', [])
         
         if not operation or not transaction_ids:
             return jsonify({'error': 'Operation and transaction IDs are required'}), 400
         
-        # Verify all transactions belong to user
-        transactions = Transaction.query.filter(
-            Transaction.id.in_(transaction_ids),
-            Transaction.user_id == g.user.id
-        ).all()
+        try:
+            transaction_ids = sorted({int(transaction_id) for transaction_id in transaction_ids})
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid transaction IDs'}), 400
+        if len(transaction_ids) > BULK_OPERATION_MAX_IDS:
+            return jsonify({'error': f'At most {BULK_OPERATION_MAX_IDS} transactions per request'}), 400
         
-        if len(transactions) != len(transaction_ids):
+        target, error = _parse_bulk_operation(data, g.user.id)
+        if error:
+            message, status = error
+            return jsonify({'error': message}), status
+        
+        user_id = g.user.id
+        connection = db.session.connection()
+        if operation == 'recategorize':
+            # Balances and kinds follow the target as it is now; the cache may be behind other processes
+            target = read_categories(connection, user_id, [target.id]).get(target.id)
+            if target is None:
+                return jsonify({'error': 'Category not found'}), 404
+        groups = _bulk_groups(connection, user_id, transaction_ids)
+        
+        # Verify all transactions belong to user
+        if sum(group.count for group in groups) != len(transaction_ids):
             return jsonify({'error': 'Some transactions were not found'}), 404
         
-        if operation == 'delete':
-            # Delete transactions and update balances
-            for transaction in transactions:
-                account = transaction.account
-                category = transaction.category
-                
-                if category.type == 'income':
-                    account.balance -= transaction.amount
-                else:  # expense
-                    account.balance += transaction.amount
-                
-                db.session.delete(transaction)
-            
-            db.session.commit()
-            return jsonify({'message': f'{len(transactions)} transactions deleted successfully'})
+        table = Transaction.__table__
+        selected = and_(table.c.id.in_(transaction_ids), table.c.user_id == user_id)
+        balance_deltas = defaultdict(float)
+        rollup_deltas = defaultdict(lambda: [0.0, 0, None])
+        account_counts = defaultdict(int)
         
-        else:
-            return jsonify({'error': 'Operation not supported'}), 400
+        def add_rollup(account_id, category_id, day, kind, amount, count):
+            delta = rollup_deltas[(user_id, day, category_id, account_id)]
+            delta[0] += amount
+            delta[1] += count
+            delta[2] = kind
+        
+        for group in groups:
+            account_counts[group.account_id] += group.count
+            # Every operation first takes the rows out of their current place
+            add_rollup(group.account_id, group.category_id, group.day, group.kind, -group.total, -group.count)
             
+            if operation == 'delete':
+                balance_deltas[group.account_id] -= balance_effect(group.type, group.total)
+            elif operation == 'recategorize':
+                balance_deltas[group.account_id] += balance_effect(target.type, group.total) - balance_effect(group.type, group.total)
+                add_rollup(group.account_id, target.id, group.day, target.transaction_kind, group.total, group.count)
+            elif operation == 'move':
+                balance_deltas[group.account_id] -= balance_effect(group.type, group.total)
+                balance_deltas[target.id] += balance_effect(group.type, group.total)
+                add_rollup(target.id, group.category_id, group.day, group.kind, group.total, group.count)
+            elif operation == 'shift_date':
+                add_rollup(group.account_id, group.category_id, group.day + timedelta(days=target),
+                           group.kind, group.total, group.count)
+        
+        if operation == 'delete':
+            connection.execute(table.delete().where(selected))
+            record_deletions(connection, user_id, 'transaction', transaction_ids)
+        elif operation == 'recategorize':
+            connection.execute(table.update().where(selected).values(
+                category_id=target.id, kind=target.transaction_kind
+            ))
+        elif operation == 'move':
+            connection.execute(table.update().where(selected).values(account_id=target.id))
+        elif operation == 'shift_date':
+            _shift_transaction_dates(connection, user_id, transaction_ids, target)
+        
+        apply_balance_deltas(connection, user_id, balance_deltas)
+        
+        # Bulk statements bypass the flush hook, so roll up the changes explicitly
+        apply_transaction_deltas(connection, {
+            key: delta for key, delta in rollup_deltas.items() if delta[0] or delta[1]
+        })
+        if operation in ('delete', 'recategorize'):
+            mark_descriptions_stale(connection, [user_id])
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(transaction_ids)} transactions {BULK_OPERATION_VERBS[operation]} successfully',
+            'operation': operation,
+            'affected': len(transaction_ids),
+            'accounts': [{
+                'account_id': account_id,
+                'transactions': account_counts.get(account_id, 0),
+                'balance_change': round(balance_deltas.get(account_id, 0.0), 2)
+            } for account_id in sorted(set(account_counts) | set(balance_deltas))]
+        })
+        
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
 
+def _export_rows_select(user_id, account_id=None, category_id=None, search='', start_date=None, end_date=None):
+    """
+    Build a Core select of only the columns written to the CSV export.
+    
+    Args:
+        user_id (int): User ID
+        account_id (int, optional): Account filter
+        category_id (int, optional): Category filter
+        search (str): Search term matched against description, account and category
+        start_date (datetime, optional): Range start (inclusive)
+        end_date (datetime, optional): Range end (inclusive)
+        
+    Returns:
+        Select: Statement yielding (id, date, description, category, account, amount)
+    """
+    statement = select(
+        Transaction.id,
+        Transaction.date,
+        Transaction.description,
+        Category.name.label('category'),
+        Account.name.label('account'),
+        Transaction.amount
+    ).join(
+        Category, Transaction.category_id == Category.id
+    ).join(
+        Account, Transaction.account_id == Account.id
+    ).where(
+        Transaction.user_id == user_id,
+        Transaction.kind != 'transfer'  # Exclude transfers
+    )
+    
+    if account_id:
+        statement = statement.where(Transaction.account_id == account_id)
+    
+    if category_id:
+        statement = statement.where(Transaction.category_id == category_id)
+    
+    if search:
+        statement = statement.where(search_condition(user_id, search))
+    
+    if start_date and end_date:
+        statement = statement.where(Transaction.date >= start_date, Transaction.date <= end_date)
+    
+    return statement.order_by(desc(Transaction.date), desc(Transaction.id))
+
+
+def _generate_csv(statement, compress=False):
+    """
+    Stream CSV text for a select, one chunk of rows at a time.
+    
+    Rows are fetched through a server-side cursor where the driver supports
+    it, so memory use stays bounded by EXPORT_CHUNK_SIZE.
+    
+    Args:
+        statement (Select): Statement from _export_rows_select()
+        compress (bool): Gzip the output on the fly
+        
+    Yields:
+        bytes: Encoded (and optionally compressed) CSV chunks
+    """
+    compressor = zlib.compressobj(wbits=GZIP_WBITS) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    def flush():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+    
+    # Send the header straight away so the download starts before the first query page
+    writer.writerow(CSV_EXPORT_HEADERS)
+    yield flush()
+    
+    with db.engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=EXPORT_CHUNK_SIZE
+        ).execute(statement)
+        
+        for rows in result.partitions():
+            writer.writerows(
+                (row.id, row.date.strftime('%Y-%m-%d'), row.description or '',
+                 row.category, row.account, float(row.amount))
+                for row in rows
+            )
+            chunk = flush()
+            if chunk:
+                yield chunk
+    
+    if compressor:
+        yield compressor.flush()
+
+
+def _export_filename(compress):
+    """Generate the download name of a CSV export with a timestamp."""
+    filename = f'transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    return filename + '.gz' if compress else filename
+
+
+@job_handler('export_csv')
+def _export_csv_job(job):
+    """Write a CSV export to the job result file."""
+    params = job.params
+    start_date = datetime.fromisoformat(params['start_date']) if params.get('start_date') else None
+    end_date = datetime.fromisoformat(params['end_date']) if params.get('end_date') else None
+    statement = _export_rows_select(
+        job.user_id, params.get('account_id'), params.get('category_id'),
+        params.get('search', ''), start_date, end_date
+    )
+    
+    compress = params.get('compress', False)
+    path = job.result_path(_export_filename(compress), 'application/gzip' if compress else 'text/csv')
+    with open(path, 'wb') as result_file:
+        for chunk in _generate_csv(statement, compress):
+            result_file.write(chunk)
+    return 'Export ready for download'
+
+
 @transaction_bp.route('/export/csv')
 @login_required
 def export_csv():
@@ -791,11 +1260,18 @@ def export_csv():
     and exports all matching transactions (no pagination).
     Excludes transfer transactions from export.
     
+    The file is streamed in chunks, so memory use does not grow with the
+    number of exported rows.
+    
+    With a "Prefer: respond-async" header the file is written by a
+    background job instead, and the response links to its status.
+    
     Query Parameters:
         Same as list_transactions view (account_id, category_id, filter, etc.)
+        gzip: 'true' to download a gzip compressed file
     
     Returns:
-        CSV file download with transaction data
+        CSV file download with transaction data, or 202 with the job ID
     """
     try:
         # Get same filter parameters as list_transactions
@@ -805,69 +1281,29 @@ def export_csv():
         time_filter = request.args.get('filter', 'month')
         start_date_str = request.args.get('start_date')
         end_date_str = request.args.get('end_date')
-        
-        # Build query with same logic as list_transactions - exclude transfers
-        query = Transaction.query.filter(
-            Transaction.user_id == g.user.id,
-            ~Transaction.category.has(Category.name == 'Transfer')  # Exclude transfers
-        )
-        
-        # Apply filters
-        if account_id:
-            query = query.filter_by(account_id=account_id)
-        
-        if category_id:
-            query = query.filter_by(category_id=category_id)
-        
-        if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                or_(
-                    Transaction.description.ilike(search_term),
-                    Transaction.account.has(Account.name.ilike(search_term)),
-                    Transaction.category.has(Category.name.ilike(search_term))
-                )
-            )
+        compress = request.args.get('gzip', 'false').lower() == 'true'
         
         # Apply time filter
+        start_date = end_date = None
         if time_filter and time_filter != 'all':
             start_date, end_date = get_date_range(time_filter, start_date_str, end_date_str)
-            query = query.filter(
-                and_(
-                    Transaction.date >= start_date,
-                    Transaction.date <= end_date
-                )
-            )
-        
-        # Get all transactions (no pagination for export)
-        transactions = query.join(Account).join(Category).order_by(desc(Transaction.date)).all()
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
         
-        # Write headers
-        writer.writerow(['id', 'date', 'description', 'category', 'account', 'amount'])
+        if wants_async():
+            return start_job('export_csv', {
+                'account_id': account_id,
+                'category_id': category_id,
+                'search': search,
+                'start_date': start_date.isoformat() if start_date else None,
+                'end_date': end_date.isoformat() if end_date else None,
+                'compress': compress
+            })
         
-        # Write transaction data
-        for transaction in transactions:
-            writer.writerow([
-                transaction.id,
-                transaction.date.strftime('%Y-%m-%d'),
-                transaction.description or '',
-                transaction.category.name,
-                transaction.account.name,
-                float(transaction.amount)
-            ])
-        
-        # Prepare response
-        output.seek(0)
-        filename = f'transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        statement = _export_rows_select(g.user.id, account_id, category_id, search, start_date, end_date)
         
         return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={'Content-Disposition': f'attachment; filename={filename}'}
+            stream_with_context(_generate_csv(statement, compress)),
+            mimetype='application/gzip' if compress else 'text/csv',
+            headers={'Content-Disposition': f'attachment; filename={_export_filename(compress)}'}
         )
         
     except Exception as e:
@@ -923,7 +1359,10 @@ def api_description_autocomplete():
     API endpoint to get transaction description suggestions for autocomplete.
     
     Returns unique, non-empty transaction descriptions from user's history,
-    ordered by frequency of use (most used first).
+    ordered by frequency of use (most used first). Descriptions starting with
+    the query come before descriptions containing it elsewhere. Suggestions
+    are served from the user's in-memory description index (see
+    app.descriptions).
     
     Query Parameters:
         q (str): Optional search query to filter descriptions
@@ -935,34 +1374,65 @@ def api_description_autocomplete():
     search_query = request.args.get('q', '').strip()
     limit = request.args.get('limit', 10, type=int)
     
-    # Build base query for user's transactions with non-empty descriptions
-    query = db.session.query(
-        Transaction.description,
-        func.count(Transaction.description).label('frequency')
-    ).filter(
-        Transaction.user_id == g.user.id,
-        Transaction.description.isnot(None),
-        Transaction.description != '',
-        # Exclude transfer transactions
-        ~Transaction.category.has(Category.name == 'Transfer')
-    )
+    suggestions = suggest_descriptions(g.user.id, search_query, limit)
     
-    # Apply search filter if provided
-    if search_query:
-        query = query.filter(
-            Transaction.description.ilike(f'%{search_query}%')
-        )
+    return jsonify({
+        'suggestions': suggestions,
+        'count': len(suggestions)
+    })
+
+@transaction_bp.route('/api/search')
+@api_login_required
+def api_search_transactions():
+    """
+    API endpoint to search transactions, categories and accounts with ranking.
+    
+    Matching is fuzzy: prefixes and descriptions with typos are found, and
+    results are ordered by how closely they match. Transfers are excluded.
     
-    # Group by description, order by frequency (most used first), limit results
-    descriptions = query.group_by(Transaction.description)\
-                       .order_by(desc('frequency'))\
-                       .limit(limit)\
-                       .all()
+    Query Parameters:
+        q (str): Search term
+        limit (int): Maximum number of transactions to return (default: 20, max: 100)
+    
+    Returns:
+        JSON: Ranked transactions, categories and accounts, each with a score
+        400: Missing search term
+    """
+    term = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    if not term:
+        return jsonify({'error': 'Search term is required'}), 400
     
-    # Extract just the description strings
-    suggestions = [desc.description for desc in descriptions]
+    results = search_transactions(g.user.id, term, limit)
     
     return jsonify({
-        'suggestions': suggestions,
-        'count': len(suggestions)
+        'transactions': [{
+            'id': row.id,
+            'amount': row.amount,
+            'date': row.date.isoformat(),
+            'description': row.description,
+            'score': round(score, 3),
+            'account': {
+                'id': account.id,
+                'name': account.name
+            } if account else None,
+            'category': {
+                'id': category.id,
+                'name': category.name,
+                'type': category.type,
+                'unicode_emoji': category.unicode_emoji
+            } if category else None
+        } for score, row, category, account in results['transactions']],
+        'categories': [{
+            'id': category.id,
+            'name': category.name,
+            'type': category.type,
+            'unicode_emoji': category.unicode_emoji,
+            'score': round(score, 3)
+        } for score, category in results['categories']],
+        'accounts': [{
+            'id': account.id,
+            'name': account.name,
+            'score': round(score, 3)
+        } for score, account in results['accounts']]
     })
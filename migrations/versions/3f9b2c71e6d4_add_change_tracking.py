@@ -0,0 +1,55 @@
+"""add change tracking
+
+Revision ID: 3f9b2c71e6d4
+Revises: d84e55620d5b
+Create Date: 2026-10-17 03:48:37.102955
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9b2c71e6d4'
+down_revision = 'd84e55620d5b'
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = ('accounts', 'categories', 'transactions', 'transfers')
+
+
+def upgrade():
+    for table in TRACKED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(f'ix_{table}_user_updated_at', ['user_id', 'updated_at'], unique=False)
+        # Existing rows count as changed now, so the first delta after a full backup is exact
+        op.execute(
+            sa.text(f'UPDATE {table} SET updated_at = :now').bindparams(now=datetime.now())
+        )
+
+    op.create_table('tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('record_type', sa.String(length=20), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstones', schema=None) as batch_op:
+        batch_op.create_index('ix_tombstones_user_deleted_at', ['user_id', 'deleted_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tombstones', schema=None) as batch_op:
+        batch_op.drop_index('ix_tombstones_user_deleted_at')
+
+    op.drop_table('tombstones')
+
+    for table in reversed(TRACKED_TABLES):
+        # Plain ALTER TABLE DROP COLUMN: a batch copy of transactions would lose its search triggers
+        op.drop_index(f'ix_{table}_user_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,80 @@
+"""add transaction kind and rollups
+
+Revision ID: 5c2e9b7d1a43
+Revises: 4a54d8f8d5a8
+Create Date: 2026-10-17 01:41:18.604217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e9b7d1a43'
+down_revision = '4a54d8f8d5a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('kind', sa.String(length=20), nullable=True))
+
+    # Same rule as transaction_kind_for(): the Transfer category moves money, others follow their type
+    op.execute(
+        "UPDATE transactions SET kind = ("
+        "SELECT CASE WHEN categories.name = 'Transfer' THEN 'transfer' ELSE categories.type END "
+        "FROM categories WHERE categories.id = transactions.category_id)"
+    )
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.alter_column('kind', existing_type=sa.String(length=20), nullable=False)
+
+    op.create_table('daily_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('txn_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'category_id', 'account_id')
+    )
+    op.create_table('user_summaries',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_income', sa.Float(), nullable=False),
+    sa.Column('total_expenses', sa.Float(), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('category_count', sa.Integer(), nullable=False),
+    sa.Column('account_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Fill both the way `flask rollups rebuild` does (rebuild_rollups and compute_user_summary)
+    day = 'CAST(date AS DATE)' if op.get_bind().dialect.name == 'postgresql' else 'date(date)'
+    op.execute(
+        "INSERT INTO daily_rollups (user_id, day, category_id, account_id, kind, total, txn_count) "
+        f"SELECT user_id, {day}, category_id, account_id, MIN(kind), SUM(amount), COUNT(id) "
+        f"FROM transactions GROUP BY user_id, {day}, category_id, account_id"
+    )
+    op.execute(
+        "INSERT INTO user_summaries "
+        "(user_id, total_income, total_expenses, transaction_count, category_count, account_count) "
+        "SELECT users.id, "
+        "COALESCE((SELECT SUM(total) FROM daily_rollups WHERE user_id = users.id AND kind = 'income'), 0), "
+        "COALESCE((SELECT SUM(total) FROM daily_rollups WHERE user_id = users.id AND kind = 'expense'), 0), "
+        "COALESCE((SELECT SUM(txn_count) FROM daily_rollups WHERE user_id = users.id), 0), "
+        "(SELECT COUNT(id) FROM categories WHERE user_id = users.id), "
+        "(SELECT COUNT(id) FROM accounts WHERE user_id = users.id) "
+        "FROM users"
+    )
+
+
+def downgrade():
+    op.drop_table('user_summaries')
+    op.drop_table('daily_rollups')
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_column('kind')
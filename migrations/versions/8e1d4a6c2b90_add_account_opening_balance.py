@@ -0,0 +1,61 @@
+"""add account opening balance
+
+Revision ID: 8e1d4a6c2b90
+Revises: 3f9b2c71e6d4
+Create Date: 2026-10-17 04:12:51.830416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1d4a6c2b90'
+down_revision = '3f9b2c71e6d4'
+branch_labels = None
+depends_on = None
+
+# Cached balance minus ledger balance (see app.ledger) of accounts without an initial deposit
+OPENING_DIFFERENCES = """
+SELECT accounts.id, COALESCE(accounts.balance, 0) - (
+    COALESCE((
+        SELECT SUM(CASE WHEN categories.type = 'income' THEN transactions.amount ELSE -transactions.amount END)
+        FROM transactions JOIN categories ON categories.id = transactions.category_id
+        WHERE transactions.account_id = accounts.id AND NOT EXISTS (
+            SELECT 1 FROM transfers
+            WHERE transfers.from_transaction_id = transactions.id OR transfers.to_transaction_id = transactions.id
+        )
+    ), 0)
+    - COALESCE((SELECT SUM(amount) FROM transfers WHERE transfers.from_account_id = accounts.id), 0)
+    + COALESCE((SELECT SUM(amount) FROM transfers WHERE transfers.to_account_id = accounts.id), 0)
+) AS difference
+FROM accounts
+WHERE NOT EXISTS (
+    SELECT 1 FROM transactions JOIN categories ON categories.id = transactions.category_id
+    WHERE transactions.account_id = accounts.id AND categories.name = 'Initial Deposit'
+)
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('opening_balance', sa.Float(), nullable=False, server_default='0'))
+
+    # Accounts opened at or below zero got no initial deposit, so their opening balance is
+    # missing from the ledger. Positive differences cannot come from an opening and stay drift.
+    connection = op.get_bind()
+    openings = [
+        {'account_id': account_id, 'opening': difference}
+        for account_id, difference in connection.execute(sa.text(OPENING_DIFFERENCES))
+        if difference < -0.005
+    ]
+    if openings:
+        connection.execute(
+            sa.text('UPDATE accounts SET opening_balance = :opening WHERE id = :account_id'),
+            openings
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.drop_column('opening_balance')
@@ -0,0 +1,29 @@
+"""add idempotency key committed_at
+
+Revision ID: b7f3c9d2e418
+Revises: 8e1d4a6c2b90
+Create Date: 2026-10-17 09:21:40.512337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7f3c9d2e418'
+down_revision = '8e1d4a6c2b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('committed_at', sa.DateTime(), nullable=True))
+
+    # Claims from before the stamp may have committed, so none of them is ever reclaimed
+    op.execute('UPDATE idempotency_keys SET committed_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE status_code IS NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_column('committed_at')
@@ -0,0 +1,28 @@
+"""allow detached jobs
+
+Revision ID: c4e8a1f27d59
+Revises: b7f3c9d2e418
+Create Date: 2026-10-17 11:04:12.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f27d59'
+down_revision = 'b7f3c9d2e418'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade():
+    # Jobs that deleted their user have no owner to go back to
+    op.execute('DELETE FROM jobs WHERE user_id IS NULL')
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
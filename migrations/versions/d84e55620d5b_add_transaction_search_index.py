@@ -0,0 +1,57 @@
+"""add transaction search index
+
+Revision ID: d84e55620d5b
+Revises: a6dcdc541655
+Create Date: 2026-10-17 03:02:14.518204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd84e55620d5b'
+down_revision = 'a6dcdc541655'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # External content FTS5 table over transactions.description, kept current by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5("
+            "description, content='transactions', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN "
+            "INSERT INTO transactions_fts(rowid, description) VALUES (new.id, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN "
+            "INSERT INTO transactions_fts(transactions_fts, rowid, description) "
+            "VALUES ('delete', old.id, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description ON transactions BEGIN "
+            "INSERT INTO transactions_fts(transactions_fts, rowid, description) "
+            "VALUES ('delete', old.id, old.description); "
+            "INSERT INTO transactions_fts(rowid, description) VALUES (new.id, new.description); END"
+        )
+        op.execute("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm "
+            "ON transactions USING gin (description gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('transactions_fts_insert', 'transactions_fts_delete', 'transactions_fts_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS transactions_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_transactions_description_trgm")
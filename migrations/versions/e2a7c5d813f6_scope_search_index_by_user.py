@@ -0,0 +1,84 @@
+"""scope search index by user
+
+Revision ID: e2a7c5d813f6
+Revises: c4e8a1f27d59
+Create Date: 2026-10-17 12:18:33.904175
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c5d813f6'
+down_revision = 'c4e8a1f27d59'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ('transactions_fts_insert', 'transactions_fts_delete', 'transactions_fts_update')
+
+
+def _drop_search_index():
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS transactions_fts")
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    # Contentless FTS5 table whose rows carry an owner token, so a MATCH
+    # only reads the rows of the user it names
+    _drop_search_index()
+    op.execute(
+        "CREATE VIRTUAL TABLE transactions_fts USING fts5("
+        "description, owner, content='', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN "
+        "INSERT INTO transactions_fts(rowid, description, owner) "
+        "VALUES (new.id, new.description, '<' || new.user_id || '>'); END"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN "
+        "INSERT INTO transactions_fts(transactions_fts, rowid, description, owner) "
+        "VALUES ('delete', old.id, old.description, '<' || old.user_id || '>'); END"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_update AFTER UPDATE OF description, user_id ON transactions BEGIN "
+        "INSERT INTO transactions_fts(transactions_fts, rowid, description, owner) "
+        "VALUES ('delete', old.id, old.description, '<' || old.user_id || '>'); "
+        "INSERT INTO transactions_fts(rowid, description, owner) "
+        "VALUES (new.id, new.description, '<' || new.user_id || '>'); END"
+    )
+    op.execute(
+        "INSERT INTO transactions_fts(rowid, description, owner) "
+        "SELECT id, description, '<' || user_id || '>' FROM transactions"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    _drop_search_index()
+    op.execute(
+        "CREATE VIRTUAL TABLE transactions_fts USING fts5("
+        "description, content='transactions', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN "
+        "INSERT INTO transactions_fts(rowid, description) VALUES (new.id, new.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN "
+        "INSERT INTO transactions_fts(transactions_fts, rowid, description) "
+        "VALUES ('delete', old.id, old.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_update AFTER UPDATE OF description ON transactions BEGIN "
+        "INSERT INTO transactions_fts(transactions_fts, rowid, description) "
+        "VALUES ('delete', old.id, old.description); "
+        "INSERT INTO transactions_fts(rowid, description) VALUES (new.id, new.description); END"
+    )
+    op.execute("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')")
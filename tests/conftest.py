@@ -1,6 +1,8 @@
 import sys
 import os
 import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
@@ -23,6 +25,50 @@ def app():
         _db.drop_all()
 
 
+@pytest.fixture
+def file_app(tmp_path):
+    """An app on a file database, so concurrent requests use separate connections."""
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'concurrency.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+
+    flask_app = create_app(FileConfig)
+    with flask_app.app_context():
+        _db.create_all()
+
+    yield flask_app
+
+    with flask_app.app_context():
+        _db.session.remove()
+        _db.drop_all()
+        _db.engine.dispose()
+
+
+@pytest.fixture
+def capture_sql(app):
+    """
+    Collect the SQL sent to the database inside a `with` block.
+
+    Usage: `with capture_sql() as statements:` fills statements with
+    (statement, parameters) tuples; pass an engine to watch another app's.
+    """
+    @contextmanager
+    def capture(engine=None):
+        engine = engine or _db.engine
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return capture
+
+
 @pytest.fixture()
 def client(app):
     """A test client for the app."""
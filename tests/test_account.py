@@ -1,4 +1,5 @@
 import pytest
+import threading
 from flask import url_for
 from app.models import User, Account, Transaction, Category, Transfer, db
 from datetime import datetime
@@ -1213,3 +1214,117 @@ class TestReverseTransferModal:
         assert 'id="confirmReverseTransfer"' in html_content
         assert 'reverseTransferModal' in html_content
         assert 'Reverse Transfer' in html_content
+
+
+class TestConcurrentBalanceUpdates:
+    """Test that concurrent writes never lose balance updates."""
+
+    THREADS = 8
+    ROUNDS = 10
+
+    @pytest.fixture(autouse=True)
+    def setup_data(self, file_app):
+        """Create a user with two accounts and an income and an expense category."""
+        with file_app.app_context():
+            user = User(username='concurrent', email='concurrent@example.com')
+            user.set_password('Password123!')
+            db.session.add(user)
+            db.session.commit()
+
+            checking = Account(name='Checking', balance=1000.0, user_id=user.id)
+            savings = Account(name='Savings', balance=1000.0, user_id=user.id)
+            income = Category(name='Salary', type='income', user_id=user.id)
+            expense = Category(name='Food', type='expense', user_id=user.id)
+            db.session.add_all([checking, savings, income, expense])
+            db.session.commit()
+
+            self.user_id = user.id
+            self.checking_id, self.savings_id = checking.id, savings.id
+            self.income_id, self.expense_id = income.id, expense.id
+
+    def _run_concurrently(self, file_app, work):
+        """Run work(client, worker) on THREADS logged in clients at once and collect failures."""
+        clients = []
+        for _ in range(self.THREADS):
+            client = file_app.test_client()
+            with client.session_transaction() as session:
+                session['user_id'] = self.user_id
+            clients.append(client)
+
+        barrier = threading.Barrier(self.THREADS)
+        failures = []
+
+        def worker(client, index):
+            barrier.wait()
+            try:
+                work(client, index)
+            except Exception as e:  # pragma: no cover - reported below
+                failures.append(repr(e))
+
+        threads = [threading.Thread(target=worker, args=(client, index)) for index, client in enumerate(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return failures
+
+    def _balances(self, file_app):
+        with file_app.app_context():
+            return (db.session.get(Account, self.checking_id).balance,
+                    db.session.get(Account, self.savings_id).balance)
+
+    def test_concurrent_transactions_and_transfers_keep_every_update(self, file_app):
+        """Test that parallel creates, deletes and transfers add up exactly."""
+        def work(client, index):
+            for _ in range(self.ROUNDS):
+                response = client.post('/transactions/api/transactions', json={
+                    'amount': 10.0, 'account_id': self.checking_id, 'category_id': self.income_id
+                })
+                assert response.status_code == 201, response.get_data(as_text=True)
+
+                response = client.post('/transactions/api/transactions', json={
+                    'amount': 3.0, 'account_id': self.savings_id, 'category_id': self.expense_id
+                })
+                assert response.status_code == 201, response.get_data(as_text=True)
+                response = client.delete(f"/transactions/api/transactions/{response.get_json()['id']}")
+                assert response.status_code == 200, response.get_data(as_text=True)
+
+                from_id, to_id = ((self.checking_id, self.savings_id) if index % 2
+                                  else (self.savings_id, self.checking_id))
+                response = client.post('/account/transfer', data={
+                    'from_account': from_id, 'to_account': to_id, 'amount': '5.00'
+                }, headers={'X-Requested-With': 'XMLHttpRequest'})
+                assert response.status_code == 200, response.get_data(as_text=True)
+
+        failures = self._run_concurrently(file_app, work)
+        assert not failures, failures
+
+        # Transfers in both directions cancel out and every expense was deleted again
+        checking, savings = self._balances(file_app)
+        assert checking == pytest.approx(1000.0 + self.THREADS * self.ROUNDS * 10.0)
+        assert savings == pytest.approx(1000.0)
+
+    def test_concurrent_transfers_never_overdraw(self, file_app):
+        """Test that racing transfers cannot spend the same money twice."""
+        with file_app.app_context():
+            db.session.get(Account, self.checking_id).balance = 25.0
+            db.session.commit()
+
+        outcomes = []
+
+        def work(client, index):
+            for _ in range(self.ROUNDS):
+                response = client.post('/account/transfer', data={
+                    'from_account': self.checking_id, 'to_account': self.savings_id, 'amount': '1.00'
+                }, headers={'X-Requested-With': 'XMLHttpRequest'})
+                outcomes.append(response.get_json()['status'])
+
+        failures = self._run_concurrently(file_app, work)
+        assert not failures, failures
+
+        assert outcomes.count('success') == 25
+        checking, savings = self._balances(file_app)
+        assert checking == pytest.approx(0.0)
+        assert savings == pytest.approx(1025.0)
+        with file_app.app_context():
+            assert Transfer.query.filter_by(user_id=self.user_id).count() == 25
@@ -187,4 +187,56 @@ def test_check_email_invalid_format(client):
             assert "Email cannot be empty." in json_data['message']
         else:
             assert response.status_code == 200
-            assert "Invalid email format." in json_data['message']
\ No newline at end of file
+            assert "Invalid email format." in json_data['message']
+
+def test_session_user_is_cached(client, auth_client, capture_sql):
+    """Test that the logged in user is loaded once and then served from the cache."""
+    auth_client.create_user(email="cached@example.com")
+    auth_client.login(email="cached@example.com")
+    client.get('/home/api/stats')
+
+    with capture_sql() as statements:
+        client.get('/home/api/stats')
+    assert not [statement for statement, _ in statements if 'FROM users' in statement]
+
+
+def test_static_files_skip_user_loading(client, auth_client):
+    """Test that static requests never look up the user."""
+    auth_client.create_user(email="static@example.com")
+    auth_client.login(email="static@example.com")
+
+    with client:
+        response = client.get('/static/js/base.js')
+        assert response.status_code == 200
+        assert g.user is None
+    response.close()
+
+
+def test_profile_update_refreshes_session_user(client, auth_client):
+    """Test that profile changes are visible on the next request."""
+    auth_client.create_user(email="before@example.com")
+    auth_client.login(email="before@example.com")
+
+    response = client.post('/profile/update', json={'firstName': 'Ada', 'lastName': 'Lovelace',
+                                                   'email': 'after@example.com'})
+    assert response.get_json()['success'] is True
+
+    with client:
+        client.get('/')
+        assert g.user.email == 'after@example.com'
+        assert g.user.name == 'Ada Lovelace'
+        assert g.user.model.email == 'after@example.com'
+
+
+def test_deleted_user_is_logged_out(client, auth_client):
+    """Test that a deleted user's session no longer resolves to a user."""
+    user = auth_client.create_user(email="gone@example.com")
+    auth_client.login(email="gone@example.com")
+    client.get('/')
+
+    User.query.filter_by(id=user.id).delete()
+    db.session.commit()
+
+    with client:
+        client.get('/')
+        assert g.user is None
@@ -0,0 +1,359 @@
+"""
+Tests for the streaming JSON backup export and restore, including delta
+backups and restoring chains of them.
+"""
+
+import gzip
+import io
+import itertools
+import json
+import pytest
+from datetime import datetime, timedelta
+from app.models import Transaction, Transfer, Category, Account, db
+from app import backup
+from app.backup import generate_backup, read_backup, restore_backup, backup_records, BackupFormatError
+from app.profile import restore_user_data
+from app.rollups import get_user_summary
+
+
+@pytest.fixture
+def backup_setup(client, auth_client, db):
+    """Create a logged in user with transactions in two accounts and a transfer."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    checking = Account(name="Checking", user_id=user.id, balance=100.0, color="#112233")
+    savings = Account(name="Savings", user_id=user.id, balance=0.0)
+    salary = Category(name="Salary", type="income", user_id=user.id)
+    food = Category(name="Food", type="expense", user_id=user.id, unicode_emoji="🍔")
+    db.session.add_all([checking, savings, salary, food])
+    db.session.commit()
+
+    now = datetime.now()
+    db.session.add_all([
+        Transaction(amount=150.0, description='Pay', date=now - timedelta(days=2), user_id=user.id,
+                    category_id=salary.id, account_id=checking.id),
+        Transaction(amount=20.0, description='Lunch', date=now - timedelta(days=1), user_id=user.id,
+                    category_id=food.id, account_id=checking.id),
+        Transaction(amount=30.0, description='Dinner', date=now, user_id=user.id,
+                    category_id=food.id, account_id=savings.id),
+        Transfer(amount=25.0, description='Save', date=now, user_id=user.id,
+                 from_account_id=checking.id, to_account_id=savings.id),
+    ])
+    db.session.commit()
+    return {'user_id': user.id}
+
+
+class TestBackupExport:
+    """Test the layouts and contents of streamed backups."""
+
+    def test_json_backup(self, client, backup_setup):
+        """Test that the JSON document holds every section with names resolved."""
+        response = client.get('/profile/export-data')
+        assert response.mimetype == 'application/json'
+        assert response.headers['Content-Disposition'].endswith('.json')
+        data = json.loads(response.get_data())
+
+        assert data['export_info']['version'] == backup.BACKUP_VERSION
+        assert data['export_info']['backup_type'] == 'full'
+        assert 'deleted' not in data
+        assert [account['name'] for account in data['accounts']] == ['Checking', 'Savings']
+        assert data['accounts'][0]['color'] == '#112233'
+        food = Category.query.filter_by(name='Food').one()
+        assert data['categories'][1] == {'id': food.id, 'name': 'Food', 'type': 'expense', 'unicode_emoji': '🍔'}
+        assert [(t['description'], t['account_name'], t['category_name'], t['category_type'])
+                for t in data['transactions']] == [
+            ('Pay', 'Checking', 'Salary', 'income'),
+            ('Lunch', 'Checking', 'Food', 'expense'),
+            ('Dinner', 'Savings', 'Food', 'expense'),
+        ]
+        assert data['transfers'] == [{
+            'id': Transfer.query.one().id, 'amount': 25.0, 'description': 'Save', 'from_account_name': 'Checking',
+            'to_account_name': 'Savings', 'date': data['transfers'][0]['date']
+        }]
+        assert data['statistics'] == {
+            'total_accounts': 2, 'total_categories': 2, 'total_transactions': 3, 'total_transfers': 1
+        }
+
+    def test_empty_sections_are_written(self, client, auth_client, db):
+        """Test that a user without data still gets every list section."""
+        user = auth_client.create_user()
+        data = json.loads(b''.join(generate_backup(user.id)))
+        assert data['accounts'] == data['transactions'] == data['transfers'] == []
+        assert data['statistics']['total_transactions'] == 0
+
+    def test_ndjson_gzip_backup(self, client, backup_setup):
+        """Test the compressed NDJSON layout."""
+        response = client.get('/profile/export-data?format=ndjson&gzip=true')
+        assert response.mimetype == 'application/gzip'
+        assert response.headers['Content-Disposition'].endswith('.ndjson.gz')
+
+        lines = [json.loads(line) for line in gzip.decompress(response.get_data()).splitlines()]
+        assert [line['record'] for line in lines] == [
+            'export_info', 'user_profile', 'account', 'account', 'category', 'category',
+            'transaction', 'transaction', 'transaction', 'transfer', 'statistics'
+        ]
+        assert lines[-1]['total_transfers'] == 1
+
+    def test_unknown_format_is_rejected(self, client, backup_setup):
+        """Test that an unsupported format redirects back with an error."""
+        response = client.get('/profile/export-data?format=xml')
+        assert response.status_code == 302
+
+    def test_streams_in_chunks_without_per_row_queries(self, client, capture_sql, backup_setup, monkeypatch):
+        """Test that rows are fetched in chunks and names come from the ID maps."""
+        monkeypatch.setattr(backup, 'BACKUP_CHUNK_SIZE', 1)
+        monkeypatch.setattr(backup, 'BACKUP_BUFFER_BYTES', 1)
+        with capture_sql() as statements:
+            chunks = list(generate_backup(backup_setup['user_id']))
+
+        # User, accounts, categories, transactions and transfers
+        assert len(statements) == 5
+        assert len(chunks) > 10
+        assert len(json.loads(b''.join(chunks))['transactions']) == 3
+
+
+def _restore(user_id, chunks, backup_format='json', compressed=False):
+    """Restore streamed backup chunks into a user and return the result."""
+    fileobj = io.BytesIO(b''.join(chunks))
+    return restore_user_data(user_id, read_backup(fileobj, backup_format, compressed))
+
+
+def _balances(user_id):
+    return {account.name: account.balance for account in Account.query.filter_by(user_id=user_id)}
+
+
+class TestBackupRestore:
+    """Test restoring streamed backups."""
+
+    def test_round_trip(self, client, auth_client, backup_setup):
+        """Test that a backup restores into another user with transfers and balances."""
+        other = auth_client.create_user(username='other', email='other@example.com')
+        result = _restore(other.id, generate_backup(backup_setup['user_id']))
+
+        assert result == {
+            'success': True,
+            'message': 'Restored 2 accounts, 2 categories, 3 transactions, 1 transfers'
+        }
+        assert _balances(other.id) == {'Checking': 105.0, 'Savings': -5.0}
+        assert Category.query.filter_by(user_id=other.id, name='Food').one().unicode_emoji == '🍔'
+        assert Transfer.query.filter_by(user_id=other.id).one().description == 'Save'
+
+    def test_ndjson_gzip_restore(self, client, auth_client, backup_setup):
+        """Test that the compressed NDJSON layout restores the same data."""
+        other = auth_client.create_user(username='other', email='other@example.com')
+        result = _restore(other.id, generate_backup(backup_setup['user_id'], 'ndjson', compress=True),
+                          'ndjson', compressed=True)
+
+        assert result['success'] is True
+        assert Transaction.query.filter_by(user_id=other.id).count() == 3
+        assert _balances(other.id) == {'Checking': 105.0, 'Savings': -5.0}
+
+    def test_linked_transfer_legs_count_once(self, client, auth_client, backup_setup, db):
+        """Test that transactions linked to a transfer are restored linked to it."""
+        user_id = backup_setup['user_id']
+        accounts = {account.name: account.id for account in Account.query.filter_by(user_id=user_id)}
+        transfer_category = Category(name='Transfer', type='expense', user_id=user_id)
+        db.session.add(transfer_category)
+        db.session.flush()
+        legs = [
+            Transaction(amount=40.0, description='Move', user_id=user_id,
+                        category_id=transfer_category.id, account_id=accounts[name])
+            for name in ('Checking', 'Savings')
+        ]
+        db.session.add_all(legs)
+        db.session.flush()
+        db.session.add(Transfer(amount=40.0, description='Move', user_id=user_id,
+                                from_account_id=accounts['Checking'], to_account_id=accounts['Savings'],
+                                from_transaction_id=legs[0].id, to_transaction_id=legs[1].id))
+        db.session.commit()
+
+        data = json.loads(b''.join(generate_backup(user_id)))
+        assert len(data['transactions']) == 3
+        assert data['transfers'][1]['from_transaction']['account_name'] == 'Checking'
+
+        other = auth_client.create_user(username='other', email='other@example.com')
+        assert _restore(other.id, generate_backup(user_id))['success'] is True
+        restored = Transfer.query.filter_by(user_id=other.id, description='Move').one()
+        assert restored.from_transaction_id and restored.to_transaction_id
+        assert _balances(other.id) == {'Checking': 65.0, 'Savings': 35.0}
+
+    def test_restore_keeps_opening_balances(self, client, auth_client, db):
+        """Test that accounts outside the backup, and opening balances, survive a restore."""
+        user = auth_client.create_user()
+        # Opened before opening balances were kept, so it does not reconcile
+        card = Account(name='Credit card', user_id=user.id, balance=-250.0)
+        db.session.add(card)
+        db.session.commit()
+
+        result = restore_user_data(user.id, {
+            'accounts': [
+                {'name': 'Loan', 'balance': -1000.0},
+                {'name': 'Mortgage', 'balance': -4900.0, 'opening_balance': -5000.0},
+            ],
+            'categories': [{'name': 'Repayment', 'type': 'income'}],
+            'transactions': [
+                {'amount': 100.0, 'account_name': 'Mortgage', 'category_name': 'Repayment'}
+            ]
+        })
+        assert result['success'] is True
+        assert _balances(user.id) == {'Credit card': -250.0, 'Loan': -1000.0, 'Mortgage': -4900.0}
+        assert Account.query.filter_by(name='Loan').one().opening_balance == -1000.0
+
+    def test_inserts_in_chunks(self, client, auth_client, capture_sql, backup_setup, monkeypatch):
+        """Test that transactions of backups without record IDs are inserted with one executemany per chunk."""
+        monkeypatch.setattr(backup, 'RESTORE_CHUNK_SIZE', 2)
+        monkeypatch.setattr(backup, 'RESTORE_READ_SIZE', 7)
+        other = auth_client.create_user(username='other', email='other@example.com')
+
+        with capture_sql() as statements:
+            records = read_backup(io.BytesIO(b''.join(generate_backup(backup_setup['user_id']))))
+            # Backups before 1.2 have no record IDs
+            counts = restore_backup(other.id, (
+                (record_type, {key: value for key, value in record.items() if key != 'id'})
+                for record_type, record in records
+            ))
+            db.session.commit()
+
+        assert counts['transactions'] == 3
+        # An executemany passes a list of parameter sets, a single insert one set
+        inserts = [
+            isinstance(parameters, list) for statement, parameters in statements
+            if statement.startswith('INSERT INTO transactions')
+        ]
+        assert inserts == [True, False]
+        assert _balances(other.id) == {'Checking': 105.0, 'Savings': -5.0}
+
+    def test_invalid_backups_are_rejected(self, client, auth_client, backup_setup):
+        """Test that unreadable or incomplete uploads raise without restoring anything."""
+        user_id = backup_setup['user_id']
+        with pytest.raises(BackupFormatError, match='Invalid JSON file format'):
+            _restore(user_id, [b'{"accounts": [{"name": "New"}, '])
+        with pytest.raises(BackupFormatError, match='Invalid backup file structure'):
+            _restore(user_id, [b'{"export_info": {}, "accounts": [{"name": "New"}]}'])
+        assert Account.query.filter_by(user_id=user_id, name='New').first() is None
+
+    def test_restore_route_accepts_compressed_ndjson(self, client, backup_setup):
+        """Test that the upload route picks the layout from the file name."""
+        chunks = generate_backup(backup_setup['user_id'], 'ndjson', compress=True)
+        response = client.post('/profile/restore-data', data={
+            'backup_file': (io.BytesIO(b''.join(chunks)), 'backup.ndjson.gz')
+        }, follow_redirects=True)
+        assert response.status_code == 200
+        assert b'Restored 0 accounts, 0 categories, 3 transactions, 1 transfers' in response.data
+
+
+def _full_then_changes(user_id, monkeypatch):
+    """Take a full backup, then change, delete and add records; return the backup and its watermark."""
+    monkeypatch.setattr(backup, 'WATERMARK_OVERLAP', timedelta(0))
+    full = b''.join(generate_backup(user_id))
+    watermark = json.loads(full)['export_info']['watermark']
+
+    lunch = Transaction.query.filter_by(description='Lunch').one()
+    lunch.amount = 22.5
+    db.session.delete(Transaction.query.filter_by(description='Dinner').one())
+    checking = Account.query.filter_by(user_id=user_id, name='Checking').one()
+    checking.name = 'Current'
+    food = Category.query.filter_by(user_id=user_id, name='Food').one()
+    db.session.add(Transaction(amount=5.0, description='Coffee', user_id=user_id,
+                               category_id=food.id, account_id=checking.id))
+    db.session.commit()
+    return full, watermark
+
+
+class TestDeltaBackup:
+    """Test delta backups of the changes since an earlier backup."""
+
+    def test_delta_holds_only_changes(self, client, backup_setup, monkeypatch):
+        """Test that a delta holds the changed records and the deletions."""
+        user_id = backup_setup['user_id']
+        _, watermark = _full_then_changes(user_id, monkeypatch)
+
+        response = client.get('/profile/export-data', query_string={'since': watermark})
+        assert response.headers['Content-Disposition'].endswith('_delta.json')
+        delta = json.loads(response.get_data())
+        assert delta['export_info']['backup_type'] == 'delta'
+        assert delta['export_info']['since'] == watermark
+        assert [t['description'] for t in delta['transactions']] == ['Lunch', 'Coffee']
+        assert delta['transactions'][1]['account_name'] == 'Current'
+        assert delta['deleted'] == [{'type': 'transaction', 'id': delta['deleted'][0]['id']}]
+        assert delta['transfers'] == [] and delta['categories'] == []
+        assert [account['name'] for account in delta['accounts']] == ['Current']
+        assert delta['statistics']['total_deleted'] == 1
+
+    def test_chain_restore(self, client, auth_client, backup_setup, monkeypatch):
+        """Test that a full backup followed by its delta restores the current state."""
+        user_id = backup_setup['user_id']
+        full, watermark = _full_then_changes(user_id, monkeypatch)
+        delta = b''.join(generate_backup(user_id, 'ndjson', since=backup.parse_watermark(watermark)))
+
+        other = auth_client.create_user(username='other', email='other@example.com')
+        records = itertools.chain(read_backup(io.BytesIO(full)), read_backup(io.BytesIO(delta), 'ndjson'))
+        result = restore_user_data(other.id, records)
+
+        assert result['message'] == (
+            'Restored 2 accounts, 2 categories, 4 transactions, 1 transfers, updated 2 and deleted 1 records'
+        )
+        restored = sorted((t.description, t.amount, t.account.name)
+                          for t in Transaction.query.filter_by(user_id=other.id))
+        assert restored == [('Coffee', 5.0, 'Current'), ('Lunch', 22.5, 'Current'), ('Pay', 150.0, 'Current')]
+        assert _balances(other.id) == {'Current': 97.5, 'Savings': 25.0}
+
+    def test_chain_after_delete_all_data(self, client, auth_client, backup_setup, monkeypatch):
+        """Test that a delta taken after deleting all data empties the restored chain first."""
+        user_id = backup_setup['user_id']
+        monkeypatch.setattr(backup, 'WATERMARK_OVERLAP', timedelta(0))
+        full = json.loads(b''.join(generate_backup(user_id)))
+
+        client.post('/profile/delete-all-data', json={
+            'confirmation1': 'DELETE ALL DATA', 'confirmation2': 'CONFIRM DELETE'
+        })
+        wallet = Account(name='Wallet', user_id=user_id, balance=0.0)
+        gifts = Category(name='Gifts', type='income', user_id=user_id)
+        db.session.add_all([wallet, gifts])
+        db.session.commit()
+        db.session.add(Transaction(amount=40.0, user_id=user_id, category_id=gifts.id, account_id=wallet.id))
+        db.session.commit()
+        delta = json.loads(b''.join(generate_backup(
+            user_id, since=backup.parse_watermark(full['export_info']['watermark'])
+        )))
+        assert delta['deleted'] == [{'type': 'all', 'id': None}]
+
+        other = auth_client.create_user(username='other', email='other@example.com')
+        result = restore_user_data(other.id, itertools.chain(backup_records(full), backup_records(delta)))
+        assert result['success'] is True
+        assert _balances(other.id) == {'Wallet': 40.0}
+        assert Transfer.query.filter_by(user_id=other.id).count() == 0
+        assert get_user_summary(other.id).total_income == 40.0
+
+    def test_broken_chains_are_rejected(self, client, auth_client, backup_setup, monkeypatch):
+        """Test that deltas must continue the backup before them."""
+        user_id = backup_setup['user_id']
+        full, watermark = _full_then_changes(user_id, monkeypatch)
+        delta = json.loads(b''.join(generate_backup(user_id, since=backup.parse_watermark(watermark))))
+
+        with pytest.raises(BackupFormatError, match='must follow'):
+            restore_user_data(user_id, backup_records(delta))
+
+        gap = dict(delta, export_info=dict(delta['export_info'], since=datetime.now().isoformat()))
+        records = itertools.chain(backup_records(json.loads(full)), backup_records(gap))
+        with pytest.raises(BackupFormatError, match='missing'):
+            restore_user_data(user_id, records)
+
+    def test_export_rejects_bad_watermarks(self, client, backup_setup):
+        """Test that invalid or expired watermarks redirect back with an error."""
+        assert client.get('/profile/export-data?since=yesterday').status_code == 302
+        too_old = (datetime.now() - timedelta(days=365)).isoformat()
+        assert client.get('/profile/export-data', query_string={'since': too_old}).status_code == 302
+
+    def test_restore_route_accepts_chains(self, client, backup_setup, monkeypatch):
+        """Test that several uploaded files are restored in name order as one chain."""
+        user_id = backup_setup['user_id']
+        full, watermark = _full_then_changes(user_id, monkeypatch)
+        delta = b''.join(generate_backup(user_id, since=backup.parse_watermark(watermark)))
+
+        response = client.post('/profile/restore-data', data={
+            'backup_file': [(io.BytesIO(delta), 'backup_20261017_101500_delta.json'),
+                            (io.BytesIO(full), 'backup_20261017_100000.json')]
+        }, follow_redirects=True)
+        assert b'Restored 1 accounts' in response.data
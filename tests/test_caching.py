@@ -0,0 +1,86 @@
+"""
+Tests for the shared cache building blocks and the session principal cache.
+"""
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from app.auth import load_principal
+from app.caching import ALL_USERS, CommitTracker, LRUCache
+from app.models import db
+
+
+class TestLRUCache:
+    """Test expiry, eviction and versioned invalidation."""
+
+    def test_loads_racing_a_commit_are_not_cached(self):
+        """Test that data read before an invalidation is not stored after it."""
+        cache = LRUCache(max_entries=2)
+        version = cache.version
+        cache.invalidate({1})
+        cache.set(1, 'stale', ttl=60, version=version)
+        assert cache.get(1) is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used user is evicted first."""
+        cache = LRUCache(max_entries=2)
+        cache.set(1, 'one', ttl=60, version=cache.version)
+        cache.set(2, 'two', ttl=60, version=cache.version)
+        assert cache.get(1) == 'one'
+        cache.set(3, 'three', ttl=60, version=cache.version)
+
+        assert cache.get(2) is None
+        assert cache.get(1) == 'one'
+        assert cache.get(3) == 'three'
+
+    def test_invalidate_all_users(self):
+        """Test that ALL_USERS drops every entry."""
+        cache = LRUCache(max_entries=2)
+        cache.set(1, 'one', ttl=60, version=cache.version)
+        cache.set(2, 'expired', ttl=-1, version=cache.version)
+        assert cache.get(2) is None
+
+        cache.invalidate({ALL_USERS})
+        assert cache.get(1) is None
+
+
+class TestCommitTracker:
+    """Test that changes reach the cache only when their transaction commits."""
+
+    def test_commit_and_rollback(self, app):
+        """Test that committed changes are handed over and rolled back ones dropped."""
+        committed = []
+        tracker = CommitTracker('test_changed_user_ids', committed.append)
+        tracker.register()
+        try:
+            tracker.mark(db.session.connection(), {1, None})
+            db.session.rollback()
+            tracker.mark(db.session.connection(), {2})
+            assert tracker.pending(db.session.connection()) == {2}
+            db.session.commit()
+        finally:
+            event.remove(Engine, 'commit', tracker._commit)
+            event.remove(Engine, 'rollback', tracker._rollback)
+
+        assert committed == [{2}]
+
+
+class TestPrincipalCache:
+    """Test caching of the logged in user."""
+
+    def test_profile_update_drops_cached_principal(self, client, auth_client):
+        """Test that a profile change is visible on the next request."""
+        user = auth_client.create_user()
+        auth_client.login()
+        assert load_principal(user.id).email == 'test@example.com'
+
+        response = client.post('/profile/update', json={'email': 'new@example.com'})
+        assert response.status_code == 200
+        assert load_principal(user.id).email == 'new@example.com'
+
+    def test_principal_is_cached(self, client, auth_client):
+        """Test that writes skipping the hooks are not seen until the entry expires."""
+        user = auth_client.create_user()
+        load_principal(user.id)
+        db.session.execute(text("UPDATE users SET email = 'raw@example.com' WHERE id = :id"), {'id': user.id})
+        db.session.commit()
+        assert load_principal(user.id).email == 'test@example.com'
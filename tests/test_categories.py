@@ -880,3 +880,45 @@ class TestCategoriesNewFilters:
         assert 'chart_data' in data
         assert 'filter' in data
         assert data['filter'] == 'custom'
+
+
+class TestCategoryTotalsQuery:
+    """Test the single aggregate query behind the categories page and APIs."""
+    
+    def test_categories_without_activity_in_range_are_listed(self, logged_in_client, sample_transactions):
+        """Test that categories whose transactions fall outside the range keep a zero total."""
+        response = logged_in_client.get('/categories/?filter=custom&start_date=2020-01-01&end_date=2020-01-31')
+        assert response.status_code == 200
+        assert b'Salary' in response.data
+        assert b'Food' in response.data
+        
+        stats = logged_in_client.get(
+            '/categories/api/categories/stats?filter=custom&start_date=2020-01-01&end_date=2020-01-31'
+        ).get_json()['stats']
+        assert stats['income_categories'] == 1
+        assert stats['expense_categories'] == 1
+        assert stats['total_income'] == 0
+    
+    def test_page_load_runs_one_aggregate_query(self, app, logged_in_client, capture_sql, sample_transactions):
+        """Test that both category types and their totals are read in one query."""
+        with capture_sql() as statements:
+            response = logged_in_client.get('/categories/?filter=year')
+        
+        assert response.status_code == 200
+        assert len([
+            statement for statement, _ in statements
+            if 'daily_rollups' in statement or 'FROM transactions' in statement
+        ]) == 1
+    
+    def test_top_expenses_excludes_transfers(self, logged_in_client, test_user, sample_transactions):
+        """Test that the chart lists expense categories by total and skips transfers."""
+        transfer_category = Category(name='Transfer', type='expense', user_id=test_user.id)
+        db.session.add(transfer_category)
+        db.session.commit()
+        db.session.add(Transaction(amount=5000.0, date=datetime.now(), account_id=sample_transactions['account'].id,
+                                   category_id=transfer_category.id, user_id=test_user.id))
+        db.session.commit()
+        
+        data = logged_in_client.get('/categories/api/categories/top-expenses?filter=all').get_json()
+        assert data['chart_data']['labels'] == ['Food']
+        assert data['chart_data']['data'] == [300.0]
@@ -0,0 +1,96 @@
+"""
+Tests for the change tracking behind delta backups.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.models import Transaction, Category, Account, Tombstone, db
+from app.purge import purge_user_data
+
+
+@pytest.fixture
+def changes_setup(client, auth_client, db):
+    """Create a logged in user with two transactions."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    food = Category(name="Food", type="expense", user_id=user.id)
+    account = Account(name="Checking", user_id=user.id, balance=0.0)
+    db.session.add_all([food, account])
+    db.session.commit()
+    db.session.add_all([
+        Transaction(amount=amount, description=description, user_id=user.id,
+                    category_id=food.id, account_id=account.id)
+        for amount, description in [(5.0, 'Coffee'), (12.0, 'Lunch')]
+    ])
+    db.session.commit()
+    return {'user_id': user.id, 'food_id': food.id}
+
+
+def _tombstones(user_id):
+    return [(t.record_type, t.record_id) for t in Tombstone.query.filter_by(user_id=user_id).order_by(Tombstone.id)]
+
+
+class TestChangeTracking:
+    """Test updated_at stamps and tombstones."""
+
+    def test_core_updates_stamp_updated_at(self, client, changes_setup):
+        """Test that Core UPDATE statements move updated_at too."""
+        coffee = Transaction.query.filter_by(description='Coffee').one()
+        before = coffee.updated_at
+
+        db.session.execute(update(Transaction).where(Transaction.id == coffee.id).values(amount=6.0))
+        db.session.commit()
+        db.session.refresh(coffee)
+        assert coffee.updated_at > before
+
+    def test_deletes_leave_tombstones(self, client, changes_setup):
+        """Test that ORM deletes and Core bulk deletes both write tombstones."""
+        user_id = changes_setup['user_id']
+        coffee = Transaction.query.filter_by(description='Coffee').one()
+        lunch_id = Transaction.query.filter_by(description='Lunch').one().id
+
+        db.session.delete(coffee)
+        db.session.commit()
+        response = client.post('/transactions/api/transactions/bulk', json={
+            'operation': 'delete', 'transaction_ids': [lunch_id]
+        })
+        assert response.status_code == 200
+        assert _tombstones(user_id) == [('transaction', coffee.id), ('transaction', lunch_id)]
+
+    def test_purge_leaves_one_tombstone(self, client, changes_setup):
+        """Test that deleting all data replaces the user's tombstones with an 'all' tombstone."""
+        user_id = changes_setup['user_id']
+        db.session.delete(Transaction.query.filter_by(description='Coffee').one())
+        db.session.commit()
+
+        purge_user_data(user_id)
+        assert _tombstones(user_id) == [('all', None)]
+
+    def test_interrupted_purge_leaves_tombstone(self, client, changes_setup):
+        """Test that the 'all' tombstone is committed with the first deleted batch."""
+        user_id = changes_setup['user_id']
+
+        def interrupt(done, total):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            purge_user_data(user_id, batch_size=1, progress=interrupt)
+        assert Transaction.query.filter_by(user_id=user_id).count() == 1
+        assert _tombstones(user_id) == [('all', None)]
+
+    def test_tombstones_command(self, runner, changes_setup):
+        """Test that the command only deletes tombstones older than the cutoff."""
+        user_id = changes_setup['user_id']
+        db.session.add_all([
+            Tombstone(user_id=user_id, record_type='transaction', record_id=1,
+                      deleted_at=datetime.now() - timedelta(days=100)),
+            Tombstone(user_id=user_id, record_type='transaction', record_id=2),
+        ])
+        db.session.commit()
+
+        result = runner.invoke(args=['purge', 'tombstones'])
+        assert result.exit_code == 0
+        assert 'Purged 1 tombstones.' in result.output
+        assert _tombstones(user_id) == [('transaction', 2)]
@@ -0,0 +1,129 @@
+"""
+Tests for the description autocomplete index.
+"""
+
+import pytest
+from datetime import datetime
+from app.models import Transaction, Category, Account, db
+from app.descriptions import DescriptionIndex, get_description_index
+
+
+@pytest.fixture
+def descriptions_setup(client, auth_client, db):
+    """Create a logged in user with a few described transactions."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    food = Category(name="Food", type="expense", user_id=user.id)
+    transfer = Category(name="Transfer", type="expense", user_id=user.id)
+    account = Account(name="Checking", user_id=user.id, balance=0.0)
+    db.session.add_all([food, transfer, account])
+    db.session.commit()
+
+    now = datetime.now()
+    db.session.add_all([
+        Transaction(amount=5.0, date=now, description=description, user_id=user.id,
+                    category_id=food.id, account_id=account.id)
+        for description in ['Lunch', 'Lunch', 'Lunch with team', 'Team lunch', 'Groceries']
+    ] + [
+        Transaction(amount=50.0, date=now, description='Lunch money to savings', user_id=user.id,
+                    category_id=transfer.id, account_id=account.id)
+    ])
+    db.session.commit()
+
+    return {'user_id': user.id, 'account_id': account.id, 'food_id': food.id, 'transfer_id': transfer.id}
+
+
+def _suggest(client, query='', limit=10):
+    return client.get('/transactions/api/descriptions', query_string={'q': query, 'limit': limit}).get_json()['suggestions']
+
+
+class TestDescriptionIndex:
+    """Test the in-memory index on its own."""
+
+    def test_prefix_matches_rank_before_substring_matches(self):
+        """Test frequency ranking within prefix matches and the substring fallback."""
+        index = DescriptionIndex({'Lunch': 3, 'lunch box': 5, 'Team lunch': 9, 'Groceries': 1})
+        assert index.search('LUN') == ['lunch box', 'Lunch', 'Team lunch']
+        assert index.search('lun', limit=2) == ['lunch box', 'Lunch']
+        assert index.search('') == ['Team lunch', 'lunch box', 'Lunch', 'Groceries']
+        assert index.search('zz') == []
+        assert index.search('lun', limit=0) == []
+
+    def test_apply_adds_and_removes(self):
+        """Test that count changes keep the sorted entries in step."""
+        index = DescriptionIndex({'Lunch': 1})
+        index.apply({'Lunch': -1, 'Coffee': 2, 'coffee beans': 1})
+        assert index.counts == {'Coffee': 2, 'coffee beans': 1}
+        assert index.search('co') == ['Coffee', 'coffee beans']
+        assert index.search('lu') == []
+
+
+class TestDescriptionAutocomplete:
+    """Test the endpoint and the maintenance of cached indexes."""
+
+    def test_suggestions_exclude_transfers(self, client, descriptions_setup):
+        """Test ranking, the substring fallback and transfer exclusion through the API."""
+        assert _suggest(client, 'lunch') == ['Lunch', 'Lunch with team', 'Team lunch']
+
+    def test_lookups_are_served_from_memory(self, client, capture_sql, descriptions_setup):
+        """Test that repeated lookups run no queries."""
+        _suggest(client, 'lu')
+        with capture_sql() as statements:
+            assert _suggest(client, 'gro') == ['Groceries']
+        assert statements == []
+
+    def test_writes_update_the_cached_index(self, client, descriptions_setup):
+        """Test that creates, edits and deletes are applied to the cached index in place."""
+        ids = descriptions_setup
+        index = get_description_index(ids['user_id'])
+
+        response = client.post('/transactions/api/transactions', json={
+            'amount': 3.0, 'account_id': ids['account_id'], 'category_id': ids['food_id'], 'description': 'Coffee'
+        })
+        assert response.status_code == 201
+        coffee_id = response.get_json()['id']
+        assert _suggest(client, 'cof') == ['Coffee']
+
+        response = client.put(f'/transactions/api/transactions/{coffee_id}', json={'description': 'Cocoa'})
+        assert response.status_code == 200
+        assert _suggest(client, 'co') == ['Cocoa']
+
+        assert client.delete(f'/transactions/api/transactions/{coffee_id}').status_code == 200
+        assert _suggest(client, 'co') == []
+        assert get_description_index(ids['user_id']) is index
+
+    def test_rollback_keeps_index(self, client, descriptions_setup):
+        """Test that rolled back writes never reach the index."""
+        ids = descriptions_setup
+        index = get_description_index(ids['user_id'])
+
+        db.session.add(Transaction(amount=1.0, date=datetime.now(), description='Temp', user_id=ids['user_id'],
+                                   category_id=ids['food_id'], account_id=ids['account_id']))
+        db.session.flush()
+        db.session.rollback()
+
+        assert get_description_index(ids['user_id']) is index
+        assert _suggest(client, 'temp') == []
+
+    def test_category_becoming_transfer_rebuilds_index(self, client, descriptions_setup):
+        """Test that reclassifying a category moves its descriptions out of the suggestions."""
+        ids = descriptions_setup
+        _suggest(client, 'gro')
+
+        response = client.put(f"/categories/api/categories/{ids['food_id']}",
+                              json={'name': 'Transfer', 'type': 'income'})
+        assert response.status_code == 200
+        assert _suggest(client, 'gro') == []
+
+    def test_bulk_delete_rebuilds_index(self, client, descriptions_setup):
+        """Test that Core bulk deletes drop the cached index."""
+        ids = descriptions_setup
+        _suggest(client, 'gro')
+        groceries = Transaction.query.filter_by(user_id=ids['user_id'], description='Groceries').one()
+
+        response = client.post('/transactions/api/transactions/bulk', json={
+            'operation': 'delete', 'transaction_ids': [groceries.id]
+        })
+        assert response.status_code == 200
+        assert _suggest(client, 'gro') == []
@@ -2,9 +2,15 @@
 Tests for the home/dashboard functionality.
 """
 
+import importlib
+import sqlite3
 import pytest
 from datetime import datetime, timedelta
-from app.models import Transaction, Category, Account, db
+from sqlalchemy import text
+from app.models import Transaction, Category, Account, User, db
+
+# app.home is shadowed by the blueprint of the same name on the app package
+home_module = importlib.import_module('app.home')
 
 
 class TestHomeDashboard:
@@ -786,3 +792,198 @@ class TestHomeDashboard:
         february_data = next((m for m in monthly_data if m['month_name'] == 'Feb'), None)
         assert february_data is not None
         assert february_data['expenses'] == 0.0
+
+
+class TestBucketTotals:
+    """Test cases for the shared time-bucket aggregation engine."""
+    
+    def _setup_user_data(self, auth_client, db):
+        user = auth_client.create_user()
+        income_category = Category(name="Salary", type="income", user_id=user.id)
+        expense_category = Category(name="Food", type="expense", user_id=user.id)
+        transfer_category = Category(name="Transfer", type="expense", user_id=user.id)
+        db.session.add_all([income_category, expense_category, transfer_category])
+        db.session.commit()
+        
+        account = Account(name="Test Account", user_id=user.id, balance=0.0)
+        db.session.add(account)
+        db.session.commit()
+        
+        return user, income_category, expense_category, transfer_category, account
+    
+    def test_week_buckets_are_iso_weeks_and_zero_filled(self, app, auth_client, db):
+        """Test ISO week buckets start on Monday and gaps are zero-filled."""
+        from app.home import _bucket_totals
+        user, income, expense, transfer, account = self._setup_user_data(auth_client, db)
+        
+        # 2024-01-01 is a Monday; 2024-01-14 is the Sunday closing the second week
+        db.session.add_all([
+            Transaction(amount=100.0, date=datetime(2024, 1, 1, 8), user_id=user.id,
+                        category_id=income.id, account_id=account.id),
+            Transaction(amount=40.0, date=datetime(2024, 1, 14, 23, 30), user_id=user.id,
+                        category_id=expense.id, account_id=account.id),
+            Transaction(amount=999.0, date=datetime(2024, 1, 2), user_id=user.id,
+                        category_id=transfer.id, account_id=account.id),
+        ])
+        db.session.commit()
+        
+        buckets = _bucket_totals(user.id, 'week', datetime(2024, 1, 1), datetime(2024, 1, 22))
+        
+        assert [b['start'] for b in buckets] == [
+            datetime(2024, 1, 1), datetime(2024, 1, 8), datetime(2024, 1, 15)
+        ]
+        assert buckets[0]['income'] == 100.0
+        assert buckets[0]['expenses'] == 0.0
+        assert buckets[1]['expenses'] == 40.0
+        assert buckets[1]['net'] == -40.0
+        assert buckets[2] == {'start': datetime(2024, 1, 15), 'income': 0.0, 'expenses': 0.0, 'net': 0.0}
+    
+    def test_month_buckets_span_year_boundary(self, app, auth_client, db):
+        """Test month buckets across a year boundary."""
+        from app.home import _bucket_totals
+        user, income, expense, transfer, account = self._setup_user_data(auth_client, db)
+        
+        db.session.add_all([
+            Transaction(amount=10.0, date=datetime(2023, 12, 31, 23, 59), user_id=user.id,
+                        category_id=expense.id, account_id=account.id),
+            Transaction(amount=20.0, date=datetime(2024, 2, 1), user_id=user.id,
+                        category_id=income.id, account_id=account.id),
+        ])
+        db.session.commit()
+        
+        buckets = _bucket_totals(user.id, 'month', datetime(2023, 12, 1), datetime(2024, 3, 1))
+        
+        assert [b['start'].month for b in buckets] == [12, 1, 2]
+        assert buckets[0]['expenses'] == 10.0
+        assert buckets[1]['income'] == 0.0
+        assert buckets[2]['income'] == 20.0
+    
+    def test_bucket_totals_runs_single_query(self, app, auth_client, capture_sql, db):
+        """Test that a full month of day buckets is computed with one query."""
+        from app.home import _bucket_totals
+        user, income, expense, transfer, account = self._setup_user_data(auth_client, db)
+        user_id = user.id
+        
+        with capture_sql() as statements:
+            buckets = _bucket_totals(user_id, 'day', datetime(2024, 1, 1), datetime(2024, 2, 1))
+        
+        assert len(buckets) == 31
+        assert len(statements) == 1
+    
+    def test_bucket_totals_rejects_unknown_granularity(self, app):
+        """Test that an unsupported granularity raises ValueError."""
+        from app.home import _bucket_totals
+        
+        with pytest.raises(ValueError):
+            _bucket_totals(1, 'hour', datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+
+class TestDashboardBundle:
+    """Test cases for the one-shot dashboard bundle."""
+    
+    def test_bundle_requires_login(self, client):
+        """Test that the bundle endpoint requires login."""
+        response = client.get('/home/api/bundle')
+        assert response.status_code == 302
+    
+    def test_bundle_matches_individual_endpoints(self, client, auth_client, db):
+        """Test that the bundle contains the same payloads as the individual endpoints."""
+        user = auth_client.create_user()
+        auth_client.login()
+        
+        income_category = Category(name="Salary", type="income", user_id=user.id)
+        expense_category = Category(name="Food", type="expense", user_id=user.id)
+        db.session.add_all([income_category, expense_category])
+        db.session.commit()
+        
+        account = Account(name="Test Account", user_id=user.id, balance=0.0)
+        db.session.add(account)
+        db.session.commit()
+        
+        now = datetime.now()
+        db.session.add_all([
+            Transaction(amount=300.0, date=now, user_id=user.id,
+                        category_id=income_category.id, account_id=account.id),
+            Transaction(amount=45.0, date=now, user_id=user.id,
+                        category_id=expense_category.id, account_id=account.id),
+        ])
+        db.session.commit()
+        
+        response = client.get('/home/api/bundle')
+        assert response.status_code == 200
+        
+        data = response.get_json()
+        assert data['status'] == 'success'
+        bundle = data['data']
+        
+        expected = {
+            'stats': '/home/api/stats',
+            'periods': '/home/api/periods',
+            'week': '/home/api/week-stats',
+            'today': '/home/api/today-stats',
+            'daily_expenses': '/home/api/daily-expenses',
+            'monthly_expenses': '/home/api/monthly-expenses'
+        }
+        for key, url in expected.items():
+            assert bundle[key] == client.get(url).get_json()['data']
+        
+        assert bundle['today']['income'] == 300.0
+        assert bundle['today']['expenses'] == 45.0
+        assert bundle['stats']['total_balance'] == 255.0
+    
+    def test_dashboard_embeds_bundle(self, client, auth_client, db):
+        """Test that the dashboard page embeds the bundle and renders period stats server-side."""
+        user = auth_client.create_user()
+        auth_client.login()
+        
+        expense_category = Category(name="Food", type="expense", user_id=user.id)
+        db.session.add(expense_category)
+        db.session.commit()
+        
+        account = Account(name="Test Account", user_id=user.id, balance=0.0)
+        db.session.add(account)
+        db.session.commit()
+        
+        db.session.add(Transaction(amount=12.5, date=datetime.now(), user_id=user.id,
+                                   category_id=expense_category.id, account_id=account.id))
+        db.session.commit()
+        
+        response = client.get('/home/')
+        assert response.status_code == 200
+        
+        html = response.data.decode()
+        assert 'id="dashboard-bundle"' in html
+        assert '"daily_expenses"' in html
+        assert '"monthly_expenses"' in html
+        assert 'Loading...' not in html
+        assert '-$12.50' in html
+    
+    def test_bundle_reads_one_snapshot(self, file_app, monkeypatch):
+        """Test that writes committed while the bundle is built do not show up in it."""
+        with file_app.app_context():
+            db.session.execute(text('PRAGMA journal_mode=WAL'))
+            user = User(username='snapshot', email='snapshot@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            path = db.engine.url.database
+        
+        def period_totals(user_id):
+            totals = original(user_id)
+            # Another process commits between the bundle's queries
+            other = sqlite3.connect(path)
+            other.execute('UPDATE user_summaries SET total_income = 1000 WHERE user_id = ?', (user_id,))
+            other.commit()
+            other.close()
+            return totals
+        
+        original = home_module.period_totals
+        monkeypatch.setattr(home_module, 'period_totals', period_totals)
+        
+        client = file_app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        
+        bundle = client.get('/home/api/bundle').get_json()['data']
+        assert bundle['stats']['total_balance'] == 0.0
+        assert client.get('/home/api/stats').get_json()['data']['total_balance'] == 1000.0
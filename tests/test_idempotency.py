@@ -0,0 +1,229 @@
+"""
+Tests for Idempotency-Key handling on transaction and transfer writes.
+"""
+
+import sys
+import pytest
+from datetime import datetime, timedelta
+from flask import g
+from app.models import Transaction, Category, Account, Transfer, IdempotencyKey, db
+from app.idempotency import ClaimLostError
+
+
+@pytest.fixture
+def idempotency_setup(client, auth_client, db):
+    """Create a logged in user with two accounts and an income category."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    income = Category(name="Salary", type="income", user_id=user.id)
+    checking = Account(name="Checking", user_id=user.id, balance=100.0)
+    savings = Account(name="Savings", user_id=user.id, balance=0.0)
+    db.session.add_all([income, checking, savings])
+    db.session.commit()
+
+    return {
+        'user_id': user.id,
+        'income_id': income.id,
+        'checking_id': checking.id,
+        'savings_id': savings.id
+    }
+
+
+def _balance(account_id):
+    db.session.expire_all()
+    return db.session.get(Account, account_id).balance
+
+
+class TestIdempotentTransactions:
+    """Test retries of the transaction create endpoint."""
+
+    def _create(self, client, ids, key=None, amount=25.0):
+        headers = {'Idempotency-Key': key} if key else {}
+        return client.post('/transactions/api/transactions', json={
+            'amount': amount, 'account_id': ids['checking_id'], 'category_id': ids['income_id']
+        }, headers=headers)
+
+    def test_retry_is_replayed(self, client, idempotency_setup):
+        """Test that a retried request returns the first response and writes once."""
+        ids = idempotency_setup
+        first = self._create(client, ids, key='retry-1')
+        second = self._create(client, ids, key='retry-1')
+
+        assert first.status_code == 201
+        assert second.status_code == 201
+        assert second.get_json() == first.get_json()
+        assert second.headers['Idempotent-Replayed'] == 'true'
+        assert 'Idempotent-Replayed' not in first.headers
+
+        assert Transaction.query.filter_by(user_id=ids['user_id']).count() == 1
+        assert _balance(ids['checking_id']) == 125.0
+
+    def test_requests_without_key_are_not_deduplicated(self, client, idempotency_setup):
+        """Test that the header is opt in."""
+        ids = idempotency_setup
+        self._create(client, ids)
+        self._create(client, ids)
+        assert Transaction.query.filter_by(user_id=ids['user_id']).count() == 2
+        assert IdempotencyKey.query.count() == 0
+
+    def test_key_reused_for_different_request(self, client, idempotency_setup):
+        """Test that a key cannot be reused with another payload."""
+        ids = idempotency_setup
+        self._create(client, ids, key='reuse')
+        response = self._create(client, ids, key='reuse', amount=99.0)
+
+        assert response.status_code == 422
+        assert Transaction.query.filter_by(user_id=ids['user_id']).count() == 1
+
+    def test_invalid_key(self, client, idempotency_setup):
+        """Test that blank and oversized keys are rejected."""
+        ids = idempotency_setup
+        assert self._create(client, ids, key=' ').status_code == 400
+        assert self._create(client, ids, key='k' * 256).status_code == 400
+        assert Transaction.query.count() == 0
+
+    def test_client_errors_are_replayed(self, client, idempotency_setup):
+        """Test that a stored client error is answered again without running the view."""
+        ids = idempotency_setup
+        headers = {'Idempotency-Key': 'missing-account'}
+        payload = {'amount': 5.0, 'account_id': 9999, 'category_id': ids['income_id']}
+
+        first = client.post('/transactions/api/transactions', json=payload, headers=headers)
+        second = client.post('/transactions/api/transactions', json=payload, headers=headers)
+        assert first.status_code == second.status_code == 404
+        assert second.headers['Idempotent-Replayed'] == 'true'
+
+    def test_server_error_releases_key(self, client, idempotency_setup, monkeypatch):
+        """Test that a failed request can be retried with the same key."""
+        ids = idempotency_setup
+
+        def fail(*args, **kwargs):
+            raise RuntimeError('database went away')
+
+        transactions_module = sys.modules['app.transactions']
+        with monkeypatch.context() as patch:
+            patch.setattr(transactions_module, 'apply_balance_deltas', fail)
+            assert self._create(client, ids, key='flaky').status_code == 500
+        assert IdempotencyKey.query.count() == 0
+
+        response = self._create(client, ids, key='flaky')
+        assert response.status_code == 201
+        assert 'Idempotent-Replayed' not in response.headers
+        assert _balance(ids['checking_id']) == 125.0
+
+    def test_expired_key_runs_again(self, client, idempotency_setup):
+        """Test that a key past its TTL no longer replays."""
+        ids = idempotency_setup
+        self._create(client, ids, key='old')
+        IdempotencyKey.query.update({'expires_at': datetime.now() - timedelta(seconds=1)})
+        db.session.commit()
+
+        response = self._create(client, ids, key='old')
+        assert 'Idempotent-Replayed' not in response.headers
+        assert Transaction.query.filter_by(user_id=ids['user_id']).count() == 2
+        assert IdempotencyKey.query.count() == 1
+
+
+    def test_committed_claim_is_never_reclaimed(self, client, idempotency_setup):
+        """Test that a claim whose view committed is not run again when its response was lost."""
+        ids = idempotency_setup
+        assert self._create(client, ids, key='crashed').status_code == 201
+        record = IdempotencyKey.query.filter_by(key='crashed').one()
+        assert record.committed_at is not None
+        # As if the process died after the view committed but before the response was stored
+        record.status_code = None
+        record.created_at = datetime.now() - timedelta(minutes=5)
+        db.session.commit()
+
+        response = self._create(client, ids, key='crashed')
+        assert response.status_code == 409
+        assert 'already applied' in response.get_json()['error']
+        assert Transaction.query.filter_by(user_id=ids['user_id']).count() == 1
+        assert _balance(ids['checking_id']) == 125.0
+
+    def test_uncommitted_claim_is_reclaimed_after_lease(self, client, idempotency_setup):
+        """Test that a claim that never committed blocks retries only for its lease."""
+        ids = idempotency_setup
+        assert self._create(client, ids, key='probe').status_code == 201
+        request_hash = IdempotencyKey.query.filter_by(key='probe').one().request_hash
+        # Left by a request that died before its view committed
+        record = IdempotencyKey(user_id=ids['user_id'], key='died', request_hash=request_hash,
+                                created_at=datetime.now(), expires_at=datetime.now() + timedelta(hours=1))
+        db.session.add(record)
+        db.session.commit()
+        assert self._create(client, ids, key='died').status_code == 409
+
+        record.created_at = datetime.now() - timedelta(minutes=5)
+        db.session.commit()
+        response = self._create(client, ids, key='died')
+        assert response.status_code == 201
+        assert Transaction.query.filter_by(user_id=ids['user_id']).count() == 2
+
+    def test_view_cannot_commit_after_losing_its_claim(self, app, idempotency_setup):
+        """Test that a commit fails once a retry has taken the request's claim over."""
+        ids = idempotency_setup
+        with app.test_request_context():
+            g.idempotency_key_id = 999999
+            db.session.add(Transaction(amount=5.0, user_id=ids['user_id'], category_id=ids['income_id'],
+                                       account_id=ids['checking_id']))
+            with pytest.raises(ClaimLostError):
+                db.session.commit()
+            db.session.rollback()
+            g.idempotency_key_id = None
+        assert Transaction.query.filter_by(user_id=ids['user_id']).count() == 0
+
+
+class TestIdempotentTransfers:
+    """Test retries of the transfer endpoint."""
+
+    def test_transfer_retry_moves_money_once(self, client, idempotency_setup):
+        """Test that a retried transfer is replayed instead of debiting again."""
+        ids = idempotency_setup
+        data = {'from_account': ids['checking_id'], 'to_account': ids['savings_id'], 'amount': '40.00'}
+        headers = {'Idempotency-Key': 'transfer-1', 'X-Requested-With': 'XMLHttpRequest'}
+
+        first = client.post('/account/transfer', data=data, headers=headers)
+        second = client.post('/account/transfer', data=data, headers=headers)
+
+        assert first.get_json()['status'] == 'success'
+        assert second.get_json() == first.get_json()
+        assert Transfer.query.filter_by(user_id=ids['user_id']).count() == 1
+        assert _balance(ids['checking_id']) == 60.0
+        assert _balance(ids['savings_id']) == 40.0
+
+    def test_form_transfer_retry_replays_redirect(self, client, idempotency_setup):
+        """Test that the redirect of a form transfer is replayed."""
+        ids = idempotency_setup
+        data = {'from_account': ids['checking_id'], 'to_account': ids['savings_id'], 'amount': '10.00'}
+        headers = {'Idempotency-Key': 'transfer-form'}
+
+        first = client.post('/account/transfer', data=data, headers=headers)
+        second = client.post('/account/transfer', data=data, headers=headers)
+
+        assert first.status_code == second.status_code == 302
+        assert second.location == first.location
+        assert Transfer.query.filter_by(user_id=ids['user_id']).count() == 1
+
+
+class TestPurgeCommand:
+    """Test the idempotency purge command."""
+
+    def test_purge_expired_keys_in_batches(self, runner, idempotency_setup):
+        """Test that only expired keys are deleted, across several batches."""
+        ids = idempotency_setup
+        now = datetime.now()
+        db.session.add_all([
+            IdempotencyKey(user_id=ids['user_id'], key=f'expired-{index}', request_hash='0' * 64,
+                           expires_at=now - timedelta(hours=1))
+            for index in range(5)
+        ] + [
+            IdempotencyKey(user_id=ids['user_id'], key='fresh', request_hash='0' * 64,
+                           expires_at=now + timedelta(hours=1))
+        ])
+        db.session.commit()
+
+        result = runner.invoke(args=['idempotency', 'purge', '--batch-size', '2'])
+        assert result.exit_code == 0
+        assert 'Purged 5 expired idempotency keys.' in result.output
+        assert [key.key for key in IdempotencyKey.query.all()] == ['fresh']
@@ -0,0 +1,265 @@
+"""
+Tests for background jobs: exports, restores and purges started with
+"Prefer: respond-async", the job status and download endpoints and the
+jobs CLI commands.
+"""
+
+import io
+import csv
+import json
+import os
+import time
+import threading
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from app import jobs
+from app.models import Transaction, Category, Account, Job, User, db
+
+ASYNC = {'Prefer': 'respond-async'}
+
+
+@pytest.fixture
+def jobs_setup(client, auth_client, db):
+    """Create a logged in user with an account, a category and two transactions."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    account = Account(name="Checking", user_id=user.id, balance=80.0)
+    category = Category(name="Salary", type="income", user_id=user.id)
+    db.session.add_all([account, category])
+    db.session.commit()
+    db.session.add_all([
+        Transaction(amount=50.0, description='Pay', date=datetime.now(), user_id=user.id,
+                    category_id=category.id, account_id=account.id),
+        Transaction(amount=30.0, description='Bonus', date=datetime.now(), user_id=user.id,
+                    category_id=category.id, account_id=account.id),
+    ])
+    db.session.commit()
+    return {'user_id': user.id, 'account_id': account.id}
+
+
+def _finished_job(client, response):
+    """Follow a 202 response to the job it started."""
+    assert response.status_code == 202
+    data = response.get_json()
+    assert response.headers['Location'] == data['status_url']
+    status = client.get(data['status_url'])
+    assert status.status_code == 200
+    return status.get_json()
+
+
+class TestJobEndpoints:
+    """Test heavy endpoints running as background jobs."""
+
+    def test_export_backup_job(self, client, jobs_setup):
+        """Test that the JSON backup is offered as a job download."""
+        job = _finished_job(client, client.get('/profile/export-data', headers=ASYNC))
+        assert job['status'] == 'succeeded'
+        assert job['progress'] == 100
+        assert job['download_url']
+
+        download = client.get(job['download_url'])
+        assert download.status_code == 200
+        assert 'attachment' in download.headers['Content-Disposition']
+        backup = json.loads(download.data)
+        assert [account['name'] for account in backup['accounts']] == ['Checking']
+        assert len(backup['transactions']) == 2
+
+    def test_export_csv_job(self, client, jobs_setup):
+        """Test that the CSV export is written by a job with the request filters."""
+        job = _finished_job(client, client.get('/transactions/export/csv?filter=all&search=Bonus', headers=ASYNC))
+        assert job['status'] == 'succeeded'
+
+        download = client.get(job['download_url'])
+        rows = list(csv.reader(io.StringIO(download.get_data(as_text=True))))
+        assert rows[0][0] == 'id'
+        assert [row[2] for row in rows[1:]] == ['Bonus']
+
+    def test_restore_job(self, client, jobs_setup):
+        """Test that an uploaded backup is restored by a job."""
+        backup = {
+            'export_info': {},
+            'accounts': [{'name': 'Restored', 'balance': 0.0}],
+            'categories': [{'name': 'Gift', 'type': 'income'}],
+            'transactions': [{'amount': 15.0, 'description': 'Gift', 'account_name': 'Restored',
+                              'category_name': 'Gift'}]
+        }
+        response = client.post('/profile/restore-data', headers=ASYNC, data={
+            'backup_file': (io.BytesIO(json.dumps(backup).encode()), 'backup.json')
+        })
+        job = _finished_job(client, response)
+        assert job['status'] == 'succeeded'
+        assert 'Restored 1 accounts' in job['message']
+        assert Account.query.filter_by(user_id=jobs_setup['user_id'], name='Restored').first().balance == 15.0
+
+    def test_failed_restore_job_reports_error(self, client, jobs_setup):
+        """Test that an invalid backup fails the job with a readable error."""
+        response = client.post('/profile/restore-data', headers=ASYNC, data={
+            'backup_file': (io.BytesIO(b'{"broken": '), 'backup.json')
+        })
+        job = _finished_job(client, response)
+        assert job['status'] == 'failed'
+        assert job['error'] == 'Invalid JSON file format'
+        assert job['download_url'] is None
+
+    def test_restore_rejects_missing_file(self, client, jobs_setup):
+        """Test that upload errors are answered as JSON to async clients."""
+        response = client.post('/profile/restore-data', headers=ASYNC, data={})
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'No file selected'
+
+    def test_delete_all_data_job(self, client, jobs_setup):
+        """Test that deleting all data runs as a job."""
+        response = client.post('/profile/delete-all-data', headers=ASYNC, json={
+            'confirmation1': 'DELETE ALL DATA',
+            'confirmation2': 'CONFIRM DELETE'
+        })
+        job = _finished_job(client, response)
+        assert job['status'] == 'succeeded'
+        assert 'permanently deleted' in job['message']
+        assert Transaction.query.filter_by(user_id=jobs_setup['user_id']).count() == 0
+
+    def test_delete_all_data_checks_confirmation_first(self, client, jobs_setup):
+        """Test that no job is started without the confirmations."""
+        response = client.post('/profile/delete-all-data', headers=ASYNC, json={'confirmation1': 'nope'})
+        assert response.status_code == 400
+        assert Job.query.count() == 0
+
+    def test_per_user_limit(self, app, client, jobs_setup):
+        """Test that a user cannot queue more than JOBS_MAX_PER_USER jobs."""
+        limit = app.config['JOBS_MAX_PER_USER']
+        db.session.add_all([Job(user_id=jobs_setup['user_id'], kind='export_backup', status='queued')
+                            for _ in range(limit)])
+        db.session.commit()
+
+        response = client.get('/profile/export-data', headers=ASYNC)
+        assert response.status_code == 429
+        assert Job.query.count() == limit
+
+    def test_jobs_are_private(self, client, auth_client, jobs_setup):
+        """Test that users cannot see or download each other's jobs."""
+        job = _finished_job(client, client.get('/profile/export-data', headers=ASYNC))
+
+        auth_client.logout()
+        auth_client.create_user(username="other", email="other@example.com")
+        auth_client.login(email="other@example.com")
+        assert client.get(f"/jobs/{job['id']}").status_code == 404
+        assert client.get(job['download_url']).status_code == 404
+
+    def test_requests_without_prefer_stay_synchronous(self, client, jobs_setup):
+        """Test that clients not asking for a job get the file directly."""
+        response = client.get('/profile/export-data')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        assert Job.query.count() == 0
+
+
+class TestJobPool:
+    """Test jobs running on the thread pool."""
+
+    def test_job_runs_in_background(self, file_app):
+        """Test that a job started by a request is finished by the pool."""
+        file_app.config['JOBS_EAGER'] = False
+        with file_app.app_context():
+            user = User(username='pool', email='pool@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        client = file_app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+
+        response = client.get('/profile/export-data', headers=ASYNC)
+        assert response.status_code == 202
+        status_url = response.get_json()['status_url']
+
+        deadline = time.monotonic() + 10
+        while True:
+            job = client.get(status_url).get_json()
+            if job['status'] in ('succeeded', 'failed') or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+
+        assert job['status'] == 'succeeded'
+        assert client.get(job['download_url']).status_code == 200
+        file_app.extensions['jobs'].shutdown(wait=True)
+
+
+    def test_concurrent_enqueues_respect_limit(self, file_app, monkeypatch):
+        """Test that parallel requests cannot queue more than JOBS_MAX_PER_USER jobs."""
+        # Leave the jobs queued, so only the limit decides how many get in
+        file_app.config['JOBS_EAGER'] = False
+        monkeypatch.setattr(jobs, '_executor', lambda app: SimpleNamespace(submit=lambda *args: None))
+        with file_app.app_context():
+            user = User(username='limit', email='limit@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        threads_count = 6
+        barrier = threading.Barrier(threads_count)
+        outcomes = []
+
+        def worker():
+            with file_app.app_context():
+                barrier.wait()
+                try:
+                    jobs.enqueue_job('export_backup', user_id)
+                    outcomes.append('queued')
+                except jobs.JobLimitError:
+                    outcomes.append('refused')
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        limit = file_app.config['JOBS_MAX_PER_USER']
+        assert sorted(outcomes) == ['queued'] * limit + ['refused'] * (threads_count - limit)
+        with file_app.app_context():
+            assert Job.query.filter_by(user_id=user_id).count() == limit
+
+
+class TestJobCommands:
+    """Test the jobs CLI commands."""
+
+    def test_purge_finished_jobs(self, app, runner, jobs_setup):
+        """Test that old finished jobs and their files are deleted."""
+        os.makedirs(app.config['JOBS_RESULT_DIR'], exist_ok=True)
+        old_file = os.path.join(app.config['JOBS_RESULT_DIR'], 'old_result')
+        with open(old_file, 'w') as result_file:
+            result_file.write('old')
+
+        now = datetime.now()
+        db.session.add_all([
+            Job(user_id=jobs_setup['user_id'], kind='export_backup', status='succeeded',
+                finished_at=now - timedelta(hours=48), result_path=old_file),
+            Job(user_id=jobs_setup['user_id'], kind='export_backup', status='failed',
+                finished_at=now - timedelta(hours=48)),
+            Job(user_id=jobs_setup['user_id'], kind='export_backup', status='succeeded', finished_at=now),
+        ])
+        db.session.commit()
+
+        result = runner.invoke(args=['jobs', 'purge'])
+        assert result.exit_code == 0
+        assert 'Purged 2 finished jobs.' in result.output
+        assert Job.query.count() == 1
+        assert not os.path.exists(old_file)
+
+    def test_recover_interrupted_jobs(self, runner, jobs_setup):
+        """Test that jobs left active by a restart are marked failed."""
+        db.session.add_all([
+            Job(user_id=jobs_setup['user_id'], kind='export_backup', status='queued'),
+            Job(user_id=jobs_setup['user_id'], kind='export_backup', status='running'),
+            Job(user_id=jobs_setup['user_id'], kind='export_backup', status='succeeded'),
+        ])
+        db.session.commit()
+
+        result = runner.invoke(args=['jobs', 'recover'])
+        assert result.exit_code == 0
+        assert 'Marked 2 interrupted jobs as failed.' in result.output
+        db.session.expire_all()
+        assert sorted(job.status for job in Job.query.all()) == ['failed', 'failed', 'succeeded']
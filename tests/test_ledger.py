@@ -0,0 +1,224 @@
+"""
+Tests for reconciling cached account balances with the ledger.
+"""
+
+import pytest
+from datetime import datetime
+from app.models import Transaction, Category, Account, Transfer, User, db
+from app.ledger import ledger_balances, reconcile_ledger
+
+
+@pytest.fixture
+def ledger_setup(client, auth_client, db):
+    """Create a logged in user whose cached balances match a small ledger."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    income = Category(name="Salary", type="income", user_id=user.id)
+    expense = Category(name="Food", type="expense", user_id=user.id)
+    transfer_category = Category(name="Transfer", type="expense", user_id=user.id)
+    checking = Account(name="Checking", user_id=user.id, balance=60.0)
+    savings = Account(name="Savings", user_id=user.id, balance=30.0)
+    db.session.add_all([income, expense, transfer_category, checking, savings])
+    db.session.commit()
+
+    day = datetime(2024, 3, 1)
+    linked = Transaction(amount=30.0, date=day, user_id=user.id,
+                         category_id=transfer_category.id, account_id=checking.id)
+    db.session.add_all([
+        Transaction(amount=100.0, date=day, user_id=user.id, category_id=income.id, account_id=checking.id),
+        Transaction(amount=10.0, date=day, user_id=user.id, category_id=expense.id, account_id=checking.id),
+        linked
+    ])
+    db.session.commit()
+    # The transfer carries the movement; its linked transaction must not count twice
+    db.session.add(Transfer(amount=30.0, date=day, user_id=user.id, from_account_id=checking.id,
+                            to_account_id=savings.id, from_transaction_id=linked.id))
+    db.session.commit()
+
+    return {
+        'user_id': user.id,
+        'checking_id': checking.id,
+        'savings_id': savings.id
+    }
+
+
+def _set_balance(account_id, balance):
+    db.session.get(Account, account_id).balance = balance
+    db.session.commit()
+
+
+class TestLedgerBalances:
+    """Test the grouped ledger balance computation."""
+
+    def test_ledger_balances(self, ledger_setup):
+        """Test that income, expenses and transfers add up per account."""
+        ids = ledger_setup
+        balances = ledger_balances(db.session.connection(), [ids['user_id']])
+        assert balances[ids['checking_id']] == pytest.approx(60.0)
+        assert balances[ids['savings_id']] == pytest.approx(30.0)
+
+    def test_reconcile_without_drift(self, ledger_setup):
+        """Test that matching balances are not reported."""
+        report = reconcile_ledger()
+        assert report['users'] == 1
+        assert report['accounts_checked'] == 2
+        assert report['drifted'] == 0
+        assert report['drifts'] == []
+
+    def test_reconcile_reports_drift_without_fixing(self, ledger_setup):
+        """Test that drift is reported and left alone unless asked to fix."""
+        ids = ledger_setup
+        _set_balance(ids['checking_id'], 75.0)
+
+        report = reconcile_ledger()
+        assert report['drifted'] == 1
+        assert report['fixed'] == 0
+        assert report['drifts'][0] == {
+            'account_id': ids['checking_id'],
+            'user_id': ids['user_id'],
+            'name': 'Checking',
+            'balance': 75.0,
+            'ledger_balance': 60.0,
+            'drift': -15.0
+        }
+        db.session.expire_all()
+        assert db.session.get(Account, ids['checking_id']).balance == 75.0
+
+    def test_reconcile_fixes_drift(self, ledger_setup):
+        """Test that fixing restores the ledger balance of drifted accounts."""
+        ids = ledger_setup
+        _set_balance(ids['checking_id'], 75.0)
+        _set_balance(ids['savings_id'], 0.0)
+
+        report = reconcile_ledger(fix=True)
+        assert report['drifted'] == 2
+        assert report['fixed'] == 2
+
+        db.session.expire_all()
+        assert db.session.get(Account, ids['checking_id']).balance == pytest.approx(60.0)
+        assert db.session.get(Account, ids['savings_id']).balance == pytest.approx(30.0)
+        assert reconcile_ledger()['drifted'] == 0
+
+    def test_opening_balance_is_not_drift(self, client, ledger_setup):
+        """Test that an account opened below zero keeps its balance when fixing."""
+        client.post('/account/create', data={'name': 'Loan', 'balance': '-1000'})
+        loan = Account.query.filter_by(name='Loan').one()
+        assert loan.opening_balance == -1000.0
+
+        report = reconcile_ledger(fix=True)
+        assert report['drifted'] == 0
+        db.session.expire_all()
+        assert db.session.get(Account, loan.id).balance == -1000.0
+
+        _set_balance(loan.id, -1100.0)
+        assert reconcile_ledger()['drifts'][0]['ledger_balance'] == -1000.0
+
+    def test_reconcile_in_batches(self, ledger_setup):
+        """Test that small batches cover every user exactly once."""
+        other = User(username="other", email="other@example.com")
+        other.set_password("Password123!")
+        db.session.add(other)
+        db.session.commit()
+        db.session.add(Account(name="Wallet", user_id=other.id, balance=5.0))
+        db.session.commit()
+
+        report = reconcile_ledger(batch_size=1)
+        assert report['users'] == 2
+        assert report['accounts_checked'] == 3
+        assert [drift['name'] for drift in report['drifts']] == ['Wallet']
+
+
+class TestParallelReconcile:
+    """Test reconciliation across worker threads on a file database."""
+
+    def test_parallel_batches_fix_every_user(self, file_app):
+        """Test that batches run by several workers fix all drifted accounts."""
+        with file_app.app_context():
+            users = [User(username=f"user{index}", email=f"user{index}@example.com", password_hash='x')
+                     for index in range(6)]
+            db.session.add_all(users)
+            db.session.commit()
+            db.session.add_all([Account(name="Cash", user_id=user.id, balance=10.0) for user in users])
+            db.session.commit()
+
+            report = reconcile_ledger(fix=True, batch_size=2, workers=3)
+            assert report['users'] == 6
+            assert report['fixed'] == 6
+
+            db.session.expire_all()
+            assert {account.balance for account in Account.query.all()} == {0.0}
+
+
+class TestLedgerCommand:
+    """Test the ledger CLI command."""
+
+    def test_reconcile_command(self, runner, ledger_setup):
+        """Test that the command lists drifted accounts and fixes them."""
+        ids = ledger_setup
+        _set_balance(ids['savings_id'], 12.5)
+
+        result = runner.invoke(args=['ledger', 'reconcile'])
+        assert result.exit_code == 0
+        assert 'balance 12.50, ledger 30.00, drift +17.50' in result.output
+        assert 'Checked 2 accounts of 1 users, 1 drifted.' in result.output
+
+        result = runner.invoke(args=['ledger', 'reconcile', '--fix', '--user-id', str(ids['user_id'])])
+        assert result.exit_code == 0
+        assert '1 drifted, 1 fixed.' in result.output
+
+        db.session.expire_all()
+        assert db.session.get(Account, ids['savings_id']).balance == pytest.approx(30.0)
+
+    def test_reconcile_command_unknown_user(self, runner, db):
+        """Test that reconciling an unknown user fails cleanly."""
+        result = runner.invoke(args=['ledger', 'reconcile', '--user-id', '999'])
+        assert result.exit_code != 0
+        assert 'User 999 not found' in result.output
+
+
+class TestReconcileEndpoint:
+    """Test the admin reconcile endpoint."""
+
+    def test_requires_login(self, client, db):
+        """Test that anonymous callers are rejected."""
+        response = client.post('/admin/api/ledger/reconcile', json={})
+        assert response.status_code == 401
+
+    def test_requires_admin(self, client, ledger_setup):
+        """Test that regular users cannot run reconciliation."""
+        response = client.post('/admin/api/ledger/reconcile', json={'fix': True})
+        assert response.status_code == 403
+
+    def test_admin_reconcile(self, app, client, ledger_setup, monkeypatch):
+        """Test that administrators get the drift report and can fix it."""
+        ids = ledger_setup
+        monkeypatch.setitem(app.config, 'ADMIN_USER_IDS', (ids['user_id'],))
+        _set_balance(ids['checking_id'], 0.0)
+
+        response = client.post('/admin/api/ledger/reconcile', json={'fix': True})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['drifted'] == 1
+        assert data['fixed'] == 1
+        assert data['drifts'][0]['ledger_balance'] == 60.0
+
+        db.session.expire_all()
+        assert db.session.get(Account, ids['checking_id']).balance == pytest.approx(60.0)
+
+    def test_admin_reconcile_invalid_options(self, app, client, ledger_setup, monkeypatch):
+        """Test that malformed options are rejected."""
+        ids = ledger_setup
+        monkeypatch.setitem(app.config, 'ADMIN_USER_IDS', (ids['user_id'],))
+        _set_balance(ids['checking_id'], 0.0)
+        for options in ({'batch_size': 'many'}, {'fix': 'false'}, {'workers': 1000}):
+            response = client.post('/admin/api/ledger/reconcile', json=options)
+            assert response.status_code == 400
+        db.session.expire_all()
+        assert db.session.get(Account, ids['checking_id']).balance == 0.0
+
+    def test_admin_rights_do_not_follow_email(self, app, client, ledger_setup, monkeypatch):
+        """Test that taking over an email address does not grant admin rights."""
+        monkeypatch.setitem(app.config, 'ADMIN_USER_IDS', (ledger_setup['user_id'] + 1,))
+        response = client.post('/admin/api/ledger/reconcile', json={})
+        assert response.status_code == 403
@@ -0,0 +1,98 @@
+"""
+Tests for the shared reporting periods and the multi-period totals.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from app.models import Transaction, Category, Account, db
+from app.periods import get_date_range, period_totals, STANDARD_PERIODS
+
+
+class TestGetDateRange:
+    """Test resolving period names to date ranges."""
+
+    @pytest.mark.parametrize('now, start, end', [
+        (datetime(2024, 2, 15, 10), datetime(2024, 1, 1), datetime(2024, 3, 31, 23, 59, 59, 999999)),
+        (datetime(2024, 11, 3, 10), datetime(2024, 10, 1), datetime(2024, 12, 31, 23, 59, 59, 999999)),
+        (datetime(2024, 12, 31, 23), datetime(2024, 10, 1), datetime(2024, 12, 31, 23, 59, 59, 999999)),
+    ])
+    def test_quarter(self, now, start, end):
+        """Test quarters, including the last one of the year."""
+        assert get_date_range('quarter', now=now) == (start, end)
+
+    def test_month_in_december(self):
+        """Test that December ends on New Year's Eve."""
+        start, end = get_date_range('month', now=datetime(2024, 12, 10))
+        assert start == datetime(2024, 12, 1)
+        assert end == datetime(2024, 12, 31, 23, 59, 59, 999999)
+
+    def test_week_starts_on_monday(self):
+        """Test that weeks run Monday to Sunday."""
+        start, end = get_date_range('week', now=datetime(2024, 3, 7, 15))  # Thursday
+        assert start == datetime(2024, 3, 4)
+        assert end == datetime(2024, 3, 10, 23, 59, 59, 999999)
+
+    def test_custom_and_fallbacks(self):
+        """Test custom ranges, 'all' and the month fallback for bad input."""
+        now = datetime(2024, 5, 20)
+        assert get_date_range('custom', '2024-01-01', '2024-01-31') == (
+            datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59, 999999)
+        )
+        assert get_date_range('all') == (None, None)
+        month = get_date_range('month', now=now)
+        assert get_date_range('custom', 'bad', '2024-01-31', now=now) == month
+        assert get_date_range('custom', now=now) == month
+        assert get_date_range('decade', now=now) == month
+
+
+@pytest.fixture
+def periods_setup(client, auth_client, db):
+    """Create a logged in user with transactions spread over several periods."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    income = Category(name="Salary", type="income", user_id=user.id)
+    expense = Category(name="Food", type="expense", user_id=user.id)
+    account = Account(name="Checking", user_id=user.id, balance=0.0)
+    db.session.add_all([income, expense, account])
+    db.session.commit()
+
+    now = datetime.now()
+    db.session.add_all([
+        Transaction(amount=100.0, date=now, user_id=user.id, category_id=income.id, account_id=account.id),
+        Transaction(amount=30.0, date=now, user_id=user.id, category_id=expense.id, account_id=account.id),
+        Transaction(amount=500.0, date=now - timedelta(days=800), user_id=user.id,
+                    category_id=income.id, account_id=account.id),
+    ])
+    db.session.commit()
+    return {'user_id': user.id}
+
+
+class TestPeriodTotals:
+    """Test the one-scan totals of every standard period."""
+
+    def test_periods_endpoint(self, client, periods_setup):
+        """Test that every standard period is returned with its totals."""
+        response = client.get('/home/api/periods')
+        assert response.status_code == 200
+        data = response.get_json()['data']
+
+        assert set(data) == set(STANDARD_PERIODS)
+        for period in ('today', 'week', 'month', 'quarter', 'year'):
+            assert data[period]['income'] == 100.0
+            assert data[period]['expenses'] == 30.0
+            assert data[period]['net'] == 70.0
+        assert data['all']['income'] == 600.0
+        assert data['all']['start_date'] is None
+
+    def test_single_query(self, app, capture_sql, periods_setup):
+        """Test that all periods are computed with one statement."""
+        with capture_sql() as statements:
+            totals = period_totals(periods_setup['user_id'])
+
+        assert len(statements) == 1
+        assert totals['year']['income'] == 100.0
+
+    def test_periods_endpoint_requires_login(self, client):
+        """Test that the periods endpoint requires login."""
+        assert client.get('/home/api/periods').status_code == 302
@@ -516,6 +516,28 @@ class TestDataBackupRestore:
             assert backup_data['categories'][0]['name'] == 'Test Category'
             assert backup_data['transactions'][0]['amount'] == -50.0
 
+    def test_restore_recomputes_balances_from_ledger(self, client, auth_client, app):
+        """Test that restored balances follow category types, not amount signs."""
+        with app.app_context():
+            user = auth_client.create_user()
+            
+            from app.profile import restore_user_data
+            result = restore_user_data(user.id, {
+                'accounts': [{'name': 'Restored', 'balance': 999.0}],
+                'categories': [
+                    {'name': 'Salary', 'type': 'income'},
+                    {'name': 'Food', 'type': 'expense'}
+                ],
+                'transactions': [
+                    {'amount': 100.0, 'description': 'Pay', 'account_name': 'Restored', 'category_name': 'Salary'},
+                    {'amount': 30.0, 'description': 'Lunch', 'account_name': 'Restored', 'category_name': 'Food'}
+                ]
+            })
+            assert result['success']
+            
+            account = Account.query.filter_by(user_id=user.id, name='Restored').first()
+            assert account.balance == 70.0
+
     def test_validate_backup_data(self, app):
         """Test backup data validation."""
         with app.app_context():
@@ -0,0 +1,161 @@
+"""
+Tests for the chunked purge of user data behind "delete all data" and
+"delete account".
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from app.models import Transaction, Transfer, Category, Account, DailyRollup, UserSummary, Job, User, db
+from app.rollups import get_user_summary
+from app import purge
+from app.profile import DELETE_ACCOUNT_MESSAGE
+from app.purge import purge_user_data
+
+ASYNC = {'Prefer': 'respond-async'}
+
+
+@pytest.fixture
+def purge_setup(client, auth_client, db):
+    """Create a logged in user with five transactions, a transfer and another user's data."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    checking = Account(name="Checking", user_id=user.id, balance=0.0)
+    savings = Account(name="Savings", user_id=user.id, balance=0.0)
+    food = Category(name="Food", type="expense", user_id=user.id)
+    db.session.add_all([checking, savings, food])
+    db.session.commit()
+    db.session.add_all([
+        Transaction(amount=10.0, description=f'Meal {day}', date=datetime.now() - timedelta(days=day),
+                    user_id=user.id, category_id=food.id, account_id=checking.id)
+        for day in range(5)
+    ] + [
+        Transfer(amount=5.0, user_id=user.id, from_account_id=checking.id, to_account_id=savings.id)
+    ])
+
+    other = auth_client.create_user(username='other', email='other@example.com')
+    other_account = Account(name="Other", user_id=other.id, balance=0.0)
+    other_category = Category(name="Food", type="expense", user_id=other.id)
+    db.session.add_all([other_account, other_category])
+    db.session.commit()
+    db.session.add(Transaction(amount=7.0, description='Kept', user_id=other.id,
+                               category_id=other_category.id, account_id=other_account.id))
+    db.session.commit()
+    return {'user_id': user.id, 'other_id': other.id}
+
+
+def _remaining(model, user_id):
+    return model.query.filter_by(user_id=user_id).count()
+
+
+class TestPurgeUserData:
+    """Test batched deletion of a user's data."""
+
+    def test_deletes_in_batches_and_dependency_order(self, client, capture_sql, purge_setup):
+        """Test that each statement deletes a bounded batch, transfers before accounts."""
+        user_id = purge_setup['user_id']
+        with capture_sql() as statements:
+            deleted = purge_user_data(user_id, batch_size=2)
+        deletes = [statement.split()[2] for statement, _ in statements if statement.startswith('DELETE FROM')]
+
+        assert deleted == {'transfers': 1, 'transactions': 5, 'accounts': 2, 'categories': 1}
+        assert deletes.count('transactions') == 3
+        assert deletes.index('transfers') < deletes.index('transactions') < deletes.index('accounts')
+        for model in (Transaction, Transfer, Account, Category, DailyRollup):
+            assert _remaining(model, user_id) == 0
+        assert db.session.get(User, user_id) is not None
+        assert _remaining(Transaction, purge_setup['other_id']) == 1
+
+    def test_reports_progress(self, client, purge_setup):
+        """Test that progress is reported after every batch up to the total."""
+        calls = []
+        purge_user_data(purge_setup['user_id'], batch_size=2, progress=lambda done, total: calls.append((done, total)))
+        assert calls == [(1, 9), (3, 9), (5, 9), (6, 9), (8, 9), (9, 9)]
+
+    def test_interrupted_purge_resumes(self, client, purge_setup, monkeypatch):
+        """Test that committed batches keep the summary exact and a rerun finishes the purge."""
+        user_id = purge_setup['user_id']
+        delete_batch = purge._delete_batch
+        batches = []
+
+        def failing_batch(*args):
+            if len(batches) == 3:
+                raise RuntimeError('interrupted')
+            batches.append(args)
+            return delete_batch(*args)
+
+        monkeypatch.setattr(purge, '_delete_batch', failing_batch)
+        with pytest.raises(RuntimeError):
+            purge_user_data(user_id, batch_size=2)
+        db.session.rollback()
+
+        assert _remaining(Transfer, user_id) == 0
+        assert _remaining(Transaction, user_id) == 3
+        summary = get_user_summary(user_id)
+        assert summary.transaction_count == 3
+        assert summary.total_expenses == pytest.approx(30.0)
+
+        monkeypatch.setattr(purge, '_delete_batch', delete_batch)
+        assert purge_user_data(user_id)['transactions'] == 3
+        summary = db.session.get(UserSummary, user_id)
+        assert (summary.transaction_count, summary.account_count, summary.category_count) == (0, 0, 0)
+
+    def test_delete_user(self, client, purge_setup):
+        """Test that deleting the user removes its summary and jobs last."""
+        user_id = purge_setup['user_id']
+        get_user_summary(user_id)
+        db.session.add(Job(user_id=user_id, kind='export_backup', status='succeeded'))
+        db.session.commit()
+
+        purge_user_data(user_id, delete_user=True)
+        assert db.session.get(User, user_id) is None
+        assert db.session.get(UserSummary, user_id) is None
+        assert _remaining(Job, user_id) == 0
+        assert db.session.get(User, purge_setup['other_id']) is not None
+
+
+class TestPurgeEndpoints:
+    """Test the endpoints and command running purges."""
+
+    def test_delete_all_data_job_reports_progress(self, client, purge_setup):
+        """Test that the delete all data job leaves the user and finishes at 100%."""
+        response = client.post('/profile/delete-all-data', headers=ASYNC, json={
+            'confirmation1': 'DELETE ALL DATA', 'confirmation2': 'CONFIRM DELETE'
+        })
+        job = client.get(response.get_json()['status_url']).get_json()
+        assert (job['status'], job['progress']) == ('succeeded', 100)
+        assert _remaining(Transaction, purge_setup['user_id']) == 0
+
+    def test_delete_account_job(self, app, client, purge_setup):
+        """Test that the delete account job removes the user but can still be polled."""
+        db.session.add(Job(user_id=purge_setup['user_id'], kind='export_backup', status='succeeded'))
+        db.session.commit()
+
+        response = client.post('/profile/delete-account', headers=ASYNC, json={
+            'confirmation1': 'DELETE ACCOUNT', 'confirmation2': 'PERMANENTLY DELETE'
+        })
+        assert response.status_code == 202
+        status_url = response.get_json()['status_url']
+        assert db.session.get(User, purge_setup['user_id']) is None
+
+        job = client.get(status_url).get_json()
+        assert (job['kind'], job['status'], job['progress']) == ('delete_account', 'succeeded', 100)
+        assert job['message'] == DELETE_ACCOUNT_MESSAGE
+        assert [(j.kind, j.user_id) for j in Job.query.all()] == [('delete_account', None)]
+
+        # Nobody else can follow the detached job
+        assert app.test_client().get(status_url).status_code == 401
+
+    def test_purge_command(self, runner, purge_setup):
+        """Test that the command purges a user's data and can delete the user."""
+        result = runner.invoke(args=['purge', 'user', str(purge_setup['user_id']), '--batch-size', '2'])
+        assert result.exit_code == 0
+        assert 'Deleted 1 transfers, 5 transactions, 2 accounts, 1 categories.' in result.output
+
+        result = runner.invoke(args=['purge', 'user', str(purge_setup['user_id']), '--delete-user'])
+        assert result.exit_code == 0
+        assert db.session.get(User, purge_setup['user_id']) is None
+
+        result = runner.invoke(args=['purge', 'user', '999'])
+        assert result.exit_code != 0
+        assert 'User 999 not found' in result.output
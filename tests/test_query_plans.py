@@ -0,0 +1,136 @@
+"""
+Query plan checks: every endpoint must read its large tables through an index.
+
+Each endpoint is requested while its SQL statements are captured, then every
+SELECT is explained. Any full scan of the transactions, transfers or
+daily_rollups tables fails the check.
+"""
+
+import re
+import pytest
+from datetime import datetime, timedelta
+from app.models import Transaction, Category, Account, Transfer, db
+
+LARGE_TABLES = ('transactions', 'transfers', 'daily_rollups')
+
+ENDPOINTS = [
+    '/home/',
+    '/home/api/stats',
+    '/home/api/stats?days=0',
+    '/home/api/recent-transactions',
+    '/home/api/category-breakdown',
+    '/home/api/monthly-trend',
+    '/home/api/daily-activity',
+    '/home/api/weekly-expenses',
+    '/home/api/daily-expenses',
+    '/home/api/monthly-expenses',
+    '/home/api/today-stats',
+    '/home/api/week-stats',
+    '/home/api/periods',
+    '/home/api/bundle',
+    '/account/',
+    '/account/api/accounts',
+    '/account/api/chart-data',
+    '/account/api/recent-transfers',
+    '/account/api/transfers',
+    '/account/api/transfer-summary',
+    '/categories/',
+    '/categories/api/categories',
+    '/categories/api/categories/stats',
+    '/categories/api/categories/top-expenses',
+    '/transactions/',
+    '/transactions/?filter=all',
+    '/transactions/api/transactions',
+    '/transactions/api/statistics',
+    '/transactions/api/descriptions?q=Lun',
+    '/transactions/api/transactions?search=Lunch',
+    '/transactions/api/transactions?search=Che',
+    '/transactions/api/search?q=Lnuch',
+    '/transactions/export/csv',
+    '/profile/',
+    '/profile/api/stats',
+]
+
+
+def full_table_scans(connection, statement, parameters):
+    """
+    Explain a statement and return the large tables it scans in full.
+
+    Args:
+        connection: SQLAlchemy connection to explain on
+        statement (str): SQL statement as sent to the driver
+        parameters: Driver parameters of the statement
+
+    Returns:
+        list: Names of the large tables read without an index search
+    """
+    if connection.dialect.name == 'postgresql':
+        # Tiny test tables are always cheaper to scan, so only allow index plans
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        plan = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).scalars().all()
+        pattern = re.compile(r'Seq Scan on (\w+)')
+    else:
+        plan = [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+        pattern = re.compile(r'^SCAN (\w+)')
+
+    scans = []
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match and match.group(1) in LARGE_TABLES:
+            scans.append(line.strip())
+    return scans
+
+
+@pytest.fixture
+def plan_setup(client, auth_client, db):
+    """Create a logged in user with a little data in every large table."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    income = Category(name="Salary", type="income", user_id=user.id)
+    expense = Category(name="Food", type="expense", user_id=user.id)
+    checking = Account(name="Checking", user_id=user.id, balance=500.0)
+    savings = Account(name="Savings", user_id=user.id, balance=100.0)
+    db.session.add_all([income, expense, checking, savings])
+    db.session.commit()
+
+    now = datetime.now()
+    for offset in range(5):
+        db.session.add_all([
+            Transaction(amount=100.0, description='Payroll', date=now - timedelta(days=offset * 20),
+                        user_id=user.id, category_id=income.id, account_id=checking.id),
+            Transaction(amount=12.5, description='Lunch', date=now - timedelta(days=offset * 7, hours=1),
+                        user_id=user.id, category_id=expense.id, account_id=checking.id),
+        ])
+    db.session.add(Transfer(amount=25.0, date=now, user_id=user.id,
+                            from_account_id=checking.id, to_account_id=savings.id))
+    db.session.commit()
+    return user
+
+
+class TestQueryPlans:
+    """Test that endpoint queries never fall back to full table scans."""
+
+    @pytest.mark.parametrize('url', ENDPOINTS)
+    def test_endpoint_uses_indexes(self, app, client, capture_sql, plan_setup, url):
+        """Test that every SELECT of an endpoint reads large tables through an index."""
+        with capture_sql() as captured:
+            response = client.get(url)
+            # Streamed responses run their queries while the body is read
+            response.get_data()
+        assert response.status_code == 200
+        statements = [
+            (statement, parameters) for statement, parameters in captured
+            if statement.lstrip().upper().startswith(('SELECT', 'WITH'))
+        ]
+        assert statements
+
+        offenders = []
+        with db.engine.connect() as connection:
+            for statement, parameters in statements:
+                scans = full_table_scans(connection, statement, parameters)
+                if scans:
+                    offenders.append(f"{scans} <- {statement}")
+            connection.rollback()
+
+        assert not offenders, '\n\n'.join(offenders)
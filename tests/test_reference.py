@@ -0,0 +1,138 @@
+"""
+Tests for the per-user account and category cache.
+"""
+
+import pytest
+from sqlalchemy import text
+from app.models import Category, Account, User, db
+from app.reference import get_reference_data
+
+
+@pytest.fixture
+def reference_setup(client, auth_client, db):
+    """Create a logged in user with an account and two categories."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    account = Account(name="Checking", user_id=user.id, balance=10.0, color="#123456")
+    salary = Category(name="Salary", type="income", user_id=user.id, unicode_emoji="💰")
+    food = Category(name="Food", type="expense", user_id=user.id)
+    db.session.add_all([account, salary, food])
+    db.session.commit()
+
+    return {'user_id': user.id, 'account_id': account.id, 'salary_id': salary.id, 'food_id': food.id}
+
+
+class TestReferenceCache:
+    """Test loading, caching and invalidation of reference data."""
+
+    def test_reference_data_is_cached(self, capture_sql, reference_setup):
+        """Test that a second lookup runs no queries."""
+        ids = reference_setup
+        data = get_reference_data(ids['user_id'])
+        assert data.account(ids['account_id']).color == "#123456"
+        assert data.category(str(ids['salary_id'])).unicode_emoji == "💰"
+        assert data.category('nope') is None
+        assert data.category_named('Food', 'expense').id == ids['food_id']
+
+        with capture_sql() as statements:
+            again = get_reference_data(ids['user_id'])
+        assert again is data
+        assert statements == []
+
+    def test_commit_invalidates(self, client, reference_setup):
+        """Test that a category created through the API can be used straight away."""
+        ids = reference_setup
+        get_reference_data(ids['user_id'])
+
+        response = client.post('/categories/api/categories', json={'name': 'Rent', 'type': 'expense'})
+        assert response.status_code in (200, 201)
+        rent = Category.query.filter_by(user_id=ids['user_id'], name='Rent').first()
+
+        response = client.post('/transactions/api/transactions', json={
+            'amount': 5.0, 'account_id': ids['account_id'], 'category_id': rent.id
+        })
+        assert response.status_code == 201
+        assert response.get_json()['account']['balance'] == 5.0
+
+    def test_uncommitted_rows_are_not_cached(self, app, reference_setup):
+        """Test that rows of a rolled back transaction never reach the cache."""
+        ids = reference_setup
+        get_reference_data(ids['user_id'])
+
+        db.session.add(Category(name="Temp", type="expense", user_id=ids['user_id']))
+        db.session.flush()
+        assert get_reference_data(ids['user_id']).category_named('Temp', 'expense') is not None
+        db.session.rollback()
+
+        assert get_reference_data(ids['user_id']).category_named('Temp', 'expense') is None
+
+    def test_bulk_delete_invalidates(self, reference_setup):
+        """Test that bulk ORM deletes drop cached entries."""
+        ids = reference_setup
+        get_reference_data(ids['user_id'])
+
+        Category.query.filter_by(user_id=ids['user_id'], name='Food').delete()
+        db.session.commit()
+
+        assert get_reference_data(ids['user_id']).category(ids['food_id']) is None
+
+    def test_other_users_accounts_are_not_found(self, client, reference_setup):
+        """Test that ownership checks use the caller's own entry."""
+        ids = reference_setup
+        other = User(username="other", email="other@example.com", password_hash='x')
+        db.session.add(other)
+        db.session.commit()
+        foreign = Account(name="Theirs", user_id=other.id)
+        db.session.add(foreign)
+        db.session.commit()
+
+        response = client.post('/transactions/api/transactions', json={
+            'amount': 5.0, 'account_id': foreign.id, 'category_id': ids['salary_id']
+        })
+        assert response.status_code == 404
+
+    def test_writes_use_current_category_type(self, client, reference_setup):
+        """Test that balances follow the stored category type when the cache is behind."""
+        ids = reference_setup
+        get_reference_data(ids['user_id'])
+        # Raw SQL skips the invalidation hooks, like a change made by another process
+        db.session.execute(text("UPDATE categories SET type = 'income' WHERE id = :id"), {'id': ids['food_id']})
+        db.session.commit()
+        assert get_reference_data(ids['user_id']).category(ids['food_id']).type == 'expense'
+
+        response = client.post('/transactions/api/transactions', json={
+            'amount': 5.0, 'account_id': ids['account_id'], 'category_id': ids['food_id']
+        })
+        assert response.status_code == 201
+        assert response.get_json()['account']['balance'] == 15.0
+        assert db.session.get(Account, ids['account_id']).balance == 15.0
+
+    def test_writes_reject_categories_deleted_elsewhere(self, client, reference_setup):
+        """Test that a category still in the cache but gone from the database is not found."""
+        ids = reference_setup
+        get_reference_data(ids['user_id'])
+        db.session.execute(text("DELETE FROM categories WHERE id = :id"), {'id': ids['food_id']})
+        db.session.commit()
+
+        response = client.post('/transactions/api/transactions', json={
+            'amount': 5.0, 'account_id': ids['account_id'], 'category_id': ids['food_id']
+        })
+        assert response.status_code == 404
+        assert db.session.get(Account, ids['account_id']).balance == 10.0
+
+    def test_rows_created_elsewhere_are_found(self, client, reference_setup):
+        """Test that a cache miss reloads the entry before answering 404."""
+        ids = reference_setup
+        get_reference_data(ids['user_id'])
+        # Raw SQL skips the invalidation hooks, like a row created by another process
+        db.session.execute(text("INSERT INTO accounts (name, balance, opening_balance, user_id) "
+                                "VALUES ('Cash', 0, 0, :user_id)"), {'user_id': ids['user_id']})
+        db.session.commit()
+        cash_id = Account.query.filter_by(name='Cash').one().id
+
+        response = client.post('/transactions/api/transactions', json={
+            'amount': 5.0, 'account_id': cash_id, 'category_id': ids['salary_id']
+        })
+        assert response.status_code == 201
+        assert get_reference_data(ids['user_id']).account(cash_id).name == 'Cash'
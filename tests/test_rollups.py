@@ -0,0 +1,361 @@
+"""
+Tests for the incrementally maintained transaction kinds, daily rollups and
+user summaries.
+"""
+
+import pytest
+from datetime import datetime, date
+from app.models import Transaction, Category, Account, DailyRollup, UserSummary, db
+from app.rollups import rebuild_rollups, ledger_rows, _full_day_span, get_user_summary
+from app.rollups import sync_transaction_kinds
+
+
+def _rollup_snapshot(user_id):
+    """Return the rollup rows of a user as a comparable set."""
+    rows = DailyRollup.query.filter_by(user_id=user_id).all()
+    return {
+        (r.day, r.category_id, r.account_id): (round(r.total, 6), r.txn_count)
+        for r in rows
+    }
+
+
+@pytest.fixture
+def rollup_setup(client, auth_client, db):
+    """Create a logged in user with an account and income/expense categories."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    income = Category(name="Salary", type="income", user_id=user.id)
+    expense = Category(name="Food", type="expense", user_id=user.id)
+    db.session.add_all([income, expense])
+    db.session.commit()
+
+    checking = Account(name="Checking", user_id=user.id, balance=0.0)
+    savings = Account(name="Savings", user_id=user.id, balance=0.0)
+    db.session.add_all([checking, savings])
+    db.session.commit()
+
+    return {
+        'user_id': user.id,
+        'income_id': income.id,
+        'expense_id': expense.id,
+        'checking_id': checking.id,
+        'savings_id': savings.id
+    }
+
+
+class TestRollupMaintenance:
+    """Test that every write path keeps the rollups in step with transactions."""
+
+    def test_orm_insert_creates_rollup(self, rollup_setup):
+        """Test that adding transactions through the session updates rollups."""
+        ids = rollup_setup
+        day = datetime(2024, 5, 10, 9, 30)
+        db.session.add_all([
+            Transaction(amount=10.0, date=day, user_id=ids['user_id'],
+                        category_id=ids['expense_id'], account_id=ids['checking_id']),
+            Transaction(amount=15.5, date=day.replace(hour=18), user_id=ids['user_id'],
+                        category_id=ids['expense_id'], account_id=ids['checking_id']),
+        ])
+        db.session.commit()
+
+        rollup = db.session.get(DailyRollup, (ids['user_id'], date(2024, 5, 10),
+                                              ids['expense_id'], ids['checking_id']))
+        assert rollup is not None
+        assert rollup.total == 25.5
+        assert rollup.txn_count == 2
+
+    def test_api_write_paths_match_rebuild(self, client, rollup_setup):
+        """Test that create, update, delete and bulk delete leave rollups equal to a rebuild."""
+        ids = rollup_setup
+
+        created = []
+        for amount, category in [(100.0, 'income_id'), (40.0, 'expense_id'), (5.0, 'expense_id')]:
+            response = client.post('/transactions/api/transactions', json={
+                'amount': amount,
+                'account_id': ids['checking_id'],
+                'category_id': ids[category],
+                'date': '2024-03-01T10:00'
+            })
+            assert response.status_code == 201
+            created.append(response.get_json()['id'])
+
+        # Move one transaction to another day, account and category
+        response = client.put(f'/transactions/api/transactions/{created[1]}', json={
+            'amount': 45.0,
+            'account_id': ids['savings_id'],
+            'category_id': ids['income_id'],
+            'date': '2024-03-02T08:00'
+        })
+        assert response.status_code == 200
+
+        response = client.delete(f'/transactions/api/transactions/{created[0]}')
+        assert response.status_code == 200
+
+        incremental = _rollup_snapshot(ids['user_id'])
+        rebuild_rollups(ids['user_id'])
+        assert incremental == _rollup_snapshot(ids['user_id'])
+
+        response = client.post('/transactions/api/transactions/bulk', json={
+            'operation': 'delete',
+            'transaction_ids': created[1:]
+        })
+        assert response.status_code == 200
+        assert _rollup_snapshot(ids['user_id']) == {}
+
+    def test_account_initial_deposit_and_adjustment(self, client, rollup_setup):
+        """Test that initial deposits and balance adjustments are rolled up."""
+        ids = rollup_setup
+
+        client.post('/account/create', data={'name': 'Wallet', 'balance': '200'})
+        wallet = Account.query.filter_by(user_id=ids['user_id'], name='Wallet').first()
+        client.post(f'/account/edit/{wallet.id}', data={'name': 'Wallet', 'balance': '150'})
+
+        incremental = _rollup_snapshot(ids['user_id'])
+        assert sum(count for _, count in incremental.values()) == 2
+        rebuild_rollups(ids['user_id'])
+        assert incremental == _rollup_snapshot(ids['user_id'])
+
+    def test_delete_all_data_removes_rollups(self, client, rollup_setup):
+        """Test that deleting all user data also clears the rollups."""
+        ids = rollup_setup
+        db.session.add(Transaction(amount=1.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                   category_id=ids['expense_id'], account_id=ids['checking_id']))
+        db.session.commit()
+
+        response = client.post('/profile/delete-all-data', json={
+            'confirmation1': 'DELETE ALL DATA',
+            'confirmation2': 'CONFIRM DELETE'
+        })
+        assert response.status_code == 200
+        assert DailyRollup.query.filter_by(user_id=ids['user_id']).count() == 0
+
+
+def _summary_snapshot(user_id):
+    """Return the stored summary of a user as a comparable tuple."""
+    db.session.expire_all()
+    summary = db.session.get(UserSummary, user_id)
+    return (round(summary.total_income, 6), round(summary.total_expenses, 6),
+            summary.transaction_count, summary.category_count, summary.account_count)
+
+
+class TestTransactionKind:
+    """Test the kind column copied from each transaction's category."""
+
+    def test_kind_is_stamped_on_insert_and_recategorize(self, rollup_setup):
+        """Test that new and recategorized transactions carry their category's kind."""
+        ids = rollup_setup
+        transaction = Transaction(amount=10.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                  category_id=ids['expense_id'], account_id=ids['checking_id'])
+        db.session.add(transaction)
+        db.session.commit()
+        assert transaction.kind == 'expense'
+
+        transaction.category_id = ids['income_id']
+        db.session.commit()
+        assert transaction.kind == 'income'
+        assert DailyRollup.query.filter_by(user_id=ids['user_id']).one().kind == 'income'
+
+    def test_category_changes_restamp_history(self, rollup_setup):
+        """Test that changing a category's type or name updates its transactions and rollups."""
+        ids = rollup_setup
+        db.session.add(Transaction(amount=10.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                   category_id=ids['expense_id'], account_id=ids['checking_id']))
+        db.session.commit()
+
+        category = db.session.get(Category, ids['expense_id'])
+        category.name = 'Transfer'
+        db.session.commit()
+        db.session.expire_all()
+        assert Transaction.query.filter_by(user_id=ids['user_id']).one().kind == 'transfer'
+        assert DailyRollup.query.filter_by(user_id=ids['user_id']).one().kind == 'transfer'
+        assert get_user_summary(ids['user_id']).total_expenses == 0.0
+
+        category = db.session.get(Category, ids['expense_id'])
+        category.name = 'Groceries'
+        category.type = 'income'
+        db.session.commit()
+        db.session.expire_all()
+        assert Transaction.query.filter_by(user_id=ids['user_id']).one().kind == 'income'
+        assert get_user_summary(ids['user_id']).total_income == 10.0
+
+    def test_sync_repairs_drifted_kinds(self, rollup_setup):
+        """Test that the backfill restamps rows written behind the ORM's back."""
+        ids = rollup_setup
+        transaction = Transaction(amount=3.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                  category_id=ids['expense_id'], account_id=ids['checking_id'])
+        db.session.add(transaction)
+        db.session.commit()
+        db.session.execute(Transaction.__table__.update().values(kind='income'))
+        db.session.commit()
+
+        sync_transaction_kinds(ids['user_id'])
+        db.session.commit()
+        db.session.expire_all()
+        assert db.session.get(Transaction, transaction.id).kind == 'expense'
+
+
+class TestUserSummary:
+    """Test the per-user lifetime summary maintained alongside the rollups."""
+
+    def test_summary_tracks_writes(self, client, rollup_setup):
+        """Test that creates, updates and deletes adjust the summary by deltas."""
+        ids = rollup_setup
+        assert _summary_snapshot(ids['user_id']) == (0.0, 0.0, 0, 2, 2)
+
+        income = Transaction(amount=100.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                             category_id=ids['income_id'], account_id=ids['checking_id'])
+        expense = Transaction(amount=30.0, date=datetime(2024, 1, 2), user_id=ids['user_id'],
+                              category_id=ids['expense_id'], account_id=ids['checking_id'])
+        db.session.add_all([income, expense])
+        db.session.commit()
+        assert _summary_snapshot(ids['user_id']) == (100.0, 30.0, 2, 2, 2)
+
+        expense.amount = 45.0
+        db.session.delete(income)
+        db.session.add(Category(name="Rent", type="expense", user_id=ids['user_id']))
+        db.session.commit()
+        assert _summary_snapshot(ids['user_id']) == (0.0, 45.0, 1, 3, 2)
+
+        incremental = _summary_snapshot(ids['user_id'])
+        rebuild_rollups(ids['user_id'])
+        assert incremental == _summary_snapshot(ids['user_id'])
+
+    def test_transfers_are_excluded(self, rollup_setup):
+        """Test that transfer transactions only count towards the transaction total."""
+        ids = rollup_setup
+        transfer = Category(name="Transfer", type="expense", user_id=ids['user_id'])
+        db.session.add(transfer)
+        db.session.commit()
+
+        db.session.add(Transaction(amount=50.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                   category_id=transfer.id, account_id=ids['checking_id']))
+        db.session.commit()
+        assert _summary_snapshot(ids['user_id']) == (0.0, 0.0, 1, 3, 2)
+
+    def test_category_type_change_recomputes_totals(self, rollup_setup):
+        """Test that reclassifying a category moves its history between totals."""
+        ids = rollup_setup
+        db.session.add(Transaction(amount=20.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                   category_id=ids['expense_id'], account_id=ids['checking_id']))
+        db.session.commit()
+
+        category = db.session.get(Category, ids['expense_id'])
+        category.type = 'income'
+        db.session.commit()
+        assert _summary_snapshot(ids['user_id']) == (20.0, 0.0, 1, 2, 2)
+
+    def test_missing_summary_is_computed(self, rollup_setup):
+        """Test that users without a stored summary get one computed on demand."""
+        ids = rollup_setup
+        db.session.add(Transaction(amount=12.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                   category_id=ids['income_id'], account_id=ids['checking_id']))
+        db.session.commit()
+        UserSummary.query.delete()
+        db.session.commit()
+
+        summary = get_user_summary(ids['user_id'])
+        assert (summary.total_income, summary.transaction_count, summary.account_count) == (12.0, 1, 2)
+
+    def test_profile_and_dashboard_read_summary(self, client, rollup_setup):
+        """Test that the profile stats and dashboard totals come from the summary."""
+        ids = rollup_setup
+        db.session.add(Transaction(amount=80.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                   category_id=ids['income_id'], account_id=ids['checking_id']))
+        db.session.commit()
+
+        stats = client.get('/profile/api/stats').get_json()
+        assert stats['total_transactions'] == 1
+        assert stats['categories_created'] == 2
+        assert stats['accounts_managed'] == 2
+
+        response = client.get('/home/api/stats?days=0')
+        assert response.get_json()['data']['total_balance'] == 80.0
+
+    def test_delete_all_data_resets_summary(self, client, rollup_setup):
+        """Test that purging all data leaves a zeroed summary behind."""
+        ids = rollup_setup
+        db.session.add(Transaction(amount=5.0, date=datetime(2024, 1, 1), user_id=ids['user_id'],
+                                   category_id=ids['expense_id'], account_id=ids['checking_id']))
+        db.session.commit()
+
+        response = client.post('/profile/delete-all-data', json={
+            'confirmation1': 'DELETE ALL DATA',
+            'confirmation2': 'CONFIRM DELETE'
+        })
+        assert response.status_code == 200
+        assert _summary_snapshot(ids['user_id']) == (0.0, 0.0, 0, 0, 0)
+
+    def test_delete_account_removes_summary(self, client, rollup_setup):
+        """Test that deleting the account also removes its summary row."""
+        ids = rollup_setup
+        response = client.post('/profile/delete-account', json={
+            'confirmation1': 'DELETE ACCOUNT',
+            'confirmation2': 'PERMANENTLY DELETE'
+        })
+        assert response.status_code == 200
+        assert db.session.get(UserSummary, ids['user_id']) is None
+
+
+class TestLedgerRows:
+    """Test reading aggregates through the rollup-backed ledger subquery."""
+
+    def test_full_day_span_splits_partial_edges(self):
+        """Test splitting a range into whole days and raw partial edges."""
+        first, last, edges = _full_day_span(datetime(2024, 1, 1, 12), datetime(2024, 1, 5, 23, 59, 59, 999999))
+        assert first == date(2024, 1, 2)
+        assert last == date(2024, 1, 5)
+        assert edges == [(datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 23, 59, 59, 999999))]
+
+        first, last, edges = _full_day_span(datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 9))
+        assert (first, last) == (None, None)
+        assert edges == [(datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 9))]
+
+    def test_ledger_rows_respects_partial_day_boundaries(self, rollup_setup):
+        """Test that transactions before a mid-day start are excluded."""
+        ids = rollup_setup
+        db.session.add_all([
+            Transaction(amount=1.0, date=datetime(2024, 1, 1, 6), user_id=ids['user_id'],
+                        category_id=ids['expense_id'], account_id=ids['checking_id']),
+            Transaction(amount=2.0, date=datetime(2024, 1, 1, 18), user_id=ids['user_id'],
+                        category_id=ids['expense_id'], account_id=ids['checking_id']),
+            Transaction(amount=4.0, date=datetime(2024, 1, 3, 10), user_id=ids['user_id'],
+                        category_id=ids['expense_id'], account_id=ids['checking_id']),
+        ])
+        db.session.commit()
+
+        ledger = ledger_rows(ids['user_id'], datetime(2024, 1, 1, 12))
+        total, count = db.session.query(
+            db.func.sum(ledger.c.total), db.func.sum(ledger.c.txn_count)
+        ).one()
+        assert total == 6.0
+        assert count == 2
+
+        ledger = ledger_rows(ids['user_id'])
+        assert db.session.query(db.func.sum(ledger.c.total)).scalar() == 7.0
+
+
+class TestRollupCommand:
+    """Test the rollups CLI command."""
+
+    def test_rebuild_command(self, runner, rollup_setup):
+        """Test that the rebuild command recreates missing rollups."""
+        ids = rollup_setup
+        db.session.add(Transaction(amount=9.0, date=datetime(2024, 2, 2), user_id=ids['user_id'],
+                                   category_id=ids['income_id'], account_id=ids['savings_id']))
+        db.session.commit()
+        DailyRollup.query.delete()
+        db.session.commit()
+
+        result = runner.invoke(args=['rollups', 'rebuild'])
+        assert result.exit_code == 0
+        assert 'Rebuilt 1 daily rollup rows' in result.output
+        assert _rollup_snapshot(ids['user_id']) == {
+            (date(2024, 2, 2), ids['income_id'], ids['savings_id']): (9.0, 1)
+        }
+
+    def test_rebuild_command_unknown_user(self, runner, db):
+        """Test that rebuilding for an unknown user fails cleanly."""
+        result = runner.invoke(args=['rollups', 'rebuild', '--user-id', '999'])
+        assert result.exit_code != 0
+        assert 'User 999 not found' in result.output
@@ -0,0 +1,147 @@
+"""
+Tests for the indexed and fuzzy transaction search.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select, text
+from app.models import Transaction, Category, Account, db
+from app.search import similarity, rebuild_search_index, description_condition, SEARCH_TABLE
+
+
+@pytest.fixture
+def search_setup(client, auth_client, db):
+    """Create a logged in user with described transactions in two accounts."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    food = Category(name="Food", type="expense", user_id=user.id)
+    transfer = Category(name="Transfer", type="expense", user_id=user.id)
+    checking = Account(name="Checking", user_id=user.id, balance=0.0)
+    wallet = Account(name="Wallet", user_id=user.id, balance=0.0)
+    db.session.add_all([food, transfer, checking, wallet])
+    db.session.commit()
+
+    now = datetime.now()
+    rows = [
+        ('Grocery shopping', checking, food, 0),
+        ('Team lunch', checking, food, 1),
+        ('Lunch with clients', wallet, food, 2),
+        ('Cinema', wallet, food, 3),
+    ]
+    db.session.add_all([
+        Transaction(amount=10.0, date=now - timedelta(hours=hours), description=description, user_id=user.id,
+                    category_id=category.id, account_id=account.id)
+        for description, account, category, hours in rows
+    ] + [
+        Transaction(amount=50.0, date=now, description='Lunch savings', user_id=user.id,
+                    category_id=transfer.id, account_id=checking.id)
+    ])
+    db.session.commit()
+
+    return {'user_id': user.id, 'food_id': food.id, 'wallet_id': wallet.id}
+
+
+def _listed(client, search):
+    response = client.get('/transactions/api/transactions', query_string={'search': search})
+    return [t['description'] for t in response.get_json()['transactions']]
+
+
+class TestSearchFilter:
+    """Test the search filter of the transaction listings."""
+
+    def test_description_substring(self, client, search_setup):
+        """Test that indexed terms match anywhere in the description, case insensitively."""
+        assert _listed(client, 'LUNCH') == ['Team lunch', 'Lunch with clients']
+        assert _listed(client, 'shop') == ['Grocery shopping']
+
+    def test_short_terms_fall_back(self, client, search_setup):
+        """Test that terms shorter than a trigram still match."""
+        assert _listed(client, 'NE') == ['Cinema']
+
+    def test_account_and_category_names(self, client, search_setup):
+        """Test that names of accounts and categories are matched too."""
+        assert _listed(client, 'wallet') == ['Lunch with clients', 'Cinema']
+        assert len(_listed(client, 'foo')) == 4
+
+    def test_like_wildcards_are_literal(self, client, search_setup):
+        """Test that % and _ in a term do not act as wildcards."""
+        assert _listed(client, '%') == []
+        assert _listed(client, 'c_nema') == []
+
+    def test_index_follows_writes(self, client, search_setup):
+        """Test that edits and deletes reach the index."""
+        cinema = Transaction.query.filter_by(description='Cinema').one()
+        cinema.description = 'Theatre'
+        db.session.commit()
+        assert _listed(client, 'cinema') == []
+        assert _listed(client, 'theatre') == ['Theatre']
+
+        db.session.delete(cinema)
+        db.session.commit()
+        assert _listed(client, 'theatre') == []
+
+
+class TestRankedSearch:
+    """Test the fuzzy ranked search endpoint."""
+
+    def test_requires_term(self, client, search_setup):
+        """Test that an empty term is rejected."""
+        assert client.get('/transactions/api/search?q=').status_code == 400
+
+    def test_typos_are_found(self, client, search_setup):
+        """Test fuzzy matching of misspelled words."""
+        data = client.get('/transactions/api/search?q=grocey').get_json()
+        assert [t['description'] for t in data['transactions']] == ['Grocery shopping']
+        assert 0.5 <= data['transactions'][0]['score'] < 1
+
+    def test_ranking_and_transfers(self, client, search_setup):
+        """Test that prefix matches rank first, newest first among equals, transfers excluded."""
+        data = client.get('/transactions/api/search?q=lunch').get_json()
+        assert [t['description'] for t in data['transactions']] == ['Team lunch', 'Lunch with clients']
+        assert data['transactions'][0]['category']['name'] == 'Food'
+
+    def test_names_are_ranked(self, client, search_setup):
+        """Test that categories and accounts are scored in memory."""
+        data = client.get('/transactions/api/search?q=walet').get_json()
+        assert [a['name'] for a in data['accounts']] == ['Wallet']
+        assert data['categories'] == []
+
+    def test_similarity(self):
+        """Test the trigram similarity used for ranking."""
+        assert similarity('gro', 'Grocery shopping') == 1.0
+        assert similarity('ocer', 'Grocery') < similarity('groc', 'Grocery') == 1.0
+        assert similarity('', 'Grocery') == 0.0
+
+
+class TestSearchIndex:
+    """Test maintenance of the SQLite search index."""
+
+    def test_rebuild_restores_missing_rows(self, client, search_setup):
+        """Test that rebuilding refills the index from the transactions table."""
+        db.session.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')"))
+        db.session.commit()
+        assert _listed(client, 'cinema') == []
+
+        assert rebuild_search_index() is True
+        assert _listed(client, 'cinema') == ['Cinema']
+
+    def test_index_only_yields_the_users_rows(self, client, search_setup):
+        """Test that the index matches descriptions of the given user only."""
+        other = Account(name="Other", user_id=search_setup['user_id'] + 1, balance=0.0)
+        db.session.add(other)
+        db.session.commit()
+        db.session.add(Transaction(amount=1.0, description='Cinema', user_id=other.user_id,
+                                   category_id=search_setup['food_id'], account_id=other.id))
+        db.session.commit()
+
+        for user_id in (search_setup['user_id'], other.user_id):
+            rows = db.session.execute(select(Transaction.user_id).where(description_condition(user_id, 'cinema')))
+            assert rows.scalars().all() == [user_id]
+
+        # Moving a transaction to another user moves its index entry too
+        db.session.execute(text("UPDATE transactions SET user_id = :user_id WHERE user_id = :other_id"),
+                           {'user_id': search_setup['user_id'], 'other_id': other.user_id})
+        db.session.commit()
+        rows = db.session.execute(select(Transaction.id).where(description_condition(other.user_id, 'cinema')))
+        assert rows.all() == []
@@ -0,0 +1,155 @@
+"""
+Tests for the shared single-pass category statistics and their cache.
+"""
+
+import pytest
+from datetime import datetime
+from app.models import Transaction, Category, Account, db
+from app.statistics import StatisticsCache
+
+
+@pytest.fixture
+def stats_setup(client, auth_client, db):
+    """Create a logged in user with income, expense and transfer activity."""
+    user = auth_client.create_user()
+    auth_client.login()
+
+    salary = Category(name="Salary", type="income", user_id=user.id, unicode_emoji="💰")
+    food = Category(name="Food", type="expense", user_id=user.id, unicode_emoji="🍔")
+    rent = Category(name="Rent", type="expense", user_id=user.id)
+    transfer = Category(name="Transfer", type="expense", user_id=user.id)
+    account = Account(name="Checking", user_id=user.id, balance=0.0)
+    db.session.add_all([salary, food, rent, transfer, account])
+    db.session.commit()
+
+    now = datetime.now()
+    db.session.add_all([
+        Transaction(amount=1000.0, date=now, user_id=user.id, category_id=salary.id, account_id=account.id),
+        Transaction(amount=40.0, date=now, user_id=user.id, category_id=food.id, account_id=account.id),
+        Transaction(amount=10.0, date=now, user_id=user.id, category_id=food.id, account_id=account.id),
+        # Transfers are neither income nor expenses
+        Transaction(amount=200.0, date=now, user_id=user.id, category_id=transfer.id, account_id=account.id),
+    ])
+    db.session.commit()
+
+    return {'user_id': user.id, 'account_id': account.id, 'food_id': food.id}
+
+
+def _selects(statements):
+    return sum(1 for statement, _ in statements if statement.lstrip().upper().startswith('SELECT'))
+
+
+class TestStatisticsEndpoints:
+    """Test the endpoints sharing the statistics engine."""
+
+    def test_transaction_statistics(self, client, stats_setup):
+        """Test that the summary and both breakdowns come from the grouped scan."""
+        data = client.get('/transactions/api/statistics').get_json()
+        assert data['summary'] == {
+            'total_income': 1000.0,
+            'total_expenses': 50.0,
+            'net_income': 950.0,
+            'transaction_count': 3
+        }
+        assert data['expenses_by_category'] == [{'category': 'Food', 'emoji': '🍔', 'amount': 50.0}]
+        assert data['income_by_category'] == [{'category': 'Salary', 'emoji': '💰', 'amount': 1000.0}]
+
+    def test_category_stats_counts_categories(self, client, stats_setup):
+        """Test that categories without activity still count."""
+        stats = client.get('/categories/api/categories/stats?filter=all').get_json()['stats']
+        assert stats['income_categories'] == 1
+        assert stats['expense_categories'] == 3
+        assert stats['total_income'] == 1000.0
+        assert stats['total_expenses'] == 50.0
+
+    def test_category_breakdown(self, client, stats_setup):
+        """Test the home breakdown percentages."""
+        data = client.get('/home/api/category-breakdown?type=expense').get_json()['data']
+        assert [category['name'] for category in data['categories']] == ['Food']
+        assert data['categories'][0]['percentage'] == 100.0
+        assert data['total_amount'] == 50.0
+
+
+class TestStatisticsCache:
+    """Test caching and invalidation of the statistics."""
+
+    def test_statistics_run_one_query_and_are_cached(self, app, client, capture_sql, stats_setup):
+        """Test that a request runs a single statistics query and repeats hit the cache."""
+        client.get('/transactions/api/statistics')
+
+        with capture_sql() as first:
+            client.get('/transactions/api/statistics?date_range=this_year')
+
+        with capture_sql() as again:
+            client.get('/transactions/api/statistics?date_range=this_year')
+        # Only the login lookup is left once the statistics are cached
+        assert _selects(again) == _selects(first) - 1
+
+    def test_write_invalidates_cache(self, client, stats_setup):
+        """Test that a committed transaction is visible on the next request."""
+        ids = stats_setup
+        assert client.get('/transactions/api/statistics').get_json()['summary']['total_expenses'] == 50.0
+
+        response = client.post('/transactions/api/transactions', json={
+            'amount': 25.0, 'account_id': ids['account_id'], 'category_id': ids['food_id']
+        })
+        assert response.status_code == 201
+
+        summary = client.get('/transactions/api/statistics').get_json()['summary']
+        assert summary['total_expenses'] == 75.0
+        assert summary['transaction_count'] == 4
+
+    def test_category_rename_invalidates_cache(self, client, stats_setup):
+        """Test that category changes reach cached breakdowns."""
+        ids = stats_setup
+        client.get('/transactions/api/statistics')
+
+        db.session.get(Category, ids['food_id']).name = 'Groceries'
+        db.session.commit()
+
+        data = client.get('/transactions/api/statistics').get_json()
+        assert data['expenses_by_category'][0]['category'] == 'Groceries'
+
+    def test_rollback_keeps_cache(self, app, client, stats_setup):
+        """Test that rolled back writes do not drop cached statistics."""
+        ids = stats_setup
+        client.get('/transactions/api/statistics')
+
+        db.session.add(Transaction(amount=5.0, date=datetime.now(), user_id=ids['user_id'],
+                                   category_id=ids['food_id'], account_id=ids['account_id']))
+        db.session.flush()
+        db.session.rollback()
+
+        cache = app.extensions['statistics_cache']
+        assert cache.get(ids['user_id'], ('transactions', 'last_30_days')) is not None
+
+    def test_custom_ranges_are_not_cached(self, app, client, stats_setup):
+        """Test that only named periods are kept in the cache."""
+        client.get('/categories/api/categories/stats?filter=custom&start_date=2020-01-01&end_date=2020-01-31')
+        client.get('/categories/api/categories/stats?filter=month')
+        client.get('/home/api/category-breakdown?days=45')
+
+        cache = app.extensions['statistics_cache']
+        assert [key for _, key in cache._entries] == [('categories', 'month')]
+
+    def test_results_racing_a_commit_are_not_cached(self):
+        """Test that totals computed before an invalidation are not stored after it."""
+        cache = StatisticsCache(max_entries=2)
+        version = cache.version
+        cache.invalidate({1})
+        cache.set(1, 'a', 'stale', ttl=60, version=version)
+        assert cache.get(1, 'a') is None
+
+    def test_lru_eviction_and_expiry(self):
+        """Test that expired entries are dropped and the least recently used is evicted."""
+        cache = StatisticsCache(max_entries=2)
+        cache.set(1, 'expired', 'old', ttl=-1, version=cache.version)
+        cache.set(1, 'a', 'one', ttl=60, version=cache.version)
+        assert list(cache._entries) == [(1, 'a')]
+
+        cache.set(2, 'a', 'two', ttl=60, version=cache.version)
+        assert cache.get(1, 'a') == 'one'
+        cache.set(3, 'a', 'three', ttl=60, version=cache.version)
+        assert cache.get(2, 'a') is None
+        assert cache.get(1, 'a') == 'one'
+        assert cache.get(3, 'a') == 'three'
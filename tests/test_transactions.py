@@ -1,3 +1,5 @@
+import json
+import sys
 import pytest
 from datetime import datetime, timedelta
 from app.models import User, Account, Category, Transaction, db
@@ -1540,3 +1542,374 @@ class TestTransactionAutocomplete:
         
         # Check that the modal setup is present
         assert 'transactionModal' in html_content
+
+
+class TestCursorPagination:
+    """Test keyset pagination of the transaction listings."""
+
+    @pytest.fixture
+    def paged_setup(self, client, auth_client, db):
+        """Create 25 transactions, several sharing the same timestamp."""
+        user = auth_client.create_user()
+        auth_client.login()
+        account = Account(name="Checking", user_id=user.id, balance=0.0)
+        category = Category(name="Food", type="expense", user_id=user.id)
+        db.session.add_all([account, category])
+        db.session.commit()
+
+        now = datetime.now().replace(microsecond=0)
+        for i in range(25):
+            # Groups of five share a timestamp so the id tie-break matters
+            db.session.add(Transaction(amount=float(i + 1), description=f"Item {i}",
+                                       date=now - timedelta(hours=i // 5),
+                                       user_id=user.id, account_id=account.id, category_id=category.id))
+        db.session.commit()
+        return {'account_id': account.id, 'category_id': category.id}
+
+    def test_walks_every_row_once_in_order(self, client, paged_setup):
+        """Test that following next cursors returns each transaction exactly once."""
+        seen = []
+        cursor = None
+        while True:
+            url = '/transactions/api/transactions?per_page=7'
+            if cursor:
+                url += f'&cursor={cursor}'
+            data = client.get(url).get_json()
+            seen.extend((t['date'], t['id']) for t in data['transactions'])
+            cursor = data['pagination']['next_cursor']
+            if not cursor:
+                break
+
+        assert len(seen) == 25
+        assert len(set(seen)) == 25
+        assert seen == sorted(seen, reverse=True)
+
+    def test_prev_cursor_returns_previous_page(self, client, paged_setup):
+        """Test that the prev cursor of page two yields page one again."""
+        first = client.get('/transactions/api/transactions?per_page=10').get_json()
+        assert first['pagination']['has_prev'] is False
+
+        second = client.get(
+            f"/transactions/api/transactions?per_page=10&cursor={first['pagination']['next_cursor']}"
+        ).get_json()
+        back = client.get(
+            f"/transactions/api/transactions?per_page=10&cursor={second['pagination']['prev_cursor']}"
+        ).get_json()
+
+        assert [t['id'] for t in back['transactions']] == [t['id'] for t in first['transactions']]
+        assert back['pagination']['has_prev'] is False
+        assert back['pagination']['has_next'] is True
+
+    def test_per_page_is_capped(self, client, paged_setup):
+        """Test that clients cannot request unbounded pages."""
+        data = client.get('/transactions/api/transactions?per_page=100000').get_json()
+        assert data['pagination']['per_page'] == 100
+
+    def test_invalid_cursor_is_rejected(self, client, paged_setup):
+        """Test that a malformed cursor returns a 400 error."""
+        response = client.get('/transactions/api/transactions?cursor=not-a-cursor')
+        assert response.status_code == 400
+
+    def test_total_estimate_is_optional(self, client, paged_setup):
+        """Test that the approximate total is only computed on request."""
+        data = client.get('/transactions/api/transactions').get_json()
+        assert 'total_estimate' not in data['pagination']
+
+        data = client.get('/transactions/api/transactions?include_total=true').get_json()
+        assert data['pagination']['total_estimate'] == 25
+
+    def test_page_view_links_next_cursor(self, client, paged_setup):
+        """Test that the transactions page renders cursor based navigation."""
+        response = client.get('/transactions/?filter=all')
+        assert response.status_code == 200
+        assert b'cursor=' in response.data
+
+
+class TestStreamingExport:
+    """Test the chunked CSV export."""
+
+    @pytest.fixture
+    def export_setup(self, client, auth_client, db):
+        """Create a logged in user with a handful of transactions."""
+        user = auth_client.create_user()
+        auth_client.login()
+        account = Account(name="Checking", user_id=user.id, balance=0.0)
+        category = Category(name="Food", type="expense", user_id=user.id)
+        db.session.add_all([account, category])
+        db.session.commit()
+
+        now = datetime.now()
+        for i in range(7):
+            db.session.add(Transaction(amount=float(i + 1), description=f"Row {i}", date=now - timedelta(minutes=i),
+                                       user_id=user.id, account_id=account.id, category_id=category.id))
+        db.session.commit()
+
+    def test_export_is_streamed_in_chunks(self, client, export_setup, monkeypatch):
+        """Test that rows are written across several chunks without loss or reordering."""
+        # The app package shadows the module name with a view function
+        transactions_module = sys.modules['app.transactions']
+        monkeypatch.setattr(transactions_module, 'EXPORT_CHUNK_SIZE', 3)
+
+        response = client.get('/transactions/export/csv?filter=all')
+        assert response.status_code == 200
+        assert response.is_streamed
+
+        lines = response.data.decode('utf-8').strip().splitlines()
+        assert lines[0] == 'id,date,description,category,account,amount'
+        assert [line.split(',')[2] for line in lines[1:]] == [f"Row {i}" for i in range(7)]
+
+    def test_gzip_export(self, client, export_setup):
+        """Test that the export can be compressed on the fly."""
+        import gzip
+
+        response = client.get('/transactions/export/csv?filter=all&gzip=true')
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'application/gzip'
+        assert '.csv.gz' in response.headers['Content-Disposition']
+
+        lines = gzip.decompress(response.data).decode('utf-8').strip().splitlines()
+        assert len(lines) == 8
+
+
+class TestBatchCreate:
+    """Test the bulk transaction create endpoint."""
+
+    @pytest.fixture
+    def batch_setup(self, client, auth_client, db):
+        """Create a logged in user with two accounts and both category types."""
+        user = auth_client.create_user()
+        auth_client.login()
+        checking = Account(name="Checking", user_id=user.id, balance=100.0)
+        savings = Account(name="Savings", user_id=user.id, balance=0.0)
+        income = Category(name="Salary", type="income", user_id=user.id)
+        expense = Category(name="Food", type="expense", user_id=user.id)
+        db.session.add_all([checking, savings, income, expense])
+        db.session.commit()
+        return {
+            'user_id': user.id,
+            'checking_id': checking.id,
+            'savings_id': savings.id,
+            'income_id': income.id,
+            'expense_id': expense.id
+        }
+
+    def test_json_array_creates_valid_rows_and_reports_errors(self, client, batch_setup):
+        """Test that invalid rows are reported without aborting the valid ones."""
+        ids = batch_setup
+        response = client.post('/transactions/api/transactions/batch', json=[
+            {'amount': 50, 'account_id': ids['checking_id'], 'category_id': ids['income_id'],
+             'date': '2024-03-01T10:00', 'description': 'Pay'},
+            {'amount': 20, 'account_id': ids['checking_id'], 'category_id': ids['expense_id']},
+            {'amount': 'abc', 'account_id': ids['checking_id'], 'category_id': ids['expense_id']},
+            {'amount': 5, 'account_id': 99999, 'category_id': ids['expense_id']},
+            {'account_id': ids['savings_id'], 'category_id': ids['expense_id']},
+            {'amount': 7, 'account_id': ids['savings_id'], 'category_id': ids['expense_id']},
+        ])
+        assert response.status_code == 201
+        data = response.get_json()
+
+        assert data['created_count'] == 3
+        assert [row['index'] for row in data['created']] == [0, 1, 5]
+        assert {(e['index'], e['error']) for e in data['errors']} == {
+            (2, 'Invalid data'), (3, 'Account not found'), (4, 'Required field: amount')
+        }
+
+        created = db.session.get(Transaction, data['created'][0]['id'])
+        assert created.description == 'Pay'
+        assert created.kind == 'income'
+        assert db.session.get(Account, ids['checking_id']).balance == 130.0
+        assert db.session.get(Account, ids['savings_id']).balance == -7.0
+
+    def test_ndjson_body(self, client, batch_setup):
+        """Test that a newline-delimited JSON body is accepted."""
+        ids = batch_setup
+        lines = [
+            json.dumps({'amount': 10, 'account_id': ids['checking_id'], 'category_id': ids['expense_id']}),
+            '',
+            'not json',
+            json.dumps({'amount': 15, 'account_id': ids['checking_id'], 'category_id': ids['expense_id']}),
+        ]
+        response = client.post('/transactions/api/transactions/batch', data='\n'.join(lines),
+                               content_type='application/x-ndjson')
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['created_count'] == 2
+        assert data['errors'] == [{'index': 1, 'error': 'Row must be a JSON object'}]
+        assert db.session.get(Account, ids['checking_id']).balance == 75.0
+
+    def test_rollups_and_summary_follow_bulk_insert(self, client, batch_setup, monkeypatch):
+        """Test that bulk inserted rows are rolled up like ORM inserts, across chunks."""
+        from app.models import UserSummary
+        from app.rollups import rebuild_rollups
+
+        monkeypatch.setattr(sys.modules['app.transactions'], 'BULK_INSERT_CHUNK_SIZE', 5)
+        ids = batch_setup
+        rows = [{'amount': i + 1, 'account_id': ids['checking_id'], 'category_id': ids['expense_id'],
+                 'date': f'2024-01-{i % 3 + 1:02d}T12:00'} for i in range(12)]
+        response = client.post('/transactions/api/transactions/batch', json={'transactions': rows})
+        assert response.status_code == 201
+
+        summary = db.session.get(UserSummary, ids['user_id'])
+        incremental = (summary.total_expenses, summary.transaction_count)
+        assert incremental == (78.0, 12)
+
+        rebuild_rollups(ids['user_id'])
+        db.session.expire_all()
+        summary = db.session.get(UserSummary, ids['user_id'])
+        assert (summary.total_expenses, summary.transaction_count) == incremental
+
+    def test_rejects_malformed_body(self, client, batch_setup):
+        """Test that a body that is not an array is rejected."""
+        response = client.post('/transactions/api/transactions/batch', json={'amount': 5})
+        assert response.status_code == 400
+
+    def test_all_rows_invalid(self, client, batch_setup):
+        """Test that a batch without valid rows returns 400 with the errors."""
+        response = client.post('/transactions/api/transactions/batch', json=[{'amount': 1}])
+        assert response.status_code == 400
+        assert response.get_json()['error_count'] == 1
+
+
+class TestSetBasedBulkOperations:
+    """Test the set-based bulk delete, recategorize, move and shift operations."""
+
+    @pytest.fixture
+    def bulk_setup(self, client, auth_client, db):
+        """Create a user with two accounts, both category types and ten transactions."""
+        user = auth_client.create_user()
+        auth_client.login()
+        checking = Account(name="Checking", user_id=user.id, balance=0.0)
+        savings = Account(name="Savings", user_id=user.id, balance=0.0)
+        income = Category(name="Salary", type="income", user_id=user.id)
+        expense = Category(name="Food", type="expense", user_id=user.id)
+        db.session.add_all([checking, savings, income, expense])
+        db.session.commit()
+
+        transaction_ids = []
+        for i in range(10):
+            transaction = Transaction(amount=10.0, date=datetime(2024, 3, 1 + i % 3, 9, 30),
+                                      user_id=user.id, account_id=checking.id, category_id=expense.id)
+            db.session.add(transaction)
+            db.session.flush()
+            transaction_ids.append(transaction.id)
+        db.session.commit()
+
+        return {
+            'user_id': user.id,
+            'checking_id': checking.id,
+            'savings_id': savings.id,
+            'income_id': income.id,
+            'expense_id': expense.id,
+            'transaction_ids': transaction_ids
+        }
+
+    def _assert_rollups_match_rebuild(self, user_id):
+        """Check that the incrementally maintained rollups equal a rebuild."""
+        from app.models import DailyRollup
+        from app.rollups import rebuild_rollups
+
+        def snapshot():
+            db.session.expire_all()
+            return {(r.day, r.category_id, r.account_id, r.kind): (round(r.total, 6), r.txn_count)
+                    for r in DailyRollup.query.filter_by(user_id=user_id)}
+
+        incremental = snapshot()
+        rebuild_rollups(user_id)
+        assert incremental == snapshot()
+
+    def test_delete_reports_accounts_and_restores_balance(self, client, bulk_setup):
+        """Test that bulk delete corrects balances and reports per-account counts."""
+        ids = bulk_setup
+        response = client.post('/transactions/api/transactions/bulk', json={
+            'operation': 'delete',
+            'transaction_ids': ids['transaction_ids'][:4]
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['message'] == '4 transactions deleted successfully'
+        assert data['accounts'] == [{'account_id': ids['checking_id'], 'transactions': 4, 'balance_change': 40.0}]
+        assert Transaction.query.filter_by(user_id=ids['user_id']).count() == 6
+        assert db.session.get(Account, ids['checking_id']).balance == 40.0
+        self._assert_rollups_match_rebuild(ids['user_id'])
+
+    def test_recategorize_flips_balance_effect(self, client, bulk_setup):
+        """Test that moving expenses to an income category applies the new sign."""
+        ids = bulk_setup
+        response = client.post('/transactions/api/transactions/bulk', json={
+            'operation': 'recategorize',
+            'transaction_ids': ids['transaction_ids'][:3],
+            'category_id': ids['income_id']
+        })
+        assert response.status_code == 200
+        assert response.get_json()['accounts'][0]['balance_change'] == 60.0
+
+        db.session.expire_all()
+        moved = db.session.get(Transaction, ids['transaction_ids'][0])
+        assert (moved.category_id, moved.kind) == (ids['income_id'], 'income')
+        assert db.session.get(Account, ids['checking_id']).balance == 60.0
+        self._assert_rollups_match_rebuild(ids['user_id'])
+
+    def test_move_to_another_account(self, client, bulk_setup):
+        """Test that moving transactions shifts their balance effect between accounts."""
+        ids = bulk_setup
+        response = client.post('/transactions/api/transactions/bulk', json={
+            'operation': 'move',
+            'transaction_ids': ids['transaction_ids'][:5],
+            'account_id': ids['savings_id']
+        })
+        assert response.status_code == 200
+        accounts = {a['account_id']: a for a in response.get_json()['accounts']}
+        assert accounts[ids['checking_id']]['balance_change'] == 50.0
+        assert accounts[ids['savings_id']]['balance_change'] == -50.0
+
+        db.session.expire_all()
+        assert db.session.get(Account, ids['savings_id']).balance == -50.0
+        assert Transaction.query.filter_by(account_id=ids['savings_id']).count() == 5
+        self._assert_rollups_match_rebuild(ids['user_id'])
+
+    def test_shift_date_keeps_time_of_day(self, client, bulk_setup):
+        """Test that shifting dates moves whole days and leaves balances alone."""
+        ids = bulk_setup
+        response = client.post('/transactions/api/transactions/bulk', json={
+            'operation': 'shift_date',
+            'transaction_ids': ids['transaction_ids'][:2],
+            'days': -3
+        })
+        assert response.status_code == 200
+
+        db.session.expire_all()
+        shifted = db.session.get(Transaction, ids['transaction_ids'][0])
+        assert shifted.date == datetime(2024, 2, 27, 9, 30)
+        assert db.session.get(Account, ids['checking_id']).balance == 0.0
+        self._assert_rollups_match_rebuild(ids['user_id'])
+
+    def test_rejects_invalid_requests(self, client, bulk_setup):
+        """Test validation of operations, targets and ownership."""
+        ids = bulk_setup
+        url = '/transactions/api/transactions/bulk'
+
+        assert client.post(url, json={'operation': 'archive', 'transaction_ids': ids['transaction_ids']}).status_code == 400
+        assert client.post(url, json={'operation': 'shift_date', 'transaction_ids': ids['transaction_ids']}).status_code == 400
+        assert client.post(url, json={'operation': 'move', 'transaction_ids': ids['transaction_ids'],
+                                      'account_id': 99999}).status_code == 404
+        assert client.post(url, json={'operation': 'delete', 'transaction_ids': [99999]}).status_code == 404
+
+    def test_statement_count_does_not_grow_with_selection(self, app, client, capture_sql, bulk_setup):
+        """Test that the number of SQL statements is independent of the selection size."""
+        ids = bulk_setup
+
+        def count_statements(transaction_ids):
+            # Start both measurements from an empty identity map
+            db.session.expire_all()
+            with capture_sql() as statements:
+                response = client.post('/transactions/api/transactions/bulk', json={
+                    'operation': 'recategorize',
+                    'transaction_ids': transaction_ids,
+                    'category_id': ids['income_id']
+                })
+            assert response.status_code == 200
+            return len(statements)
+
+        # Load the cached accounts and categories so both measurements hit the cache
+        client.get('/transactions/')
+        assert count_statements(ids['transaction_ids'][:2]) == count_statements(ids['transaction_ids'][2:])